@@ -12,10 +12,16 @@ from colorama import Fore, Style
 from utils.logger import log_info, log_error, log_warning, log_profit, log_opportunity
 from utils.exceptions import ArbitrageError, ExchangeError, InsufficientBalanceError, OrderError
 from utils.helpers import show_time, extract_base_asset
+from utils.orderbook_slots import LatestBookSlots
+from utils.depth_book import DepthBook
+from utils.price_index import BestPriceIndex
+from utils.book_freshness import BookFreshness
+from utils.latency import latency_tracker, STAGE_FEED, STAGE_QUEUE, STAGE_PROCESS, STAGE_DECISION, ALL_EXCHANGES
+from services.trade_pipeline import TradeIntent, TradePipeline, BUY_SIDE, SELL_SIDE
 from configs import (
     PROFIT_CRITERIA_PCT, PROFIT_CRITERIA_USD, ENABLE_CTRL_C_HANDLING,
-    ORDERBOOK_WATCH_DELAY, NETWORK_ERROR_DELAY, TRANSACTION_SAFETY_FACTOR,
-    BALANCE_SAFETY_MARGIN
+    NETWORK_ERROR_DELAY, TRANSACTION_SAFETY_FACTOR, BALANCE_SAFETY_MARGIN,
+    SCANNER_SYMBOL_BATCH_SIZE, DEPTH_BOOK_LEVELS, MAX_BOOK_AGE_SECONDS
 )
 
 
@@ -43,31 +49,55 @@ class BaseBot:
         
         # Các biến chung
         self.symbol = None
+        self.symbols = []  # Danh sách cặp giao dịch được theo dõi (chế độ nhiều cặp)
         self.exchanges = []
         self.timeout = 0
+        self.duration = 0  # Thời gian chạy của phiên (giây)
         self.howmuchusd = 0
         self.total_absolute_profit_pct = 0
         self.opportunity_count = 0
         self.start_time = 0
+        self.clock = time  # Nguồn thời gian của bot (ReplayClock khi phát lại dữ liệu đã ghi)
+        self.quiet = False  # Không hiển thị cơ hội tốt nhất sau mỗi lần đánh giá
         
         # Khởi tạo các biến theo dõi giá
-        self.bid_prices = {}  # Giá mua tốt nhất trên mỗi sàn (người khác mua)
-        self.ask_prices = {}  # Giá bán tốt nhất trên mỗi sàn (người khác bán)
+        self.depth_books = {}  # Sổ độ sâu lũy kế của mỗi sàn
+        self.bid_prices = {}  # Giá bán khớp trung bình (VWAP) cho crypto_per_transaction trên mỗi sàn
+        self.ask_prices = {}  # Giá mua khớp trung bình (VWAP) cho crypto_per_transaction trên mỗi sàn
+        self.bid_limit_prices = {}  # Giá giới hạn cần đặt để bán hết khối lượng trên mỗi sàn
+        self.ask_limit_prices = {}  # Giá giới hạn cần đặt để mua hết khối lượng trên mỗi sàn
+        self.ask_index = BestPriceIndex()  # Chỉ mục sàn có giá mua thấp nhất
+        self.bid_index = BestPriceIndex(highest=True)  # Chỉ mục sàn có giá bán cao nhất
+        self.freshness = BookFreshness(MAX_BOOK_AGE_SECONDS)  # Thời điểm cập nhật gần nhất của mỗi sàn
         self.min_ask_price = 0
         self.max_bid_price = 0
+        self.min_ask_limit_price = 0
+        self.max_bid_limit_price = 0
         self.prec_ask_price = 0
         self.prec_bid_price = 0
         
+        # Sách lệnh mới nhất của mỗi sàn, chờ tác vụ đánh giá xử lý
+        self.book_slots = LatestBookSlots()
+        self.tick_recorder = None  # TickRecorder ghi lại sách lệnh nhận được (tùy chọn)
+        self.receive_times = {}  # Thời điểm nhận (perf_counter) sách lệnh mới nhất của mỗi ô
+        self.evaluation_started = 0  # Thời điểm (perf_counter) bắt đầu lần đánh giá hiện tại
+        
+        # Giao dịch thật chạy nền để sách lệnh vẫn được nhận và đánh giá trong lúc chờ khớp lệnh
+        self.background_trades = False
+        self.trade_pipeline = None  # Đường ống thực thi nhiều giao dịch không xung đột cùng lúc
+        
         # Số dư
         self.usd = {}  # Số dư USDT trên mỗi sàn
         self.crypto = {}  # Số dư crypto trên mỗi sàn
+        self.live_usd = {}  # Số dư USDT khả dụng thực tế trên mỗi sàn (từ luồng số dư)
+        self.live_crypto = {}  # Số dư crypto khả dụng thực tế trên mỗi sàn (từ luồng số dư)
         self.crypto_per_transaction = 0  # Số lượng crypto mỗi giao dịch
         
         # Khởi tạo bắt CTRL+C
         if ENABLE_CTRL_C_HANDLING:
             signal.signal(signal.SIGINT, self._handle_interrupt)
     
-    def configure(self, symbol, exchanges, timeout, amount_usd, indicatif=None):
+    def configure(self, symbol, exchanges, timeout, amount_usd, indicatif=None, symbols=None, tick_recorder=None):
         """
         Cấu hình bot giao dịch.
         
@@ -77,12 +107,17 @@ class BaseBot:
             timeout (int): Thời gian chạy tối đa (giây)
             amount_usd (float): Số lượng USDT để giao dịch
             indicatif (str, optional): Tiêu đề cho thông báo
+            symbols (list, optional): Danh sách cặp giao dịch cho chế độ theo dõi nhiều cặp
+            tick_recorder (TickRecorder, optional): Bộ ghi sách lệnh nhận được
         """
         self.symbol = symbol
+        self.symbols = symbols or ([symbol] if symbol else [])
         self.exchanges = exchanges
-        self.timeout = time.time() + timeout
+        self.duration = timeout
+        self.timeout = self.clock.time() + timeout
         self.howmuchusd = float(amount_usd)
         self.indicatif = indicatif or symbol
+        self.tick_recorder = tick_recorder
         
         log_info(f"Cấu hình bot với: {symbol}, {exchanges}, {timeout}s, {amount_usd} USDT")
     
@@ -105,6 +140,12 @@ class BaseBot:
         Returns:
             float: Tổng lợi nhuận (phần trăm)
         """
+        # Báo cáo tần suất cập nhật sách lệnh của các sàn
+        self.freshness.report(self.clock.time())
+        
+        # Ngừng nhận số dư (luồng số dư của sàn vẫn chạy cho phiên sau)
+        self.balance_service.remove_listener(self._on_balance_update)
+        
         # Cập nhật số dư với lợi nhuận
         final_balance = self.balance_service.update_balance_with_profit(self.total_absolute_profit_pct)
         
@@ -142,8 +183,8 @@ class BaseBot:
                 
                 if user_input.lower() in ["y", "yes"]:
                     answered = True
-                    self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
-                    sys.exit(1)
+                    # Lệnh bán chạy trên vòng lặp sự kiện đang chạy, chương trình thoát sau khi bán xong
+                    asyncio.get_running_loop().create_task(self._emergency_exit())
                     
                 elif user_input.lower() in ["n", "no"]:
                     answered = True
@@ -153,6 +194,11 @@ class BaseBot:
                 # Nếu người dùng nhấn Ctrl+C một lần nữa, thoát ngay lập tức
                 sys.exit(1)
     
+    async def _emergency_exit(self):
+        """Bán tất cả crypto về USDT rồi thoát chương trình."""
+        await self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+        sys.exit(1)
+    
     async def _start_orderbook_loop(self):
         """
         Bắt đầu vòng lặp theo dõi sách lệnh trên tất cả các sàn.
@@ -167,8 +213,8 @@ class BaseBot:
             for exchange_id in self.exchanges:
                 exchange_loops.append(self._exchange_loop(exchange_id))
                 
-            # Chạy tất cả các vòng lặp
-            await gather(*exchange_loops)
+            # Chạy tất cả các vòng lặp cùng tác vụ đánh giá cơ hội
+            await gather(self._evaluator_loop(), *exchange_loops)
             
             return self.total_absolute_profit_pct
             
@@ -176,6 +222,44 @@ class BaseBot:
             log_error(f"Lỗi trong vòng lặp theo dõi sách lệnh: {str(e)}")
             raise
     
+    async def _evaluator_loop(self):
+        """
+        Tác vụ đánh giá cơ hội giao dịch duy nhất.
+        
+        Thức dậy ngay khi có sàn cập nhật sách lệnh và đánh giá một lần cho trạng thái
+        mới nhất của tất cả các sàn, bất kể có bao nhiêu cập nhật đã dồn lại.
+        
+        Returns:
+            None
+        """
+        if self.background_trades and self.trade_pipeline is None:
+            self.trade_pipeline = TradePipeline(self._run_trade)
+            self.trade_pipeline.start()
+        
+        while self.clock.time() <= self.timeout:
+            updates = await self.book_slots.wait_for_updates(max(0, self.timeout - self.clock.time()))
+            
+            if not updates:
+                continue
+            
+            try:
+                opportunity_found = await self.process_orderbooks(updates)
+                
+                if opportunity_found:
+                    self._on_opportunity_found()
+                    
+            except Exception as e:
+                log_error(f"Lỗi khi đánh giá cơ hội giao dịch: {str(e)}")
+        
+        # Chờ các giao dịch đang chạy nền hoàn tất trước khi kết thúc phiên
+        if self.trade_pipeline:
+            await self.trade_pipeline.close()
+            self.trade_pipeline = None
+    
+    def _on_opportunity_found(self):
+        """Được gọi sau mỗi lần đánh giá phát hiện và thực hiện một cơ hội giao dịch."""
+        pass
+    
     async def _exchange_loop(self, exchange_id):
         """
         Vòng lặp theo dõi sách lệnh cho một sàn giao dịch cụ thể.
@@ -186,46 +270,168 @@ class BaseBot:
         Returns:
             None
         """
-        pro_exchange = None
         try:
-            # Tạo đối tượng sàn giao dịch ccxt.pro
+            # Lấy handle tới kết nối ccxt.pro dùng chung
             log_info(f"Bắt đầu theo dõi sách lệnh trên sàn {exchange_id}")
-            pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
+            handle = await self.exchange_service.acquire_pro_exchange(exchange_id)
             
-            # Theo dõi sách lệnh cho đến khi hết thời gian
-            while time.time() <= self.timeout:
-                try:
-                    # Lấy thông tin sách lệnh mới nhất
-                    orderbook = await pro_exchange.watch_order_book(self.symbol)
-                    
-                    # Xử lý dữ liệu sách lệnh
-                    await self.process_orderbook(exchange_id, orderbook)
-                    
-                except ccxt.pro.NetworkError as network_error:
-                    log_warning(f"Lỗi kết nối với {exchange_id}: {str(network_error)}")
-                    await asyncio.sleep(NETWORK_ERROR_DELAY)  # Đợi một chút trước khi thử lại
-                    
-                except Exception as loop_error:
-                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
-                    await asyncio.sleep(NETWORK_ERROR_DELAY)  # Đợi một chút trước khi thử lại
-                
-                # Đợi một chút để giảm tải cho CPU
-                await asyncio.sleep(ORDERBOOK_WATCH_DELAY)
+            async with handle:
+                # Theo dõi sách lệnh cho đến khi hết thời gian
+                while self.clock.time() <= self.timeout:
+                    try:
+                        # Lấy thông tin sách lệnh mới nhất
+                        orderbook = await handle.exchange.watch_order_book(self.symbol)
+                        
+                        # Ghi vào ô của sàn, tác vụ đánh giá sẽ xử lý trạng thái mới nhất
+                        self._receive_orderbook(exchange_id, exchange_id, orderbook)
+                        
+                    except ccxt.pro.NetworkError as network_error:
+                        log_warning(f"Lỗi kết nối với {exchange_id}: {str(network_error)}")
+                        await asyncio.sleep(NETWORK_ERROR_DELAY)  # Đợi một chút trước khi thử lại
+                        
+                    except Exception as loop_error:
+                        log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
+                        await asyncio.sleep(NETWORK_ERROR_DELAY)  # Đợi một chút trước khi thử lại
             
-            # Đóng kết nối với sàn giao dịch
+            # Kết nối được giữ ấm trong registry cho phiên tiếp theo
             log_info(f"Kết thúc theo dõi sách lệnh trên sàn {exchange_id}")
-            if pro_exchange:
-                await pro_exchange.close()
                 
         except Exception as e:
             log_error(f"Lỗi khi khởi tạo vòng lặp cho {exchange_id}: {str(e)}")
+    
+    def _receive_orderbook(self, slot_key, exchange_id, orderbook):
+        """
+        Xử lý một sách lệnh vừa nhận: ghi lại (nếu bật) và đưa vào ô chờ đánh giá.
+        
+        Args:
+            slot_key: Khóa ô (exchange_id hoặc (exchange_id, symbol))
+            exchange_id (str): ID của sàn giao dịch
+            orderbook (dict): Dữ liệu sách lệnh
+        """
+        self.receive_times[slot_key] = time.perf_counter()
+        
+        # Độ trễ từ sàn đến bot (theo đồng hồ của sàn, có thể lệch vài ms)
+        if orderbook.get('timestamp'):
+            latency_tracker.record(STAGE_FEED, exchange_id, time.time() - orderbook['timestamp'] / 1000)
+        
+        if self.tick_recorder:
+            self.tick_recorder.record(exchange_id, orderbook.get('symbol') or self.symbol, orderbook)
+        
+        self.book_slots.publish(slot_key, orderbook)
+    
+    def _record_queue_latency(self, orderbooks):
+        """
+        Bắt đầu một lần đánh giá và ghi thời gian chờ của các sách lệnh từ lúc nhận.
+        
+        Args:
+            orderbooks (dict): Ánh xạ khóa ô -> sách lệnh mới nhất
+        """
+        self.evaluation_started = time.perf_counter()
+        
+        for slot_key in orderbooks:
+            received = self.receive_times.get(slot_key)
+            if received is not None:
+                exchange_id = slot_key[0] if isinstance(slot_key, tuple) else slot_key
+                latency_tracker.record(STAGE_QUEUE, exchange_id, self.evaluation_started - received)
+    
+    def _record_decision_latency(self, min_ask_ex, max_bid_ex):
+        """
+        Ghi độ trễ từ lúc nhận sách lệnh của từng sàn đến quyết định giao dịch.
+        
+        Args:
+            min_ask_ex (str): Tên sàn mua
+            max_bid_ex (str): Tên sàn bán
+        """
+        for exchange_id in (min_ask_ex, max_bid_ex):
+            # Khi phát lại không có thời điểm nhận, tính từ lúc bắt đầu đánh giá
+            latency_tracker.record_since(
+                STAGE_DECISION, exchange_id, self.receive_times.get(exchange_id, self.evaluation_started)
+            )
+    
+    async def _multi_symbol_exchange_loop(self, exchange_id):
+        """
+        Theo dõi sách lệnh của tất cả các cặp trong self.symbols trên một kết nối duy nhất.
+        
+        Dùng watch_order_book_for_symbols theo từng lô nếu sàn hỗ trợ, ngược lại đăng ký
+        từng cặp trên cùng kết nối websocket. Mỗi cập nhật được ghi vào ô (exchange_id, symbol).
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
             
-            # Đảm bảo kết nối được đóng đúng cách
-            if pro_exchange:
-                try:
-                    await pro_exchange.close()
-                except Exception:
-                    pass
+        Returns:
+            None
+        """
+        try:
+            log_info(f"Bắt đầu theo dõi {len(self.symbols)} cặp giao dịch trên sàn {exchange_id}")
+            handle = await self.exchange_service.acquire_pro_exchange(exchange_id)
+            
+            async with handle:
+                exchange = handle.exchange
+                
+                # Chỉ theo dõi các cặp mà sàn có niêm yết
+                symbols = [s for s in self.symbols if not exchange.markets or s in exchange.markets]
+                if len(symbols) < len(self.symbols):
+                    log_warning(f"{exchange_id} không hỗ trợ {len(self.symbols) - len(symbols)} cặp, bỏ qua các cặp này")
+                
+                if exchange.has.get('watchOrderBookForSymbols'):
+                    batches = [
+                        symbols[i:i + SCANNER_SYMBOL_BATCH_SIZE]
+                        for i in range(0, len(symbols), SCANNER_SYMBOL_BATCH_SIZE)
+                    ]
+                    watchers = [self._watch_symbol_batch(exchange_id, handle, batch) for batch in batches]
+                else:
+                    watchers = [self._watch_single_symbol(exchange_id, handle, symbol) for symbol in symbols]
+                
+                await gather(*watchers)
+            
+            log_info(f"Kết thúc theo dõi sách lệnh trên sàn {exchange_id}")
+            
+        except Exception as e:
+            log_error(f"Lỗi khi khởi tạo vòng lặp nhiều cặp cho {exchange_id}: {str(e)}")
+    
+    async def _watch_symbol_batch(self, exchange_id, handle, symbols):
+        """
+        Theo dõi một lô cặp giao dịch bằng watch_order_book_for_symbols.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            handle (ProExchangeHandle): Handle tới kết nối dùng chung
+            symbols (list): Danh sách cặp giao dịch trong lô
+        """
+        while self.clock.time() <= self.timeout:
+            try:
+                orderbook = await handle.exchange.watch_order_book_for_symbols(symbols)
+                self._receive_orderbook((exchange_id, orderbook['symbol']), exchange_id, orderbook)
+                
+            except ccxt.pro.NetworkError as network_error:
+                log_warning(f"Lỗi kết nối với {exchange_id}: {str(network_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
+                
+            except Exception as loop_error:
+                log_error(f"Lỗi khi theo dõi lô cặp trên {exchange_id}: {str(loop_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
+    
+    async def _watch_single_symbol(self, exchange_id, handle, symbol):
+        """
+        Theo dõi một cặp giao dịch trên kết nối dùng chung (cho sàn không hỗ trợ theo lô).
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            handle (ProExchangeHandle): Handle tới kết nối dùng chung
+            symbol (str): Ký hiệu của cặp giao dịch
+        """
+        while self.clock.time() <= self.timeout:
+            try:
+                orderbook = await handle.exchange.watch_order_book(symbol)
+                self._receive_orderbook((exchange_id, symbol), exchange_id, orderbook)
+                
+            except ccxt.pro.NetworkError as network_error:
+                log_warning(f"Lỗi kết nối với {exchange_id} ({symbol}): {str(network_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
+                
+            except Exception as loop_error:
+                log_error(f"Lỗi khi theo dõi {symbol} trên {exchange_id}: {str(loop_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
     
     async def process_orderbook(self, exchange_id, orderbook):
         """
@@ -238,27 +444,203 @@ class BaseBot:
         Returns:
             bool: True nếu phát hiện cơ hội giao dịch, ngược lại False
         """
-        # Cập nhật giá mua và bán tốt nhất
-        self.bid_prices[exchange_id] = orderbook["bids"][0][0]  # Giá mua cao nhất
-        self.ask_prices[exchange_id] = orderbook["asks"][0][0]  # Giá bán thấp nhất
+        return await self.process_orderbooks({exchange_id: orderbook})
+    
+    async def process_orderbooks(self, orderbooks):
+        """
+        Cập nhật giá từ sách lệnh mới nhất của các sàn rồi đánh giá cơ hội một lần.
+        
+        Args:
+            orderbooks (dict): Ánh xạ ID sàn -> sách lệnh mới nhất
+            
+        Returns:
+            bool: True nếu phát hiện cơ hội giao dịch, ngược lại False
+        """
+        self._record_queue_latency(orderbooks)
         
-        # Tìm sàn có giá bán thấp nhất và sàn có giá mua cao nhất
-        min_ask_ex = min(self.ask_prices, key=self.ask_prices.get)
-        max_bid_ex = max(self.bid_prices, key=self.bid_prices.get)
+        for exchange_id, orderbook in orderbooks.items():
+            self._update_prices(exchange_id, orderbook)
         
-        # Điều chỉnh lựa chọn sàn dựa trên số dư
-        for exchange in self.exchanges:
-            # Nếu không đủ crypto, chọn sàn này để mua
-            if exchange in self.crypto and self.crypto[exchange] < self.crypto_per_transaction:
-                min_ask_ex = exchange
-                
-            # Nếu không đủ USDT (không nên xảy ra), chọn sàn này để bán
-            if exchange in self.usd and self.usd[exchange] <= 0:
-                max_bid_ex = exchange
+        if not self.bid_prices or not self.ask_prices:
+            return False
+        
+        return await self._evaluate_opportunity()
+    
+    def _update_prices(self, exchange_id, orderbook):
+        """
+        Cập nhật sổ độ sâu của một sàn và tính lại giá khớp thực tế cho khối lượng giao dịch.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            orderbook (dict): Dữ liệu sách lệnh
+        """
+        # Bỏ qua sách lệnh rỗng (sàn đang gửi snapshot)
+        if not orderbook["bids"] or not orderbook["asks"]:
+            return
+        
+        self.freshness.touch(exchange_id, self.clock.time(), orderbook.get('timestamp'))
         
-        # Lấy giá mua và bán tốt nhất đã điều chỉnh
+        if exchange_id not in self.depth_books:
+            self.depth_books[exchange_id] = DepthBook(DEPTH_BOOK_LEVELS)
+        
+        self.depth_books[exchange_id].update(orderbook)
+        self._reprice_exchange(exchange_id)
+    
+    def _reprice_exchange(self, exchange_id):
+        """
+        Tính giá khớp trung bình để mua/bán crypto_per_transaction trên một sàn.
+        
+        Sàn không đủ độ sâu cho khối lượng giao dịch bị loại khỏi việc chọn sàn.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        book = self.depth_books[exchange_id]
+        buy = book.buy_price(self.crypto_per_transaction)
+        sell = book.sell_price(self.crypto_per_transaction)
+        
+        if buy:
+            self.ask_prices[exchange_id], self.ask_limit_prices[exchange_id] = buy
+            self.ask_index.update(exchange_id, self.ask_prices[exchange_id])
+        else:
+            self.ask_prices.pop(exchange_id, None)
+            self.ask_limit_prices.pop(exchange_id, None)
+            self.ask_index.remove(exchange_id)
+        
+        if sell:
+            self.bid_prices[exchange_id], self.bid_limit_prices[exchange_id] = sell
+            self.bid_index.update(exchange_id, self.bid_prices[exchange_id])
+        else:
+            self.bid_prices.pop(exchange_id, None)
+            self.bid_limit_prices.pop(exchange_id, None)
+            self.bid_index.remove(exchange_id)
+    
+    def _reprice_all(self):
+        """Tính lại giá khớp của tất cả các sàn sau khi khối lượng giao dịch thay đổi."""
+        for exchange_id in self.depth_books:
+            self._reprice_exchange(exchange_id)
+    
+    async def _start_balance_stream(self):
+        """Nhận số dư thực tế của các sàn từ luồng số dư nền của BalanceService."""
+        self.live_usd = {}
+        self.live_crypto = {}
+        self.balance_service.add_listener(self._on_balance_update)
+        
+        # Dùng ngay ảnh chụp đã có (ví dụ từ lần kiểm tra số dư khi bắt đầu phiên)
+        for exchange_id in self.exchanges:
+            if exchange_id in self.balance_service.snapshots:
+                self._on_balance_update(exchange_id, self.balance_service.snapshots[exchange_id])
+        
+        await self.balance_service.start_streaming(self.exchanges)
+    
+    def _on_balance_update(self, exchange_id, balance):
+        """
+        Cập nhật số dư khả dụng thực tế của một sàn.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            balance (dict): Số dư theo định dạng ccxt
+        """
+        if exchange_id not in self.exchanges:
+            return
+        
+        free = balance.get('free') or {}
+        self.live_usd[exchange_id] = free.get('USDT') or 0.0
+        self.live_crypto[exchange_id] = free.get(extract_base_asset(self.symbol)) or 0.0
+    
+    def _available_usd(self, exchange_id):
+        """Số USDT trên sàn chưa bị giữ chỗ bởi các giao dịch đang thực hiện, không vượt số dư thực tế."""
+        reserved = self.trade_pipeline.ledger.usd_reserved(exchange_id) if self.trade_pipeline else 0
+        usd = self.usd.get(exchange_id, 0)
+        live = self.live_usd.get(exchange_id)
+        return (usd if live is None else min(usd, live)) - reserved
+    
+    def _available_crypto(self, exchange_id):
+        """Số crypto trên sàn chưa bị giữ chỗ bởi các giao dịch đang thực hiện, không vượt số dư thực tế."""
+        reserved = self.trade_pipeline.ledger.crypto_reserved(exchange_id) if self.trade_pipeline else 0
+        crypto = self.crypto.get(exchange_id, 0)
+        live = self.live_crypto.get(exchange_id)
+        return (crypto if live is None else min(crypto, live)) - reserved
+    
+    def _side_busy(self, exchange_id, side):
+        """Kiểm tra phía mua/bán của sàn đang được một giao dịch khác sử dụng."""
+        return self.trade_pipeline is not None and self.trade_pipeline.ledger.is_busy(exchange_id, side)
+    
+    def _can_buy_on(self, exchange_id):
+        """Kiểm tra sàn có đủ USDT khả dụng để mua crypto_per_transaction ở giá khớp hiện tại."""
+        needed = self.crypto_per_transaction * self.ask_prices[exchange_id] * BALANCE_SAFETY_MARGIN
+        return not self._side_busy(exchange_id, BUY_SIDE) and self._available_usd(exchange_id) >= needed
+    
+    def _can_sell_on(self, exchange_id):
+        """Kiểm tra sàn có đủ crypto khả dụng để bán crypto_per_transaction."""
+        needed = self.crypto_per_transaction * BALANCE_SAFETY_MARGIN
+        return not self._side_busy(exchange_id, SELL_SIDE) and self._available_crypto(exchange_id) >= needed
+    
+    def _select_exchanges(self):
+        """
+        Chọn cặp sàn mua/bán tốt nhất từ chỉ mục giá, ưu tiên các sàn đủ số dư.
+        
+        Chỉ cần hai sàn tốt nhất mỗi phía: nếu cùng một sàn đứng đầu cả hai phía,
+        sàn đứng thứ hai của một trong hai phía sẽ được ghép cặp. Các sàn có sách lệnh
+        cũ hơn MAX_BOOK_AGE_SECONDS không được chọn.
+        
+        Returns:
+            tuple: (sàn mua, sàn bán), hoặc None nếu không có sàn nào đủ mới
+        """
+        now = self.clock.time()
+        
+        def fresh(exchange_id):
+            return self.freshness.is_fresh(exchange_id, now)
+        
+        buys = self.ask_index.top(2, lambda exchange_id: fresh(exchange_id) and self._can_buy_on(exchange_id))
+        sells = self.bid_index.top(2, lambda exchange_id: fresh(exchange_id) and self._can_sell_on(exchange_id))
+        
+        # Chưa có sàn nào đủ số dư: vẫn hiển thị cơ hội theo giá thuần
+        if not buys or not sells:
+            buys = self.ask_index.top(2, fresh)
+            sells = self.bid_index.top(2, fresh)
+        
+        if not buys or not sells:
+            return None
+        
+        # Xếp hạng theo chênh lệch sau phí: phí khác nhau giữa các sàn có thể đảo thứ tự giá thuần
+        fees = self.config.get('fees', {})
+        best_pair = None
+        best_spread = None
+        for buy_ex, ask_price in buys:
+            for sell_ex, bid_price in sells:
+                if buy_ex == sell_ex:
+                    continue
+                spread = (
+                    bid_price * (1 - fees.get(sell_ex, {}).get('receive', 0.001))
+                    - ask_price * (1 + fees.get(buy_ex, {}).get('give', 0.001))
+                )
+                if best_spread is None or spread > best_spread:
+                    best_pair = (buy_ex, sell_ex)
+                    best_spread = spread
+        
+        # Chỉ có một sàn: trả về cặp trùng sàn, _should_execute_trade sẽ bỏ qua
+        return best_pair or (buys[0][0], sells[0][0])
+    
+    async def _evaluate_opportunity(self):
+        """
+        Đánh giá cơ hội giao dịch trên trạng thái giá hiện tại của tất cả các sàn.
+        
+        Returns:
+            bool: True nếu phát hiện cơ hội giao dịch, ngược lại False
+        """
+        # Tìm sàn mua rẻ nhất và sàn bán đắt nhất trong số các sàn đủ số dư
+        selected = self._select_exchanges()
+        if selected is None:
+            return False
+        
+        min_ask_ex, max_bid_ex = selected
+        
+        # Lấy giá khớp trung bình và giá giới hạn đã điều chỉnh
         self.min_ask_price = self.ask_prices[min_ask_ex]
         self.max_bid_price = self.bid_prices[max_bid_ex]
+        self.min_ask_limit_price = self.ask_limit_prices[min_ask_ex]
+        self.max_bid_limit_price = self.bid_limit_prices[max_bid_ex]
         
         # Tính toán lợi nhuận tiềm năng
         total_usd_amount = sum(self.usd.values())
@@ -282,11 +664,17 @@ class BaseBot:
         profit_with_fees_pct = (profit_with_fees_usd / total_usd_amount) * 100
         
         # Hiển thị thông tin về cơ hội tốt nhất
-        self._display_best_opportunity(min_ask_ex, max_bid_ex, profit_with_fees_usd)
+        if not self.quiet:
+            self._display_best_opportunity(min_ask_ex, max_bid_ex, profit_with_fees_usd)
         
         # Kiểm tra điều kiện để thực hiện giao dịch
-        if self._should_execute_trade(min_ask_ex, max_bid_ex, profit_with_fees_usd, profit_with_fees_pct):
-            # Thực hiện giao dịch
+        should_trade = self._should_execute_trade(min_ask_ex, max_bid_ex, profit_with_fees_usd, profit_with_fees_pct)
+        latency_tracker.record_since(STAGE_PROCESS, ALL_EXCHANGES, self.evaluation_started)
+        
+        if should_trade:
+            self._record_decision_latency(min_ask_ex, max_bid_ex)
+            
+            # Thực hiện giao dịch (xếp hàng vào đường ống với bot giao dịch thật)
             await self._execute_trade(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd)
             return True
             
@@ -337,6 +725,14 @@ class BaseBot:
         if min_ask_ex == max_bid_ex:
             return False
         
+        # Giới hạn số giao dịch đồng thời và tránh tranh cùng một phía sách lệnh
+        if self.trade_pipeline:
+            if not self.trade_pipeline.has_capacity():
+                return False
+            
+            if self.trade_pipeline.ledger.conflicts(min_ask_ex, max_bid_ex):
+                return False
+        
         # Kiểm tra điều kiện lợi nhuận
         if profit_with_fees_usd <= float(PROFIT_CRITERIA_USD):
             return False
@@ -348,11 +744,11 @@ class BaseBot:
         if self.prec_ask_price == self.min_ask_price and self.prec_bid_price == self.max_bid_price:
             return False
         
-        # Kiểm tra đủ số dư để thực hiện giao dịch
-        if self.usd[min_ask_ex] < self.crypto_per_transaction * self.min_ask_price * BALANCE_SAFETY_MARGIN:
+        # Kiểm tra đủ số dư khả dụng (trừ phần giữ chỗ của giao dịch đang thực hiện)
+        if self._available_usd(min_ask_ex) < self.crypto_per_transaction * self.min_ask_price * BALANCE_SAFETY_MARGIN:
             return False
             
-        if self.crypto[max_bid_ex] < self.crypto_per_transaction * BALANCE_SAFETY_MARGIN:
+        if self._available_crypto(max_bid_ex) < self.crypto_per_transaction * BALANCE_SAFETY_MARGIN:
             return False
         
         # Nếu qua tất cả các điều kiện, có thể thực hiện giao dịch
@@ -360,7 +756,35 @@ class BaseBot:
     
     async def _execute_trade(self, min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd):
         """
-        Thực hiện giao dịch chênh lệch giá.
+        Tạo ý định giao dịch từ trạng thái giá hiện tại và thực hiện nó.
+        
+        Với bot chạy giao dịch nền, ý định được giữ chỗ số dư và xếp hàng vào đường ống
+        rồi trả về ngay; ngược lại giao dịch được thực hiện trực tiếp.
+        
+        Args:
+            min_ask_ex (str): Tên sàn có giá mua thấp nhất
+            max_bid_ex (str): Tên sàn có giá bán cao nhất
+            profit_with_fees_pct (float): Lợi nhuận sau phí tính theo phần trăm
+            profit_with_fees_usd (float): Lợi nhuận sau phí tính theo USD
+            
+        Returns:
+            bool: True nếu giao dịch được xếp hàng hoặc thực hiện thành công, ngược lại False
+        """
+        intent = self._create_trade_intent(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd)
+        
+        # Cập nhật giá trước đó (trước khi chờ lệnh khớp vì giá có thể thay đổi trong lúc chờ)
+        self.prec_ask_price = self.min_ask_price
+        self.prec_bid_price = self.max_bid_price
+        
+        if self.trade_pipeline is None:
+            return await self._run_trade(intent)
+        
+        self.trade_pipeline.submit(intent)
+        return True
+    
+    def _create_trade_intent(self, min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd):
+        """
+        Chụp lại giá, khối lượng và phần số dư cần giữ chỗ của một cơ hội giao dịch.
         
         Args:
             min_ask_ex (str): Tên sàn có giá mua thấp nhất
@@ -368,6 +792,30 @@ class BaseBot:
             profit_with_fees_pct (float): Lợi nhuận sau phí tính theo phần trăm
             profit_with_fees_usd (float): Lợi nhuận sau phí tính theo USD
             
+        Returns:
+            TradeIntent: Ý định giao dịch
+        """
+        fees = self.config.get('fees', {})
+        fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
+        fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
+        amount = self.crypto_per_transaction
+        
+        return TradeIntent(
+            min_ask_ex, max_bid_ex, self.symbol, amount,
+            self.min_ask_price, self.max_bid_price,
+            self.min_ask_limit_price, self.max_bid_limit_price,
+            profit_with_fees_pct, profit_with_fees_usd,
+            reserved_usd=amount * self.min_ask_limit_price * (1 + fee_rate_buy),
+            reserved_crypto=amount * (1 + fee_rate_sell)
+        )
+    
+    async def _run_trade(self, intent):
+        """
+        Thực hiện giao dịch chênh lệch giá.
+        
+        Args:
+            intent (TradeIntent): Ý định giao dịch
+            
         Returns:
             bool: True nếu giao dịch thành công, ngược lại False
         """
@@ -375,67 +823,91 @@ class BaseBot:
             # Tăng số lượng cơ hội đã phát hiện
             self.opportunity_count += 1
             
-            # Cập nhật số dư trên các sàn
-            self._update_balances_after_trade(min_ask_ex, max_bid_ex)
-            
             # Tính toán phí giao dịch
-            fees = self.config.get('fees', {})
-            fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
-            fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
-            
-            fee_crypto = self.crypto_per_transaction * (fee_rate_buy + fee_rate_sell)
-            fee_usd = (self.crypto_per_transaction * self.max_bid_price * fee_rate_sell) + (self.crypto_per_transaction * self.min_ask_price * fee_rate_buy)
+            fee_usd, fee_crypto = self._trade_fees(intent)
             
             # Cập nhật tổng lợi nhuận
-            self.total_absolute_profit_pct += profit_with_fees_pct
-            
-            # Tạo báo cáo giao dịch
-            self._display_trade_report(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd, fee_usd, fee_crypto)
+            self.total_absolute_profit_pct += intent.profit_pct
             
             # Đặt lệnh giao dịch
-            self.order_service.place_arbitrage_orders(
-                min_ask_ex, max_bid_ex, self.symbol,
-                self.crypto_per_transaction, self.min_ask_price, self.max_bid_price,
+            trade_success = await self.order_service.place_arbitrage_orders(
+                intent.buy_exchange, intent.sell_exchange, intent.symbol,
+                intent.amount, intent.buy_limit_price, intent.sell_limit_price,
                 self.notification_service
             )
             
-            # Cập nhật giá trước đó
-            self.prec_ask_price = self.min_ask_price
-            self.prec_bid_price = self.max_bid_price
+            # Cập nhật số dư trên các sàn khi giao dịch đã xong và phần giữ chỗ sắp được trả lại
+            self._update_balances_after_trade(
+                intent.buy_exchange, intent.sell_exchange, intent.amount, intent.buy_price, intent.sell_price
+            )
+            
+            # Ghi giao dịch và phí vào sổ cái
+            self.balance_service.record_trade(intent, fee_usd, fee_crypto, trade_success)
+            
+            # Tạo báo cáo giao dịch
+            self._display_trade_report(
+                intent.buy_exchange, intent.sell_exchange, intent.profit_pct, intent.profit_usd, fee_usd, fee_crypto,
+                buy_price=intent.buy_price, sell_price=intent.sell_price
+            )
             
             # Cập nhật số lượng crypto mỗi giao dịch
             self._update_transaction_amount()
             
-            return True
+            return trade_success
             
         except Exception as e:
             log_error(f"Lỗi khi thực hiện giao dịch: {str(e)}")
             return False
     
-    def _update_balances_after_trade(self, min_ask_ex, max_bid_ex):
+    def _trade_fees(self, intent):
+        """
+        Tính phí của một giao dịch.
+        
+        Args:
+            intent (TradeIntent): Ý định giao dịch
+            
+        Returns:
+            tuple: (phí tính theo USD, phí tính theo crypto)
+        """
+        fees = self.config.get('fees', {})
+        fee_rate_buy = fees.get(intent.buy_exchange, {}).get('give', 0.001)
+        fee_rate_sell = fees.get(intent.sell_exchange, {}).get('receive', 0.001)
+        
+        fee_crypto = intent.amount * (fee_rate_buy + fee_rate_sell)
+        fee_usd = (intent.amount * intent.sell_price * fee_rate_sell) + (intent.amount * intent.buy_price * fee_rate_buy)
+        return fee_usd, fee_crypto
+    
+    def _update_balances_after_trade(self, min_ask_ex, max_bid_ex, amount=None, buy_price=None, sell_price=None):
         """
         Cập nhật số dư sau khi thực hiện giao dịch.
         
         Args:
             min_ask_ex (str): Tên sàn có giá mua thấp nhất
             max_bid_ex (str): Tên sàn có giá bán cao nhất
+            amount (float, optional): Số lượng crypto đã giao dịch, mặc định là crypto_per_transaction
+            buy_price (float, optional): Giá mua, mặc định là giá mua thấp nhất hiện tại
+            sell_price (float, optional): Giá bán, mặc định là giá bán cao nhất hiện tại
         """
+        amount = self.crypto_per_transaction if amount is None else amount
+        buy_price = self.min_ask_price if buy_price is None else buy_price
+        sell_price = self.max_bid_price if sell_price is None else sell_price
+        
         # Cập nhật số dư trên sàn mua
         fees = self.config.get('fees', {})
         buy_fee_rate = fees.get(min_ask_ex, {}).get('give', 0.001)
         sell_fee_rate = fees.get(max_bid_ex, {}).get('receive', 0.001)
         
         # Tăng số dư crypto trên sàn mua
-        self.crypto[min_ask_ex] += self.crypto_per_transaction * (1 - buy_fee_rate)
+        self.crypto[min_ask_ex] += amount * (1 - buy_fee_rate)
         
         # Giảm số dư USDT trên sàn mua
-        self.usd[min_ask_ex] -= self.crypto_per_transaction * self.min_ask_price * (1 + buy_fee_rate)
+        self.usd[min_ask_ex] -= amount * buy_price * (1 + buy_fee_rate)
         
         # Giảm số dư crypto trên sàn bán
-        self.crypto[max_bid_ex] -= self.crypto_per_transaction * (1 + sell_fee_rate)
+        self.crypto[max_bid_ex] -= amount * (1 + sell_fee_rate)
         
         # Tăng số dư USDT trên sàn bán
-        self.usd[max_bid_ex] += self.crypto_per_transaction * self.max_bid_price * (1 - sell_fee_rate)
+        self.usd[max_bid_ex] += amount * sell_price * (1 - sell_fee_rate)
     
     def _update_transaction_amount(self):
         """
@@ -446,8 +918,11 @@ class BaseBot:
         
         # Cập nhật số lượng crypto mỗi giao dịch (lấy trung bình)
         self.crypto_per_transaction = total_crypto / len(self.exchanges) * TRANSACTION_SAFETY_FACTOR  # Giảm 1% để đảm bảo đủ số dư
+        
+        # Giá khớp phụ thuộc vào khối lượng, cần tính lại cho khối lượng mới
+        self._reprice_all()
     
-    def _display_trade_report(self, min_ask_ex, max_bid_ex, profit_pct, profit_usd, fee_usd, fee_crypto):
+    def _display_trade_report(self, min_ask_ex, max_bid_ex, profit_pct, profit_usd, fee_usd, fee_crypto, buy_price=None, sell_price=None):
         """
         Hiển thị báo cáo về giao dịch đã thực hiện.
         
@@ -458,7 +933,12 @@ class BaseBot:
             profit_usd (float): Lợi nhuận tính theo USD
             fee_usd (float): Phí tính theo USD
             fee_crypto (float): Phí tính theo crypto
+            buy_price (float, optional): Giá mua của giao dịch, mặc định là giá mua thấp nhất hiện tại
+            sell_price (float, optional): Giá bán của giao dịch, mặc định là giá bán cao nhất hiện tại
         """
+        buy_price = self.min_ask_price if buy_price is None else buy_price
+        sell_price = self.max_bid_price if sell_price is None else sell_price
+        
         # Xóa dòng hiện tại
         sys.stdout.write("\033[F")
         sys.stdout.write("\033[K")
@@ -472,12 +952,12 @@ class BaseBot:
             ex_balances += f"\n➝ {exchange}: {round(self.crypto[exchange], 3)} {extract_base_asset(self.symbol)} / {round(self.usd[exchange], 2)} USDT"
         
         # In thông tin giao dịch
-        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(time.time() - self.start_time))
+        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(self.clock.time() - self.start_time))
         current_worth = round((self.howmuchusd * (1 + (self.total_absolute_profit_pct / 100))), 3)
         
         print(
             f"{Style.RESET_ALL}Cơ hội #{self.opportunity_count} phát hiện! "
-            f"({min_ask_ex} {self.min_ask_price} -> {self.max_bid_price} {max_bid_ex})\n"
+            f"({min_ask_ex} {buy_price} -> {sell_price} {max_bid_ex})\n"
             f"\nLợi nhuận: {Fore.GREEN}+{round(profit_pct, 4)}% (+{round(profit_usd, 4)} USD){Style.RESET_ALL}\n"
             f"\nTổng lợi nhuận phiên: {Fore.GREEN}+{round(self.total_absolute_profit_pct, 4)}% "
             f"(+{round((self.total_absolute_profit_pct / 100) * self.howmuchusd, 4)} USD){Style.RESET_ALL}\n"
@@ -491,7 +971,7 @@ class BaseBot:
         # Gửi thông báo qua Telegram nếu được kích hoạt
         if self.notification_service:
             self.notification_service.send_opportunity(
-                self.opportunity_count, min_ask_ex, self.min_ask_price, max_bid_ex, self.max_bid_price,
+                self.opportunity_count, min_ask_ex, buy_price, max_bid_ex, sell_price,
                 profit_pct, profit_usd, self.total_absolute_profit_pct, 
                 (self.total_absolute_profit_pct / 100) * self.howmuchusd,
                 fee_usd, fee_crypto, self.symbol, elapsed_time, 
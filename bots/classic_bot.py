@@ -37,6 +37,9 @@ class ClassicBot(BaseBot):
             {'fees': EXCHANGE_FEES}
         )
         
+        # Lệnh được đặt và theo dõi trong tác vụ nền, sách lệnh vẫn được đánh giá trong lúc chờ khớp
+        self.background_trades = True
+        
         # Thêm biến theo dõi số lần thử lại và thống kê
         self.retry_count = 0
         self.max_retries = 3
@@ -62,11 +65,11 @@ class ClassicBot(BaseBot):
         """
         try:
             log_info(f"Bắt đầu phiên giao dịch với tham số: {self.symbol}, {self.exchanges}, {self.howmuchusd} USDT")
-            self.start_time = time.time()
+            self.start_time = self.clock.time()
             
             # Kiểm tra số dư
             try:
-                self.balance_service.check_balances(self.exchanges, 'USDT', self.howmuchusd, self.notification_service)
+                await self.balance_service.check_balances(self.exchanges, 'USDT', self.howmuchusd, self.notification_service)
             except InsufficientBalanceError as e:
                 log_error(f"Không đủ số dư: {str(e)}")
                 self.error_counts['balance'] += 1
@@ -86,7 +89,7 @@ class ClassicBot(BaseBot):
                     prices = []
                     for exchange_id in self.exchanges:
                         try:
-                            ticker = self.exchange_service.get_ticker(exchange_id, self.symbol)
+                            ticker = await self.exchange_service.get_ticker(exchange_id, self.symbol)
                             prices.append((ticker['bid'] + ticker['ask']) / 2)
                         except Exception:
                             continue
@@ -115,7 +118,7 @@ class ClassicBot(BaseBot):
             for attempt in range(self.max_retries):
                 try:
                     log_info(f"Lần thử {attempt+1}/{self.max_retries} đặt lệnh mua ban đầu")
-                    success = self.order_service.place_initial_orders(
+                    success = await self.order_service.place_initial_orders(
                         self.exchanges, self.symbol, crypto_per_exchange, average_price, self.notification_service
                     )
                     if success:
@@ -137,6 +140,9 @@ class ClassicBot(BaseBot):
             # Cập nhật số lượng crypto mỗi giao dịch
             self.crypto_per_transaction = (total_crypto / len(self.exchanges)) * 0.99  # Giảm 1% để đảm bảo đủ số dư
             
+            # Số dư thực tế được đẩy về bot, không cần hỏi REST trước mỗi giao dịch
+            await self._start_balance_stream()
+            
             # Bắt đầu vòng lặp theo dõi sách lệnh
             await self._start_orderbook_loop()
             
@@ -152,7 +158,7 @@ class ClassicBot(BaseBot):
             
             # Thực hiện bán khẩn cấp nếu có lỗi
             try:
-                self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+                await self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
             except Exception as cleanup_error:
                 log_error(f"Lỗi khi bán khẩn cấp: {str(cleanup_error)}")
                 
@@ -172,8 +178,8 @@ class ClassicBot(BaseBot):
             for exchange_id in self.exchanges:
                 exchange_loops.append(self._exchange_loop(exchange_id))
                 
-            # Chạy tất cả các vòng lặp
-            await gather(*exchange_loops)
+            # Chạy tất cả các vòng lặp cùng tác vụ đánh giá cơ hội
+            await gather(self._evaluator_loop(), *exchange_loops)
             
             return self.total_absolute_profit_pct
             
@@ -192,88 +198,71 @@ class ClassicBot(BaseBot):
         Returns:
             None
         """
-        pro_exchange = None
         try:
-            # Tạo đối tượng sàn giao dịch ccxt.pro
+            # Lấy handle tới kết nối ccxt.pro dùng chung
             log_info(f"Bắt đầu theo dõi sách lệnh trên sàn {exchange_id}")
-            pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
+            handle = await self.exchange_service.acquire_pro_exchange(exchange_id)
             
             connection_errors = 0
             max_connection_errors = 5
             reconnect_delay = 5  # giây
             
-            # Theo dõi sách lệnh cho đến khi hết thời gian
-            while time.time() <= self.timeout:
-                try:
-                    # Lấy thông tin sách lệnh mới nhất
-                    orderbook = await pro_exchange.watch_order_book(self.symbol)
-                    
-                    # Đặt lại bộ đếm lỗi kết nối khi thành công
-                    if connection_errors > 0:
-                        log_info(f"Kết nối lại thành công với {exchange_id}")
-                        connection_errors = 0
-                    
-                    # Xử lý dữ liệu sách lệnh
-                    opportunity_found = await self.process_orderbook(exchange_id, orderbook)
-                    
-                    if opportunity_found:
-                        self.stats['opportunities_found'] += 1
-                    
-                except ccxt.pro.NetworkError as network_error:
-                    connection_errors += 1
-                    log_warning(f"Lỗi kết nối với {exchange_id} (lần {connection_errors}/{max_connection_errors}): {str(network_error)}")
-                    
-                    if connection_errors >= max_connection_errors:
-                        log_error(f"Đã vượt quá số lần thử kết nối với {exchange_id}. Đang khởi động lại kết nối...")
+            async with handle:
+                # Theo dõi sách lệnh cho đến khi hết thời gian
+                while self.clock.time() <= self.timeout:
+                    try:
+                        # Lấy thông tin sách lệnh mới nhất
+                        orderbook = await handle.exchange.watch_order_book(self.symbol)
                         
-                        # Đóng kết nối hiện tại
-                        await pro_exchange.close()
+                        # Đặt lại bộ đếm lỗi kết nối khi thành công
+                        if connection_errors > 0:
+                            log_info(f"Kết nối lại thành công với {exchange_id}")
+                            connection_errors = 0
                         
-                        # Tạo kết nối mới
-                        pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
-                        connection_errors = 0
-                        log_info(f"Đã khởi động lại kết nối với {exchange_id}")
-                    
-                    # Đợi trước khi thử lại
-                    await asyncio.sleep(reconnect_delay)
-                    
-                except Exception as loop_error:
-                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
-                    log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
-                    
-                    # Đợi một chút trước khi tiếp tục
-                    await asyncio.sleep(1)
-                    
-                    # Không thoát vòng lặp, tiếp tục thử lại
-                
-                # Đợi một chút để giảm tải cho CPU
-                await asyncio.sleep(0.1)
+                        # Ghi vào ô của sàn, tác vụ đánh giá sẽ xử lý trạng thái mới nhất
+                        self._receive_orderbook(exchange_id, exchange_id, orderbook)
+                        
+                    except ccxt.pro.NetworkError as network_error:
+                        connection_errors += 1
+                        log_warning(f"Lỗi kết nối với {exchange_id} (lần {connection_errors}/{max_connection_errors}): {str(network_error)}")
+                        
+                        if connection_errors >= max_connection_errors:
+                            log_error(f"Đã vượt quá số lần thử kết nối với {exchange_id}. Đang khởi động lại kết nối...")
+                            
+                            # Tạo lại kết nối dùng chung trong registry
+                            await handle.reconnect()
+                            connection_errors = 0
+                            log_info(f"Đã khởi động lại kết nối với {exchange_id}")
+                        
+                        # Đợi trước khi thử lại
+                        await asyncio.sleep(reconnect_delay)
+                        
+                    except Exception as loop_error:
+                        log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
+                        log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
+                        
+                        # Đợi một chút trước khi tiếp tục
+                        await asyncio.sleep(1)
+                        
+                        # Không thoát vòng lặp, tiếp tục thử lại
             
-            # Đóng kết nối với sàn giao dịch
+            # Kết nối được giữ ấm trong registry cho phiên tiếp theo
             log_info(f"Kết thúc theo dõi sách lệnh trên sàn {exchange_id}")
-            if pro_exchange:
-                await pro_exchange.close()
                 
         except Exception as e:
             log_error(f"Lỗi khi khởi tạo vòng lặp cho {exchange_id}: {str(e)}")
             log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
-            
-            # Đảm bảo kết nối được đóng đúng cách
-            if pro_exchange:
-                try:
-                    await pro_exchange.close()
-                except Exception:
-                    pass
     
-    async def _execute_trade(self, min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd):
+    def _on_opportunity_found(self):
+        """Cập nhật thống kê khi phát hiện cơ hội giao dịch."""
+        self.stats['opportunities_found'] += 1
+    
+    async def _run_trade(self, intent):
         """
-        Thực hiện giao dịch chênh lệch giá.
+        Thực hiện giao dịch chênh lệch giá (chạy trong tác vụ thực thi của đường ống giao dịch).
         
         Args:
-            min_ask_ex (str): Tên sàn có giá mua thấp nhất
-            max_bid_ex (str): Tên sàn có giá bán cao nhất
-            profit_with_fees_pct (float): Lợi nhuận sau phí tính theo phần trăm
-            profit_with_fees_usd (float): Lợi nhuận sau phí tính theo USD
+            intent (TradeIntent): Ý định giao dịch
             
         Returns:
             bool: True nếu giao dịch thành công, ngược lại False
@@ -285,47 +274,47 @@ class ClassicBot(BaseBot):
             # Ghi log thông tin về cơ hội giao dịch
             log_info(
                 f"Cơ hội giao dịch #{self.opportunity_count}: "
-                f"Mua trên {min_ask_ex} ở giá {self.min_ask_price}, "
-                f"Bán trên {max_bid_ex} ở giá {self.max_bid_price}, "
-                f"Lợi nhuận: {profit_with_fees_pct:.4f}% ({profit_with_fees_usd:.4f} USD)"
+                f"Mua trên {intent.buy_exchange} ở giá {intent.buy_price}, "
+                f"Bán trên {intent.sell_exchange} ở giá {intent.sell_price}, "
+                f"Lợi nhuận: {intent.profit_pct:.4f}% ({intent.profit_usd:.4f} USD)"
             )
             
-            # Cập nhật số dư trên các sàn
-            self._update_balances_after_trade(min_ask_ex, max_bid_ex)
-            
             # Tính toán phí giao dịch
-            fees = self.config.get('fees', {})
-            fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
-            fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
-            
-            fee_crypto = self.crypto_per_transaction * (fee_rate_buy + fee_rate_sell)
-            fee_usd = (self.crypto_per_transaction * self.max_bid_price * fee_rate_sell) + (self.crypto_per_transaction * self.min_ask_price * fee_rate_buy)
+            fee_usd, fee_crypto = self._trade_fees(intent)
             
             # Cập nhật tổng lợi nhuận
-            self.total_absolute_profit_pct += profit_with_fees_pct
+            self.total_absolute_profit_pct += intent.profit_pct
             
             # Thực hiện giao dịch thực tế
-            trade_success = self.order_service.place_arbitrage_orders(
-                min_ask_ex, max_bid_ex, self.symbol,
-                self.crypto_per_transaction, self.min_ask_price, self.max_bid_price,
+            # Đặt giá giới hạn ở mức xa nhất cần chạm tới để khớp toàn bộ khối lượng
+            trade_success = await self.order_service.place_arbitrage_orders(
+                intent.buy_exchange, intent.sell_exchange, intent.symbol,
+                intent.amount, intent.buy_limit_price, intent.sell_limit_price,
                 self.notification_service
             )
             
+            # Cập nhật số dư trên các sàn khi giao dịch đã xong và phần giữ chỗ sắp được trả lại
+            self._update_balances_after_trade(
+                intent.buy_exchange, intent.sell_exchange, intent.amount, intent.buy_price, intent.sell_price
+            )
+            
+            # Ghi giao dịch và phí vào sổ cái
+            self.balance_service.record_trade(intent, fee_usd, fee_crypto, trade_success)
+            
             # Cập nhật thống kê
             if trade_success:
                 self.stats['trades_executed'] += 1
-                self.stats['total_volume'] += self.crypto_per_transaction * self.min_ask_price
+                self.stats['total_volume'] += intent.amount * intent.buy_price
                 
                 # Tạo báo cáo giao dịch
-                self._display_trade_report(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd, fee_usd, fee_crypto)
+                self._display_trade_report(
+                    intent.buy_exchange, intent.sell_exchange, intent.profit_pct, intent.profit_usd, fee_usd, fee_crypto,
+                    buy_price=intent.buy_price, sell_price=intent.sell_price
+                )
             else:
                 self.stats['failed_trades'] += 1
                 log_warning(f"Giao dịch #{self.opportunity_count} thất bại")
             
-            # Cập nhật giá trước đó
-            self.prec_ask_price = self.min_ask_price
-            self.prec_bid_price = self.max_bid_price
-            
             # Cập nhật số lượng crypto mỗi giao dịch
             self._update_transaction_amount()
             
@@ -339,7 +328,7 @@ class ClassicBot(BaseBot):
     
     def _display_stats(self):
         """Hiển thị thống kê về phiên giao dịch."""
-        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(time.time() - self.start_time))
+        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(self.clock.time() - self.start_time))
         
         log_info("\n" + "="*50)
         log_info(f"THỐNG KÊ PHIÊN GIAO DỊCH - {self.symbol}")
@@ -385,7 +374,7 @@ class ClassicBot(BaseBot):
         # Bán tất cả crypto trên tất cả sàn
         try:
             log_info(f"Bán tất cả {self.symbol} trên {self.exchanges}")
-            self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+            await self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
             log_info("Đã bán tất cả crypto thành công")
         except Exception as e:
             log_error(f"Lỗi khi bán crypto: {str(e)}")
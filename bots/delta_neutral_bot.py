@@ -8,7 +8,7 @@ import sys
 import traceback
 
 from utils.logger import log_info, log_error, log_warning, log_debug
-from utils.exceptions import ArbitrageError, ExchangeError, InsufficientBalanceError, OrderError
+from utils.exceptions import ArbitrageError, ExchangeError, OrderError
 from utils.helpers import calculate_average, extract_base_asset
 from bots.base_bot import BaseBot
 from configs import EXCHANGE_FEES
@@ -38,6 +38,9 @@ class DeltaNeutralBot(BaseBot):
             {'fees': EXCHANGE_FEES}
         )
         
+        # Lệnh được đặt và theo dõi trong tác vụ nền, sách lệnh vẫn được đánh giá trong lúc chờ khớp
+        self.background_trades = True
+        
         # Biến cho chiến lược delta-neutral
         self.futures_exchange = 'kucoinfutures'  # Sàn futures mặc định
         self.futures_amount = 0  # Số lượng tiền điện tử đã short
@@ -61,27 +64,30 @@ class DeltaNeutralBot(BaseBot):
         """
         try:
             log_info(f"Bắt đầu phiên giao dịch delta-neutral với tham số: {self.symbol}, {self.exchanges}, {self.howmuchusd} USDT")
-            self.start_time = time.time()
+            self.start_time = self.clock.time()
             
             # Tính toán số tiền để mở vị thế delta-neutral
             spot_investment = self.howmuchusd * (2/3)  # 2/3 số tiền cho giao dịch spot
             futures_investment = self.howmuchusd * (1/3)  # 1/3 số tiền cho vị thế short
             
-            # Kiểm tra số dư trên các sàn spot
-            try:
-                self.balance_service.check_balances(
-                    self.exchanges, 
-                    'USDT', 
-                    spot_investment, 
-                    self.notification_service
-                )
-            except InsufficientBalanceError as e:
-                log_error(f"Không đủ số dư: {str(e)}")
+            # Kiểm tra đồng thời số dư trên các sàn spot và sàn futures
+            spot_per_exchange = spot_investment / len(self.exchanges)
+            report = await self.balance_service.check_requirements(
+                [(exchange_id, 'USDT', spot_per_exchange) for exchange_id in self.exchanges]
+                + [(self.futures_exchange, 'USDT', futures_investment)]
+            )
+            
+            spot_shortfalls = report.shortfalls_on(self.exchanges)
+            if spot_shortfalls:
+                self.balance_service.report_shortfalls(spot_shortfalls, self.notification_service)
+                log_error(f"Không đủ số dư trên {len(spot_shortfalls)} sàn spot")
                 return 0
             
-            # Kiểm tra số dư trên sàn futures
+            # Số dư futures thiếu được bù bằng cách chuyển tiền từ spot
             try:
-                futures_balance = self.balance_service.get_balance(self.futures_exchange, 'USDT')
+                futures_balance = report.available(self.futures_exchange, 'USDT')
+                if futures_balance is None:
+                    raise ExchangeError(self.futures_exchange, report.shortfalls_on([self.futures_exchange])[0].error)
                 
                 # Nếu số dư trên sàn futures không đủ, chuyển tiền từ spot sang futures
                 if futures_balance < futures_investment:
@@ -92,7 +98,7 @@ class DeltaNeutralBot(BaseBot):
                         transfer_amount = round(futures_investment - futures_balance, 3)
                         
                         if transfer_amount > 1:  # Đảm bảo số tiền chuyển > 1 USDT
-                            self.balance_service.transfer_between_accounts(
+                            await self.balance_service.transfer_between_accounts(
                                 'kucoin', 
                                 'USDT', 
                                 transfer_amount, 
@@ -123,7 +129,7 @@ class DeltaNeutralBot(BaseBot):
             self.crypto = {exchange: 0 for exchange in self.exchanges}  # Khởi tạo số dư crypto bằng 0
             
             # Đặt lệnh mua ban đầu trên các sàn spot
-            success = self.order_service.place_initial_orders(
+            success = await self.order_service.place_initial_orders(
                 self.exchanges, 
                 self.symbol, 
                 (spot_investment / 2) / (len(self.exchanges) * average_price), 
@@ -164,7 +170,7 @@ class DeltaNeutralBot(BaseBot):
                 quantity_to_short = max(min_futures_quantity, round(futures_investment / average_price, 3))
                 
                 # Đặt lệnh short
-                self.order_service.place_futures_short_order(
+                short_order = await self.order_service.place_futures_short_order(
                     self.futures_exchange, 
                     futures_symbol, 
                     quantity_to_short, 
@@ -185,11 +191,7 @@ class DeltaNeutralBot(BaseBot):
                 log_info("Đang đợi 120 giây để lệnh short được thực hiện...")
                 
                 # Kiểm tra trạng thái lệnh short
-                short_filled = self.order_service.wait_for_futures_order_fill(
-                    self.futures_exchange, 
-                    futures_symbol, 
-                    120
-                )
+                short_filled = await self.order_service.wait_for_futures_order_fill(short_order, 120)
                 
                 if not short_filled:
                     log_error("Lệnh Delta-neutral Short không được thực hiện thành công. Thoát chương trình.")
@@ -200,6 +202,9 @@ class DeltaNeutralBot(BaseBot):
                 log_debug(f"Chi tiết lỗi: {traceback.format_exc()}")
                 return 0
             
+            # Số dư thực tế được đẩy về bot, không cần hỏi REST trước mỗi giao dịch
+            await self._start_balance_stream()
+            
             # Bắt đầu vòng lặp theo dõi sách lệnh
             await self._start_orderbook_loop()
             
@@ -231,7 +236,7 @@ class DeltaNeutralBot(BaseBot):
         # Bán tất cả crypto trên tất cả sàn
         try:
             log_info(f"Bán tất cả {self.symbol} trên {self.exchanges}")
-            self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+            await self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
             log_info("Đã bán tất cả crypto thành công")
         except Exception as e:
             log_error(f"Lỗi khi bán crypto: {str(e)}")
@@ -245,7 +250,7 @@ class DeltaNeutralBot(BaseBot):
                     futures_symbol = f"{extract_base_asset(self.symbol)}:USDT"
                 
                 # Đóng vị thế short
-                self.order_service.close_futures_short_order(
+                await self.order_service.close_futures_short_order(
                     self.futures_exchange, 
                     futures_symbol, 
                     self.futures_amount, 
@@ -273,7 +278,7 @@ class DeltaNeutralBot(BaseBot):
         """
         # Bán tất cả crypto trên các sàn spot
         try:
-            self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
+            await self.balance_service.emergency_convert_all(self.symbol, self.exchanges)
         except Exception as e:
             log_error(f"Lỗi khi bán khẩn cấp crypto: {str(e)}")
         
@@ -286,7 +291,7 @@ class DeltaNeutralBot(BaseBot):
                     futures_symbol = f"{extract_base_asset(self.symbol)}:USDT"
                 
                 # Đóng vị thế short
-                self.order_service.close_futures_short_order(
+                await self.order_service.close_futures_short_order(
                     self.futures_exchange, 
                     futures_symbol, 
                     self.futures_amount, 
@@ -299,7 +304,7 @@ class DeltaNeutralBot(BaseBot):
     
     def _display_stats(self):
         """Hiển thị thống kê về phiên giao dịch."""
-        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(time.time() - self.start_time))
+        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(self.clock.time() - self.start_time))
         
         log_info("\n" + "="*50)
         log_info(f"THỐNG KÊ PHIÊN GIAO DỊCH DELTA-NEUTRAL - {self.symbol}")
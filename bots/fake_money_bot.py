@@ -10,7 +10,8 @@ from utils.logger import log_info, log_error, log_warning
 from utils.exceptions import ArbitrageError
 from utils.helpers import calculate_average
 from bots.base_bot import BaseBot
-from configs import EXCHANGE_FEES
+from services.replay_service import ReplayClock
+from configs import EXCHANGE_FEES, TRANSACTION_SAFETY_FACTOR
 
 
 class FakeMoneyBot(BaseBot):
@@ -45,28 +46,13 @@ class FakeMoneyBot(BaseBot):
         """
         try:
             log_info(f"Bắt đầu phiên mô phỏng với tham số: {self.symbol}, {self.exchanges}, {self.howmuchusd} USDT")
-            self.start_time = time.time()
+            self.start_time = self.clock.time()
             
             # Lấy giá trung bình toàn cầu
             average_price = await self.exchange_service.get_global_average_price(self.exchanges, self.symbol)
             
-            # Tính số lượng crypto có thể mua
-            total_crypto = (self.howmuchusd / 2) / average_price
-            
-            # Thông báo về lệnh mô phỏng
-            log_info(
-                f"Nếu đây là tiền thật, các lệnh sẽ được gửi đến đây để mua "
-                f"{round(total_crypto / len(self.exchanges), 3)} {self.symbol.split('/')[0]} ở giá {average_price}."
-            )
-            
             # Khởi tạo số dư ảo
-            self.usd = self.balance_service.initialize_balances(self.exchanges, self.symbol, self.howmuchusd)
-            self.crypto = self.balance_service.initialize_crypto_balances(
-                self.exchanges, self.symbol, average_price, self.howmuchusd
-            )
-            
-            # Cập nhật số lượng crypto mỗi giao dịch
-            self.crypto_per_transaction = total_crypto / len(self.exchanges)
+            self._initialize_fake_balances(average_price)
             
             # Bắt đầu vòng lặp theo dõi sách lệnh
             await self._start_orderbook_loop()
@@ -78,6 +64,84 @@ class FakeMoneyBot(BaseBot):
             log_error(f"Lỗi khi chạy bot mô phỏng: {str(e)}")
             return 0
     
+    async def replay(self, replay_service, speed=0):
+        """
+        Chạy phiên mô phỏng trên sách lệnh đã ghi thay vì websocket.
+        
+        Đồng hồ của bot được thay bằng ReplayClock nên self.timeout tính theo thời gian
+        mô phỏng; với speed = 0 dữ liệu được phát lại nhanh nhất có thể.
+        
+        Args:
+            replay_service (ReplayService): Dịch vụ đọc dữ liệu đã ghi
+            speed (float): Hệ số tốc độ so với thời gian thực, 0 để chạy nhanh nhất có thể
+            
+        Returns:
+            float: Tổng lợi nhuận (phần trăm)
+        """
+        try:
+            average_price, start_ns = replay_service.opening_price(self.exchanges, self.symbol)
+            if average_price is None:
+                log_error(f"Không có dữ liệu đã ghi cho {self.symbol} trên {self.exchanges}")
+                return 0
+            
+            log_info(f"Bắt đầu phát lại {self.symbol} trên {self.exchanges} (tốc độ: {speed or 'tối đa'})")
+            
+            # Thời gian của phiên tính theo đồng hồ mô phỏng
+            self.clock = ReplayClock(start_ns, speed)
+            self.timeout = self.clock.time() + self.duration
+            self.start_time = self.clock.time()
+            self.quiet = True
+            
+            self._initialize_fake_balances(average_price)
+            
+            tick_count = 0
+            wall_start = time.perf_counter()
+            
+            for ts_local, exchange_id, orderbook in replay_service.stream(self.exchanges, self.symbol):
+                await self.clock.advance(ts_local)
+                if self.clock.time() > self.timeout:
+                    break
+                
+                if await self.process_orderbook(exchange_id, orderbook):
+                    self._on_opportunity_found()
+                tick_count += 1
+            
+            log_info(f"Đã phát lại {tick_count} sách lệnh trong {time.perf_counter() - wall_start:.1f}s")
+            
+            return await self.stop()
+            
+        except Exception as e:
+            log_error(f"Lỗi khi phát lại dữ liệu: {str(e)}")
+            return 0
+    
+    def _initialize_fake_balances(self, average_price):
+        """
+        Khởi tạo số dư ảo: một nửa USDT, một nửa crypto theo giá trung bình, chia đều cho các sàn.
+        
+        Args:
+            average_price (float): Giá trung bình của cặp giao dịch
+        """
+        # Tính số lượng crypto có thể mua
+        total_crypto = (self.howmuchusd / 2) / average_price
+        
+        # Thông báo về lệnh mô phỏng
+        log_info(
+            f"Nếu đây là tiền thật, các lệnh sẽ được gửi đến đây để mua "
+            f"{round(total_crypto / len(self.exchanges), 3)} {self.symbol.split('/')[0]} ở giá {average_price}."
+        )
+        
+        # Khởi tạo số dư ảo
+        self.usd = self.balance_service.initialize_balances(self.exchanges, self.symbol, self.howmuchusd)
+        self.crypto = self.balance_service.initialize_crypto_balances(
+            self.exchanges, self.symbol, average_price, self.howmuchusd
+        )
+        
+        # Cập nhật số lượng crypto mỗi giao dịch (giảm 1% như _update_transaction_amount để đủ số dư)
+        self.crypto_per_transaction = total_crypto / len(self.exchanges) * TRANSACTION_SAFETY_FACTOR
+        
+        # Giá khớp phụ thuộc vào khối lượng, cần tính lại cho khối lượng mới
+        self._reprice_all()
+    
     async def _start_orderbook_loop(self):
         """
         Bắt đầu vòng lặp theo dõi sách lệnh trên tất cả các sàn.
@@ -92,8 +156,8 @@ class FakeMoneyBot(BaseBot):
             for exchange_id in self.exchanges:
                 exchange_loops.append(self._exchange_loop(exchange_id))
                 
-            # Chạy tất cả các vòng lặp
-            await gather(*exchange_loops)
+            # Chạy tất cả các vòng lặp cùng tác vụ đánh giá cơ hội
+            await gather(self._evaluator_loop(), *exchange_loops)
             
             return self.total_absolute_profit_pct
             
@@ -112,37 +176,32 @@ class FakeMoneyBot(BaseBot):
             None
         """
         try:
-            # Tạo đối tượng sàn giao dịch ccxt.pro
-            pro_exchange = await self.exchange_service.get_pro_exchange(exchange_id)
-            
-            # Theo dõi sách lệnh cho đến khi hết thời gian
-            while time.time() <= self.timeout:
-                try:
-                    # Lấy thông tin sách lệnh mới nhất
-                    orderbook = await pro_exchange.watch_order_book(self.symbol)
-                    
-                    # Xử lý dữ liệu sách lệnh
-                    await self.process_orderbook(exchange_id, orderbook)
-                    
-                except Exception as loop_error:
-                    log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
-                    break
-            
-            # Đóng kết nối với sàn giao dịch
-            await pro_exchange.close()
+            # Lấy handle tới kết nối ccxt.pro dùng chung
+            handle = await self.exchange_service.acquire_pro_exchange(exchange_id)
+            
+            async with handle:
+                # Theo dõi sách lệnh cho đến khi hết thời gian
+                while self.clock.time() <= self.timeout:
+                    try:
+                        # Lấy thông tin sách lệnh mới nhất
+                        orderbook = await handle.exchange.watch_order_book(self.symbol)
+                        
+                        # Ghi vào ô của sàn, tác vụ đánh giá sẽ xử lý trạng thái mới nhất
+                        self._receive_orderbook(exchange_id, exchange_id, orderbook)
+                        
+                    except Exception as loop_error:
+                        log_error(f"Lỗi trong vòng lặp {exchange_id}: {str(loop_error)}")
+                        break
             
         except Exception as e:
             log_error(f"Lỗi khi khởi tạo vòng lặp cho {exchange_id}: {str(e)}")
     
-    async def _execute_trade(self, min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd):
+    async def _run_trade(self, intent):
         """
         Thực hiện giao dịch mô phỏng (không gửi lệnh thực tế).
         
         Args:
-            min_ask_ex (str): Tên sàn có giá mua thấp nhất
-            max_bid_ex (str): Tên sàn có giá bán cao nhất
-            profit_with_fees_pct (float): Lợi nhuận sau phí tính theo phần trăm
-            profit_with_fees_usd (float): Lợi nhuận sau phí tính theo USD
+            intent (TradeIntent): Ý định giao dịch
             
         Returns:
             bool: True nếu giao dịch mô phỏng thành công, ngược lại False
@@ -152,28 +211,27 @@ class FakeMoneyBot(BaseBot):
             self.opportunity_count += 1
             
             # Cập nhật số dư trên các sàn
-            self._update_balances_after_trade(min_ask_ex, max_bid_ex)
+            self._update_balances_after_trade(
+                intent.buy_exchange, intent.sell_exchange, intent.amount, intent.buy_price, intent.sell_price
+            )
             
             # Tính toán phí giao dịch
-            fees = self.config.get('fees', {})
-            fee_rate_buy = fees.get(min_ask_ex, {}).get('give', 0.001)
-            fee_rate_sell = fees.get(max_bid_ex, {}).get('receive', 0.001)
-            
-            fee_crypto = self.crypto_per_transaction * (fee_rate_buy + fee_rate_sell)
-            fee_usd = (self.crypto_per_transaction * self.max_bid_price * fee_rate_sell) + (self.crypto_per_transaction * self.min_ask_price * fee_rate_buy)
+            fee_usd, fee_crypto = self._trade_fees(intent)
             
             # Cập nhật tổng lợi nhuận
-            self.total_absolute_profit_pct += profit_with_fees_pct
+            self.total_absolute_profit_pct += intent.profit_pct
+            
+            # Ghi giao dịch mô phỏng và phí vào sổ cái
+            self.balance_service.record_trade(intent, fee_usd, fee_crypto)
             
             # Tạo báo cáo giao dịch mô phỏng
-            self._display_trade_report(min_ask_ex, max_bid_ex, profit_with_fees_pct, profit_with_fees_usd, fee_usd, fee_crypto)
+            self._display_trade_report(
+                intent.buy_exchange, intent.sell_exchange, intent.profit_pct, intent.profit_usd, fee_usd, fee_crypto,
+                buy_price=intent.buy_price, sell_price=intent.sell_price
+            )
             
             # Trong mô phỏng, không thực sự đặt lệnh, chỉ cập nhật số dư
             
-            # Cập nhật giá trước đó
-            self.prec_ask_price = self.min_ask_price
-            self.prec_bid_price = self.max_bid_price
-            
             # Cập nhật số lượng crypto mỗi giao dịch
             self._update_transaction_amount()
             
@@ -0,0 +1,166 @@
+"""
+Bot quét chênh lệch giá trên nhiều cặp giao dịch cùng lúc, không thực hiện giao dịch.
+"""
+import time
+from asyncio import gather
+
+from utils.logger import log_info, log_error, log_opportunity
+from utils.top_of_book import TopOfBookTable
+from utils.latency import latency_tracker, STAGE_PROCESS, ALL_EXCHANGES
+from bots.base_bot import BaseBot
+from configs import EXCHANGE_FEES, PROFIT_CRITERIA_PCT, SCANNER_LOG_INTERVAL
+
+
+class ScannerBot(BaseBot):
+    """
+    Bot theo dõi hàng chục đến hàng trăm cặp giao dịch trên một kết nối mỗi sàn
+    và đánh giá chênh lệch giá giữa các sàn cho mọi cặp vừa được cập nhật.
+    """
+
+    def __init__(self, exchange_service, balance_service, order_service, notification_service):
+        """
+        Khởi tạo bot quét nhiều cặp.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            balance_service (BalanceService): Dịch vụ quản lý số dư
+            order_service (OrderService): Dịch vụ quản lý lệnh
+            notification_service (NotificationService): Dịch vụ thông báo
+        """
+        super().__init__(
+            exchange_service,
+            balance_service,
+            order_service,
+            notification_service,
+            {'fees': EXCHANGE_FEES}
+        )
+
+        self.top_of_book = TopOfBookTable(EXCHANGE_FEES)
+        self.best_spreads = {}  # Chênh lệch giá sau phí tốt nhất quan sát được cho mỗi cặp
+        self.last_reported = {}  # Thời điểm báo cáo gần nhất cho mỗi cặp
+        self.evaluation_count = 0
+
+    async def start(self):
+        """
+        Bắt đầu quét các cặp giao dịch.
+
+        Returns:
+            float: Tổng lợi nhuận (luôn là 0 vì bot không giao dịch)
+        """
+        try:
+            log_info(f"Bắt đầu quét {len(self.symbols)} cặp giao dịch trên {self.exchanges}")
+            self.start_time = self.clock.time()
+
+            await self._start_orderbook_loop()
+
+            return await self.stop()
+
+        except Exception as e:
+            log_error(f"Lỗi khi chạy bot quét: {str(e)}")
+            return 0
+
+    async def _start_orderbook_loop(self):
+        """
+        Bắt đầu theo dõi tất cả các cặp trên tất cả các sàn.
+
+        Returns:
+            float: Tổng lợi nhuận (phần trăm)
+        """
+        try:
+            exchange_loops = [self._multi_symbol_exchange_loop(exchange_id) for exchange_id in self.exchanges]
+
+            await gather(self._evaluator_loop(), *exchange_loops)
+
+            return self.total_absolute_profit_pct
+
+        except Exception as e:
+            log_error(f"Lỗi trong vòng lặp quét sách lệnh: {str(e)}")
+            raise
+
+    async def process_orderbooks(self, orderbooks):
+        """
+        Cập nhật bảng giá cho các cặp vừa thay đổi và đánh giá chênh lệch giá của chúng.
+
+        Args:
+            orderbooks (dict): Ánh xạ (exchange_id, symbol) -> sách lệnh mới nhất
+
+        Returns:
+            bool: True nếu có cặp vượt ngưỡng lợi nhuận, ngược lại False
+        """
+        self._record_queue_latency(orderbooks)
+        touched_symbols = set()
+
+        for (exchange_id, symbol), orderbook in orderbooks.items():
+            if self.top_of_book.update_from_orderbook(symbol, exchange_id, orderbook):
+                touched_symbols.add(symbol)
+
+        found = False
+        for symbol in touched_symbols:
+            spread = self.top_of_book.best_spread(symbol)
+            self.evaluation_count += 1
+
+            if spread is None:
+                continue
+
+            best = self.best_spreads.get(symbol)
+            if best is None or spread['net_spread_pct'] > best['net_spread_pct']:
+                self.best_spreads[symbol] = spread
+
+            if spread['net_spread_pct'] > float(PROFIT_CRITERIA_PCT):
+                found = True
+                self._report_opportunity(spread)
+
+        latency_tracker.record_since(STAGE_PROCESS, ALL_EXCHANGES, self.evaluation_started)
+        return found
+
+    def _report_opportunity(self, spread):
+        """
+        Ghi log cơ hội của một cặp, tối đa một lần mỗi SCANNER_LOG_INTERVAL giây.
+
+        Args:
+            spread (dict): Thông tin chênh lệch giá từ TopOfBookTable.best_spread
+        """
+        now = self.clock.time()
+        symbol = spread['symbol']
+
+        if now - self.last_reported.get(symbol, 0) < SCANNER_LOG_INTERVAL:
+            return
+
+        self.last_reported[symbol] = now
+        self.opportunity_count += 1
+
+        # Lợi nhuận USD ước tính cho số tiền cấu hình
+        profit_usd = self.howmuchusd * spread['net_spread_pct'] / 100
+        log_opportunity(
+            f"{self.opportunity_count} [{symbol}]",
+            spread['buy_exchange'], spread['buy_price'],
+            spread['sell_exchange'], spread['sell_price'],
+            spread['net_spread_pct'], profit_usd
+        )
+
+    async def stop(self):
+        """
+        Dừng quét và gửi báo cáo các cặp có chênh lệch giá tốt nhất.
+
+        Returns:
+            float: Tổng lợi nhuận (luôn là 0 vì bot không giao dịch)
+        """
+        elapsed_time = time.strftime('%H:%M:%S', time.gmtime(self.clock.time() - self.start_time))
+        top_spreads = sorted(self.best_spreads.values(), key=lambda s: s['net_spread_pct'], reverse=True)[:10]
+
+        lines = [
+            f"{s['symbol']}: {s['net_spread_pct']:.4f}% sau phí "
+            f"(mua {s['buy_exchange']} {s['buy_price']}, bán {s['sell_exchange']} {s['sell_price']})"
+            for s in top_spreads
+        ]
+        message = (
+            f"Phiên quét {len(self.symbols)} cặp đã kết thúc sau {elapsed_time}.\n"
+            f"Số lần đánh giá: {self.evaluation_count}, số cơ hội: {self.opportunity_count}\n\n"
+            f"Chênh lệch tốt nhất:\n" + "\n".join(lines)
+        )
+        log_info(message)
+
+        if self.notification_service:
+            self.notification_service.send_message(message)
+
+        return self.total_absolute_profit_pct
@@ -11,6 +11,8 @@ load_dotenv()
 PYTHON_COMMAND = os.getenv('PYTHON_COMMAND', 'python')
 ENABLE_TELEGRAM = os.getenv('ENABLE_TELEGRAM', 'false').lower() == 'true'
 ENABLE_CTRL_C_HANDLING = os.getenv('ENABLE_CTRL_C_HANDLING', 'false').lower() == 'true'
+ENABLE_MOCK_EXCHANGE = os.getenv('ENABLE_MOCK_EXCHANGE', 'false').lower() == 'true'  # Dùng sàn giả lập thay cho sàn thật
+ENABLE_LATENCY_TRACKING = os.getenv('ENABLE_LATENCY_TRACKING', 'true').lower() == 'true'  # Đo độ trễ tick-to-trade theo giai đoạn
 
 # Tiêu chí lợi nhuận
 PROFIT_CRITERIA_PCT = 0  # % lợi nhuận tối thiểu
@@ -19,6 +21,8 @@ PROFIT_CRITERIA_USD = 0  # Lợi nhuận USD tối thiểu
 # Thông số giao dịch
 BETTER_FILL_LESS_PROFITS = True  # Điều chỉnh fill để giảm lợi nhuận
 FIRST_ORDERS_FILL_TIMEOUT = 3600  # Thời gian chờ tối đa để fill đơn hàng đầu tiên (giây)
+TRADE_EXECUTOR_COUNT = 3  # Số giao dịch chênh lệch giá được thực hiện đồng thời tối đa
+ARBITRAGE_EXECUTION_MODE = os.getenv('ARBITRAGE_EXECUTION_MODE', 'gtc').lower()  # gtc: lệnh chờ khớp; ioc/fok: khớp ngay hoặc hủy (fok dùng IOC trên sàn không hỗ trợ)
 
 # Giới hạn giao dịch
 MIN_USDT_AMOUNT = 10  # Số lượng USDT tối thiểu để giao dịch
@@ -27,8 +31,24 @@ MIN_USDT_FOR_CONVERSION = 10  # Số lượng USDT tối thiểu để chuyển
 # Thông số retry và timeout
 DEFAULT_RETRY_ATTEMPTS = 3  # Số lần thử lại mặc định cho API calls
 DEFAULT_RETRY_DELAY = 1  # Thời gian chờ giữa các lần thử (giây)
-ORDERBOOK_WATCH_DELAY = 0.1  # Thời gian chờ giữa các lần kiểm tra orderbook (giây)
 NETWORK_ERROR_DELAY = 1  # Thời gian chờ khi gặp lỗi mạng (giây)
+ARBITRAGE_SUBMIT_TIMEOUT = 5  # Hạn chót chung để sàn xác nhận cả hai chân lệnh chênh lệch giá (giây)
+ARBITRAGE_FILL_TIMEOUT = 180  # Thời gian chờ hai chân lệnh GTC khớp trước khi hủy và phòng hộ (giây)
+ORDER_RECONCILE_INTERVAL = 10  # Khoảng thời gian đối chiếu trạng thái lệnh qua REST khi chờ cập nhật websocket (giây)
+EXCHANGE_KEEPALIVE_INTERVAL = 10  # Khoảng thời gian gửi request giữ ấm kết nối REST của mỗi sàn, nhỏ hơn thời gian giữ kết nối rảnh của aiohttp (giây)
+EXCHANGE_TIME_SYNC_INTERVAL = 300  # Khoảng thời gian đo lại độ lệch đồng hồ với máy chủ của sàn (giây)
+EXCHANGE_RATE_LIMITS = {}  # Ghi đè giới hạn request REST theo sàn (đơn vị trọng số mỗi giây), mặc định suy ra từ rateLimit của ccxt
+EXCHANGE_RATE_HEADROOM = 0.8  # Tỷ lệ giới hạn request công bố của sàn được sử dụng, chừa khoảng an toàn trước 429
+EXCHANGE_RATE_BURST = 1  # Kích thước burst của token bucket tính theo số giây của tốc độ
+CANCEL_CONFIRM_ATTEMPTS = 2  # Số lần hủy lại các lệnh vẫn còn mở sau khi xác nhận hủy hàng loạt
+ORDER_HISTORY_SIZE = 1000  # Số lệnh đã kết thúc được giữ trong bộ nhớ của bộ theo dõi/quản lý lệnh
+ORDER_POLL_MIN_INTERVAL = 0.5  # Khoảng đối chiếu ban đầu khi sàn không có luồng lệnh websocket, tăng gấp đôi tới ORDER_RECONCILE_INTERVAL (giây)
+
+# Độ sâu sách lệnh dùng để tính giá khớp trung bình (VWAP)
+DEPTH_BOOK_LEVELS = 50  # Số mức giá tối đa giữ lại cho mỗi phía
+
+# Độ mới của sách lệnh
+MAX_BOOK_AGE_SECONDS = 5  # Sàn không cập nhật sách lệnh lâu hơn thời gian này bị loại khỏi việc chọn sàn
 
 # Phần trăm giữ lại khi chuyển đổi khẩn cấp
 EMERGENCY_CONVERSION_KEEP_PERCENTAGE = 0.01  # 1% tài sản giữ lại
@@ -36,9 +56,13 @@ EMERGENCY_CONVERSION_KEEP_PERCENTAGE = 0.01  # 1% tài sản giữ lại
 # Hệ số an toàn cho giao dịch
 TRANSACTION_SAFETY_FACTOR = 0.99  # Giảm 1% để đảm bảo đủ số dư
 BALANCE_SAFETY_MARGIN = 1.001  # Thêm 0.1% cho phí và biến động
+BALANCE_CACHE_TTL = 10  # Thời gian ảnh chụp số dư của một sàn còn hiệu lực nếu không có lệnh khớp (giây)
+BALANCE_POLL_INTERVAL = 5  # Khoảng thời gian lấy số dư qua REST của sàn không hỗ trợ watch_balance (giây)
+BALANCE_CHECK_TIMEOUT = 10  # Hạn chót chung để tất cả các sàn trả về số dư khi kiểm tra trước phiên giao dịch (giây)
+BALANCE_POLL_MIN_INTERVAL = 1  # Khoảng cách tối thiểu giữa hai lần lấy số dư qua REST khi lệnh khớp liên tục (giây)
 
 # Danh sách các sàn giao dịch hỗ trợ
-SUPPORTED_EXCHANGES = ['kucoin', 'binance', 'bybit', 'okx', 'kucoinfutures']
+SUPPORTED_EXCHANGES = ['kucoin', 'binance', 'bybit', 'okx', 'gate', 'mexc', 'bitget', 'htx', 'kucoinfutures']
 
 # Phí giao dịch của từng sàn
 EXCHANGE_FEES = {
@@ -46,6 +70,10 @@ EXCHANGE_FEES = {
     'kucoin': {'give': 0.001, 'receive': 0.001},
     'okx': {'give': 0.0008, 'receive': 0.001},
     'bybit': {'give': 0.001, 'receive': 0.001},
+    'gate': {'give': 0.002, 'receive': 0.002},
+    'mexc': {'give': 0.0005, 'receive': 0.0005},
+    'bitget': {'give': 0.001, 'receive': 0.001},
+    'htx': {'give': 0.002, 'receive': 0.002},
     'kucoinfutures': {'give': 0.001, 'receive': 0.001},
     # Có thể thêm nhiều sàn khác nếu cần
 }
@@ -56,10 +84,50 @@ DEFAULT_LEVERAGE = 1  # Đòn bẩy mặc định
 SHORT_AMOUNT_RATIO = 1/3  # Tỷ lệ số tiền để mở vị thế short (1/3 tổng số tiền)
 MIN_FUTURES_QUANTITY = 1  # Số lượng tối thiểu cho giao dịch futures
 
+# Cấu hình chế độ quét nhiều cặp (scanner)
+SCANNER_SYMBOLS = [
+    "BTC/USDT", "ETH/USDT", "XRP/USDT", "LTC/USDT", "ADA/USDT",
+    "DOT/USDT", "DOGE/USDT", "SOL/USDT", "AVAX/USDT", "LINK/USDT",
+    "TRX/USDT", "BCH/USDT", "ATOM/USDT", "NEAR/USDT", "UNI/USDT",
+    "ETC/USDT", "FIL/USDT", "APT/USDT", "ARB/USDT", "OP/USDT",
+    "SUI/USDT", "TON/USDT", "XLM/USDT", "AAVE/USDT", "INJ/USDT",
+]  # Danh sách cặp mặc định khi không chỉ định --symbols
+SCANNER_SYMBOL_BATCH_SIZE = 50  # Số cặp tối đa trong một lần gọi watch_order_book_for_symbols
+SCANNER_LOG_INTERVAL = 10  # Thời gian tối thiểu giữa hai lần báo cáo cùng một cặp (giây)
+
 # Chế độ bot
-BOT_MODES = ['fake-money', 'classic', 'delta-neutral']
+BOT_MODES = ['fake-money', 'classic', 'delta-neutral', 'scanner']
 
 # Đường dẫn tệp tin
-BALANCE_FILE = 'balance.txt'
-START_BALANCE_FILE = 'start_balance.txt'
-SYMBOL_FILE = 'symbol.txt'
\ No newline at end of file
+BALANCE_FILE = 'balance.txt'  # Tệp số dư cũ, chỉ được nhập vào sổ cái một lần
+START_BALANCE_FILE = 'start_balance.txt'  # Tệp số dư ban đầu cũ, chỉ được nhập vào sổ cái một lần
+LEDGER_DB = 'ledger.db'  # Sổ cái SQLite: phiên, giao dịch, phí và số dư
+LEDGER_BATCH_SIZE = 500  # Số bản ghi tối đa trong một transaction của sổ cái
+SYMBOL_FILE = 'symbol.txt'
+MARKET_CACHE_DIR = 'cache/markets'  # Thư mục lưu markets của mỗi sàn (precision, tick size, lot size)
+MARKET_CACHE_TTL = 6 * 3600  # Thời gian markets đã lưu còn hiệu lực (giây)
+
+# Cấu hình ghi sách lệnh (--record)
+RECORDER_DIR = 'recordings'  # Thư mục gốc chứa tệp sách lệnh theo sàn/cặp/ngày
+RECORDER_LEVELS = 10  # Số mức giá được lưu cho mỗi phía
+RECORDER_CHUNK_SIZE = 4096  # Số bản ghi trong bộ đệm trước khi ghi ra tệp
+
+# Báo cáo độ trễ tick-to-trade (ENABLE_LATENCY_TRACKING)
+LATENCY_REPORT_DIR = 'logs'  # Thư mục chứa báo cáo JSON của mỗi phiên
+
+# Cấu hình sàn giả lập (ENABLE_MOCK_EXCHANGE hoặc --mock)
+MOCK_EXCHANGE_SETTINGS = {
+    'update_rate': 1000,  # Số lần cập nhật sách lệnh mỗi giây trên mỗi sàn/cặp (0 = nhanh nhất có thể)
+    'rest_latency': 0.0,  # Độ trễ mô phỏng của mỗi request REST (giây)
+    'fill_probability': 1.0,  # Xác suất lệnh giới hạn chạm giá được khớp ở mỗi lần cập nhật
+    'levels': 20,  # Số mức giá mỗi phía
+    'level_size': 1.0,  # Khối lượng trung bình mỗi mức giá
+    'spread': 0.0004,  # Chênh lệch bid/ask tương đối
+    'volatility': 0.00005,  # Độ lệch chuẩn biến động giá hợp lý mỗi lần cập nhật
+    'deviation_volatility': 0.0001,  # Độ lệch chuẩn biến động độ lệch giá của mỗi sàn
+    'max_deviation': 0.003,  # Độ lệch tối đa của giá sàn so với giá hợp lý
+    'default_price': 100,  # Giá khởi điểm cho cặp không có trong start_prices
+    'start_prices': {'BTC/USDT': 60000, 'ETH/USDT': 3000, 'SOL/USDT': 150},
+    'initial_balances': {'USDT': 100000, 'BTC': 2, 'ETH': 30, 'SOL': 500},
+    'seed': 42,
+}
\ No newline at end of file
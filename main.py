@@ -22,20 +22,28 @@ from services.exchange_service import ExchangeService
 from services.balance_service import BalanceService
 from services.order_service import OrderService
 from services.notification_service import NotificationService
+from services.tick_recorder import TickRecorder
+from services.replay_service import ReplayService
 
 # Import các bot
 from bots.classic_bot import ClassicBot
 from bots.delta_neutral_bot import DeltaNeutralBot
 from bots.fake_money_bot import FakeMoneyBot
+from bots.scanner_bot import ScannerBot
 
 # Import các module tiện ích
 from utils.logger import log_info, log_error, log_warning, logger
 from utils.helpers import show_time
+from utils.latency import latency_tracker
 from utils.validators import (
     validate_mode, validate_exchange, validate_positive_number,
-    validate_positive_integer, validate_symbol, validate_exchanges_unique
+    validate_positive_integer, validate_symbol, validate_exchanges_unique,
+    validate_exchange_count
+)
+from configs import (
+    PYTHON_COMMAND, ENABLE_TELEGRAM, BOT_MODES, MIN_USDT_AMOUNT, SCANNER_SYMBOLS,
+    SUPPORTED_EXCHANGES, RECORDER_DIR
 )
-from configs import PYTHON_COMMAND, ENABLE_TELEGRAM, BOT_MODES, MIN_USDT_AMOUNT
 
 
 def setup_logging(level=logging.INFO):
@@ -91,34 +99,55 @@ def parse_arguments():
     parser = argparse.ArgumentParser(description='Arbitrage Bot - Giao dịch chênh lệch giá crypto')
     
     # Tham số bắt buộc
-    parser.add_argument('mode', choices=BOT_MODES, help='Chế độ bot (fake-money, classic, delta-neutral)')
+    parser.add_argument('mode', choices=BOT_MODES, help='Chế độ bot (fake-money, classic, delta-neutral, scanner)')
     parser.add_argument('renew_time', type=int, help='Thời gian làm mới (phút)')
     parser.add_argument('usdt_amount', type=float, help='Số lượng USDT để giao dịch')
     
-    # Các sàn giao dịch
-    parser.add_argument('exchange1', help='Sàn giao dịch 1')
-    parser.add_argument('exchange2', help='Sàn giao dịch 2')
-    parser.add_argument('exchange3', help='Sàn giao dịch 3')
-    
-    # Tham số tùy chọn
-    parser.add_argument('symbol', nargs='?', help='Cặp giao dịch (nếu bỏ trống sẽ tìm tự động)')
+    # Các sàn giao dịch (ít nhất 2), có thể kết thúc bằng cặp giao dịch (nếu bỏ trống sẽ tìm tự động)
+    parser.add_argument('exchanges', nargs='+', help='Danh sách sàn giao dịch, theo sau là cặp giao dịch (tùy chọn)')
     
     # Thêm các tùy chọn mới
     parser.add_argument('--debug', action='store_true', help='Kích hoạt chế độ debug')
     parser.add_argument('--no-banner', action='store_true', help='Không hiển thị banner')
     parser.add_argument('--dry-run', action='store_true', help='Chạy mà không thực hiện giao dịch thực tế')
+    parser.add_argument('--symbols', help='Danh sách cặp giao dịch cho chế độ scanner, cách nhau bởi dấu phẩy')
+    parser.add_argument('--mock', action='store_true', help='Dùng sàn giả lập trong tiến trình thay cho sàn thật')
+    parser.add_argument('--record', action='store_true', help='Ghi lại sách lệnh nhận được vào thư mục recordings')
+    parser.add_argument('--replay', nargs='?', const=RECORDER_DIR,
+                        help='Chạy fake-money trên sách lệnh đã ghi (mặc định thư mục recordings) thay vì websocket')
+    parser.add_argument('--replay-speed', type=float, default=0,
+                        help='Hệ số tốc độ phát lại so với thời gian thực (0 = nhanh nhất có thể)')
     
     args = parser.parse_args()
     
+    # Phần tử cuối có dạng BASE/QUOTE là cặp giao dịch, không phải sàn
+    args.symbol = None
+    if '/' in args.exchanges[-1] or ':' in args.exchanges[-1]:
+        args.symbol = args.exchanges.pop()
+    
+    # Tách danh sách cặp giao dịch cho chế độ scanner
+    args.symbols = [s.strip() for s in args.symbols.split(',') if s.strip()] if args.symbols else None
+    
     # Validate arguments
     errors = validate_bot_config(
         args.mode,
         args.renew_time,
         args.usdt_amount,
-        [args.exchange1, args.exchange2, args.exchange3],
+        args.exchanges,
         args.symbol
     )
     
+    if args.replay and args.mode != "fake-money":
+        errors.append("--replay chỉ dùng được với chế độ fake-money")
+    
+    if args.replay_speed < 0:
+        errors.append("--replay-speed không được âm")
+    
+    for symbol in args.symbols or []:
+        is_valid, error = validate_symbol(symbol)
+        if not is_valid:
+            errors.append(f"{symbol}: {error}")
+    
     if errors:
         parser.error('\n'.join(errors))
     
@@ -166,6 +195,10 @@ def validate_bot_config(mode, renew_time, usdt_amount, exchanges, symbol=None):
     if not is_valid:
         errors.append(error)
     
+    is_valid, error = validate_exchange_count(exchanges)
+    if not is_valid:
+        errors.append(error)
+    
     # Validate symbol
     if symbol:
         is_valid, error = validate_symbol(symbol)
@@ -186,12 +219,10 @@ def get_user_input():
     
     # Danh sách các thông tin cần nhập với key tương ứng
     input_prompts = [
-        ("mode", "mode (fake-money, classic, delta-neutral)"),
+        ("mode", "mode (fake-money, classic, delta-neutral, scanner)"),
         ("renew_time", "renew time (in minutes)"),
         ("balance", "balance to use (USDT)"),
-        ("exchange1", "exchange 1"),
-        ("exchange2", "exchange 2"),
-        ("exchange3", "exchange 3"),
+        ("exchanges", "exchanges (cách nhau bởi dấu cách, ít nhất 2)"),
         ("crypto", "crypto pair (để trống để tìm tự động)")
     ]
     
@@ -228,12 +259,17 @@ def get_user_input():
                 else:
                     print(f"{Fore.RED}{error}{Style.RESET_ALL}")
             
-            elif key in ["exchange1", "exchange2", "exchange3"]:
-                if validate_exchange(user_input):
-                    inputs[key] = user_input
-                    break
+            elif key == "exchanges":
+                exchanges = user_input.split()
+                invalid = [ex for ex in exchanges if not validate_exchange(ex)]
+                is_valid, error = validate_exchange_count(exchanges)
+                if invalid:
+                    print(f"{Fore.RED}Sàn không được hỗ trợ: {', '.join(invalid)}. Các sàn hợp lệ: {', '.join(SUPPORTED_EXCHANGES)}{Style.RESET_ALL}")
+                elif not is_valid:
+                    print(f"{Fore.RED}{error}{Style.RESET_ALL}")
                 else:
-                    print(f"{Fore.RED}Sàn không được hỗ trợ. Các sàn hợp lệ: binance, kucoin, okx, bybit{Style.RESET_ALL}")
+                    inputs[key] = exchanges
+                    break
             
             elif key == "crypto":
                 if not user_input:  # Cho phép để trống
@@ -247,8 +283,7 @@ def get_user_input():
                     print(f"{Fore.RED}{error}{Style.RESET_ALL}")
     
     # Check if exchanges are unique
-    exchanges = [inputs["exchange1"], inputs["exchange2"], inputs["exchange3"]]
-    is_valid, error = validate_exchanges_unique(exchanges)
+    is_valid, error = validate_exchanges_unique(inputs["exchanges"])
     if not is_valid:
         print(f"{Fore.RED}{error}. Vui lòng khởi động lại và nhập lại.{Style.RESET_ALL}")
         sys.exit(1)
@@ -289,7 +324,7 @@ async def find_best_symbol(exchange_service, exchanges):
                 
                 # Thu thập giá từ các sàn
                 for exchange_id in exchanges:
-                    ticker = exchange_service.get_ticker(exchange_id, pair)
+                    ticker = await exchange_service.get_ticker(exchange_id, pair)
                     bid_prices[exchange_id] = ticker['bid']
                     ask_prices[exchange_id] = ticker['ask']
                 
@@ -343,7 +378,32 @@ async def find_best_symbol(exchange_service, exchanges):
         return default_pair
 
 
-async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=False):
+def create_services(use_mock=None):
+    """
+    Khởi tạo các dịch vụ dùng chung cho tất cả các phiên giao dịch.
+    
+    Các dịch vụ (đặc biệt là kết nối websocket trong ExchangeService) được giữ
+    suốt vòng đời tiến trình để các phiên sau không phải kết nối lại.
+    
+    Args:
+        use_mock (bool, optional): Dùng sàn giả lập (mặc định ENABLE_MOCK_EXCHANGE)
+    
+    Returns:
+        tuple: (exchange_service, balance_service, order_service, notification_service)
+    """
+    exchange_service = ExchangeService(use_mock)
+    balance_service = BalanceService(exchange_service)
+    order_service = OrderService(exchange_service)
+    notification_service = NotificationService(ENABLE_TELEGRAM)
+    
+    # Ảnh chụp số dư của một sàn hết hiệu lực ngay khi lệnh của bot khớp trên sàn đó
+    order_service.order_tracker.add_fill_listener(balance_service.invalidate)
+    
+    return exchange_service, balance_service, order_service, notification_service
+
+
+async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, services, dry_run=False, symbols=None,
+                  tick_recorder=None, replay_service=None, replay_speed=0):
     """
     Chạy bot giao dịch với các tham số đã cho.
     
@@ -353,34 +413,50 @@ async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=Fals
         usdt_amount (float): Số lượng USDT để giao dịch
         renew_time (int): Thời gian làm mới (phút)
         exchanges (list): Danh sách tên các sàn giao dịch
+        services (tuple): Các dịch vụ dùng chung từ create_services()
         dry_run (bool): Nếu True, bot sẽ không thực hiện giao dịch thực tế
+        symbols (list, optional): Danh sách cặp giao dịch cho chế độ scanner
+        tick_recorder (TickRecorder, optional): Bộ ghi sách lệnh (--record)
+        replay_service (ReplayService, optional): Nguồn sách lệnh đã ghi (--replay)
+        replay_speed (float): Hệ số tốc độ phát lại, 0 để chạy nhanh nhất có thể
         
     Returns:
         float: Tổng lợi nhuận (phần trăm)
     """
     try:
-        # Khởi tạo các dịch vụ
-        exchange_service = ExchangeService()
-        balance_service = BalanceService(exchange_service)
-        order_service = OrderService(exchange_service)
-        notification_service = NotificationService(ENABLE_TELEGRAM)
+        exchange_service, balance_service, order_service, notification_service = services
         
         # Log thông tin khởi động
         log_info(f"Khởi động bot với chế độ: {mode}, số tiền: {usdt_amount} USDT, thời gian làm mới: {renew_time} phút")
         if dry_run:
             log_info("Chế độ dry-run được kích hoạt - không thực hiện giao dịch thực tế")
         
-        # Khởi tạo balance files
-        balance_service.initialize_balance_files(usdt_amount)
+        # Ghi nhận phiên mới và số dư ban đầu vào sổ cái (cặp giao dịch tự chọn được ghi theo từng giao dịch)
+        await balance_service.start_session(mode, symbol, usdt_amount)
         
+        # Chế độ scanner theo dõi nhiều cặp, không cần chọn một cặp
+        if mode == "scanner":
+            symbols = symbols or ([symbol] if symbol else SCANNER_SYMBOLS)
+            log_info(f"Quét {len(symbols)} cặp giao dịch")
+        # Khi phát lại, chọn cặp đầu tiên đã được ghi trên tất cả các sàn
+        elif replay_service and not symbol:
+            recorded = replay_service.symbols(exchanges)
+            if not recorded:
+                log_error(f"Không có dữ liệu đã ghi chung cho các sàn {exchanges} trong {replay_service.directory}")
+                return 0
+            symbol = recorded[0]
+            log_info(f"Phát lại cặp giao dịch đã ghi: {symbol}")
         # Tìm cặp giao dịch nếu không được chỉ định
-        if not symbol:
+        elif not symbol:
             symbol = await find_best_symbol(exchange_service, exchanges)
         else:
             log_info(f"Sử dụng cặp giao dịch đã chỉ định: {symbol}")
         
         # Khởi tạo bot dựa trên chế độ
-        if mode == "fake-money" or dry_run:
+        if mode == "scanner":
+            bot = ScannerBot(exchange_service, balance_service, order_service, notification_service)
+            log_info("Sử dụng bot quét nhiều cặp (không thực hiện giao dịch)")
+        elif mode == "fake-money" or dry_run:
             bot = FakeMoneyBot(exchange_service, balance_service, order_service, notification_service)
             log_info("Sử dụng bot mô phỏng (không thực hiện giao dịch thực tế)")
         elif mode == "classic":
@@ -395,13 +471,30 @@ async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=Fals
         
         # Cấu hình bot
         timeout = renew_time * 60  # Chuyển đổi phút sang giây
-        bot.configure(symbol, exchanges, timeout, usdt_amount, symbol)
+        bot.configure(
+            symbol, exchanges, timeout, usdt_amount, symbol,
+            symbols=symbols if mode == "scanner" else None,
+            tick_recorder=tick_recorder
+        )
         
-        # Chạy bot
+        # Chạy bot (phát lại dữ liệu đã ghi nếu có)
         start_time = time.time()
-        profit_pct = await bot.start()
+        if replay_service:
+            profit_pct = await bot.replay(replay_service, replay_speed)
+        else:
+            profit_pct = await bot.start()
         end_time = time.time()
         
+        # Ghi phần sách lệnh còn trong bộ đệm của phiên
+        if tick_recorder:
+            await tick_recorder.drain()
+        
+        # Báo cáo độ trễ theo giai đoạn của phiên rồi bắt đầu lại cho phiên sau
+        latency_tracker.report()
+        latency_tracker.export(label=symbol or mode)
+        exchange_service.request_scheduler.report()
+        latency_tracker.reset()
+        
         # Log thông tin kết thúc
         elapsed_time = time.strftime('%H:%M:%S', time.gmtime(end_time - start_time))
         log_info(f"Bot đã kết thúc sau {elapsed_time}. Tổng lợi nhuận: {profit_pct:.4f}%")
@@ -415,6 +508,11 @@ async def run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run=Fals
 
 async def main():
     """Hàm chính của ứng dụng."""
+    services = None
+    tick_recorder = None
+    replay_service = None
+    replay_speed = 0
+    use_mock = None
     try:
         # Thiết lập logging
         setup_logging()
@@ -435,9 +533,21 @@ async def main():
             mode = args.mode
             renew_time = args.renew_time
             usdt_amount = args.usdt_amount
-            exchanges = [args.exchange1, args.exchange2, args.exchange3]
+            exchanges = args.exchanges
             symbol = args.symbol
+            symbols = args.symbols
             dry_run = args.dry_run
+            
+            if args.mock:
+                use_mock = True
+            
+            if args.replay:
+                replay_service = ReplayService(args.replay)
+                replay_speed = args.replay_speed
+            
+            if args.record:
+                tick_recorder = TickRecorder()
+                log_info(f"Ghi lại sách lệnh vào thư mục {tick_recorder.directory}")
         # Nếu không có tham số dòng lệnh, lấy thông tin từ người dùng
         else:
             # Hiển thị banner
@@ -448,8 +558,9 @@ async def main():
             mode = inputs["mode"]
             renew_time = int(inputs["renew_time"])
             usdt_amount = float(inputs["balance"])
-            exchanges = [inputs["exchange1"], inputs["exchange2"], inputs["exchange3"]]
+            exchanges = inputs["exchanges"]
             symbol = inputs["crypto"] if inputs["crypto"] else None
+            symbols = None  # Chế độ scanner dùng danh sách cặp mặc định khi nhập thủ công
             dry_run = False  # Mặc định không phải dry run khi nhập thủ công
             
             # Validate configuration
@@ -459,21 +570,38 @@ async def main():
                     log_error(error)
                 sys.exit(1)
             
+        # Khởi tạo các dịch vụ một lần, giữ kết nối giữa các phiên
+        services = create_services(use_mock)
+        
+        # Tải thông tin thị trường của các sàn đồng thời (từ tệp nếu còn hạn) trước phiên đầu tiên
+        if not replay_service:
+            await services[0].market_cache.load(exchanges)
+        
+        # Mở sẵn và giữ ấm kết nối REST tới các sàn cho các chế độ đặt lệnh thật
+        if mode in ("classic", "delta-neutral") and not dry_run and not replay_service:
+            await services[0].start_keepalive(exchanges)
+        
         # Chạy bot
         i = 0
         while True:
             # Chạy bot với các tham số đã cho
-            profit_pct = await run_bot(mode, symbol, usdt_amount, renew_time, exchanges, dry_run)
+            profit_pct = await run_bot(
+                mode, symbol, usdt_amount, renew_time, exchanges, services, dry_run, symbols, tick_recorder,
+                replay_service, replay_speed
+            )
             
-            # Đọc số dư mới từ tệp
-            with open('balance.txt', 'r') as f:
-                usdt_amount = float(f.read().strip())
+            # Đọc số dư mới từ sổ cái
+            usdt_amount = await services[1].session_balance()
             
             # Tăng số lần chạy
             i += 1
             
-            # Nếu là lần chạy đầu tiên mà có lỗi, thoát khỏi vòng lặp
-            if i == 1 and profit_pct == 0:
+            # Dữ liệu đã ghi chỉ phát lại một lần
+            if replay_service:
+                break
+            
+            # Nếu là lần chạy đầu tiên mà có lỗi, thoát khỏi vòng lặp (scanner không có lợi nhuận)
+            if i == 1 and profit_pct == 0 and mode != "scanner":
                 log_error("Chạy bot lần đầu không thành công. Thoát chương trình.")
                 break
             
@@ -482,6 +610,14 @@ async def main():
     except Exception as e:
         log_error(f"Lỗi không xác định: {str(e)}")
     finally:
+        # Dừng theo dõi lệnh và đóng các kết nối websocket dùng chung
+        if services:
+            await services[2].close()
+            await services[1].close()
+            await services[0].close()
+        if tick_recorder:
+            await tick_recorder.drain()
+            tick_recorder.close()
         log_info("Chương trình kết thúc.")
 
 
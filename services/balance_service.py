@@ -1,34 +1,131 @@
 """
 Service quản lý số dư trên các sàn giao dịch.
 """
-import os
 import time
+import asyncio
+import ccxt
+import ccxt.pro
 from utils.logger import log_info, log_error, log_warning
 from utils.exceptions import InsufficientBalanceError
-from utils.helpers import read_file_content, update_balance_file, extract_base_asset
-from configs import START_BALANCE_FILE, BALANCE_FILE
+from utils.helpers import extract_base_asset
+from services.ledger_service import LedgerService, ACCOUNT
+from configs import (
+    BALANCE_CACHE_TTL, BALANCE_POLL_INTERVAL, BALANCE_POLL_MIN_INTERVAL,
+    BALANCE_CHECK_TIMEOUT, NETWORK_ERROR_DELAY
+)
+
+
+class BalanceShortfall:
+    """
+    Một yêu cầu số dư không được đáp ứng (thiếu tiền hoặc sàn không trả về số dư).
+    """
+    
+    def __init__(self, exchange, asset, required, available, error=None):
+        """
+        Args:
+            exchange (str): ID của sàn giao dịch
+            asset (str): Ký hiệu của tài sản
+            required (float): Số dư cần có
+            available (float): Số dư khả dụng đọc được (0 nếu không đọc được)
+            error (str, optional): Lỗi khi lấy số dư
+        """
+        self.exchange = exchange
+        self.asset = asset
+        self.required = required
+        self.available = available
+        self.error = error
+    
+    @property
+    def missing(self):
+        """Số dư còn thiếu."""
+        return max(0.0, self.required - self.available)
+    
+    def __str__(self):
+        if self.error:
+            return f"Không thể kiểm tra số dư {self.asset} trên {self.exchange}: {self.error}"
+        return (
+            f"Không đủ số dư trên {self.exchange}. "
+            f"Cần thêm {round(self.missing, 3)} {self.asset} nữa. "
+            f"Số dư hiện tại trên {self.exchange}: {round(self.available, 3)} {self.asset}"
+        )
+
+
+class BalanceCheckReport:
+    """
+    Kết quả kiểm tra số dư trên nhiều sàn.
+    """
+    
+    def __init__(self):
+        """Khởi tạo kết quả rỗng."""
+        self.balances = {}  # (sàn, tài sản) -> số dư khả dụng đọc được
+        self.shortfalls = []  # Danh sách BalanceShortfall
+        self.elapsed = 0.0  # Thời gian kiểm tra (giây)
+    
+    @property
+    def ok(self):
+        """True nếu mọi yêu cầu số dư đều được đáp ứng."""
+        return not self.shortfalls
+    
+    def available(self, exchange_id, asset):
+        """
+        Số dư khả dụng đọc được trong lần kiểm tra.
+        
+        Returns:
+            float: Số dư, hoặc None nếu sàn không trả về số dư
+        """
+        return self.balances.get((exchange_id, asset))
+    
+    def shortfalls_on(self, exchanges):
+        """
+        Các yêu cầu không được đáp ứng trên một nhóm sàn.
+        
+        Args:
+            exchanges (list): Danh sách tên các sàn giao dịch
+        
+        Returns:
+            list: Danh sách BalanceShortfall
+        """
+        return [shortfall for shortfall in self.shortfalls if shortfall.exchange in exchanges]
 
 
 class BalanceService:
     """
     Lớp dịch vụ quản lý số dư trên các sàn giao dịch.
+    
+    Số dư của mỗi sàn được giữ trong một ảnh chụp. Khi luồng số dư của sàn đang chạy,
+    ảnh chụp được cập nhật qua watch_balance (hoặc REST định kỳ nếu sàn không hỗ trợ)
+    và được đẩy tới các bot đã đăng ký. Phiên giao dịch, giao dịch và số dư được ghi vào sổ cái.
     """
     
-    def __init__(self, exchange_service):
+    def __init__(self, exchange_service, poll_interval=BALANCE_POLL_INTERVAL, min_poll_interval=BALANCE_POLL_MIN_INTERVAL,
+                 ledger=None):
         """
         Khởi tạo dịch vụ quản lý số dư.
         
         Args:
             exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            poll_interval (float): Khoảng thời gian lấy số dư qua REST khi sàn không có watch_balance (giây)
+            min_poll_interval (float): Khoảng cách tối thiểu giữa hai lần lấy số dư qua REST (giây)
+            ledger (LedgerService, optional): Sổ cái lưu phiên, giao dịch và số dư (mặc định ledger.db)
         """
         self.exchange_service = exchange_service
-        self.cache = {}  # Cache số dư để giảm số lượng request
-        self.cache_time = {}  # Thời gian cache
-        self.cache_timeout = 10  # Thời gian hết hạn cache (giây)
+        self.snapshots = {}  # Sàn -> số dư theo định dạng ccxt ({'free': {...}, 'used': {...}, 'total': {...}})
+        self.snapshot_time = {}  # Sàn -> thời điểm lấy ảnh chụp số dư
+        self.refreshing = {}  # Sàn -> tác vụ đang lấy số dư, các lần gọi đồng thời dùng chung một request
+        self.invalidations = {}  # Sàn -> số lần ảnh chụp bị vô hiệu hóa
+        self.cache_timeout = BALANCE_CACHE_TTL  # Thời gian hết hạn ảnh chụp (giây)
+        self.poll_interval = poll_interval
+        self.min_poll_interval = min(min_poll_interval, poll_interval)
+        self.listeners = []  # Hàm gọi lại (sàn, số dư) khi ảnh chụp số dư được cập nhật
+        self.watchers = {}  # Sàn -> tác vụ luồng số dư
+        self.streaming = set()  # Các sàn đang nhận số dư qua websocket
+        self.stale_events = {}  # Sàn -> sự kiện báo ảnh chụp bị vô hiệu hóa (đánh thức vòng lặp REST)
+        self.ledger = ledger if ledger is not None else LedgerService()
+        self.account_balance = 0.0  # Số dư USDT của bot trong phiên hiện tại
     
-    def check_balances(self, exchanges, symbol, total_amount, notification_service=None):
+    async def check_balances(self, exchanges, symbol, total_amount, notification_service=None):
         """
-        Kiểm tra số dư trên các sàn giao dịch.
+        Kiểm tra số dư USDT trên các sàn giao dịch (đồng thời, chung một hạn chót).
         
         Args:
             exchanges (list): Danh sách tên các sàn giao dịch
@@ -37,69 +134,324 @@ class BalanceService:
             notification_service (NotificationService, optional): Dịch vụ thông báo
             
         Returns:
-            bool: True nếu tất cả các sàn có đủ số dư, ngược lại False
+            BalanceCheckReport: Kết quả kiểm tra khi tất cả các sàn có đủ số dư
             
         Raises:
-            InsufficientBalanceError: Nếu một sàn không có đủ số dư
+            InsufficientBalanceError: Nếu có sàn không đủ số dư, kèm danh sách tất cả các sàn thiếu
         """
         amount_per_exchange = total_amount / len(exchanges)
-        insufficient = False
-        insufficient_exchange = None
-        insufficient_amount = 0
-        available_amount = 0
+        report = await self.check_requirements([(exchange_id, 'USDT', amount_per_exchange) for exchange_id in exchanges])
         
-        for exchange_id in exchanges:
-            balance = self.get_balance(exchange_id, 'USDT')
+        if not report.ok:
+            self.report_shortfalls(report.shortfalls, notification_service)
+            first = report.shortfalls[0]
+            raise InsufficientBalanceError(first.exchange, first.asset, first.required, first.available, report.shortfalls)
+        
+        return report
+    
+    async def check_requirements(self, requirements, timeout=BALANCE_CHECK_TIMEOUT):
+        """
+        Kiểm tra đồng thời nhiều yêu cầu số dư, mỗi sàn một request, chung một hạn chót.
+        
+        Sàn lỗi hoặc không trả về kịp được ghi nhận là thiếu số dư thay vì dừng cả lần kiểm tra.
+        
+        Args:
+            requirements (list): Danh sách (ID sàn, tài sản, số dư cần có), gồm cả sàn spot và futures
+            timeout (float): Hạn chót chung (giây)
+        
+        Returns:
+            BalanceCheckReport: Số dư đọc được và tất cả các yêu cầu không được đáp ứng
+        """
+        report = BalanceCheckReport()
+        start = time.perf_counter()
+        
+        exchanges = list(dict.fromkeys(exchange_id for exchange_id, _, _ in requirements))
+        tasks = {exchange_id: asyncio.ensure_future(self.refresh(exchange_id)) for exchange_id in exchanges}
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        
+        for exchange_id, asset, required in requirements:
+            task = tasks[exchange_id]
+            if task in pending:
+                report.shortfalls.append(BalanceShortfall(exchange_id, asset, required, 0.0, f"Không trả về số dư trong {timeout} giây"))
+                continue
+            if task.exception() is not None:
+                report.shortfalls.append(BalanceShortfall(exchange_id, asset, required, 0.0, str(task.exception())))
+                continue
             
-            if balance < amount_per_exchange:
-                message = (
-                    f"Không đủ số dư trên {exchange_id}. "
-                    f"Cần thêm {round(amount_per_exchange - balance, 3)} USDT nữa. "
-                    f"Số dư hiện tại trên {exchange_id}: {round(balance, 3)} USDT"
-                )
-                log_error(message)
-                
-                if notification_service:
-                    notification_service.send_message(message)
-                
-                insufficient = True
-                insufficient_exchange = exchange_id
-                insufficient_amount = amount_per_exchange
-                available_amount = balance
-            else:
-                log_info(f"Số dư trên {exchange_id} đã đủ")
-        
-        if insufficient:
-            raise InsufficientBalanceError(insufficient_exchange, 'USDT', insufficient_amount, available_amount)
+            available = task.result()['free'].get(asset) or 0.0
+            report.balances[(exchange_id, asset)] = available
+            if available < required:
+                report.shortfalls.append(BalanceShortfall(exchange_id, asset, required, available))
         
-        return True
+        report.elapsed = time.perf_counter() - start
+        log_info(f"Đã kiểm tra số dư trên {len(exchanges)} sàn trong {report.elapsed * 1e3:.1f}ms")
+        return report
     
-    def get_balance(self, exchange_id, asset):
+    def report_shortfalls(self, shortfalls, notification_service=None):
         """
-        Lấy số dư của một tài sản trên sàn giao dịch với caching.
+        Ghi log và gửi một thông báo gộp cho các sàn thiếu số dư.
+        
+        Args:
+            shortfalls (list): Danh sách BalanceShortfall
+            notification_service (NotificationService, optional): Dịch vụ thông báo
+        """
+        for shortfall in shortfalls:
+            log_error(str(shortfall))
+        
+        if shortfalls and notification_service:
+            notification_service.send_message("\n".join(str(shortfall) for shortfall in shortfalls))
+    
+    async def get_balance(self, exchange_id, asset):
+        """
+        Lấy số dư khả dụng của một tài sản, từ ảnh chụp số dư của sàn nếu còn hiệu lực.
         
         Args:
             exchange_id (str): ID của sàn giao dịch
-            asset (str): Ký hiệu của tài sản
+            asset (str): Ký hiệu của tài sản (hoặc cặp giao dịch, khi đó lấy tài sản cơ sở)
         
         Returns:
             float: Số dư của tài sản
         """
-        cache_key = f"{exchange_id}_{asset}"
+        if not self.is_fresh(exchange_id):
+            await self.refresh(exchange_id)
+        
+        return self.free(exchange_id, asset if asset == 'USDT' else extract_base_asset(asset))
+    
+    def free(self, exchange_id, asset):
+        """
+        Đọc số dư khả dụng từ ảnh chụp hiện có, không gửi request.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            asset (str): Ký hiệu của tài sản (ví dụ: 'USDT', 'BTC')
+        
+        Returns:
+            float: Số dư khả dụng (0 nếu chưa có ảnh chụp)
+        """
+        return (self.snapshots.get(exchange_id) or {}).get('free', {}).get(asset) or 0.0
+    
+    def used(self, exchange_id, asset):
+        """
+        Đọc số dư đang bị khóa trong lệnh từ ảnh chụp hiện có, không gửi request.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            asset (str): Ký hiệu của tài sản
+        
+        Returns:
+            float: Số dư đang bị khóa (0 nếu chưa có ảnh chụp)
+        """
+        return (self.snapshots.get(exchange_id) or {}).get('used', {}).get(asset) or 0.0
+    
+    def is_fresh(self, exchange_id):
+        """
+        Kiểm tra ảnh chụp số dư của sàn còn hiệu lực.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        
+        Returns:
+            bool: True nếu có ảnh chụp chưa hết hạn và chưa bị vô hiệu hóa
+        """
+        if exchange_id in self.streaming:
+            # Số dư đẩy qua websocket không hết hạn, nhưng vẫn phải lấy lại sau khi bị vô hiệu hóa
+            return exchange_id in self.snapshot_time
+        snapshot_time = self.snapshot_time.get(exchange_id)
+        return snapshot_time is not None and time.time() - snapshot_time < self.cache_timeout
+    
+    def invalidate(self, exchange_id, order=None):
+        """
+        Vô hiệu hóa ảnh chụp số dư của sàn (ví dụ khi lệnh của bot vừa khớp).
+        
+        Số dư cũ vẫn được giữ để đọc, lần get_balance kế tiếp sẽ lấy lại từ sàn.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order (dict, optional): Lệnh vừa khớp (dùng khi đăng ký với OrderTracker)
+        """
+        self.snapshot_time.pop(exchange_id, None)
+        self.invalidations[exchange_id] = self.invalidations.get(exchange_id, 0) + 1
+        if exchange_id in self.stale_events:
+            self.stale_events[exchange_id].set()
+    
+    async def refresh(self, exchange_id):
+        """
+        Lấy lại toàn bộ số dư của một sàn bằng một request.
+        
+        Các lần gọi đồng thời cho cùng một sàn chờ chung một request.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        
+        Returns:
+            dict: Số dư theo định dạng ccxt
+        """
+        task = self.refreshing.get(exchange_id)
+        if task is None or task.done():
+            task = self.refreshing[exchange_id] = asyncio.create_task(self._fetch_snapshot(exchange_id))
+        return await asyncio.shield(task)
+    
+    async def _fetch_snapshot(self, exchange_id):
+        """Lấy số dư từ sàn và lưu thành ảnh chụp."""
+        fetched_at = time.time()
+        invalidations = self.invalidations.get(exchange_id, 0)
+        snapshot = await self.exchange_service.fetch_balance(exchange_id)
+        self.snapshots[exchange_id] = snapshot
+        # Lệnh khớp trong lúc chờ phản hồi có thể chưa có trong số dư, không đánh dấu còn hiệu lực
+        if self.invalidations.get(exchange_id, 0) == invalidations:
+            self.snapshot_time[exchange_id] = fetched_at
+        self._notify(exchange_id, snapshot)
+        return snapshot
+    
+    def _apply_snapshot(self, exchange_id, snapshot):
+        """Lưu số dư do sàn đẩy qua websocket."""
+        self.snapshots[exchange_id] = snapshot
+        self.snapshot_time[exchange_id] = time.time()
+        self._notify(exchange_id, snapshot)
+    
+    def _notify(self, exchange_id, snapshot):
+        """Ghi ảnh chụp số dư mới vào sổ cái và gửi tới các hàm đã đăng ký."""
+        if self.ledger.started:
+            self.ledger.record_snapshot(exchange_id, snapshot)
+        
+        for listener in list(self.listeners):
+            try:
+                listener(exchange_id, snapshot)
+            except Exception as e:
+                log_error(f"Lỗi khi xử lý cập nhật số dư của {exchange_id}: {str(e)}")
+    
+    def add_listener(self, listener):
+        """
+        Đăng ký hàm nhận số dư mỗi khi ảnh chụp của một sàn được cập nhật.
+        
+        Args:
+            listener (callable): Hàm nhận (ID sàn, số dư theo định dạng ccxt)
+        """
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+    
+    def remove_listener(self, listener):
+        """
+        Hủy đăng ký một hàm nhận số dư.
+        
+        Args:
+            listener (callable): Hàm đã đăng ký bằng add_listener
+        """
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+    
+    async def start_streaming(self, exchanges):
+        """
+        Bắt đầu luồng số dư nền cho các sàn (mỗi sàn một luồng dùng chung cho mọi bot).
+        
+        Args:
+            exchanges (list): Danh sách tên các sàn giao dịch
+        """
+        for exchange_id in exchanges:
+            if exchange_id not in self.watchers or self.watchers[exchange_id].done():
+                self.watchers[exchange_id] = asyncio.create_task(self._stream(exchange_id))
+    
+    async def _stream(self, exchange_id):
+        """
+        Luồng số dư của một sàn: watch_balance nếu sàn hỗ trợ, nếu không thì REST định kỳ.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        try:
+            handle = await self.exchange_service.acquire_pro_exchange(exchange_id)
+        except Exception as e:
+            log_warning(f"Không thể mở luồng số dư qua websocket trên {exchange_id}, lấy số dư qua REST: {str(e)}")
+            handle = None
+        
+        if handle is not None:
+            async with handle:
+                if getattr(handle.exchange, 'has', {}).get('watchBalance'):
+                    log_info(f"Bắt đầu theo dõi số dư qua websocket trên sàn {exchange_id}")
+                    try:
+                        await self._watch_loop(exchange_id, handle)
+                    finally:
+                        self.streaming.discard(exchange_id)
+                else:
+                    log_info(f"Sàn {exchange_id} không hỗ trợ watch_balance, lấy số dư qua REST mỗi {self.poll_interval} giây")
+        
+        await self._poll_loop(exchange_id)
+    
+    async def _watch_loop(self, exchange_id, handle):
+        """
+        Nhận số dư qua watch_balance cho tới khi bị dừng hoặc sàn báo không hỗ trợ.
         
-        # Sử dụng cache nếu chưa hết hạn
-        current_time = time.time()
-        if cache_key in self.cache and current_time - self.cache_time.get(cache_key, 0) < self.cache_timeout:
-            return self.cache[cache_key]
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            handle (ProExchangeHandle): Handle tới kết nối dùng chung
+        """
+        while True:
+            try:
+                self._apply_snapshot(exchange_id, await handle.exchange.watch_balance())
+                self.streaming.add(exchange_id)
+            
+            except ccxt.NotSupported as e:
+                log_warning(f"Sàn {exchange_id} không hỗ trợ watch_balance, lấy số dư qua REST: {str(e)}")
+                return
+            
+            except ccxt.pro.NetworkError as network_error:
+                # Ảnh chụp hết hạn theo thời gian trong lúc luồng bị gián đoạn
+                self.streaming.discard(exchange_id)
+                log_warning(f"Lỗi kết nối khi theo dõi số dư trên {exchange_id}: {str(network_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
+            
+            except Exception as loop_error:
+                self.streaming.discard(exchange_id)
+                log_error(f"Lỗi khi theo dõi số dư trên {exchange_id}: {str(loop_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
+    
+    async def _poll_loop(self, exchange_id):
+        """
+        Lấy số dư qua REST mỗi poll_interval giây, sớm hơn khi lệnh của bot khớp trên sàn.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        stale = self.stale_events.setdefault(exchange_id, asyncio.Event())
+        while True:
+            stale.clear()
+            try:
+                await self.refresh(exchange_id)
+            except Exception as e:
+                log_warning(f"Không thể lấy số dư trên {exchange_id}: {str(e)}")
+            
+            await asyncio.sleep(self.min_poll_interval)
+            try:
+                await asyncio.wait_for(stale.wait(), self.poll_interval - self.min_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def close(self):
+        """Dừng tất cả các luồng số dư và đóng sổ cái."""
+        for task in self.watchers.values():
+            task.cancel()
         
-        # Nếu không có cache hoặc đã hết hạn, lấy số dư mới
-        balance = self.exchange_service.get_balance(exchange_id, asset)
+        await asyncio.gather(*self.watchers.values(), return_exceptions=True)
+        self.watchers.clear()
+        self.streaming.clear()
+        await self.ledger.close()
+    
+    async def refresh_all(self, exchanges):
+        """
+        Lấy lại số dư của nhiều sàn đồng thời.
         
-        # Cập nhật cache
-        self.cache[cache_key] = balance
-        self.cache_time[cache_key] = current_time
+        Args:
+            exchanges (list): Danh sách tên các sàn giao dịch
         
-        return balance
+        Returns:
+            dict: Sàn -> số dư theo định dạng ccxt
+        """
+        snapshots = await asyncio.gather(*(self.refresh(exchange_id) for exchange_id in exchanges))
+        return dict(zip(exchanges, snapshots))
     
     def initialize_balances(self, exchanges, symbol, total_usd_amount):
         """
@@ -145,23 +497,25 @@ class BalanceService:
         
         return crypto
     
-    def initialize_balance_files(self, amount):
+    async def start_session(self, mode, symbol, amount):
         """
-        Khởi tạo các tệp tin lưu trữ số dư.
+        Mở sổ cái (nếu chưa mở) và ghi nhận một phiên giao dịch mới.
         
         Args:
+            mode (str): Chế độ bot
+            symbol (str): Ký hiệu của cặp giao dịch
             amount (float): Số dư ban đầu
-        """
-        # Ghi số dư ban đầu vào tệp
-        with open(START_BALANCE_FILE, 'w') as f:
-            f.write(str(amount))
         
-        with open(BALANCE_FILE, 'w') as f:
-            f.write(str(amount))
+        Returns:
+            int: ID của phiên
+        """
+        await self.ledger.start()
+        self.account_balance = amount
+        return await self.ledger.record_session_start(mode, symbol, amount)
     
     def update_balance_with_profit(self, profit_pct):
         """
-        Cập nhật số dư với lợi nhuận.
+        Cập nhật số dư với lợi nhuận và ghi số dư mới vào sổ cái.
         
         Args:
             profit_pct (float): Phần trăm lợi nhuận
@@ -169,26 +523,40 @@ class BalanceService:
         Returns:
             float: Số dư mới
         """
-        try:
-            # Đọc số dư hiện tại từ tệp
-            with open(BALANCE_FILE, 'r+') as f:
-                balance = float(f.read().strip())
-                
-                # Tính số dư mới
-                new_balance = round(balance * (1 + (profit_pct / 100)), 3)
-                
-                # Ghi số dư mới vào tệp
-                f.seek(0)
-                f.write(str(new_balance))
-                f.truncate()
-                
-                return new_balance
-                
-        except Exception as e:
-            log_error(f"Lỗi khi cập nhật số dư với lợi nhuận: {str(e)}")
-            return 0
+        self.account_balance = round(self.account_balance * (1 + (profit_pct / 100)), 3)
+        self.ledger.record_balance(ACCOUNT, 'USDT', self.account_balance)
+        return self.account_balance
     
-    def emergency_convert_all(self, symbol, exchanges):
+    async def session_balance(self):
+        """
+        Số dư USDT gần nhất của bot được ghi trong sổ cái.
+        
+        Returns:
+            float: Số dư (số dư của phiên hiện tại nếu sổ cái chưa có bản ghi)
+        """
+        if not self.ledger.started:
+            return self.account_balance
+        
+        balance = await self.ledger.latest_balance()
+        return self.account_balance if balance is None else balance
+    
+    def record_trade(self, intent, fee_usd, fee_crypto, success=True):
+        """
+        Ghi một giao dịch chênh lệch giá vào sổ cái mà không chờ ghi đĩa.
+        
+        Args:
+            intent (TradeIntent): Ý định giao dịch đã thực hiện
+            fee_usd (float): Phí tính theo USD
+            fee_crypto (float): Phí tính theo crypto
+            success (bool): False nếu lệnh không khớp đủ
+        """
+        self.ledger.record_trade(
+            intent.symbol, intent.buy_exchange, intent.sell_exchange, intent.amount,
+            intent.buy_price, intent.sell_price, intent.profit_pct, intent.profit_usd,
+            fee_usd, fee_crypto, success
+        )
+    
+    async def emergency_convert_all(self, symbol, exchanges):
         """
         Chuyển đổi khẩn cấp tất cả tiền mã hóa sang USDT trên tất cả sàn.
         
@@ -201,16 +569,22 @@ class BalanceService:
         """
         log_info(f"Bán tất cả {extract_base_asset(symbol)} trên {', '.join(exchanges)}")
         
-        for exchange_id in exchanges:
+        async def convert(exchange_id):
             try:
-                self.exchange_service.emergency_convert(exchange_id, symbol)
+                await self.exchange_service.emergency_convert(exchange_id, symbol)
                 log_info(f"Đã bán thành công trên {exchange_id}")
             except Exception as e:
                 log_error(f"Lỗi khi bán khẩn cấp trên {exchange_id}: {str(e)}")
+            self.invalidate(exchange_id)
+        
+        # Hủy lệnh và bán đồng thời trên tất cả các sàn
+        start = time.perf_counter()
+        await asyncio.gather(*(convert(exchange_id) for exchange_id in exchanges))
+        log_info(f"Đã đóng vị thế trên {len(exchanges)} sàn trong {time.perf_counter() - start:.2f} giây")
         
         return True
     
-    def transfer_between_accounts(self, exchange_id, asset, amount, from_account, to_account):
+    async def transfer_between_accounts(self, exchange_id, asset, amount, from_account, to_account):
         """
         Chuyển tiền giữa các tài khoản trên cùng một sàn giao dịch.
         
@@ -225,7 +599,7 @@ class BalanceService:
             dict: Thông tin về giao dịch chuyển
         """
         try:
-            result = self.exchange_service.transfer_between_accounts(exchange_id, asset, amount, from_account, to_account)
+            result = await self.exchange_service.transfer_between_accounts(exchange_id, asset, amount, from_account, to_account)
             log_info(f"Đã chuyển {amount} {asset} từ {from_account} sang {to_account} trên {exchange_id}")
             return result
         except Exception as e:
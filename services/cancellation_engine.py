@@ -0,0 +1,127 @@
+"""
+Hủy lệnh hàng loạt: gửi đồng thời trên mọi sàn, xác nhận lại qua danh sách lệnh đang mở.
+"""
+import time
+import asyncio
+
+from utils.logger import log_info, log_warning
+from configs import CANCEL_CONFIRM_ATTEMPTS
+
+
+class CancelReport:
+    """
+    Kết quả của một lần hủy lệnh hàng loạt.
+    """
+
+    def __init__(self):
+        """Khởi tạo kết quả rỗng."""
+        self.requests = 0  # Số request hủy đã gửi
+        self.cancelled = 0  # Số lệnh sàn xác nhận đã hủy
+        self.remaining = {}  # Sàn -> ID các lệnh vẫn còn mở sau khi xác nhận
+        self.errors = {}  # Sàn -> lỗi khiến không thể hủy hoặc xác nhận
+        self.elapsed = 0.0  # Tổng thời gian (giây)
+
+    @property
+    def ok(self):
+        """True nếu mọi sàn đã được xác nhận không còn lệnh mở."""
+        return not self.remaining and not self.errors
+
+    def __repr__(self):
+        return (
+            f"CancelReport(cancelled={self.cancelled}, requests={self.requests}, remaining={self.remaining}, "
+            f"errors={list(self.errors)}, elapsed={self.elapsed * 1e3:.1f}ms)"
+        )
+
+
+class CancellationEngine:
+    """
+    Hủy tất cả lệnh đang mở của nhiều (sàn, cặp) cùng lúc.
+
+    Mỗi sàn dùng cancel_all_orders nếu sàn hỗ trợ, nếu không thì hủy từng lệnh đồng thời.
+    Sau đó danh sách lệnh đang mở được lấy lại để xác nhận và các lệnh còn sót được hủy lại,
+    tối đa CANCEL_CONFIRM_ATTEMPTS lần. Mọi request đi qua bộ giới hạn request của
+    ExchangeService với mức ưu tiên của lệnh hủy.
+    """
+
+    def __init__(self, exchange_service, attempts=CANCEL_CONFIRM_ATTEMPTS):
+        """
+        Khởi tạo bộ hủy lệnh.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            attempts (int): Số lần hủy lại các lệnh còn sót sau khi xác nhận
+        """
+        self.exchange_service = exchange_service
+        self.attempts = attempts
+
+    async def cancel_all(self, targets):
+        """
+        Hủy đồng thời tất cả lệnh đang mở của các (sàn, cặp) và xác nhận kết quả.
+
+        Args:
+            targets (list): Danh sách (ID sàn, ký hiệu cặp giao dịch)
+
+        Returns:
+            CancelReport: Kết quả hủy lệnh
+        """
+        report = CancelReport()
+        start = time.perf_counter()
+        await asyncio.gather(*(self._cancel_venue(exchange_id, symbol, report) for exchange_id, symbol in targets))
+        report.elapsed = time.perf_counter() - start
+
+        venues = ', '.join(sorted({exchange_id for exchange_id, _ in targets}))
+        log_info(f"Đã hủy {report.cancelled} lệnh trên {venues} trong {report.elapsed * 1e3:.1f}ms")
+        for exchange_id, order_ids in report.remaining.items():
+            log_warning(f"Vẫn còn {len(order_ids)} lệnh mở trên {exchange_id} sau khi hủy: {', '.join(map(str, order_ids))}")
+        for exchange_id, error in report.errors.items():
+            log_warning(f"Không thể hủy lệnh trên {exchange_id}: {error}")
+
+        return report
+
+    async def _cancel_venue(self, exchange_id, symbol, report):
+        """
+        Hủy và xác nhận các lệnh đang mở của một cặp trên một sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            report (CancelReport): Kết quả được cập nhật
+        """
+        try:
+            exchange = self.exchange_service.get_exchange(exchange_id)
+            if exchange.has.get('cancelAllOrders'):
+                await self.exchange_service.request_scheduler.acquire(exchange_id, 'cancel_all_orders', exchange)
+                report.requests += 1
+                cancelled = await exchange.cancel_all_orders(symbol)
+                # ccxt trả về danh sách lệnh đã hủy; sàn chỉ trả phản hồi thô thì không biết số lệnh
+                if isinstance(cancelled, list):
+                    report.cancelled += len(cancelled)
+
+            open_orders = await self.exchange_service.fetch_open_orders(exchange_id, symbol)
+            for _ in range(self.attempts):
+                if not open_orders:
+                    break
+                await asyncio.gather(*(self._cancel_one(exchange_id, order['id'], symbol, report) for order in open_orders))
+                open_orders = await self.exchange_service.fetch_open_orders(exchange_id, symbol)
+
+            if open_orders:
+                report.remaining[exchange_id] = [order['id'] for order in open_orders]
+        except Exception as e:
+            report.errors[exchange_id] = str(e)
+
+    async def _cancel_one(self, exchange_id, order_id, symbol, report):
+        """
+        Hủy một lệnh; lỗi chỉ được ghi log vì kết quả được xác nhận lại sau đó.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str): ID của lệnh
+            symbol (str): Ký hiệu của cặp giao dịch
+            report (CancelReport): Kết quả được cập nhật
+        """
+        report.requests += 1
+        try:
+            await self.exchange_service.cancel_order(exchange_id, order_id, symbol)
+            report.cancelled += 1
+        except Exception as e:
+            log_warning(f"Không thể hủy lệnh {order_id} trên {exchange_id} (có thể đã khớp): {str(e)}")
@@ -0,0 +1,212 @@
+"""
+Registry giữ các kết nối websocket ccxt.pro dùng chung cho toàn bộ tiến trình.
+"""
+import asyncio
+from utils.logger import log_info, log_error, log_debug
+from utils.exceptions import ExchangeError
+
+
+class ProExchangeHandle:
+    """
+    Handle đếm tham chiếu tới một kết nối ccxt.pro trong registry.
+
+    Handle luôn trỏ tới kết nối hiện tại của sàn, nên sau khi registry
+    kết nối lại, mọi vòng lặp đang giữ handle đều dùng kết nối mới.
+    """
+
+    def __init__(self, registry, exchange_id):
+        """
+        Khởi tạo handle.
+
+        Args:
+            registry (ConnectionRegistry): Registry quản lý kết nối
+            exchange_id (str): ID của sàn giao dịch
+        """
+        self.registry = registry
+        self.exchange_id = exchange_id
+        self.released = False
+        self.client = None  # Kết nối mà handle trả về gần nhất
+
+    @property
+    def exchange(self):
+        """
+        Trả về đối tượng ccxt.pro hiện tại của sàn.
+
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro
+        """
+        self.client = self.registry.get_client(self.exchange_id)
+        return self.client
+
+    async def reconnect(self):
+        """
+        Yêu cầu registry tạo lại kết nối mà handle đã dùng (không làm gì nếu kết nối đó đã được thay).
+
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro hiện tại
+        """
+        return await self.registry.reconnect(self.exchange_id, self.client)
+
+    def release(self):
+        """Trả handle về registry (kết nối vẫn được giữ ấm)."""
+        if not self.released:
+            self.released = True
+            self.registry.release(self.exchange_id)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class ConnectionRegistry:
+    """
+    Giữ một kết nối ccxt.pro (kèm markets đã tải và các subscription) cho mỗi sàn
+    trong suốt vòng đời tiến trình và cấp phát handle đếm tham chiếu cho các bot.
+    """
+
+    def __init__(self, client_factory):
+        """
+        Khởi tạo registry.
+
+        Args:
+            client_factory (callable): Hàm nhận exchange_id và trả về đối tượng ccxt.pro mới
+        """
+        self.client_factory = client_factory
+        self.clients = {}  # Kết nối hiện tại của mỗi sàn
+        self.ref_counts = {}  # Số handle đang được sử dụng cho mỗi sàn
+        self.locks = {}  # Khóa để tránh tạo trùng kết nối khi nhiều vòng lặp cùng yêu cầu
+
+    def _get_lock(self, exchange_id):
+        """Lấy khóa khởi tạo của một sàn."""
+        if exchange_id not in self.locks:
+            self.locks[exchange_id] = asyncio.Lock()
+        return self.locks[exchange_id]
+
+    async def _open_client(self, exchange_id):
+        """
+        Tạo kết nối mới và tải markets một lần.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro
+        """
+        client = self.client_factory(exchange_id)
+
+        try:
+            await client.load_markets()
+        except Exception as e:
+            # Markets sẽ được tải lại ở lần watch đầu tiên, không chặn việc khởi tạo
+            log_error(f"Không thể tải markets cho {exchange_id}: {str(e)}")
+
+        log_info(f"Đã mở kết nối websocket dùng chung cho {exchange_id}")
+        return client
+
+    async def get_or_create(self, exchange_id):
+        """
+        Lấy kết nối hiện tại của sàn, tạo mới nếu chưa có.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro
+        """
+        if exchange_id in self.clients:
+            return self.clients[exchange_id]
+
+        async with self._get_lock(exchange_id):
+            if exchange_id not in self.clients:
+                self.clients[exchange_id] = await self._open_client(exchange_id)
+
+        return self.clients[exchange_id]
+
+    async def acquire(self, exchange_id):
+        """
+        Cấp một handle đếm tham chiếu tới kết nối của sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            ProExchangeHandle: Handle tới kết nối
+        """
+        await self.get_or_create(exchange_id)
+        self.ref_counts[exchange_id] = self.ref_counts.get(exchange_id, 0) + 1
+        log_debug(f"Cấp handle cho {exchange_id} (đang dùng: {self.ref_counts[exchange_id]})")
+        return ProExchangeHandle(self, exchange_id)
+
+    def release(self, exchange_id):
+        """
+        Giảm số tham chiếu của sàn. Kết nối không bị đóng để phiên sau dùng lại.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        if self.ref_counts.get(exchange_id, 0) > 0:
+            self.ref_counts[exchange_id] -= 1
+        log_debug(f"Trả handle của {exchange_id} (đang dùng: {self.ref_counts.get(exchange_id, 0)})")
+
+    def get_client(self, exchange_id):
+        """
+        Lấy kết nối hiện tại của sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro
+
+        Raises:
+            ExchangeError: Nếu sàn chưa có kết nối trong registry
+        """
+        if exchange_id not in self.clients:
+            raise ExchangeError(exchange_id, "Chưa có kết nối websocket trong registry")
+        return self.clients[exchange_id]
+
+    async def reconnect(self, exchange_id, stale_client=None):
+        """
+        Thay kết nối hỏng của sàn bằng kết nối mới.
+
+        Kết nối mới được mở trước rồi mới thay vào và đóng kết nối cũ, nên các vòng lặp khác
+        đang giữ handle luôn có kết nối để dùng. Nếu kết nối mà người gọi thấy lỗi đã được
+        một vòng lặp khác thay, registry giữ nguyên kết nối hiện tại.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            stale_client (object, optional): Kết nối người gọi thấy lỗi, mặc định là kết nối hiện tại
+
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro hiện tại
+        """
+        async with self._get_lock(exchange_id):
+            old_client = self.clients.get(exchange_id)
+            if stale_client is not None and old_client is not stale_client:
+                log_debug(f"Kết nối của {exchange_id} đã được tạo lại, bỏ qua yêu cầu kết nối lại")
+                return old_client
+
+            self.clients[exchange_id] = await self._open_client(exchange_id)
+
+            if old_client:
+                try:
+                    await old_client.close()
+                except Exception as e:
+                    log_error(f"Lỗi khi đóng kết nối cũ của {exchange_id}: {str(e)}")
+
+        return self.clients[exchange_id]
+
+    async def close_all(self):
+        """Đóng tất cả kết nối khi tiến trình kết thúc."""
+        for exchange_id, client in list(self.clients.items()):
+            try:
+                await client.close()
+                log_info(f"Đã đóng kết nối websocket của {exchange_id}")
+            except Exception as e:
+                log_error(f"Lỗi khi đóng kết nối của {exchange_id}: {str(e)}")
+
+        self.clients.clear()
+        self.ref_counts.clear()
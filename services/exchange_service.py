@@ -2,15 +2,27 @@
 Service quản lý tương tác với các sàn giao dịch.
 """
 import os
+import time
 import ccxt
+import ccxt.async_support
 import ccxt.pro
 import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
-from utils.logger import log_info, log_error, log_debug
+from utils.logger import log_info, log_error, log_debug, log_warning
 from utils.exceptions import ExchangeError, InsufficientBalanceError, FuturesError
 from utils.helpers import calculate_average, extract_base_asset
-from configs import MIN_USDT_FOR_CONVERSION, EMERGENCY_CONVERSION_KEEP_PERCENTAGE
+from utils.latency import latency_tracker, STAGE_ORDER_ACK, STAGE_RTT
+from services.connection_registry import ConnectionRegistry
+from services.mock_exchange import MockExchangeHub
+from services.market_cache import MarketCache
+from services.rate_limiter import RequestScheduler
+from services.cancellation_engine import CancellationEngine
+from configs import (
+    MIN_USDT_FOR_CONVERSION, EMERGENCY_CONVERSION_KEEP_PERCENTAGE,
+    ENABLE_MOCK_EXCHANGE, SUPPORTED_EXCHANGES, MARKET_CACHE_DIR,
+    EXCHANGE_KEEPALIVE_INTERVAL, EXCHANGE_TIME_SYNC_INTERVAL
+)
 
 # Tải biến môi trường
 load_dotenv()
@@ -21,14 +33,36 @@ class ExchangeService:
     Lớp dịch vụ tương tác với các sàn giao dịch cryptocurrency.
     """
     
-    def __init__(self):
-        """Khởi tạo dịch vụ sàn giao dịch."""
+    def __init__(self, use_mock=None):
+        """
+        Khởi tạo dịch vụ sàn giao dịch.
+        
+        Args:
+            use_mock (bool, optional): Dùng sàn giả lập thay cho sàn thật (mặc định ENABLE_MOCK_EXCHANGE)
+        """
         self.exchanges = {}
         self.exchange_instances = {}
+        self.use_mock = ENABLE_MOCK_EXCHANGE if use_mock is None else use_mock
+        self.mock_hub = MockExchangeHub() if self.use_mock else None
+        self.connection_registry = ConnectionRegistry(self._create_pro_exchange)
+        # Markets của sàn giả lập được sinh trong tiến trình, không lưu ra tệp
+        self.market_cache = MarketCache(self, None if self.use_mock else MARKET_CACHE_DIR)
+        # Mọi request REST của các bot trong tiến trình đi qua cùng một bộ giới hạn theo sàn
+        self.request_scheduler = RequestScheduler()
+        self.cancellation_engine = CancellationEngine(self)
+        self.rtt = {}  # Sàn -> thời gian khứ hồi gần nhất của request giữ ấm (giây)
+        self.time_synced_at = {}  # Sàn -> thời điểm đo độ lệch đồng hồ gần nhất
+        self.keepalive_tasks = {}  # Sàn -> tác vụ giữ ấm kết nối REST
         self._initialize_exchanges()
     
     def _initialize_exchanges(self):
         """Khởi tạo đối tượng sàn giao dịch với thông tin xác thực từ biến môi trường."""
+        # Sàn giả lập không cần API key, mọi sàn được hỗ trợ đều khả dụng
+        if self.use_mock:
+            self.exchanges = {exchange_id: {} for exchange_id in SUPPORTED_EXCHANGES}
+            log_info("Sử dụng sàn giả lập cho tất cả các sàn giao dịch")
+            return
+        
         # Khởi tạo Binance
         if os.getenv('BINANCE_API_KEY') and os.getenv('BINANCE_SECRET'):
             self.exchanges['binance'] = {
@@ -70,10 +104,43 @@ class ExchangeService:
                 'password': os.getenv('OKX_PASSWORD'),
                 'options': {'createMarketBuyOrderRequiresPrice': False}
             }
+        
+        # Khởi tạo Gate
+        if os.getenv('GATE_API_KEY') and os.getenv('GATE_SECRET'):
+            self.exchanges['gate'] = {
+                'apiKey': os.getenv('GATE_API_KEY'),
+                'secret': os.getenv('GATE_SECRET'),
+                'options': {'createMarketBuyOrderRequiresPrice': False}
+            }
+        
+        # Khởi tạo MEXC
+        if os.getenv('MEXC_API_KEY') and os.getenv('MEXC_SECRET'):
+            self.exchanges['mexc'] = {
+                'apiKey': os.getenv('MEXC_API_KEY'),
+                'secret': os.getenv('MEXC_SECRET'),
+                'options': {'createMarketBuyOrderRequiresPrice': False}
+            }
+        
+        # Khởi tạo Bitget
+        if os.getenv('BITGET_API_KEY') and os.getenv('BITGET_SECRET') and os.getenv('BITGET_PASSWORD'):
+            self.exchanges['bitget'] = {
+                'apiKey': os.getenv('BITGET_API_KEY'),
+                'secret': os.getenv('BITGET_SECRET'),
+                'password': os.getenv('BITGET_PASSWORD'),
+                'options': {'createMarketBuyOrderRequiresPrice': False}
+            }
+        
+        # Khởi tạo HTX
+        if os.getenv('HTX_API_KEY') and os.getenv('HTX_SECRET'):
+            self.exchanges['htx'] = {
+                'apiKey': os.getenv('HTX_API_KEY'),
+                'secret': os.getenv('HTX_SECRET'),
+                'options': {'createMarketBuyOrderRequiresPrice': False}
+            }
     
     def get_exchange(self, exchange_id):
         """
-        Lấy đối tượng sàn giao dịch theo id.
+        Lấy đối tượng sàn giao dịch REST (ccxt.async_support) theo id.
         
         Args:
             exchange_id (str): ID của sàn giao dịch
@@ -90,23 +157,27 @@ class ExchangeService:
             
             try:
                 # Tạo đối tượng sàn giao dịch
-                exchange_class = getattr(ccxt, exchange_id)
-                self.exchange_instances[exchange_id] = exchange_class(self.exchanges[exchange_id])
+                if self.mock_hub:
+                    self.exchange_instances[exchange_id] = self.mock_hub.create_exchange(exchange_id)
+                else:
+                    # Tắt bộ giới hạn FIFO của ccxt, request đã được xếp hàng theo ưu tiên bởi request_scheduler
+                    exchange_class = getattr(ccxt.async_support, exchange_id)
+                    self.exchange_instances[exchange_id] = exchange_class({**self.exchanges[exchange_id], 'enableRateLimit': False})
                 log_info(f"Đã khởi tạo sàn giao dịch {exchange_id}")
             except Exception as e:
                 raise ExchangeError(exchange_id, f"Không thể khởi tạo sàn giao dịch: {str(e)}")
         
         return self.exchange_instances[exchange_id]
 
-    async def get_pro_exchange(self, exchange_id):
+    def _create_pro_exchange(self, exchange_id):
         """
-        Lấy đối tượng sàn giao dịch ccxt.pro theo id.
+        Tạo đối tượng sàn giao dịch ccxt.pro mới (dùng bởi connection registry).
         
         Args:
             exchange_id (str): ID của sàn giao dịch
         
         Returns:
-            object: Đối tượng sàn giao dịch ccxt.pro đã được khởi tạo
+            object: Đối tượng sàn giao dịch ccxt.pro mới
         
         Raises:
             ExchangeError: Nếu sàn giao dịch không tồn tại hoặc không được hỗ trợ
@@ -115,41 +186,192 @@ class ExchangeService:
             raise ExchangeError(exchange_id, "Sàn giao dịch không được hỗ trợ hoặc chưa được cấu hình")
         
         try:
-            # Tạo đối tượng sàn giao dịch pro
+            if self.mock_hub:
+                return self.mock_hub.create_pro_exchange(exchange_id)
+            
             exchange_class = getattr(ccxt.pro, exchange_id)
             return exchange_class(self.exchanges[exchange_id])
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể khởi tạo sàn giao dịch pro: {str(e)}")
+
+    async def get_pro_exchange(self, exchange_id):
+        """
+        Lấy đối tượng sàn giao dịch ccxt.pro dùng chung theo id.
+        
+        Kết nối được giữ trong registry suốt vòng đời tiến trình, không cần đóng sau khi dùng.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        
+        Returns:
+            object: Đối tượng sàn giao dịch ccxt.pro đã được khởi tạo
+        
+        Raises:
+            ExchangeError: Nếu sàn giao dịch không tồn tại hoặc không được hỗ trợ
+        """
+        return await self.connection_registry.get_or_create(exchange_id)
+
+    async def acquire_pro_exchange(self, exchange_id):
+        """
+        Lấy handle đếm tham chiếu tới kết nối ccxt.pro dùng chung của một sàn.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        
+        Returns:
+            ProExchangeHandle: Handle dùng được với `async with`
+        
+        Raises:
+            ExchangeError: Nếu sàn giao dịch không tồn tại hoặc không được hỗ trợ
+        """
+        return await self.connection_registry.acquire(exchange_id)
+
+    async def start_keepalive(self, exchanges, interval=EXCHANGE_KEEPALIVE_INTERVAL):
+        """
+        Mở sẵn kết nối REST (DNS, TCP, TLS, độ lệch đồng hồ) tới các sàn và giữ ấm định kỳ.
+        
+        Lệnh đầu tiên của phiên không phải trả chi phí thiết lập kết nối.
+        
+        Args:
+            exchanges (list): Danh sách tên các sàn giao dịch
+            interval (float): Khoảng thời gian giữa hai request giữ ấm (giây)
+        """
+        results = await asyncio.gather(*(self.ping(exchange_id) for exchange_id in exchanges), return_exceptions=True)
+        
+        for exchange_id, result in zip(exchanges, results):
+            if isinstance(result, Exception):
+                log_warning(f"Không thể làm ấm kết nối REST tới {exchange_id}: {str(result)}")
+            else:
+                log_info(f"Đã làm ấm kết nối REST tới {exchange_id} (RTT {result * 1000:.1f}ms)")
+            
+            if exchange_id not in self.keepalive_tasks or self.keepalive_tasks[exchange_id].done():
+                self.keepalive_tasks[exchange_id] = asyncio.create_task(self._keepalive_loop(exchange_id, interval))
     
-    def get_balance(self, exchange_id, symbol):
+    async def _keepalive_loop(self, exchange_id, interval):
         """
-        Lấy số dư của một tài sản trên sàn giao dịch.
+        Gửi request giữ ấm định kỳ cho một sàn cho tới khi bị hủy.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            interval (float): Khoảng thời gian giữa hai request (giây)
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.ping(exchange_id)
+            except Exception as e:
+                log_warning(f"Request giữ ấm kết nối tới {exchange_id} thất bại: {str(e)}")
+    
+    async def ping(self, exchange_id):
+        """
+        Gửi một request rẻ (có xác thực nếu có API key) và đo thời gian khứ hồi.
+        
+        Độ lệch đồng hồ với máy chủ của sàn được đo lại mỗi EXCHANGE_TIME_SYNC_INTERVAL giây
+        để chữ ký của các request có xác thực không bị từ chối vì sai thời gian.
         
         Args:
             exchange_id (str): ID của sàn giao dịch
-            symbol (str): Ký hiệu của tài sản
         
         Returns:
-            float: Số dư của tài sản
+            float: Thời gian khứ hồi (giây)
         
         Raises:
-            ExchangeError: Nếu có lỗi khi lấy số dư
+            ExchangeError: Nếu request thất bại
         """
         exchange = self.get_exchange(exchange_id)
         
         try:
-            # Làm sạch symbol nếu nó có dạng BTC/USDT hoặc BTC:USDT
-            clean_symbol = extract_base_asset(symbol) if symbol != 'USDT' else 'USDT'
-            
-            balance = exchange.fetch_balance()
+            if exchange.has.get('fetchTime') and time.time() - self.time_synced_at.get(exchange_id, 0) >= EXCHANGE_TIME_SYNC_INTERVAL:
+                await self.request_scheduler.acquire(exchange_id, 'fetch_time', exchange)
+                await exchange.load_time_difference()
+                self.time_synced_at[exchange_id] = time.time()
             
-            if clean_symbol in balance['free'] and balance['free'][clean_symbol] != 0:
-                return balance['free'][clean_symbol]
-            return 0
+            if getattr(exchange, 'apiKey', None) or not exchange.has.get('fetchTime'):
+                await self.request_scheduler.acquire(exchange_id, 'fetch_balance', exchange)
+                sent = time.perf_counter()
+                await exchange.fetch_balance()
+            else:
+                await self.request_scheduler.acquire(exchange_id, 'fetch_time', exchange)
+                sent = time.perf_counter()
+                await exchange.fetch_time()
+            rtt = time.perf_counter() - sent
         except Exception as e:
-            raise ExchangeError(exchange_id, f"Không thể lấy số dư của {symbol}: {str(e)}")
+            raise ExchangeError(exchange_id, f"Không thể gửi request giữ ấm: {str(e)}")
+        
+        self.rtt[exchange_id] = rtt
+        latency_tracker.record(STAGE_RTT, exchange_id, rtt)
+        return rtt
     
-    def get_ticker(self, exchange_id, symbol):
+    def get_rtt(self, exchange_id):
+        """
+        Lấy thời gian khứ hồi gần nhất tới REST API của một sàn.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        
+        Returns:
+            float: Thời gian khứ hồi (giây), hoặc None nếu chưa đo
+        """
+        return self.rtt.get(exchange_id)
+    
+    async def close(self):
+        """Đóng tất cả kết nối websocket dùng chung và các phiên HTTP khi tiến trình kết thúc."""
+        for task in self.keepalive_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.keepalive_tasks.values(), return_exceptions=True)
+        self.keepalive_tasks.clear()
+        
+        await self.connection_registry.close_all()
+        
+        for exchange_id, exchange in self.exchange_instances.items():
+            try:
+                await exchange.close()
+            except Exception as e:
+                log_error(f"Lỗi khi đóng kết nối REST của {exchange_id}: {str(e)}")
+        self.exchange_instances.clear()
+    
+    async def fetch_balance(self, exchange_id):
+        """
+        Lấy toàn bộ số dư (free/used/total của mọi tài sản) trên sàn giao dịch.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        
+        Returns:
+            dict: Số dư theo định dạng ccxt
+        
+        Raises:
+            ExchangeError: Nếu có lỗi khi lấy số dư
+        """
+        exchange = self.get_exchange(exchange_id)
+        
+        try:
+            await self.request_scheduler.acquire(exchange_id, 'fetch_balance', exchange)
+            return await exchange.fetch_balance()
+        except Exception as e:
+            raise ExchangeError(exchange_id, f"Không thể lấy số dư: {str(e)}")
+    
+    async def get_balance(self, exchange_id, symbol):
+        """
+        Lấy số dư của một tài sản trên sàn giao dịch.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của tài sản
+        
+        Returns:
+            float: Số dư của tài sản
+        
+        Raises:
+            ExchangeError: Nếu có lỗi khi lấy số dư
+        """
+        # Làm sạch symbol nếu nó có dạng BTC/USDT hoặc BTC:USDT
+        clean_symbol = extract_base_asset(symbol) if symbol != 'USDT' else 'USDT'
+        
+        balance = await self.fetch_balance(exchange_id)
+        return balance['free'].get(clean_symbol) or 0
+    
+    async def get_ticker(self, exchange_id, symbol):
         """
         Lấy thông tin ticker của một cặp giao dịch.
         
@@ -166,11 +388,12 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.fetch_ticker(symbol)
+            await self.request_scheduler.acquire(exchange_id, 'fetch_ticker', exchange)
+            return await exchange.fetch_ticker(symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể lấy ticker cho {symbol}: {str(e)}")
     
-    def create_limit_buy_order(self, exchange_id, symbol, amount, price):
+    async def create_limit_buy_order(self, exchange_id, symbol, amount, price, params=None):
         """
         Tạo lệnh mua giới hạn.
         
@@ -179,6 +402,7 @@ class ExchangeService:
             symbol (str): Ký hiệu của cặp giao dịch
             amount (float): Số lượng cần mua
             price (float): Giá mua
+            params (dict, optional): Tham số bổ sung (ví dụ: clientOrderId)
         
         Returns:
             dict: Thông tin lệnh đã tạo
@@ -189,11 +413,15 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.create_limit_buy_order(symbol, amount, price)
+            await self.request_scheduler.acquire(exchange_id, 'create_order', exchange)
+            sent = time.perf_counter()
+            order = await exchange.create_limit_buy_order(symbol, amount, price, params or {})
+            latency_tracker.record_since(STAGE_ORDER_ACK, exchange_id, sent)
+            return order
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh mua giới hạn cho {symbol}: {str(e)}")
     
-    def create_limit_sell_order(self, exchange_id, symbol, amount, price):
+    async def create_limit_sell_order(self, exchange_id, symbol, amount, price, params=None):
         """
         Tạo lệnh bán giới hạn.
         
@@ -202,6 +430,7 @@ class ExchangeService:
             symbol (str): Ký hiệu của cặp giao dịch
             amount (float): Số lượng cần bán
             price (float): Giá bán
+            params (dict, optional): Tham số bổ sung (ví dụ: clientOrderId)
         
         Returns:
             dict: Thông tin lệnh đã tạo
@@ -212,11 +441,15 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.create_limit_sell_order(symbol, amount, price)
+            await self.request_scheduler.acquire(exchange_id, 'create_order', exchange)
+            sent = time.perf_counter()
+            order = await exchange.create_limit_sell_order(symbol, amount, price, params or {})
+            latency_tracker.record_since(STAGE_ORDER_ACK, exchange_id, sent)
+            return order
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh bán giới hạn cho {symbol}: {str(e)}")
     
-    def create_market_buy_order(self, exchange_id, symbol, amount, params=None):
+    async def create_market_buy_order(self, exchange_id, symbol, amount, params=None):
         """
         Tạo lệnh mua thị trường.
         
@@ -236,11 +469,12 @@ class ExchangeService:
         params = params or {}
         
         try:
-            return exchange.create_market_buy_order(symbol, amount, params)
+            await self.request_scheduler.acquire(exchange_id, 'create_order', exchange)
+            return await exchange.create_market_buy_order(symbol, amount, params)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh mua thị trường cho {symbol}: {str(e)}")
     
-    def create_market_sell_order(self, exchange_id, symbol, amount, params=None):
+    async def create_market_sell_order(self, exchange_id, symbol, amount, params=None):
         """
         Tạo lệnh bán thị trường.
         
@@ -260,11 +494,12 @@ class ExchangeService:
         params = params or {}
         
         try:
-            return exchange.create_market_sell_order(symbol, amount, params)
+            await self.request_scheduler.acquire(exchange_id, 'create_order', exchange)
+            return await exchange.create_market_sell_order(symbol, amount, params)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể tạo lệnh bán thị trường cho {symbol}: {str(e)}")
     
-    def fetch_open_orders(self, exchange_id, symbol):
+    async def fetch_open_orders(self, exchange_id, symbol):
         """
         Lấy danh sách lệnh đang mở.
         
@@ -281,11 +516,35 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.fetch_open_orders(symbol)
+            await self.request_scheduler.acquire(exchange_id, 'fetch_open_orders', exchange)
+            return await exchange.fetch_open_orders(symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể lấy danh sách lệnh đang mở cho {symbol}: {str(e)}")
     
-    def fetch_closed_orders(self, exchange_id, symbol):
+    async def fetch_order(self, exchange_id, order_id, symbol):
+        """
+        Lấy thông tin một lệnh.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str): ID của lệnh
+            symbol (str): Ký hiệu của cặp giao dịch
+        
+        Returns:
+            dict: Thông tin lệnh
+        
+        Raises:
+            ExchangeError: Nếu có lỗi khi lấy thông tin lệnh
+        """
+        exchange = self.get_exchange(exchange_id)
+        
+        try:
+            await self.request_scheduler.acquire(exchange_id, 'fetch_order', exchange)
+            return await exchange.fetch_order(order_id, symbol)
+        except Exception as e:
+            raise ExchangeError(exchange_id, f"Không thể lấy thông tin lệnh {order_id}: {str(e)}")
+    
+    async def fetch_closed_orders(self, exchange_id, symbol):
         """
         Lấy danh sách lệnh đã đóng.
         
@@ -302,11 +561,12 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.fetch_closed_orders(symbol)
+            await self.request_scheduler.acquire(exchange_id, 'fetch_closed_orders', exchange)
+            return await exchange.fetch_closed_orders(symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể lấy danh sách lệnh đã đóng cho {symbol}: {str(e)}")
     
-    def cancel_order(self, exchange_id, order_id, symbol):
+    async def cancel_order(self, exchange_id, order_id, symbol):
         """
         Hủy một lệnh.
         
@@ -324,40 +584,49 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            return exchange.cancel_order(order_id, symbol)
+            await self.request_scheduler.acquire(exchange_id, 'cancel_order', exchange)
+            return await exchange.cancel_order(order_id, symbol)
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể hủy lệnh {order_id} cho {symbol}: {str(e)}")
     
-    def cancel_all_orders(self, exchange_id, symbol):
+    async def cancel_all_orders(self, exchange_id, symbol):
         """
-        Hủy tất cả các lệnh đang mở.
+        Hủy tất cả các lệnh đang mở và xác nhận lại qua danh sách lệnh đang mở.
+        
+        Nếu sàn không hỗ trợ hủy tất cả, các lệnh được hủy đồng thời thay vì lần lượt.
         
         Args:
             exchange_id (str): ID của sàn giao dịch
             symbol (str): Ký hiệu của cặp giao dịch
         
         Returns:
-            dict: Thông tin về việc hủy lệnh
+            CancelReport: Kết quả hủy lệnh (số lệnh đã hủy, lệnh còn sót, thời gian)
         
         Raises:
             ExchangeError: Nếu có lỗi khi hủy lệnh
         """
-        exchange = self.get_exchange(exchange_id)
+        report = await self.cancellation_engine.cancel_all([(exchange_id, symbol)])
+        if exchange_id in report.errors:
+            raise ExchangeError(exchange_id, f"Không thể hủy tất cả lệnh cho {symbol}: {report.errors[exchange_id]}")
+        return report
+    
+    def supports_time_in_force(self, exchange_id, time_in_force):
+        """
+        Kiểm tra sàn có hỗ trợ một kiểu hiệu lực lệnh giao ngay (theo exchange.features của ccxt).
         
-        try:
-            if hasattr(exchange, 'cancel_all_orders'):
-                return exchange.cancel_all_orders(symbol)
-            else:
-                # Nếu sàn không hỗ trợ hủy tất cả, hủy từng lệnh một
-                orders = self.fetch_open_orders(exchange_id, symbol)
-                results = []
-                for order in orders:
-                    results.append(self.cancel_order(exchange_id, order['id'], symbol))
-                return results
-        except Exception as e:
-            raise ExchangeError(exchange_id, f"Không thể hủy tất cả lệnh cho {symbol}: {str(e)}")
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            time_in_force (str): Kiểu hiệu lực ('GTC', 'IOC', 'FOK', ...)
+        
+        Returns:
+            bool: True nếu sàn khai báo hỗ trợ kiểu hiệu lực này
+        """
+        exchange = self.get_exchange(exchange_id)
+        features = getattr(exchange, 'features', None) or {}
+        create_order = (features.get('spot') or {}).get('createOrder') or {}
+        return bool((create_order.get('timeInForce') or {}).get(time_in_force))
     
-    def get_precision_min(self, exchange_id, symbol):
+    async def get_precision_min(self, exchange_id, symbol):
         """
         Lấy giá trị tối thiểu của giá cho một cặp giao dịch.
         
@@ -371,14 +640,11 @@ class ExchangeService:
         Raises:
             ExchangeError: Nếu có lỗi khi lấy giá trị tối thiểu
         """
-        exchange = self.get_exchange(exchange_id)
-        
         try:
-            markets = exchange.load_markets()
-            if symbol in markets:
-                symbol_info = markets[symbol]
-                if 'limits' in symbol_info and 'price' in symbol_info['limits'] and 'min' in symbol_info['limits']['price']:
-                    return symbol_info['limits']['price']['min']
+            await self.market_cache.ensure_loaded(exchange_id)
+            rules = self.market_cache.get(exchange_id, symbol)
+            if rules and rules.min_price:
+                return rules.min_price
             return 0.001  # Giá trị mặc định
         except Exception as e:
             # Nếu không lấy được thông tin, trả về giá trị mặc định
@@ -403,8 +669,9 @@ class ExchangeService:
         log_info(f"Đang lấy giá trung bình trên toàn cầu cho {symbol}...")
         
         try:
-            for exchange_id in exchanges:
-                ticker = self.get_ticker(exchange_id, symbol)
+            # Lấy ticker của tất cả các sàn cùng lúc
+            tickers = await asyncio.gather(*(self.get_ticker(exchange_id, symbol) for exchange_id in exchanges))
+            for ticker in tickers:
                 all_tickers.append(ticker['bid'])
                 all_tickers.append(ticker['ask'])
             
@@ -435,7 +702,7 @@ class ExchangeService:
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể theo dõi sách lệnh cho {symbol}: {str(e)}")
     
-    def emergency_convert(self, exchange_id, symbol, keep_percentage=None):
+    async def emergency_convert(self, exchange_id, symbol, keep_percentage=None):
         """
         Chuyển đổi khẩn cấp một tài sản sang USDT.
         
@@ -455,26 +722,29 @@ class ExchangeService:
             
         try:
             # Hủy tất cả các lệnh đang mở
-            self.cancel_all_orders(exchange_id, symbol)
+            await self.cancel_all_orders(exchange_id, symbol)
             
-            # Lấy số dư và tính số lượng cần bán
+            # Lấy số dư và tính số lượng cần bán (làm tròn xuống theo lot size của sàn)
             base_asset = extract_base_asset(symbol)
-            balance = self.get_balance(exchange_id, base_asset)
-            balance_to_sell = balance - (balance * keep_percentage)
+            balance, ticker, _ = await asyncio.gather(
+                self.get_balance(exchange_id, base_asset),
+                self.get_ticker(exchange_id, symbol),
+                self.market_cache.ensure_loaded(exchange_id)
+            )
+            balance_to_sell = self.market_cache.amount_to_precision(exchange_id, symbol, balance - (balance * keep_percentage))
             
             # Kiểm tra số dư tối thiểu
-            ticker = self.get_ticker(exchange_id, symbol)
             min_amount_in_base = MIN_USDT_FOR_CONVERSION / ticker['last']  # Số lượng tối thiểu tương đương MIN_USDT_FOR_CONVERSION USDT
             
-            if balance_to_sell > min_amount_in_base:
-                return self.create_market_sell_order(exchange_id, symbol, round(balance_to_sell, 4))
+            if balance_to_sell > min_amount_in_base and self.market_cache.meets_minimums(exchange_id, symbol, balance_to_sell, ticker['last']):
+                return await self.create_market_sell_order(exchange_id, symbol, balance_to_sell)
             else:
                 log_info(f"Không đủ {base_asset} trên {exchange_id}.")
                 return None
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể thực hiện chuyển đổi khẩn cấp cho {symbol}: {str(e)}")
     
-    def transfer_between_accounts(self, exchange_id, asset, amount, from_account, to_account):
+    async def transfer_between_accounts(self, exchange_id, asset, amount, from_account, to_account):
         """
         Chuyển tiền giữa các tài khoản trên cùng một sàn giao dịch.
         
@@ -494,13 +764,14 @@ class ExchangeService:
         exchange = self.get_exchange(exchange_id)
         
         try:
-            result = exchange.transfer(asset, amount, from_account, to_account)
+            await self.request_scheduler.acquire(exchange_id, 'transfer', exchange)
+            result = await exchange.transfer(asset, amount, from_account, to_account)
             log_info(f"Đã chuyển {amount} {asset} từ {from_account} sang {to_account} trên {exchange_id}")
             return result
         except Exception as e:
             raise ExchangeError(exchange_id, f"Không thể chuyển tiền: {str(e)}")
     
-    def create_futures_order(self, exchange_id, symbol, type, side, amount, params=None):
+    async def create_futures_order(self, exchange_id, symbol, type, side, amount, params=None):
         """
         Tạo lệnh trên thị trường futures.
         
@@ -527,20 +798,21 @@ class ExchangeService:
                 symbol = f"{extract_base_asset(symbol)}:USDT"
             
             # Tạo lệnh futures
+            await self.request_scheduler.acquire(exchange_id, 'create_order', exchange)
             if type == 'market':
                 if side == 'buy':
-                    return exchange.create_market_buy_order(symbol, amount, params)
+                    return await exchange.create_market_buy_order(symbol, amount, params)
                 elif side == 'sell':
-                    return exchange.create_market_sell_order(symbol, amount, params)
+                    return await exchange.create_market_sell_order(symbol, amount, params)
             elif type == 'limit':
                 price = params.pop('price', None)
                 if not price:
                     raise FuturesError(exchange_id, "Giá bắt buộc phải có cho lệnh giới hạn")
                 
                 if side == 'buy':
-                    return exchange.create_limit_buy_order(symbol, amount, price, params)
+                    return await exchange.create_limit_buy_order(symbol, amount, price, params)
                 elif side == 'sell':
-                    return exchange.create_limit_sell_order(symbol, amount, price, params)
+                    return await exchange.create_limit_sell_order(symbol, amount, price, params)
             
             raise FuturesError(exchange_id, f"Loại lệnh không hợp lệ: {type}")
             
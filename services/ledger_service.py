@@ -0,0 +1,340 @@
+"""
+Sổ cái SQLite chỉ ghi thêm: phiên giao dịch, giao dịch, phí và ảnh chụp số dư.
+"""
+import os
+import time
+import asyncio
+import aiosqlite
+
+from utils.logger import log_info, log_error, log_warning
+from configs import LEDGER_DB, LEDGER_BATCH_SIZE, BALANCE_FILE, START_BALANCE_FILE
+
+# Sàn dùng cho số dư tổng của tài khoản bot (thay cho balance.txt)
+ACCOUNT = '*'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    mode TEXT,
+    symbol TEXT,
+    start_balance REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    symbol TEXT,
+    buy_exchange TEXT NOT NULL,
+    sell_exchange TEXT NOT NULL,
+    amount REAL NOT NULL,
+    buy_price REAL NOT NULL,
+    sell_price REAL NOT NULL,
+    profit_pct REAL NOT NULL,
+    profit_usd REAL NOT NULL,
+    fee_usd REAL NOT NULL,
+    fee_crypto REAL NOT NULL,
+    success INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS balances (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER,
+    ts REAL NOT NULL,
+    exchange TEXT NOT NULL,
+    asset TEXT NOT NULL,
+    free REAL,
+    used REAL,
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trades_session ON trades (session_id, id);
+CREATE INDEX IF NOT EXISTS balances_latest ON balances (exchange, asset, id);
+CREATE INDEX IF NOT EXISTS balances_session ON balances (session_id, id);
+"""
+
+INSERT_SESSION = "INSERT INTO sessions (ts, mode, symbol, start_balance) VALUES (?, ?, ?, ?)"
+INSERT_TRADE = (
+    "INSERT INTO trades (session_id, ts, symbol, buy_exchange, sell_exchange, amount, buy_price, sell_price, "
+    "profit_pct, profit_usd, fee_usd, fee_crypto, success) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+INSERT_BALANCE = (
+    "INSERT INTO balances (session_id, ts, exchange, asset, free, used, total) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+class LedgerService:
+    """
+    Sổ cái của bot trong một tệp SQLite (chế độ WAL).
+
+    Các hàm record_* chỉ đưa bản ghi vào hàng đợi và trả về ngay; một tác vụ ghi nền
+    gom mọi bản ghi đang chờ thành một transaction, nên vòng lặp giao dịch không bao giờ
+    chờ đĩa. Các truy vấn đọc chờ hàng đợi được ghi xong rồi đọc qua chỉ mục. ID phiên do
+    SQLite cấp nên nhiều tiến trình có thể dùng chung một tệp sổ cái.
+    """
+
+    def __init__(self, path=LEDGER_DB, batch_size=LEDGER_BATCH_SIZE):
+        """
+        Khởi tạo sổ cái.
+
+        Args:
+            path (str): Đường dẫn tệp SQLite
+            batch_size (int): Số bản ghi tối đa trong một transaction
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.db = None
+        self.queue = None  # Hàng đợi (câu lệnh SQL, tham số) chờ tác vụ ghi
+        self.writer = None  # Tác vụ ghi nền
+        self.write_lock = asyncio.Lock()  # Mỗi transaction trên kết nối chỉ của một tác vụ
+        self.session_id = 0  # ID của phiên hiện tại (0 khi chưa có phiên)
+        self.rows_written = 0
+        self.batches_written = 0
+
+    @property
+    def started(self):
+        """True nếu sổ cái đã được mở."""
+        return self.db is not None
+
+    async def start(self):
+        """Mở tệp SQLite, tạo bảng, nhập số dư từ các tệp cũ và chạy tác vụ ghi nền."""
+        if self.started:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db = await aiosqlite.connect(self.path)
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        # Với WAL, NORMAL vẫn giữ nguyên vẹn dữ liệu khi tiến trình bị dừng đột ngột
+        await self.db.execute("PRAGMA synchronous=NORMAL")
+        await self.db.executescript(SCHEMA)
+        await self.db.commit()
+
+        async with self.db.execute("SELECT COALESCE(MAX(id), 0) FROM sessions") as cursor:
+            self.session_id = (await cursor.fetchone())[0]
+
+        await self._import_balance_files()
+
+        self.queue = asyncio.Queue()
+        self.writer = asyncio.create_task(self._write_loop())
+
+    async def _import_balance_files(self):
+        """Nhập số dư từ balance.txt/start_balance.txt một lần khi sổ cái còn trống."""
+        if not os.path.exists(BALANCE_FILE):
+            return
+
+        async with self.db.execute("SELECT COUNT(*) FROM balances WHERE exchange = ?", (ACCOUNT,)) as cursor:
+            if (await cursor.fetchone())[0]:
+                return
+
+        try:
+            with open(BALANCE_FILE, 'r') as f:
+                balance = float(f.read().strip())
+            start_balance = balance
+            if os.path.exists(START_BALANCE_FILE):
+                with open(START_BALANCE_FILE, 'r') as f:
+                    start_balance = float(f.read().strip())
+        except (OSError, ValueError) as e:
+            log_warning(f"Không thể nhập số dư từ {BALANCE_FILE}: {str(e)}")
+            return
+
+        self.session_id = await self._insert_session('import', None, start_balance, balance)
+        log_info(f"Đã nhập số dư {balance} USDT từ {BALANCE_FILE} vào {self.path}")
+
+    def _put(self, sql, params):
+        """Đưa một bản ghi vào hàng đợi ghi."""
+        if self.queue is None:
+            log_warning(f"Sổ cái {self.path} chưa được mở, bỏ qua bản ghi")
+            return
+        self.queue.put_nowait((sql, params))
+
+    async def _write_loop(self):
+        """Ghi các bản ghi đang chờ, mỗi lô một transaction."""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            try:
+                async with self.write_lock:
+                    await self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _write_batch(self, batch):
+        """Ghi một lô trong một transaction; lô lỗi được hoàn tác toàn bộ."""
+        # Gom các bản ghi liên tiếp cùng câu lệnh để dùng executemany, giữ nguyên thứ tự
+        groups = []
+        for sql, params in batch:
+            if groups and groups[-1][0] == sql:
+                groups[-1][1].append(params)
+            else:
+                groups.append((sql, [params]))
+
+        try:
+            for sql, rows in groups:
+                await self.db.executemany(sql, rows)
+            await self.db.commit()
+            self.rows_written += len(batch)
+            self.batches_written += 1
+        except Exception as e:
+            log_error(f"Lỗi khi ghi {len(batch)} bản ghi vào sổ cái {self.path}: {str(e)}")
+            # Bỏ cả lô để phần đã ghi không bị commit cùng lô sau
+            try:
+                await self.db.rollback()
+            except Exception as rollback_error:
+                log_error(f"Lỗi khi hoàn tác lô ghi sổ cái {self.path}: {str(rollback_error)}")
+
+    async def flush(self):
+        """Chờ mọi bản ghi đang chờ được ghi xuống tệp."""
+        if self.queue is not None:
+            await self.queue.join()
+
+    async def _insert_session(self, mode, symbol, start_balance, balance):
+        """Ghi một phiên và số dư của nó trong một transaction, trả về ID do SQLite cấp."""
+        now = time.time()
+        async with self.write_lock:
+            try:
+                async with self.db.execute(INSERT_SESSION, (now, mode, symbol, start_balance)) as cursor:
+                    session_id = cursor.lastrowid
+                await self.db.execute(INSERT_BALANCE, (session_id, now, ACCOUNT, 'USDT', None, None, balance))
+                await self.db.commit()
+            except Exception:
+                await self.db.rollback()
+                raise
+        return session_id
+
+    async def record_session_start(self, mode, symbol, start_balance):
+        """
+        Ghi nhận một phiên giao dịch mới và số dư ban đầu của nó.
+
+        Được ghi ngay (không qua hàng đợi) vì các bản ghi sau của phiên cần ID do SQLite cấp.
+
+        Args:
+            mode (str): Chế độ bot
+            symbol (str): Ký hiệu của cặp giao dịch
+            start_balance (float): Số dư USDT ban đầu của phiên
+
+        Returns:
+            int: ID của phiên
+        """
+        self.session_id = await self._insert_session(mode, symbol, start_balance, start_balance)
+        return self.session_id
+
+    def record_trade(self, symbol, buy_exchange, sell_exchange, amount, buy_price, sell_price,
+                     profit_pct, profit_usd, fee_usd, fee_crypto, success=True):
+        """
+        Ghi nhận một giao dịch chênh lệch giá của phiên hiện tại.
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            buy_exchange (str): Sàn mua
+            sell_exchange (str): Sàn bán
+            amount (float): Số lượng crypto
+            buy_price (float): Giá mua
+            sell_price (float): Giá bán
+            profit_pct (float): Lợi nhuận (phần trăm)
+            profit_usd (float): Lợi nhuận (USD)
+            fee_usd (float): Phí tính theo USD
+            fee_crypto (float): Phí tính theo crypto
+            success (bool): False nếu lệnh không khớp đủ
+        """
+        self._put(INSERT_TRADE, (
+            self.session_id, time.time(), symbol, buy_exchange, sell_exchange, amount, buy_price, sell_price,
+            profit_pct, profit_usd, fee_usd, fee_crypto, int(success)
+        ))
+
+    def record_balance(self, exchange, asset, total, free=None, used=None):
+        """
+        Ghi nhận số dư của một tài sản.
+
+        Args:
+            exchange (str): ID của sàn giao dịch (ACCOUNT cho số dư tổng của bot)
+            asset (str): Ký hiệu của tài sản
+            total (float): Tổng số dư
+            free (float, optional): Số dư khả dụng
+            used (float, optional): Số dư đang bị giữ trong lệnh
+        """
+        self._put(INSERT_BALANCE, (self.session_id, time.time(), exchange, asset, free, used, total))
+
+    def record_snapshot(self, exchange, snapshot):
+        """
+        Ghi nhận ảnh chụp số dư của một sàn (bỏ qua các tài sản có số dư bằng 0).
+
+        Args:
+            exchange (str): ID của sàn giao dịch
+            snapshot (dict): Số dư theo định dạng ccxt
+        """
+        free = snapshot.get('free') or {}
+        used = snapshot.get('used') or {}
+        for asset, total in (snapshot.get('total') or {}).items():
+            if total:
+                self.record_balance(exchange, asset, total, free.get(asset), used.get(asset))
+
+    async def latest_balance(self, exchange=ACCOUNT, asset='USDT'):
+        """
+        Số dư được ghi nhận gần nhất của một tài sản.
+
+        Args:
+            exchange (str): ID của sàn giao dịch (mặc định là số dư tổng của bot)
+            asset (str): Ký hiệu của tài sản
+
+        Returns:
+            float: Tổng số dư, None nếu chưa có bản ghi
+        """
+        await self.flush()
+        async with self.db.execute(
+            "SELECT total FROM balances WHERE exchange = ? AND asset = ? ORDER BY id DESC LIMIT 1",
+            (exchange, asset)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def start_balance(self, session_id=None):
+        """
+        Số dư ban đầu của một phiên.
+
+        Args:
+            session_id (int, optional): ID của phiên, mặc định là phiên gần nhất
+
+        Returns:
+            float: Số dư USDT ban đầu, None nếu chưa có phiên
+        """
+        await self.flush()
+        session_id = self.session_id if session_id is None else session_id
+        async with self.db.execute("SELECT start_balance FROM sessions WHERE id = ?", (session_id,)) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def session_trades(self, session_id=None):
+        """
+        Các giao dịch của một phiên theo thứ tự thực hiện.
+
+        Args:
+            session_id (int, optional): ID của phiên, mặc định là phiên gần nhất
+
+        Returns:
+            list: Danh sách dict, mỗi dict là một giao dịch
+        """
+        await self.flush()
+        session_id = self.session_id if session_id is None else session_id
+        self.db.row_factory = aiosqlite.Row
+        try:
+            async with self.db.execute("SELECT * FROM trades WHERE session_id = ? ORDER BY id", (session_id,)) as cursor:
+                return [dict(row) for row in await cursor.fetchall()]
+        finally:
+            self.db.row_factory = None
+
+    async def close(self):
+        """Ghi nốt các bản ghi đang chờ, dừng tác vụ ghi và đóng tệp."""
+        if not self.started:
+            return
+
+        await self.flush()
+        self.writer.cancel()
+        await asyncio.gather(self.writer, return_exceptions=True)
+        await self.db.close()
+        self.db = None
+        self.queue = None
+        log_info(f"Đã ghi {self.rows_written} bản ghi vào sổ cái {self.path} trong {self.batches_written} transaction")
@@ -0,0 +1,292 @@
+"""
+Bộ nhớ đệm thông tin thị trường (precision, tick size, lot size, giá trị tối thiểu) của các sàn.
+"""
+import os
+import json
+import time
+import asyncio
+
+import ccxt
+
+from utils.logger import log_info, log_warning, log_error
+from utils.helpers import floor_to_step, ceil_to_step, common_step
+from configs import MARKET_CACHE_TTL
+
+
+class MarketRules:
+    """
+    Quy tắc đặt lệnh của một cặp giao dịch trên một sàn, rút gọn từ market của ccxt.
+    """
+
+    __slots__ = ('price_step', 'amount_step', 'min_amount', 'min_price', 'min_cost')
+
+    def __init__(self, price_step=None, amount_step=None, min_amount=None, min_price=None, min_cost=None):
+        """
+        Args:
+            price_step (float, optional): Bước giá (tick size)
+            amount_step (float, optional): Bước khối lượng (lot size)
+            min_amount (float, optional): Khối lượng tối thiểu
+            min_price (float, optional): Giá tối thiểu
+            min_cost (float, optional): Giá trị lệnh tối thiểu (min notional)
+        """
+        self.price_step = price_step
+        self.amount_step = amount_step
+        self.min_amount = min_amount
+        self.min_price = min_price
+        self.min_cost = min_cost
+
+    @classmethod
+    def from_market(cls, market, precision_mode=ccxt.TICK_SIZE):
+        """
+        Tạo quy tắc từ market theo định dạng ccxt.
+
+        Args:
+            market (dict): Market của ccxt
+            precision_mode (int): Chế độ precision của sàn (TICK_SIZE hoặc DECIMAL_PLACES)
+
+        Returns:
+            MarketRules: Quy tắc đặt lệnh
+        """
+        precision = market.get('precision') or {}
+        limits = market.get('limits') or {}
+
+        def step(value):
+            if value is None:
+                return None
+            if precision_mode == ccxt.DECIMAL_PLACES:
+                return 10 ** -int(value)
+            if precision_mode == ccxt.TICK_SIZE:
+                return float(value)
+            # SIGNIFICANT_DIGITS không có bước cố định, để sàn tự làm tròn
+            return None
+
+        return cls(
+            price_step=step(precision.get('price')),
+            amount_step=step(precision.get('amount')),
+            min_amount=(limits.get('amount') or {}).get('min'),
+            min_price=(limits.get('price') or {}).get('min'),
+            min_cost=(limits.get('cost') or {}).get('min'),
+        )
+
+
+class MarketCache:
+    """
+    Thông tin thị trường của các sàn, tải một lần rồi tra cứu O(1) trên đường đặt lệnh.
+
+    Markets của mỗi sàn được lưu ra tệp JSON; khi khởi động lại trong thời gian TTL,
+    markets được nạp từ tệp vào đối tượng ccxt (set_markets) thay vì tải lại qua mạng.
+    """
+
+    def __init__(self, exchange_service, directory=None, ttl=MARKET_CACHE_TTL):
+        """
+        Khởi tạo bộ nhớ đệm thông tin thị trường.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            directory (str, optional): Thư mục lưu markets, None để chỉ giữ trong bộ nhớ
+            ttl (float): Thời gian markets đã lưu còn hiệu lực (giây)
+        """
+        self.exchange_service = exchange_service
+        self.directory = directory
+        self.ttl = ttl
+        self.rules = {}  # (sàn, cặp) -> MarketRules
+        self.loaded_at = {}  # Sàn -> thời điểm markets được tải/lưu
+        self.locks = {}  # Sàn -> khóa tải markets
+
+    def _path(self, exchange_id):
+        """Đường dẫn tệp markets của một sàn."""
+        return os.path.join(self.directory, f"{exchange_id}.json")
+
+    def is_loaded(self, exchange_id):
+        """
+        Kiểm tra markets của sàn đã được tải và còn trong thời gian TTL.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            bool: True nếu markets còn hiệu lực
+        """
+        loaded_at = self.loaded_at.get(exchange_id)
+        return loaded_at is not None and time.time() - loaded_at < self.ttl
+
+    async def load(self, exchanges):
+        """
+        Tải markets của nhiều sàn đồng thời.
+
+        Args:
+            exchanges (list): Danh sách tên các sàn giao dịch
+        """
+        await asyncio.gather(*(self.ensure_loaded(exchange_id) for exchange_id in exchanges))
+
+    async def ensure_loaded(self, exchange_id):
+        """
+        Tải markets của một sàn nếu chưa có hoặc đã hết hạn.
+
+        Lỗi khi tải chỉ được ghi log: lệnh vẫn được gửi nhưng không được làm tròn trước.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        if self.is_loaded(exchange_id):
+            return
+
+        lock = self.locks.setdefault(exchange_id, asyncio.Lock())
+        async with lock:
+            if self.is_loaded(exchange_id):
+                return
+
+            try:
+                await self._load_exchange(exchange_id)
+            except Exception as e:
+                log_error(f"Không thể tải thông tin thị trường của {exchange_id}: {str(e)}")
+
+    async def _load_exchange(self, exchange_id):
+        """
+        Nạp markets của một sàn từ tệp còn hạn, nếu không thì tải qua mạng và lưu lại.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        exchange = self.exchange_service.get_exchange(exchange_id)
+        saved = await asyncio.to_thread(self._read, exchange_id) if self.directory else None
+
+        if saved is not None:
+            exchange.set_markets(saved['markets'], saved.get('currencies'))
+            saved_at = saved['saved_at']
+            log_info(f"Đã nạp {len(saved['markets'])} markets của {exchange_id} từ bộ nhớ đệm")
+        else:
+            await self.exchange_service.request_scheduler.acquire(exchange_id, 'load_markets', exchange)
+            await exchange.load_markets()
+            saved_at = time.time()
+            if self.directory:
+                await asyncio.to_thread(self._write, exchange_id, exchange, saved_at)
+
+        precision_mode = getattr(exchange, 'precisionMode', ccxt.TICK_SIZE)
+        for symbol, market in exchange.markets.items():
+            self.rules[(exchange_id, symbol)] = MarketRules.from_market(market, precision_mode)
+        self.loaded_at[exchange_id] = saved_at
+
+    def _read(self, exchange_id):
+        """
+        Đọc markets đã lưu của một sàn.
+
+        Returns:
+            dict: Dữ liệu đã lưu, hoặc None nếu không có tệp, tệp hỏng hoặc đã hết hạn
+        """
+        try:
+            with open(self._path(exchange_id), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            log_warning(f"Bỏ qua tệp markets hỏng của {exchange_id}: {str(e)}")
+            return None
+
+        if time.time() - saved.get('saved_at', 0) >= self.ttl or not saved.get('markets'):
+            return None
+        return saved
+
+    def _write(self, exchange_id, exchange, saved_at):
+        """Ghi markets của một sàn ra tệp (ghi tệp tạm rồi đổi tên để không để lại tệp dở dang)."""
+        path = self._path(exchange_id)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump({
+                    'saved_at': saved_at,
+                    'markets': exchange.markets,
+                    'currencies': getattr(exchange, 'currencies', None),
+                }, f)
+            os.replace(f"{path}.tmp", path)
+        except (OSError, TypeError, ValueError) as e:
+            log_warning(f"Không thể lưu markets của {exchange_id}: {str(e)}")
+
+    def get(self, exchange_id, symbol):
+        """
+        Lấy quy tắc đặt lệnh của một cặp trên một sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+
+        Returns:
+            MarketRules: Quy tắc đặt lệnh, hoặc None nếu chưa tải markets
+        """
+        return self.rules.get((exchange_id, symbol))
+
+    def amount_to_precision(self, exchange_id, symbol, amount):
+        """
+        Làm tròn xuống khối lượng theo lot size của sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            amount (float): Khối lượng
+
+        Returns:
+            float: Khối lượng đã làm tròn (giữ nguyên nếu chưa có thông tin thị trường)
+        """
+        rules = self.rules.get((exchange_id, symbol))
+        return floor_to_step(amount, rules.amount_step) if rules else amount
+
+    def price_to_precision(self, exchange_id, symbol, price, side):
+        """
+        Làm tròn giá giới hạn theo tick size, về phía dễ khớp hơn.
+
+        Giá mua được làm tròn lên và giá bán được làm tròn xuống để lệnh vẫn chạm tới
+        mức giá xa nhất đã tính.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            price (float): Giá giới hạn
+            side (str): 'buy' hoặc 'sell'
+
+        Returns:
+            float: Giá đã làm tròn (giữ nguyên nếu chưa có thông tin thị trường)
+        """
+        rules = self.rules.get((exchange_id, symbol))
+        if not rules:
+            return price
+        if side == 'buy':
+            return ceil_to_step(price, rules.price_step)
+        return floor_to_step(price, rules.price_step)
+
+    def common_amount(self, exchanges, symbol, amount):
+        """
+        Làm tròn khối lượng để hợp lệ trên tất cả các sàn (hai chân lệnh cùng khối lượng).
+
+        Args:
+            exchanges (list): Danh sách tên các sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            amount (float): Khối lượng
+
+        Returns:
+            float: Khối lượng đã làm tròn theo lot size của từng sàn
+        """
+        # Làm tròn lần lượt theo từng sàn chưa chắc cho bội số chung (0.3 rồi 0.2: 1.0 -> 0.9 -> 0.8)
+        steps = [rules.amount_step for rules in (self.rules.get((exchange_id, symbol)) for exchange_id in exchanges) if rules]
+        return floor_to_step(amount, common_step(*steps))
+
+    def meets_minimums(self, exchange_id, symbol, amount, price):
+        """
+        Kiểm tra lệnh đạt khối lượng và giá trị tối thiểu của sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            amount (float): Khối lượng
+            price (float): Giá
+
+        Returns:
+            bool: True nếu lệnh không bị sàn từ chối vì quá nhỏ (hoặc chưa có thông tin thị trường)
+        """
+        rules = self.rules.get((exchange_id, symbol))
+        if not rules:
+            return True
+        if rules.min_amount and amount < rules.min_amount:
+            return False
+        if rules.min_cost and price and amount * price < rules.min_cost:
+            return False
+        return True
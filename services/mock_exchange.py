@@ -0,0 +1,622 @@
+"""
+Sàn giao dịch giả lập chạy trong tiến trình, tương thích với phần API ccxt/ccxt.pro mà bot sử dụng.
+
+Dùng để chạy thử và đo tải các bot mà không cần mạng hay API key thật
+(bật bằng ENABLE_MOCK_EXCHANGE=true hoặc tham số --mock).
+"""
+import time
+import random
+import asyncio
+from collections import defaultdict
+
+import ccxt
+
+from utils.logger import log_info
+from configs import EXCHANGE_FEES, MOCK_EXCHANGE_SETTINGS, SCANNER_SYMBOLS
+
+
+def split_symbol(symbol):
+    """
+    Tách ký hiệu cặp giao dịch thành tài sản cơ sở và tài sản định giá.
+
+    Args:
+        symbol (str): Ký hiệu (BTC/USDT, BTC/USDT:USDT hoặc BTC:USDT)
+
+    Returns:
+        tuple: (base, quote)
+    """
+    if '/' in symbol:
+        base, rest = symbol.split('/', 1)
+        return base, rest.split(':')[0]
+    if ':' in symbol:
+        base, quote = symbol.split(':', 1)
+        return base, quote
+    return symbol, 'USDT'
+
+
+class MockExchangeHub:
+    """
+    Trạng thái dùng chung của tất cả các sàn giả lập: giá hợp lý của mỗi cặp và các sàn.
+    """
+
+    def __init__(self, settings=None):
+        """
+        Khởi tạo hub.
+
+        Args:
+            settings (dict, optional): Cấu hình giả lập (mặc định MOCK_EXCHANGE_SETTINGS)
+        """
+        self.settings = {**MOCK_EXCHANGE_SETTINGS, **(settings or {})}
+        self.rng = random.Random(self.settings['seed'])
+        self.fair_prices = {}
+        self.venues = {}
+
+    def fair_price(self, symbol, step=False):
+        """
+        Giá hợp lý chung của một cặp, đi ngẫu nhiên mỗi lần step.
+
+        Args:
+            symbol (str): Ký hiệu cặp giao dịch
+            step (bool): Có cập nhật giá trước khi trả về hay không
+
+        Returns:
+            float: Giá hợp lý
+        """
+        key = '/'.join(split_symbol(symbol))
+        if key not in self.fair_prices:
+            self.fair_prices[key] = float(self.settings['start_prices'].get(key, self.settings['default_price']))
+
+        if step:
+            self.fair_prices[key] *= 1 + self.rng.gauss(0, self.settings['volatility'])
+
+        return self.fair_prices[key]
+
+    def venue(self, exchange_id):
+        """
+        Lấy (hoặc tạo) trạng thái của một sàn giả lập.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            MockVenue: Trạng thái sàn
+        """
+        if exchange_id not in self.venues:
+            self.venues[exchange_id] = MockVenue(self, exchange_id)
+        return self.venues[exchange_id]
+
+    def create_exchange(self, exchange_id):
+        """Tạo đối tượng REST giả lập (thay cho ccxt.<exchange_id>)."""
+        return MockExchange(self.venue(exchange_id))
+
+    def create_pro_exchange(self, exchange_id):
+        """Tạo đối tượng websocket giả lập (thay cho ccxt.pro.<exchange_id>)."""
+        return MockProExchange(self.venue(exchange_id))
+
+
+class MockVenue:
+    """
+    Trạng thái một sàn giả lập: sách lệnh, số dư, lệnh và vị thế futures.
+    """
+
+    def __init__(self, hub, exchange_id):
+        """
+        Khởi tạo sàn.
+
+        Args:
+            hub (MockExchangeHub): Hub chứa giá hợp lý chung
+            exchange_id (str): ID của sàn giao dịch
+        """
+        self.hub = hub
+        self.id = exchange_id
+        self.settings = hub.settings
+        self.rng = random.Random(f"{self.settings['seed']}-{exchange_id}")
+        self.fee = EXCHANGE_FEES.get(exchange_id, {}).get('give', 0.001)
+        self.is_derivatives = exchange_id.endswith('futures')
+
+        self.balances = defaultdict(float, self.settings['initial_balances'])
+        self.reserved = defaultdict(float)  # Số dư bị khóa bởi lệnh giới hạn đang mở
+        self.orders = {}  # order_id -> lệnh
+        self.open_orders = defaultdict(dict)  # symbol -> {order_id: lệnh}
+        self.positions = defaultdict(float)  # symbol futures -> số hợp đồng (âm là short)
+        self.leverage = {}
+        self.deviations = defaultdict(float)  # Độ lệch tương đối của giá sàn so với giá hợp lý
+        self.books = {}
+        self.book_times = {}  # Thời điểm tạo sách lệnh gần nhất của mỗi cặp
+        update_rate = self.settings['update_rate']
+        self.interval = 1 / update_rate if update_rate > 0 else 0
+        self.next_order_id = 1
+        self.order_listeners = []  # Hàng đợi cập nhật lệnh của các luồng watch_orders
+
+        symbols = list(self.settings['start_prices']) + list(SCANNER_SYMBOLS)
+        self.markets = {symbol: self._market(symbol) for symbol in symbols}
+
+    def _market(self, symbol):
+        """Thông tin thị trường tối thiểu theo định dạng ccxt."""
+        base, quote = split_symbol(symbol)
+        return {
+            'id': symbol.replace('/', ''),
+            'symbol': symbol,
+            'base': base,
+            'quote': quote,
+            'active': True,
+            'precision': {'price': 1e-8, 'amount': 1e-8},
+            'limits': {'price': {'min': 1e-8}, 'amount': {'min': 1e-8}, 'cost': {'min': 1}},
+        }
+
+    def step(self, symbol):
+        """
+        Tạo sách lệnh mới cho một cặp và khớp các lệnh đang mở với nó.
+
+        Args:
+            symbol (str): Ký hiệu cặp giao dịch
+
+        Returns:
+            dict: Sách lệnh theo định dạng ccxt
+        """
+        settings = self.settings
+        fair = self.hub.fair_price(symbol, step=True)
+
+        # Độ lệch của sàn hồi quy về 0 để tạo chênh lệch giá giữa các sàn
+        deviation = self.deviations[symbol] * 0.98 + self.rng.gauss(0, settings['deviation_volatility'])
+        deviation = max(-settings['max_deviation'], min(settings['max_deviation'], deviation))
+        self.deviations[symbol] = deviation
+
+        mid = fair * (1 + deviation)
+        tick = mid * settings['spread'] / 2
+        levels = settings['levels']
+        size = settings['level_size']
+        rng = self.rng
+
+        now = int(time.time() * 1000)
+        book = {
+            'symbol': symbol,
+            'bids': [[mid - tick * (i + 1), size * (0.5 + rng.random())] for i in range(levels)],
+            'asks': [[mid + tick * (i + 1), size * (0.5 + rng.random())] for i in range(levels)],
+            'timestamp': now,
+            'datetime': None,
+            'nonce': None,
+        }
+        self.books[symbol] = book
+        self.book_times[symbol] = time.perf_counter()
+
+        if self.open_orders.get(symbol):
+            self._match_resting_orders(symbol, book)
+
+        return book
+
+    def book(self, symbol):
+        """Sách lệnh hiện tại của một cặp (tạo mới nếu chưa có)."""
+        return self.books.get(symbol) or self.step(symbol)
+
+    def refresh(self, symbol, max_steps=50):
+        """
+        Cho thị trường tiến theo thời gian đã trôi qua kể từ lần cập nhật trước.
+
+        Cần khi không có vòng lặp websocket nào chạy (ví dụ lúc đợi lệnh ban đầu khớp
+        bằng REST), để lệnh đang chờ vẫn có cơ hội khớp.
+
+        Args:
+            symbol (str): Ký hiệu cặp giao dịch
+            max_steps (int): Số lần cập nhật tối đa
+
+        Returns:
+            dict: Sách lệnh hiện tại
+        """
+        if symbol not in self.books:
+            return self.step(symbol)
+
+        elapsed = time.perf_counter() - self.book_times[symbol]
+        steps = max_steps if self.interval == 0 else min(max_steps, int(elapsed / self.interval))
+        for _ in range(steps):
+            self.step(symbol)
+
+        return self.books[symbol]
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        """
+        Đặt lệnh. Lệnh thị trường khớp ngay theo sách lệnh; lệnh giới hạn khớp ngay nếu
+        chạm giá đối ứng (với xác suất fill_probability), ngược lại nằm chờ trong sổ lệnh.
+
+        Returns:
+            dict: Lệnh theo định dạng ccxt
+
+        Raises:
+            ccxt.InvalidOrder: Nếu tham số lệnh không hợp lệ
+            ccxt.InsufficientFunds: Nếu không đủ số dư
+        """
+        params = params or {}
+        if amount is None or amount <= 0:
+            raise ccxt.InvalidOrder(f"{self.id} số lượng không hợp lệ: {amount}")
+        if type == 'limit' and not price:
+            raise ccxt.InvalidOrder(f"{self.id} lệnh giới hạn cần giá")
+
+        if symbol not in self.markets:
+            self.markets[symbol] = self._market(symbol)
+
+        book = self.book(symbol)
+        if type == 'market':
+            levels = book['asks'] if side == 'buy' else book['bids']
+            price = self._walk_levels(levels, amount)
+
+        self._check_funds(symbol, side, amount, price)
+
+        order_id = str(self.next_order_id)
+        self.next_order_id += 1
+        order = {
+            'id': order_id,
+            'clientOrderId': params.get('clientOrderId'),
+            'timestamp': int(time.time() * 1000),
+            'symbol': symbol,
+            'type': type,
+            'side': side,
+            'price': price,
+            'amount': amount,
+            'filled': 0.0,
+            'remaining': amount,
+            'average': None,
+            'cost': 0.0,
+            'status': 'open',
+            'fee': {'cost': 0.0, 'currency': 'USDT'},
+            'timeInForce': params.get('timeInForce', 'GTC'),
+            'trades': [],
+        }
+        self.orders[order_id] = order
+
+        marketable = type == 'market' or (
+            price >= book['asks'][0][0] if side == 'buy' else price <= book['bids'][0][0]
+        )
+
+        if marketable and (type == 'market' or self.rng.random() < self.settings['fill_probability']):
+            self._fill(order, price)
+        elif order['timeInForce'] in ('IOC', 'FOK'):
+            order['status'] = 'canceled'
+        else:
+            self._reserve(order, 1)
+            self.open_orders[symbol][order_id] = order
+
+        self._publish(order)
+        return dict(order)
+
+    def _publish(self, order):
+        """Gửi bản sao trạng thái mới của lệnh tới các luồng watch_orders."""
+        for queue in self.order_listeners:
+            queue.put_nowait(dict(order))
+
+    def _walk_levels(self, levels, amount):
+        """Giá trung bình khi khớp amount vào các mức giá (mức cuối được kéo dài nếu thiếu)."""
+        remaining = amount
+        cost = 0.0
+        for level_price, level_size in levels:
+            take = min(remaining, level_size)
+            cost += take * level_price
+            remaining -= take
+            if remaining <= 0:
+                break
+        if remaining > 0:
+            cost += remaining * levels[-1][0]
+        return cost / amount
+
+    def _check_funds(self, symbol, side, amount, price):
+        """Kiểm tra số dư khả dụng cho lệnh spot (sàn futures không kiểm tra ký quỹ)."""
+        if self.is_derivatives:
+            return
+
+        base, quote = split_symbol(symbol)
+        if side == 'buy':
+            needed, asset = amount * price * (1 + self.fee), quote
+        else:
+            needed, asset = amount, base
+
+        available = self.balances[asset] - self.reserved[asset]
+        if available + 1e-12 < needed:
+            raise ccxt.InsufficientFunds(
+                f"{self.id} không đủ {asset}: cần {needed}, khả dụng {available}"
+            )
+
+    def _reserve(self, order, direction):
+        """Khóa (direction=1) hoặc mở khóa (direction=-1) số dư cho phần chưa khớp của lệnh."""
+        if self.is_derivatives:
+            return
+
+        base, quote = split_symbol(order['symbol'])
+        if order['side'] == 'buy':
+            self.reserved[quote] += direction * order['remaining'] * order['price'] * (1 + self.fee)
+        else:
+            self.reserved[base] += direction * order['remaining']
+
+    def _fill(self, order, price):
+        """Khớp toàn bộ phần còn lại của lệnh tại giá cho trước và cập nhật số dư."""
+        amount = order['remaining']
+        cost = amount * price
+        fee = cost * self.fee
+        base, quote = split_symbol(order['symbol'])
+
+        if self.is_derivatives:
+            self.positions[order['symbol']] += amount if order['side'] == 'buy' else -amount
+            self.balances[quote] -= fee
+        elif order['side'] == 'buy':
+            self.balances[base] += amount
+            self.balances[quote] -= cost + fee
+        else:
+            self.balances[base] -= amount
+            self.balances[quote] += cost - fee
+
+        order['filled'] += amount
+        order['remaining'] = 0.0
+        order['cost'] += cost
+        order['average'] = order['cost'] / order['filled']
+        order['fee'] = {'cost': order['fee']['cost'] + fee, 'currency': quote}
+        order['status'] = 'closed'
+        order['lastTradeTimestamp'] = int(time.time() * 1000)
+        order['trades'].append({'price': price, 'amount': amount, 'cost': cost, 'fee': {'cost': fee, 'currency': quote}})
+
+    def _match_resting_orders(self, symbol, book):
+        """Khớp các lệnh giới hạn đang chờ khi sách lệnh mới chạm giá của chúng."""
+        best_bid = book['bids'][0][0]
+        best_ask = book['asks'][0][0]
+
+        for order_id, order in list(self.open_orders[symbol].items()):
+            crossed = order['price'] >= best_ask if order['side'] == 'buy' else order['price'] <= best_bid
+            if crossed and self.rng.random() < self.settings['fill_probability']:
+                self._reserve(order, -1)
+                self._fill(order, order['price'])
+                del self.open_orders[symbol][order_id]
+                self._publish(order)
+
+    def cancel_order(self, order_id, symbol=None):
+        """
+        Hủy một lệnh đang mở.
+
+        Raises:
+            ccxt.OrderNotFound: Nếu lệnh không tồn tại hoặc không còn mở
+        """
+        order = self.orders.get(str(order_id))
+        if order is None or order['status'] != 'open':
+            raise ccxt.OrderNotFound(f"{self.id} không tìm thấy lệnh mở {order_id}")
+
+        self._reserve(order, -1)
+        order['status'] = 'canceled'
+        self.open_orders[order['symbol']].pop(order['id'], None)
+        self._publish(order)
+        return dict(order)
+
+    def fetch_orders(self, symbol, status):
+        """Danh sách lệnh của một cặp theo trạng thái, cũ nhất trước."""
+        if status == 'open':
+            return [dict(order) for order in self.open_orders.get(symbol, {}).values()]
+        return [dict(o) for o in self.orders.values() if o['symbol'] == symbol and o['status'] == status]
+
+    def balance(self):
+        """Số dư theo định dạng ccxt fetch_balance."""
+        result = {'free': {}, 'used': {}, 'total': {}}
+        for asset, total in self.balances.items():
+            used = max(0.0, self.reserved[asset])
+            result['free'][asset] = total - used
+            result['used'][asset] = used
+            result['total'][asset] = total
+            result[asset] = {'free': total - used, 'used': used, 'total': total}
+        return result
+
+    def transfer(self, code, amount, from_account, to_account):
+        """
+        Chuyển tiền giữa tài khoản spot và futures (ví dụ kucoin <-> kucoinfutures).
+
+        Raises:
+            ccxt.InsufficientFunds: Nếu không đủ số dư để chuyển
+        """
+        spot_id = self.id[:-len('futures')] if self.is_derivatives else self.id
+        accounts = {'spot': spot_id, 'main': spot_id, 'trade': spot_id, 'future': f"{spot_id}futures", 'swap': f"{spot_id}futures"}
+        source = self.hub.venue(accounts.get(from_account, spot_id))
+        target = self.hub.venue(accounts.get(to_account, spot_id))
+
+        if source.balances[code] - source.reserved[code] < amount:
+            raise ccxt.InsufficientFunds(f"{source.id} không đủ {code} để chuyển {amount}")
+
+        source.balances[code] -= amount
+        target.balances[code] += amount
+        return {'id': str(self.next_order_id), 'currency': code, 'amount': amount,
+                'fromAccount': from_account, 'toAccount': to_account, 'status': 'ok'}
+
+    def fetch_positions(self, symbols=None):
+        """Vị thế futures theo định dạng ccxt."""
+        return [
+            {'symbol': symbol, 'contracts': abs(contracts), 'side': 'long' if contracts > 0 else 'short'}
+            for symbol, contracts in self.positions.items()
+            if contracts and (not symbols or symbol in symbols)
+        ]
+
+
+class MockExchange:
+    """
+    Đối tượng REST giả lập với cùng chữ ký phương thức như ccxt.async_support (bất đồng bộ).
+    """
+
+    def __init__(self, venue):
+        """
+        Args:
+            venue (MockVenue): Trạng thái sàn giả lập
+        """
+        self.venue = venue
+        self.id = venue.id
+        self.markets = venue.markets
+        self.latency = venue.settings['rest_latency']
+        self.has = {'cancelAllOrders': True, 'fetchPositions': True, 'setLeverage': True, 'transfer': True}
+        self.features = {'spot': {'createOrder': {'timeInForce': {'GTC': True, 'IOC': True, 'FOK': True, 'PO': False, 'GTD': False}}}}
+        self.precisionMode = ccxt.TICK_SIZE
+        self.rateLimit = 10  # Mili giây cho mỗi đơn vị trọng số request
+
+    async def _delay(self):
+        """Mô phỏng độ trễ của một request REST."""
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    async def load_markets(self, reload=False):
+        await self._delay()
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets.update(markets)
+        return self.markets
+
+    async def fetch_ticker(self, symbol):
+        await self._delay()
+        book = self.venue.refresh(symbol)
+        bid, ask = book['bids'][0][0], book['asks'][0][0]
+        return {'symbol': symbol, 'bid': bid, 'ask': ask, 'last': (bid + ask) / 2, 'timestamp': book['timestamp']}
+
+    async def fetch_order_book(self, symbol, limit=None):
+        await self._delay()
+        return self.venue.refresh(symbol)
+
+    async def fetch_balance(self, params=None):
+        await self._delay()
+        return self.venue.balance()
+
+    async def create_order(self, symbol, type, side, amount, price=None, params=None):
+        await self._delay()
+        return self.venue.create_order(symbol, type, side, amount, price, params)
+
+    async def create_limit_buy_order(self, symbol, amount, price, params=None):
+        return await self.create_order(symbol, 'limit', 'buy', amount, price, params)
+
+    async def create_limit_sell_order(self, symbol, amount, price, params=None):
+        return await self.create_order(symbol, 'limit', 'sell', amount, price, params)
+
+    async def create_market_buy_order(self, symbol, amount, params=None):
+        return await self.create_order(symbol, 'market', 'buy', amount, None, params)
+
+    async def create_market_sell_order(self, symbol, amount, params=None):
+        return await self.create_order(symbol, 'market', 'sell', amount, None, params)
+
+    async def fetch_order(self, order_id, symbol=None):
+        await self._delay()
+        order = self.venue.orders.get(str(order_id))
+        if order is None:
+            raise ccxt.OrderNotFound(f"{self.id} không tìm thấy lệnh {order_id}")
+        self.venue.refresh(order['symbol'])
+        return dict(order)
+
+    async def fetch_open_orders(self, symbol=None):
+        await self._delay()
+        self.venue.refresh(symbol)
+        return self.venue.fetch_orders(symbol, 'open')
+
+    async def fetch_closed_orders(self, symbol=None):
+        await self._delay()
+        self.venue.refresh(symbol)
+        return self.venue.fetch_orders(symbol, 'closed')
+
+    async def cancel_order(self, order_id, symbol=None):
+        await self._delay()
+        return self.venue.cancel_order(order_id, symbol)
+
+    async def cancel_all_orders(self, symbol=None):
+        await self._delay()
+        return [self.venue.cancel_order(order['id']) for order in self.venue.fetch_orders(symbol, 'open')]
+
+    async def transfer(self, code, amount, from_account, to_account, params=None):
+        await self._delay()
+        return self.venue.transfer(code, amount, from_account, to_account)
+
+    async def set_leverage(self, leverage, symbol=None, params=None):
+        await self._delay()
+        self.venue.leverage[symbol] = leverage
+        return {'symbol': symbol, 'leverage': leverage}
+
+    async def fetch_positions(self, symbols=None, params=None):
+        await self._delay()
+        return self.venue.fetch_positions(symbols)
+
+    async def close(self):
+        pass
+
+
+class MockProExchange:
+    """
+    Đối tượng websocket giả lập với cùng chữ ký phương thức như ccxt.pro (bất đồng bộ).
+
+    Mỗi lần watch sách lệnh chờ 1/update_rate giây rồi trả về sách lệnh mới của sàn;
+    watch_orders trả về các lệnh thay đổi trạng thái kể từ lần gọi trước.
+    """
+
+    def __init__(self, venue):
+        """
+        Args:
+            venue (MockVenue): Trạng thái sàn giả lập
+        """
+        self.venue = venue
+        self.id = venue.id
+        self.markets = {}
+        update_rate = venue.settings['update_rate']
+        self.interval = 1 / update_rate if update_rate > 0 else 0
+        self.has = {'watchOrderBook': True, 'watchOrderBookForSymbols': True, 'watchOrders': True, 'watchBalance': True}
+        self._batch_index = 0
+        self._order_updates = None  # Hàng đợi cập nhật lệnh, tạo ở lần watch_orders đầu tiên
+        self._balance_updates = None  # Hàng đợi cập nhật lệnh dùng để báo số dư thay đổi, tạo ở lần watch_balance đầu tiên
+        self._next_update = {}  # Thời điểm cập nhật kế tiếp của mỗi luồng theo dõi
+
+    async def _wait_for_update(self, key):
+        """Chờ tới lượt cập nhật kế tiếp theo lịch cố định (không cộng dồn độ trễ của sleep)."""
+        now = time.perf_counter()
+        next_update = max(self._next_update.get(key, now), now - self.interval) + self.interval
+        self._next_update[key] = next_update
+        await asyncio.sleep(max(0, next_update - now))
+
+    async def load_markets(self, reload=False):
+        self.markets = self.venue.markets
+        return self.markets
+
+    async def watch_order_book(self, symbol, limit=None, params=None):
+        await self._wait_for_update(symbol)
+        return self.venue.step(symbol)
+
+    async def watch_order_book_for_symbols(self, symbols, limit=None, params=None):
+        await self._wait_for_update(tuple(symbols))
+        symbol = symbols[self._batch_index % len(symbols)]
+        self._batch_index += 1
+        return self.venue.step(symbol)
+
+    async def watch_orders(self, symbol=None, since=None, limit=None, params=None):
+        if self._order_updates is None:
+            self._order_updates = asyncio.Queue()
+            self.venue.order_listeners.append(self._order_updates)
+        queue = self._order_updates
+
+        while True:
+            # Lệnh chờ chỉ khớp khi sách lệnh được cập nhật, nên tiếp tục cập nhật các cặp có lệnh mở
+            open_symbols = [s for s, orders in self.venue.open_orders.items() if orders]
+            if queue.empty() and open_symbols:
+                await self._wait_for_update('orders')
+                for open_symbol in open_symbols:
+                    self.venue.refresh(open_symbol)
+                continue
+
+            updates = [await queue.get()]
+            while not queue.empty():
+                updates.append(queue.get_nowait())
+
+            updates = [order for order in updates if symbol is None or order['symbol'] == symbol]
+            if updates:
+                return updates
+
+    async def watch_balance(self, params=None):
+        if self._balance_updates is None:
+            self._balance_updates = asyncio.Queue()
+            self.venue.order_listeners.append(self._balance_updates)
+            return self.venue.balance()
+
+        # Số dư chỉ thay đổi khi có lệnh được tạo, khớp hoặc hủy
+        await self._balance_updates.get()
+        while not self._balance_updates.empty():
+            self._balance_updates.get_nowait()
+        return self.venue.balance()
+
+    async def close(self):
+        if self._order_updates is not None:
+            self.venue.order_listeners.remove(self._order_updates)
+            self._order_updates = None
+        if self._balance_updates is not None:
+            self.venue.order_listeners.remove(self._balance_updates)
+            self._balance_updates = None
+        log_info(f"Đóng kết nối giả lập {self.id}")
@@ -0,0 +1,439 @@
+"""
+Quản lý vòng đời của các lệnh do bot tạo, tra cứu theo order id hoặc client order id.
+"""
+import time
+import uuid
+import asyncio
+
+from utils.logger import log_info, log_warning
+from services.order_tracker import OrderTracker
+from configs import CANCEL_CONFIRM_ATTEMPTS, ORDER_POLL_MIN_INTERVAL, ORDER_HISTORY_SIZE
+
+# Trạng thái vòng đời của lệnh
+ORDER_PENDING = 'pending'  # Đã gửi, chưa được sàn xác nhận
+ORDER_OPEN = 'open'  # Sàn đã xác nhận, chưa khớp
+ORDER_PARTIALLY_FILLED = 'partially_filled'  # Đã khớp một phần, vẫn đang mở
+ORDER_FILLED = 'filled'  # Đã khớp hết
+ORDER_CANCELED = 'canceled'  # Đã hủy (có thể đã khớp một phần, xem filled)
+ORDER_EXPIRED = 'expired'  # Hết hạn (có thể đã khớp một phần, xem filled)
+ORDER_REJECTED = 'rejected'  # Sàn từ chối hoặc gửi lỗi
+TERMINAL_STATES = (ORDER_FILLED, ORDER_CANCELED, ORDER_EXPIRED, ORDER_REJECTED)
+
+# Trạng thái ccxt -> trạng thái vòng đời khi lệnh không còn mở
+CCXT_TERMINAL_STATES = {
+    'closed': ORDER_FILLED,
+    'canceled': ORDER_CANCELED,
+    'cancelled': ORDER_CANCELED,
+    'expired': ORDER_EXPIRED,
+    'rejected': ORDER_REJECTED,
+}
+
+
+class ManagedOrder:
+    """
+    Một lệnh do bot tạo: khối lượng yêu cầu và đã khớp, giá trung bình và các mốc thời gian.
+    """
+
+    def __init__(self, exchange_id, symbol, side, amount, price=None, order_type='limit', client_order_id=None):
+        """
+        Khởi tạo lệnh ở trạng thái chờ xác nhận.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            side (str): 'buy' hoặc 'sell'
+            amount (float): Khối lượng yêu cầu
+            price (float, optional): Giá giới hạn
+            order_type (str): Loại lệnh ('limit' hoặc 'market')
+            client_order_id (str, optional): ID do bot đặt cho lệnh
+        """
+        self.exchange_id = exchange_id
+        self.symbol = symbol
+        self.side = side
+        self.type = order_type
+        self.price = price
+        self.amount = amount
+        self.client_order_id = client_order_id
+        self.order_id = None
+        self.state = ORDER_PENDING
+        self.filled = 0.0
+        self.average = None
+        self.error = None
+        self.created_at = time.time()
+        self.acked_at = None
+        self.updated_at = self.created_at
+        self.closed_at = None
+
+    @property
+    def remaining(self):
+        """Khối lượng chưa khớp."""
+        return max(self.amount - self.filled, 0)
+
+    @property
+    def is_terminal(self):
+        """True nếu lệnh không còn thay đổi."""
+        return self.state in TERMINAL_STATES
+
+    def apply(self, order):
+        """
+        Cập nhật trạng thái từ một lệnh theo định dạng ccxt.
+
+        Trạng thái cuối không bị thay đổi và khối lượng đã khớp không giảm, nên có thể
+        áp dụng các cập nhật đến không theo thứ tự.
+
+        Args:
+            order (dict): Lệnh theo định dạng ccxt (có thể thiếu trường)
+        """
+        if not order:
+            return
+
+        now = time.time()
+        self.updated_at = now
+        if self.order_id is None and order.get('id') is not None:
+            self.order_id = str(order['id'])
+            self.acked_at = now
+
+        if order.get('filled') is not None and order['filled'] > self.filled:
+            self.filled = order['filled']
+        if order.get('average'):
+            self.average = order['average']
+
+        if self.is_terminal:
+            return
+
+        state = CCXT_TERMINAL_STATES.get(order.get('status'))
+        if state is not None:
+            self.state = state
+            self.closed_at = now
+        elif self.filled > 0:
+            self.state = ORDER_PARTIALLY_FILLED
+        elif self.order_id is not None:
+            self.state = ORDER_OPEN
+
+    def reject(self, error):
+        """
+        Đánh dấu lệnh bị từ chối.
+
+        Args:
+            error (Exception): Lỗi khi gửi lệnh
+        """
+        self.state = ORDER_REJECTED
+        self.error = str(error)
+        self.updated_at = self.closed_at = time.time()
+
+    def __repr__(self):
+        return (
+            f"ManagedOrder({self.exchange_id} {self.side} {self.filled}/{self.amount} {self.symbol} "
+            f"@ {self.price}, {self.state}, id={self.order_id})"
+        )
+
+
+class OrderManager:
+    """
+    Bảng các lệnh do bot tạo, tra cứu O(1) theo (sàn, order id) hoặc client order id.
+
+    Trạng thái được cập nhật từ phản hồi khi đặt/hủy lệnh và từ bộ theo dõi lệnh qua
+    websocket, nên việc hủy và phòng hộ dựa trực tiếp vào bảng thay vì hỏi lại sàn.
+    Chỉ history_size lệnh đã kết thúc gần nhất được giữ lại trong bảng.
+    """
+
+    def __init__(self, exchange_service, order_tracker=None, history_size=ORDER_HISTORY_SIZE):
+        """
+        Khởi tạo bộ quản lý lệnh.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            order_tracker (OrderTracker, optional): Bộ theo dõi lệnh qua websocket (mặc định tạo mới)
+            history_size (int): Số lệnh đã kết thúc được giữ lại trong bảng
+        """
+        self.exchange_service = exchange_service
+        self.order_tracker = order_tracker or OrderTracker(exchange_service)
+        self.history_size = history_size
+        self.orders = {}  # (sàn, order id) -> ManagedOrder, theo thứ tự ghi nhận
+        self.client_orders = {}  # client order id -> ManagedOrder, theo thứ tự ghi nhận
+
+    @staticmethod
+    def new_client_order_id():
+        """Tạo client order id chữ và số, đủ ngắn cho giới hạn của các sàn."""
+        return f"arb{uuid.uuid4().hex[:24]}"
+
+    def register(self, exchange_id, symbol, side, amount, price=None, order_type='limit', client_order_id=None):
+        """
+        Ghi nhận một lệnh trước khi gửi.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            side (str): 'buy' hoặc 'sell'
+            amount (float): Khối lượng yêu cầu
+            price (float, optional): Giá giới hạn
+            order_type (str): Loại lệnh
+            client_order_id (str, optional): ID do bot đặt cho lệnh
+
+        Returns:
+            ManagedOrder: Lệnh ở trạng thái chờ xác nhận
+        """
+        managed = ManagedOrder(exchange_id, symbol, side, amount, price, order_type, client_order_id)
+        if client_order_id:
+            self.client_orders[client_order_id] = managed
+            self._prune(self.client_orders)
+        return managed
+
+    def _prune(self, table):
+        """
+        Loại các lệnh cũ nhất đã kết thúc khi bảng vượt quá history_size.
+
+        Bảng được thu về một nửa history_size mỗi lần nên chi phí duyệt được chia đều cho các lệnh.
+        Người gọi vẫn giữ ManagedOrder của mình, chỉ việc tra cứu lệnh cũ là không còn.
+
+        Args:
+            table (dict): Bảng lệnh (orders hoặc client_orders)
+        """
+        if len(table) <= self.history_size:
+            return
+
+        excess = len(table) - self.history_size // 2
+        stale = [key for key, managed in table.items() if managed.is_terminal][:excess]
+        for key in stale:
+            del table[key]
+
+    def acknowledge(self, managed, order):
+        """
+        Ghi nhận phản hồi của sàn khi đặt lệnh.
+
+        Args:
+            managed (ManagedOrder): Lệnh đã ghi nhận
+            order (dict): Lệnh do sàn trả về
+
+        Returns:
+            ManagedOrder: Lệnh đã cập nhật
+        """
+        managed.apply(order)
+        if managed.order_id is not None:
+            self.orders[(managed.exchange_id, managed.order_id)] = managed
+            self._prune(self.orders)
+            # Cập nhật websocket có thể đã đến trước phản hồi REST
+            managed.apply(self.order_tracker.track(managed.exchange_id, order))
+        return managed
+
+    def get(self, exchange_id, order_id):
+        """
+        Tra cứu lệnh theo order id.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str): ID của lệnh trên sàn
+
+        Returns:
+            ManagedOrder: Lệnh, hoặc None nếu không do bot tạo
+        """
+        return self.orders.get((exchange_id, str(order_id)))
+
+    def get_by_client_id(self, client_order_id):
+        """
+        Tra cứu lệnh theo client order id.
+
+        Args:
+            client_order_id (str): ID do bot đặt cho lệnh
+
+        Returns:
+            ManagedOrder: Lệnh, hoặc None nếu không tồn tại
+        """
+        return self.client_orders.get(client_order_id)
+
+    async def create_limit_order(self, exchange_id, symbol, side, amount, price, time_in_force=None, client_order_id=None):
+        """
+        Đặt lệnh giới hạn kèm client order id và ghi nhận vào bảng.
+
+        Khối lượng được làm tròn xuống theo lot size, giá theo tick size về phía dễ khớp.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            side (str): 'buy' hoặc 'sell'
+            amount (float): Khối lượng
+            price (float): Giá giới hạn
+            time_in_force (str, optional): Kiểu hiệu lực ('IOC', 'FOK'), mặc định theo sàn (GTC)
+            client_order_id (str, optional): ID do bot đặt cho lệnh, mặc định tạo mới; người gọi
+                tạo trước để tìm lại lệnh nếu không nhận được phản hồi
+
+        Returns:
+            ManagedOrder: Lệnh đã được sàn xác nhận
+
+        Raises:
+            ExchangeError: Nếu sàn từ chối lệnh (lệnh được đánh dấu rejected)
+        """
+        market_cache = self.exchange_service.market_cache
+        await market_cache.ensure_loaded(exchange_id)
+        amount = market_cache.amount_to_precision(exchange_id, symbol, amount)
+        price = market_cache.price_to_precision(exchange_id, symbol, price, side)
+
+        client_order_id = client_order_id or self.new_client_order_id()
+        managed = self.register(exchange_id, symbol, side, amount, price, client_order_id=client_order_id)
+        params = {'clientOrderId': managed.client_order_id}
+        if time_in_force:
+            params['timeInForce'] = time_in_force
+
+        try:
+            if side == 'buy':
+                order = await self.exchange_service.create_limit_buy_order(exchange_id, symbol, amount, price, params)
+            else:
+                order = await self.exchange_service.create_limit_sell_order(exchange_id, symbol, amount, price, params)
+        except Exception as e:
+            managed.reject(e)
+            raise
+
+        return self.acknowledge(managed, order)
+
+    async def create_market_order(self, exchange_id, symbol, side, amount, params=None):
+        """
+        Đặt lệnh thị trường (khối lượng làm tròn xuống theo lot size) và ghi nhận vào bảng.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch
+            side (str): 'buy' hoặc 'sell'
+            amount (float): Khối lượng
+            params (dict, optional): Tham số bổ sung
+
+        Returns:
+            ManagedOrder: Lệnh đã được sàn xác nhận
+
+        Raises:
+            ExchangeError: Nếu sàn từ chối lệnh (lệnh được đánh dấu rejected)
+        """
+        market_cache = self.exchange_service.market_cache
+        await market_cache.ensure_loaded(exchange_id)
+        amount = market_cache.amount_to_precision(exchange_id, symbol, amount)
+
+        managed = self.register(exchange_id, symbol, side, amount, order_type='market')
+
+        try:
+            if side == 'buy':
+                order = await self.exchange_service.create_market_buy_order(exchange_id, symbol, amount, params)
+            else:
+                order = await self.exchange_service.create_market_sell_order(exchange_id, symbol, amount, params)
+        except Exception as e:
+            managed.reject(e)
+            raise
+
+        return self.acknowledge(managed, order)
+
+    async def create_futures_order(self, exchange_id, symbol, order_type, side, amount, params=None):
+        """
+        Đặt lệnh futures và ghi nhận vào bảng.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu của cặp giao dịch futures
+            order_type (str): Loại lệnh (market, limit)
+            side (str): 'buy' hoặc 'sell'
+            amount (float): Khối lượng
+            params (dict, optional): Tham số bổ sung (ví dụ: đòn bẩy)
+
+        Returns:
+            ManagedOrder: Lệnh đã được sàn xác nhận
+
+        Raises:
+            FuturesError: Nếu sàn từ chối lệnh (lệnh được đánh dấu rejected)
+        """
+        managed = self.register(exchange_id, symbol, side, amount, order_type=order_type)
+
+        try:
+            order = await self.exchange_service.create_futures_order(exchange_id, symbol, order_type, side, amount, params)
+        except Exception as e:
+            managed.reject(e)
+            raise
+
+        return self.acknowledge(managed, order)
+
+    async def wait(self, managed, timeout):
+        """
+        Chờ lệnh đạt trạng thái cuối (qua websocket, đối chiếu REST với tần suất thấp).
+
+        Args:
+            managed (ManagedOrder): Lệnh cần chờ
+            timeout (float): Thời gian chờ tối đa (giây)
+
+        Returns:
+            ManagedOrder: Lệnh với trạng thái mới nhất
+        """
+        if managed.order_id is not None and not managed.is_terminal:
+            managed.apply(await self.order_tracker.wait_for(managed.exchange_id, managed.order_id, managed.symbol, timeout))
+        return managed
+
+    async def locate(self, managed, attempts=CANCEL_CONFIRM_ATTEMPTS, delay=ORDER_POLL_MIN_INTERVAL):
+        """
+        Tìm trên sàn một lệnh đã gửi nhưng chưa nhận được phản hồi, theo client order id.
+
+        Lệnh được tìm trong bộ theo dõi lệnh rồi trong danh sách lệnh đang mở và đã đóng của
+        cặp giao dịch; request có thể đến sàn muộn nên việc tìm được lặp lại vài lần.
+
+        Args:
+            managed (ManagedOrder): Lệnh chưa được xác nhận
+            attempts (int): Số lần tìm
+            delay (float): Thời gian chờ giữa hai lần tìm (giây)
+
+        Returns:
+            ManagedOrder: Lệnh đã cập nhật (order_id vẫn là None nếu sàn không có lệnh)
+        """
+        if managed.order_id is not None or managed.is_terminal or not managed.client_order_id:
+            return managed
+
+        exchange_id, client_order_id = managed.exchange_id, managed.client_order_id
+        for attempt in range(attempts):
+            if attempt:
+                await asyncio.sleep(delay)
+
+            order = self.order_tracker.get(exchange_id, client_order_id=client_order_id)
+            for fetch in (self.exchange_service.fetch_open_orders, self.exchange_service.fetch_closed_orders):
+                if order is not None:
+                    break
+                try:
+                    orders = await fetch(exchange_id, managed.symbol)
+                except Exception as e:
+                    log_warning(f"Không thể tìm lệnh {client_order_id} trên {exchange_id}: {str(e)}")
+                    continue
+                order = next((o for o in orders if o.get('clientOrderId') == client_order_id), None)
+
+            if order is not None:
+                return self.acknowledge(managed, order)
+
+        log_warning(f"Không tìm thấy lệnh {client_order_id} trên {exchange_id}, coi như lệnh chưa đến sàn.")
+        return managed
+
+    async def cancel(self, managed):
+        """
+        Hủy lệnh nếu còn mở và cập nhật khối lượng đã khớp từ phản hồi.
+
+        Lệnh chưa được sàn xác nhận được tìm lại theo client order id trước khi hủy. Nếu sàn
+        báo không hủy được (thường do lệnh vừa khớp), trạng thái được đối chiếu một lần qua
+        REST để khối lượng đã khớp chính xác trước khi phòng hộ.
+
+        Args:
+            managed (ManagedOrder): Lệnh cần hủy
+
+        Returns:
+            ManagedOrder: Lệnh với trạng thái mới nhất
+        """
+        if managed.order_id is None:
+            await self.locate(managed)
+        if managed.is_terminal or managed.order_id is None:
+            return managed
+
+        try:
+            response = await self.exchange_service.cancel_order(managed.exchange_id, managed.order_id, managed.symbol)
+            managed.apply(self.order_tracker.get(managed.exchange_id, managed.order_id))
+            if isinstance(response, dict) and response.get('status') and response.get('filled') is not None:
+                managed.apply(response)
+            else:
+                # Phản hồi hủy không có khối lượng đã khớp, đối chiếu một lần qua REST
+                managed.apply(await self.order_tracker.reconcile(managed.exchange_id, managed.order_id, managed.symbol))
+            if not managed.is_terminal:
+                managed.apply({'status': 'canceled'})
+            log_info(f"Đã hủy lệnh {managed.order_id} trên {managed.exchange_id} (đã khớp {managed.filled}/{managed.amount}).")
+        except Exception as e:
+            log_warning(f"Không thể hủy lệnh {managed.order_id} trên {managed.exchange_id} (có thể đã khớp): {str(e)}")
+            managed.apply(await self.order_tracker.reconcile(managed.exchange_id, managed.order_id, managed.symbol))
+
+        return managed
@@ -1,12 +1,17 @@
 """
 Service quản lý các hoạt động đặt lệnh giao dịch.
 """
-import time
 import asyncio
 from utils.logger import log_info, log_error, log_warning
 from utils.exceptions import OrderError, OrderFillTimeoutError, FuturesError
-from configs import FIRST_ORDERS_FILL_TIMEOUT
+from configs import FIRST_ORDERS_FILL_TIMEOUT, ARBITRAGE_SUBMIT_TIMEOUT, ARBITRAGE_FILL_TIMEOUT, ARBITRAGE_EXECUTION_MODE
 from utils.helpers import extract_base_asset
+from utils.latency import latency_tracker, STAGE_FILL, STAGE_LEG_SKEW, STAGE_LEG_ACK_SKEW, ALL_EXCHANGES
+from services.order_tracker import OrderTracker
+from services.order_manager import OrderManager, ORDER_FILLED
+
+# Chế độ thực thi mà hai chân lệnh khớp ngay hoặc bị hủy, không nằm chờ trong sổ lệnh
+IMMEDIATE_EXECUTION_MODES = ('ioc', 'fok')
 
 
 class OrderService:
@@ -14,16 +19,46 @@ class OrderService:
     Lớp dịch vụ quản lý các lệnh giao dịch.
     """
     
-    def __init__(self, exchange_service):
+    def __init__(self, exchange_service, order_tracker=None, execution_mode=ARBITRAGE_EXECUTION_MODE):
         """
         Khởi tạo dịch vụ quản lý lệnh.
         
         Args:
             exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            order_tracker (OrderTracker, optional): Bộ theo dõi lệnh qua websocket (mặc định tạo mới)
+            execution_mode (str): Chế độ thực thi chân lệnh chênh lệch giá ('gtc', 'ioc' hoặc 'fok')
         """
         self.exchange_service = exchange_service
+        self.execution_mode = execution_mode
+        self.order_tracker = order_tracker or OrderTracker(exchange_service)
+        self.order_manager = OrderManager(exchange_service, self.order_tracker)
+    
+    async def close(self):
+        """Dừng các luồng theo dõi lệnh qua websocket."""
+        await self.order_tracker.close()
     
-    def place_initial_orders(self, exchanges, symbol, amount_per_exchange, price, notification_service=None):
+    async def _wait_for_fill(self, managed, timeout):
+        """
+        Chờ một lệnh khớp hết qua bộ quản lý lệnh.
+        
+        Args:
+            managed (ManagedOrder): Lệnh đã được sàn xác nhận
+            timeout (float): Thời gian chờ tối đa (giây)
+            
+        Returns:
+            bool: True nếu lệnh đã khớp hết trong thời gian chờ
+        """
+        if managed.order_id is None:
+            log_warning(f"Không có ID lệnh trên {managed.exchange_id}, không thể theo dõi trạng thái")
+            return False
+        
+        await self.order_manager.wait(managed, timeout)
+        filled = managed.state == ORDER_FILLED
+        if filled and managed.acked_at is not None:
+            latency_tracker.record(STAGE_FILL, managed.exchange_id, managed.closed_at - managed.acked_at)
+        return filled
+    
+    async def place_initial_orders(self, exchanges, symbol, amount_per_exchange, price, notification_service=None):
         """
         Đặt các lệnh mua ban đầu.
         
@@ -40,78 +75,75 @@ class OrderService:
         Raises:
             OrderError: Nếu có lỗi khi đặt lệnh
         """
-        orders_filled = 0
-        already_filled = []
+        # Theo dõi lệnh qua websocket trước khi đặt để không bỏ lỡ cập nhật
+        await asyncio.gather(*(self.order_tracker.ensure_watching(exchange_id) for exchange_id in exchanges))
         
-        # Đặt lệnh mua giới hạn trên tất cả các sàn
-        for exchange_id in exchanges:
-            try:
-                self.exchange_service.create_limit_buy_order(exchange_id, symbol, amount_per_exchange, price)
-                log_info(f"Đặt lệnh giới hạn mua {round(amount_per_exchange, 3)} {extract_base_asset(symbol)} ở giá {price} gửi đến {exchange_id}.")
-                
-                if notification_service:
-                    notification_service.send_message(f"Đặt lệnh giới hạn mua {round(amount_per_exchange, 3)} {extract_base_asset(symbol)} ở giá {price} gửi đến {exchange_id}.")
-            except Exception as e:
-                raise OrderError(exchange_id, "limit buy", str(e))
+        # Đặt đồng thời lệnh mua giới hạn trên tất cả các sàn
+        results = await asyncio.gather(
+            *(self.order_manager.create_limit_order(exchange_id, symbol, 'buy', amount_per_exchange, price) for exchange_id in exchanges),
+            return_exceptions=True
+        )
+        orders = {}  # Sàn -> ManagedOrder
+        failed = {}  # Sàn -> lỗi khi đặt lệnh
+        for exchange_id, result in zip(exchanges, results):
+            if isinstance(result, Exception):
+                failed[exchange_id] = result
+                continue
+            
+            orders[exchange_id] = result
+            log_info(f"Đặt lệnh giới hạn mua {round(amount_per_exchange, 3)} {extract_base_asset(symbol)} ở giá {price} gửi đến {exchange_id}.")
+            
+            if notification_service:
+                notification_service.send_message(f"Đặt lệnh giới hạn mua {round(amount_per_exchange, 3)} {extract_base_asset(symbol)} ở giá {price} gửi đến {exchange_id}.")
+        
+        if failed:
+            # Hủy các lệnh đã đặt và bán phần đã khớp trước khi báo lỗi
+            await asyncio.gather(*(self.order_manager.cancel(managed) for managed in orders.values()))
+            filled = [exchange_id for exchange_id, managed in orders.items() if managed.filled > 0]
+            if filled:
+                await self.emergency_sell(symbol, filled)
+            
+            exchange_id, error = next(iter(failed.items()))
+            raise OrderError(exchange_id, "limit buy", str(error))
         
         log_info("Tất cả các lệnh đã được gửi.")
         
-        # Đợi cho đến khi tất cả các lệnh được điền hoặc hết thời gian chờ
-        timeout_seconds = FIRST_ORDERS_FILL_TIMEOUT * 60 * 0.5  # Thời gian chờ tối đa
-        start_time = time.time()
+        # Đợi đồng thời cho đến khi tất cả các lệnh được điền hoặc hết thời gian chờ
+        already_filled = []
         
-        while time.time() - start_time <= timeout_seconds and orders_filled != len(exchanges):
-            for exchange_id in exchanges:
-                if exchange_id in already_filled:
-                    continue
-                    
-                try:
-                    # Kiểm tra xem lệnh đã được điền chưa
-                    open_orders = self.exchange_service.fetch_open_orders(exchange_id, symbol)
-                    
-                    if not open_orders:  # Nếu không có lệnh mở, lệnh đã được điền
-                        log_info(f"Lệnh trên {exchange_id} đã được điền.")
-                        
-                        if notification_service:
-                            notification_service.send_message(f"Lệnh trên {exchange_id} đã được điền.")
-                            
-                        orders_filled += 1
-                        already_filled.append(exchange_id)
-                except Exception as e:
-                    log_error(f"Lỗi khi kiểm tra trạng thái lệnh trên {exchange_id}: {str(e)}")
+        async def wait_for_exchange(exchange_id):
+            if await self._wait_for_fill(orders[exchange_id], FIRST_ORDERS_FILL_TIMEOUT):
+                log_info(f"Lệnh trên {exchange_id} đã được điền.")
+                
+                if notification_service:
+                    notification_service.send_message(f"Lệnh trên {exchange_id} đã được điền.")
                 
-            # Dừng 1.8 giây để giảm số lượng request
-            time.sleep(1.8)
+                already_filled.append(exchange_id)
+        
+        await asyncio.gather(*(wait_for_exchange(exchange_id) for exchange_id in exchanges))
         
         # Kiểm tra nếu có lệnh nào chưa được điền sau khi hết thời gian chờ
-        if time.time() - start_time >= timeout_seconds and orders_filled != len(exchanges):
-            message = f"Một hoặc nhiều lệnh không được điền trong khoảng {FIRST_ORDERS_FILL_TIMEOUT} phút. Hủy các lệnh và bán số lượng đã điền."
+        if len(already_filled) != len(exchanges):
+            message = f"Một hoặc nhiều lệnh không được điền trong khoảng {FIRST_ORDERS_FILL_TIMEOUT} giây. Hủy các lệnh và bán số lượng đã điền."
             log_warning(message)
             
             if notification_service:
                 notification_service.send_message(message)
             
+            # Hủy các lệnh chưa điền, phần đã khớp một phần được bán cùng các lệnh đã điền
+            unfilled = [exchange_id for exchange_id in exchanges if exchange_id not in already_filled]
+            await asyncio.gather(*(self.order_manager.cancel(orders[exchange_id]) for exchange_id in unfilled))
+            to_sell = already_filled + [exchange_id for exchange_id in unfilled if orders[exchange_id].filled > 0]
+            
             # Bán số lượng đã mua trên các sàn đã điền lệnh
-            if already_filled:
-                self.emergency_sell(symbol, already_filled)
-            
-            # Hủy các lệnh chưa điền
-            for exchange_id in exchanges:
-                if exchange_id not in already_filled:
-                    try:
-                        open_orders = self.exchange_service.fetch_open_orders(exchange_id, symbol)
-                        
-                        if open_orders:
-                            self.exchange_service.cancel_order(exchange_id, open_orders[-1]['id'], symbol)
-                            log_info(f"Đã hủy lệnh trên {exchange_id}.")
-                    except Exception as e:
-                        log_error(f"Lỗi khi hủy lệnh trên {exchange_id}: {str(e)}")
+            if to_sell:
+                await self.emergency_sell(symbol, to_sell)
             
             return False
         
         return True
     
-    def place_arbitrage_orders(self, min_ask_ex, max_bid_ex, symbol, amount, min_ask_price, max_bid_price, notification_service=None):
+    async def place_arbitrage_orders(self, min_ask_ex, max_bid_ex, symbol, amount, min_ask_price, max_bid_price, notification_service=None):
         """
         Đặt các lệnh giao dịch chênh lệch giá.
         
@@ -128,16 +160,80 @@ class OrderService:
             bool: True nếu các lệnh đã được điền, ngược lại False
             
         Raises:
-            OrderError: Nếu có lỗi khi đặt lệnh
+            OrderError: Nếu có lỗi khi đặt lệnh hoặc cả hai chân lệnh đều không được sàn chấp nhận
         """
         try:
-            # Đặt lệnh bán giới hạn trên sàn có giá cao
-            self.exchange_service.create_limit_sell_order(max_bid_ex, symbol, amount, max_bid_price)
-            log_info(f"Lệnh bán giới hạn đã gửi đến {max_bid_ex} cho {amount} {extract_base_asset(symbol)} ở giá {max_bid_price}, đợi 3 phút để điền.")
+            # Theo dõi lệnh qua websocket trước khi đặt để không bỏ lỡ cập nhật
+            market_cache = self.exchange_service.market_cache
+            await asyncio.gather(
+                self.order_tracker.ensure_watching(min_ask_ex), self.order_tracker.ensure_watching(max_bid_ex),
+                market_cache.load([min_ask_ex, max_bid_ex])
+            )
+            
+            # Hai chân lệnh cùng khối lượng, hợp lệ theo lot size của cả hai sàn
+            amount = market_cache.common_amount([min_ask_ex, max_bid_ex], symbol, amount)
+            if not (market_cache.meets_minimums(min_ask_ex, symbol, amount, min_ask_price)
+                    and market_cache.meets_minimums(max_bid_ex, symbol, amount, max_bid_price)):
+                log_warning(f"Khối lượng {amount} {extract_base_asset(symbol)} dưới mức tối thiểu của {min_ask_ex}/{max_bid_ex}, bỏ qua giao dịch.")
+                return False
+            
+            # Ở chế độ IOC/FOK, kết quả khớp có ngay trong phản hồi và phần dư được phòng hộ ngay
+            immediate = self.execution_mode in IMMEDIATE_EXECUTION_MODES
+            fill_timeout = ARBITRAGE_SUBMIT_TIMEOUT if immediate else ARBITRAGE_FILL_TIMEOUT
+            sell_tif = self._time_in_force(max_bid_ex)
+            buy_tif = self._time_in_force(min_ask_ex)
+            
+            # Gửi đồng thời lệnh bán trên sàn có giá cao và lệnh mua trên sàn có giá thấp
+            # Client order id được tạo trước để tìm lại chân lệnh không được xác nhận kịp
+            sell_id = self.order_manager.new_client_order_id()
+            buy_id = self.order_manager.new_client_order_id()
+            sell_task = asyncio.create_task(self.order_manager.create_limit_order(
+                max_bid_ex, symbol, 'sell', amount, max_bid_price, sell_tif, client_order_id=sell_id
+            ))
+            buy_task = asyncio.create_task(self.order_manager.create_limit_order(
+                min_ask_ex, symbol, 'buy', amount, min_ask_price, buy_tif, client_order_id=buy_id
+            ))
+            
+            # Hạn chót chung cho cả hai chân lệnh
+            _, pending = await asyncio.wait((sell_task, buy_task), timeout=ARBITRAGE_SUBMIT_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            # cancel() chỉ yêu cầu hủy, chờ tác vụ kết thúc trước khi đọc kết quả
+            await asyncio.gather(*pending, return_exceptions=True)
+            
+            sell_order = self._leg_result(sell_task, max_bid_ex, "bán")
+            buy_order = self._leg_result(buy_task, min_ask_ex, "mua")
+            
+            if sell_order is None and buy_order is None:
+                # Lệnh không được xác nhận kịp vẫn có thể đã đến sàn: hủy và phòng hộ trước khi báo lỗi
+                sell_order, buy_order = await asyncio.gather(
+                    self._cancel_unacknowledged(sell_task, sell_id), self._cancel_unacknowledged(buy_task, buy_id)
+                )
+                await self._hedge_imbalance(buy_order, sell_order, symbol)
+                raise OrderError(f"{min_ask_ex}/{max_bid_ex}", "arbitrage", "Cả hai chân lệnh đều không được sàn chấp nhận")
+            
+            if sell_order is None or buy_order is None:
+                # Chỉ một chân lệnh được chấp nhận: hủy và đưa chân đó về trạng thái ban đầu
+                # Lệnh không được xác nhận kịp vẫn có thể đã đến sàn nhưng chưa có ID
+                if sell_order is None:
+                    buy_order, sell_order = await asyncio.gather(
+                        self.order_manager.cancel(buy_order), self._cancel_unacknowledged(sell_task, sell_id)
+                    )
+                else:
+                    sell_order, buy_order = await asyncio.gather(
+                        self.order_manager.cancel(sell_order), self._cancel_unacknowledged(buy_task, buy_id)
+                    )
+                await self._hedge_imbalance(buy_order, sell_order, symbol)
+                
+                if notification_service:
+                    notification_service.send_message(
+                        f"Chỉ một chân lệnh chênh lệch giá được chấp nhận ({min_ask_ex}/{max_bid_ex}), đã hủy giao dịch."
+                    )
+                return False
             
-            # Đặt lệnh mua giới hạn trên sàn có giá thấp
-            self.exchange_service.create_limit_buy_order(min_ask_ex, symbol, amount, min_ask_price)
-            log_info(f"Lệnh mua giới hạn đã gửi đến {min_ask_ex} cho {amount} {extract_base_asset(symbol)} ở giá {min_ask_price}, đợi 3 phút để điền.")
+            self._report_leg_skew(sell_order, buy_order)
+            log_info(f"Lệnh bán giới hạn {sell_tif or 'GTC'} đã gửi đến {max_bid_ex} cho {amount} {extract_base_asset(symbol)} ở giá {max_bid_price}, đợi tối đa {fill_timeout} giây để điền.")
+            log_info(f"Lệnh mua giới hạn {buy_tif or 'GTC'} đã gửi đến {min_ask_ex} cho {amount} {extract_base_asset(symbol)} ở giá {min_ask_price}, đợi tối đa {fill_timeout} giây để điền.")
             
             if notification_service:
                 notification_service.send_message(
@@ -146,90 +242,145 @@ class OrderService:
                     f"- Mua giới hạn: {min_ask_ex} {amount} {extract_base_asset(symbol)} @ {min_ask_price}"
                 )
             
-            # Thiết lập thời gian chờ tối đa cho việc điền lệnh
-            cancel_order_timeout = time.time() + 180  # 3 phút
-            already_filled = []
-            
-            # Kiểm tra liên tục trạng thái lệnh
-            while time.time() < cancel_order_timeout:
-                time.sleep(2)
-                
-                # Kiểm tra lệnh mua
-                buy_orders = self.exchange_service.fetch_open_orders(min_ask_ex, symbol)
-                
-                # Kiểm tra lệnh bán
-                sell_orders = self.exchange_service.fetch_open_orders(max_bid_ex, symbol)
-                
-                # Cập nhật danh sách lệnh đã điền
-                if not buy_orders and min_ask_ex not in already_filled:
-                    already_filled.append(min_ask_ex)
-                    log_info(f"Lệnh mua trên {min_ask_ex} đã được điền!")
-                    
-                    if notification_service:
-                        notification_service.send_message(f"Lệnh mua trên {min_ask_ex} đã được điền!")
-                
-                if not sell_orders and max_bid_ex not in already_filled:
-                    already_filled.append(max_bid_ex)
-                    log_info(f"Lệnh bán trên {max_bid_ex} đã được điền!")
+            # Chờ cả hai lệnh khớp qua bộ quản lý lệnh. Lệnh IOC/FOK thường đã ở trạng thái cuối
+            # trong phản hồi; nếu sàn chỉ trả về ID, trạng thái được lấy từ luồng lệnh hoặc REST
+            async def wait_for_leg(managed, side_name):
+                filled = await self._wait_for_fill(managed, fill_timeout)
+                if filled:
+                    log_info(f"Lệnh {side_name} trên {managed.exchange_id} đã được điền!")
                     
                     if notification_service:
-                        notification_service.send_message(f"Lệnh bán trên {max_bid_ex} đã được điền!")
-                
-                # Nếu cả hai lệnh đều đã điền thì thoát vòng lặp
-                if not buy_orders and not sell_orders:
-                    return True
+                        notification_service.send_message(f"Lệnh {side_name} trên {managed.exchange_id} đã được điền!")
+                return filled
+            
+            buy_filled, sell_filled = await asyncio.gather(wait_for_leg(buy_order, "mua"), wait_for_leg(sell_order, "bán"))
+            
+            # Nếu cả hai lệnh đều đã điền thì kết thúc
+            if buy_filled and sell_filled:
+                return True
             
             # Xử lý trường hợp lệnh chưa được điền sau thời gian chờ
-            if buy_orders and not sell_orders:
-                # Lệnh mua chưa điền nhưng lệnh bán đã điền
-                log_warning(f"Lệnh mua trên {min_ask_ex} không được điền trong 3 phút.")
-                
-                # Hủy lệnh mua
-                self.exchange_service.cancel_order(min_ask_ex, buy_orders[0]['id'], symbol)
-                log_info(f"Đã hủy lệnh mua trên {min_ask_ex}.")
-                
-                # Tạo lệnh mua thị trường để cân bằng
-                log_info("Tạo lệnh mua thị trường ngược lại...")
-                last_orders = self.exchange_service.fetch_closed_orders(max_bid_ex, symbol)
-                
-                if last_orders:
-                    amount_filled = last_orders[-1]["filled"]
-                    self.exchange_service.create_market_buy_order(max_bid_ex, symbol, amount_filled)
-                    log_info(f"Đã tạo lệnh mua thị trường trên {max_bid_ex} cho {amount_filled} {extract_base_asset(symbol)}.")
-                
-            elif sell_orders and not buy_orders:
-                # Lệnh bán chưa điền nhưng lệnh mua đã điền
-                log_warning(f"Lệnh bán trên {max_bid_ex} không được điền trong 3 phút.")
-                
-                # Hủy lệnh bán
-                self.exchange_service.cancel_order(max_bid_ex, sell_orders[0]['id'], symbol)
-                log_info(f"Đã hủy lệnh bán trên {max_bid_ex}.")
-                
-                # Tạo lệnh bán thị trường để cân bằng
-                last_orders = self.exchange_service.fetch_closed_orders(min_ask_ex, symbol)
-                
-                if last_orders:
-                    amount_filled = last_orders[-1]["filled"]
-                    self.exchange_service.create_market_sell_order(min_ask_ex, symbol, amount_filled)
-                    log_info(f"Lệnh bán thị trường đã được điền trên {min_ask_ex}. Có thể có tổn thất nhỏ.")
-            
-            elif buy_orders and sell_orders:
-                # Cả hai lệnh đều chưa điền
-                log_warning("2 lệnh không được điền trong 120 giây. Đang hủy...")
-                
-                # Hủy cả hai lệnh
-                self.exchange_service.cancel_order(min_ask_ex, buy_orders[0]['id'], symbol)
-                self.exchange_service.cancel_order(max_bid_ex, sell_orders[0]['id'], symbol)
-                log_info("Đã hủy cả hai lệnh.")
+            if not buy_filled and sell_filled:
+                log_warning(f"Lệnh mua trên {min_ask_ex} không được điền hết (đã khớp {buy_order.filled}/{amount}).")
+            elif not sell_filled and buy_filled:
+                log_warning(f"Lệnh bán trên {max_bid_ex} không được điền hết (đã khớp {sell_order.filled}/{amount}).")
+            else:
+                log_warning("2 lệnh không được điền hết. Đang hủy...")
+            
+            # Hủy các lệnh chưa điền rồi cân bằng phần chênh lệch đã khớp (kể cả khớp một phần)
+            await asyncio.gather(self.order_manager.cancel(buy_order), self.order_manager.cancel(sell_order))
+            await self._hedge_imbalance(buy_order, sell_order, symbol)
             
             return False
             
+        except OrderError:
+            raise
         except Exception as e:
             raise OrderError(f"{min_ask_ex}/{max_bid_ex}", "arbitrage", str(e))
     
-    def emergency_sell(self, symbol, exchanges):
+    def _time_in_force(self, exchange_id):
+        """
+        Chọn kiểu hiệu lực cho chân lệnh chênh lệch giá theo chế độ thực thi.
+        
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            
+        Returns:
+            str: 'FOK' hoặc 'IOC', hoặc None với lệnh GTC thông thường
+        """
+        if self.execution_mode == 'fok' and self.exchange_service.supports_time_in_force(exchange_id, 'FOK'):
+            return 'FOK'
+        if self.execution_mode in IMMEDIATE_EXECUTION_MODES:
+            return 'IOC'
+        return None
+    
+    def _leg_result(self, task, exchange_id, side_name):
+        """
+        Lấy kết quả của một chân lệnh sau hạn chót.
+        
+        Args:
+            task (asyncio.Task): Tác vụ gửi lệnh
+            exchange_id (str): ID của sàn giao dịch
+            side_name (str): Tên chiều lệnh dùng trong log
+            
+        Returns:
+            ManagedOrder: Lệnh đã được sàn xác nhận, hoặc None nếu sàn từ chối hoặc không xác nhận kịp
+        """
+        if task.cancelled():
+            log_warning(f"Lệnh {side_name} trên {exchange_id} không được xác nhận trong {ARBITRAGE_SUBMIT_TIMEOUT} giây")
+            return None
+        
+        if task.exception() is not None:
+            log_error(f"Lệnh {side_name} trên {exchange_id} bị từ chối: {str(task.exception())}")
+            return None
+        
+        return task.result()
+    
+    async def _cancel_unacknowledged(self, task, client_order_id):
+        """
+        Hủy chân lệnh không được sàn xác nhận trước hạn chót, chỉ theo client order id của nó.
+        
+        Lệnh khác của bot trên cùng sàn và cặp (của các giao dịch đang chạy song song) không bị động tới.
+        
+        Args:
+            task (asyncio.Task): Tác vụ gửi lệnh
+            client_order_id (str): ID do bot đặt cho lệnh
+            
+        Returns:
+            ManagedOrder: Lệnh với khối lượng đã khớp mới nhất, hoặc None nếu lệnh bị từ chối hoặc chưa được gửi
+        """
+        if not task.cancelled():
+            return None
+        
+        managed = self.order_manager.get_by_client_id(client_order_id)
+        if managed is None:
+            return None
+        
+        return await self.order_manager.cancel(managed)
+    
+    async def _hedge_imbalance(self, buy_order, sell_order, symbol):
         """
-        Bán khẩn cấp tiền mã hóa trên các sàn.
+        Cân bằng chênh lệch giữa khối lượng đã mua và đã bán bằng lệnh thị trường.
+        
+        Phần mua thừa được bán lại trên sàn mua, phần bán thừa được mua lại trên sàn bán,
+        nên tổng lượng crypto trở về như trước giao dịch.
+        
+        Args:
+            buy_order (ManagedOrder): Chân mua (None nếu không được chấp nhận)
+            sell_order (ManagedOrder): Chân bán (None nếu không được chấp nhận)
+            symbol (str): Ký hiệu của cặp giao dịch
+        """
+        bought = buy_order.filled if buy_order else 0
+        sold = sell_order.filled if sell_order else 0
+        imbalance = bought - sold
+        
+        if imbalance > 1e-12:
+            log_info(f"Bán thị trường {imbalance} {extract_base_asset(symbol)} trên {buy_order.exchange_id} để cân bằng (mua {bought}, bán {sold}).")
+            await self.order_manager.create_market_order(buy_order.exchange_id, symbol, 'sell', imbalance)
+        elif imbalance < -1e-12:
+            log_info(f"Mua thị trường {-imbalance} {extract_base_asset(symbol)} trên {sell_order.exchange_id} để cân bằng (mua {bought}, bán {sold}).")
+            await self.order_manager.create_market_order(sell_order.exchange_id, symbol, 'buy', -imbalance)
+    
+    def _report_leg_skew(self, sell_order, buy_order):
+        """
+        Ghi độ lệch thời gian giữa hai chân lệnh.
+        
+        Args:
+            sell_order (ManagedOrder): Chân bán
+            buy_order (ManagedOrder): Chân mua
+        """
+        send_gap = abs(sell_order.created_at - buy_order.created_at)
+        ack_gap = abs(sell_order.acked_at - buy_order.acked_at)
+        latency_tracker.record(STAGE_LEG_SKEW, ALL_EXCHANGES, send_gap)
+        latency_tracker.record(STAGE_LEG_ACK_SKEW, ALL_EXCHANGES, ack_gap)
+        log_info(
+            f"Độ lệch giữa hai chân lệnh ({sell_order.exchange_id}/{buy_order.exchange_id}): gửi {send_gap * 1000:.2f}ms, "
+            f"xác nhận {ack_gap * 1000:.2f}ms"
+        )
+    
+    async def emergency_sell(self, symbol, exchanges):
+        """
+        Bán khẩn cấp tiền mã hóa đồng thời trên các sàn.
         
         Args:
             symbol (str): Ký hiệu của cặp giao dịch
@@ -238,15 +389,17 @@ class OrderService:
         Returns:
             bool: True nếu thành công, ngược lại False
         """
-        for exchange_id in exchanges:
+        async def convert(exchange_id):
             try:
-                self.exchange_service.emergency_convert(exchange_id, symbol)
+                await self.exchange_service.emergency_convert(exchange_id, symbol)
             except Exception as e:
                 log_error(f"Lỗi khi bán khẩn cấp trên {exchange_id}: {str(e)}")
         
+        await asyncio.gather(*(convert(exchange_id) for exchange_id in exchanges))
+        
         return True
     
-    def place_futures_short_order(self, exchange_id, symbol, amount, leverage=1):
+    async def place_futures_short_order(self, exchange_id, symbol, amount, leverage=1):
         """
         Đặt lệnh Short trên thị trường Futures.
         
@@ -257,7 +410,7 @@ class OrderService:
             leverage (int): Đòn bẩy
             
         Returns:
-            dict: Thông tin lệnh
+            ManagedOrder: Lệnh đã được sàn xác nhận
             
         Raises:
             FuturesError: Nếu có lỗi khi đặt lệnh
@@ -268,15 +421,16 @@ class OrderService:
                 symbol = f"{extract_base_asset(symbol)}:USDT"
             
             # Đặt lệnh bán thị trường với đòn bẩy
+            await self.order_tracker.ensure_watching(exchange_id)
             params = {'leverage': leverage}
-            order = self.exchange_service.create_futures_order(exchange_id, symbol, 'market', 'sell', amount, params)
+            order = await self.order_manager.create_futures_order(exchange_id, symbol, 'market', 'sell', amount, params)
             log_info(f"Đã đặt lệnh short trên {exchange_id} cho {amount} {extract_base_asset(symbol)} với đòn bẩy {leverage}x")
             
             return order
         except Exception as e:
             raise FuturesError(exchange_id, f"Không thể đặt lệnh short: {str(e)}")
     
-    def close_futures_short_order(self, exchange_id, symbol, amount, leverage=1):
+    async def close_futures_short_order(self, exchange_id, symbol, amount, leverage=1):
         """
         Đóng lệnh Short trên thị trường Futures.
         
@@ -287,7 +441,7 @@ class OrderService:
             leverage (int): Đòn bẩy
             
         Returns:
-            dict: Thông tin lệnh
+            ManagedOrder: Lệnh đã được sàn xác nhận
             
         Raises:
             FuturesError: Nếu có lỗi khi đặt lệnh
@@ -299,20 +453,19 @@ class OrderService:
             
             # Đặt lệnh mua thị trường để đóng vị thế short
             params = {'leverage': leverage}
-            order = self.exchange_service.create_futures_order(exchange_id, symbol, 'market', 'buy', amount, params)
+            order = await self.order_manager.create_futures_order(exchange_id, symbol, 'market', 'buy', amount, params)
             log_info(f"Đã đóng lệnh short trên {exchange_id} cho {amount} {extract_base_asset(symbol)} với đòn bẩy {leverage}x")
             
             return order
         except Exception as e:
             raise FuturesError(exchange_id, f"Không thể đóng lệnh short: {str(e)}")
     
-    def wait_for_futures_order_fill(self, exchange_id, symbol, timeout=120):
+    async def wait_for_futures_order_fill(self, order, timeout=120):
         """
         Đợi cho đến khi lệnh Futures được điền.
         
         Args:
-            exchange_id (str): ID của sàn giao dịch
-            symbol (str): Ký hiệu của cặp giao dịch
+            order (ManagedOrder): Lệnh do place_futures_short_order trả về
             timeout (int): Thời gian chờ tối đa (giây)
             
         Returns:
@@ -322,43 +475,21 @@ class OrderService:
             OrderFillTimeoutError: Nếu lệnh không được điền trong thời gian quy định
         """
         try:
-            # Đảm bảo đây là một symbol Futures hợp lệ
-            if not symbol.endswith(':USDT'):
-                symbol = f"{extract_base_asset(symbol)}:USDT"
-            
-            start_time = time.time()
-            
-            while time.time() - start_time < timeout:
-                # Kiểm tra các lệnh đang mở
-                open_orders = self.exchange_service.fetch_open_orders(exchange_id, symbol)
-                
-                if not open_orders:
-                    # Không có lệnh đang mở, tức là lệnh đã được điền
-                    log_info(f"Lệnh Futures trên {exchange_id} đã được điền.")
-                    return True
-                
-                # Dừng 1 giây để giảm số lượng request
-                time.sleep(1)
-            
-            # Nếu vẫn còn lệnh đang mở sau khi hết thời gian chờ
-            open_orders = self.exchange_service.fetch_open_orders(exchange_id, symbol)
-            
-            if open_orders:
-                # Hủy lệnh đầu tiên
-                order_id = open_orders[0]['id']
-                self.exchange_service.cancel_order(exchange_id, order_id, symbol)
-                
-                raise OrderFillTimeoutError(exchange_id, order_id, timeout)
+            if await self._wait_for_fill(order, timeout):
+                log_info(f"Lệnh Futures trên {order.exchange_id} đã được điền.")
+                return True
             
-            return True
+            # Hủy lệnh nếu vẫn chưa khớp sau khi hết thời gian chờ
+            await self.order_manager.cancel(order)
+            raise OrderFillTimeoutError(order.exchange_id, order.order_id, timeout)
             
         except Exception as e:
             if isinstance(e, OrderFillTimeoutError):
                 raise
             
-            raise FuturesError(exchange_id, f"Lỗi khi đợi lệnh futures được điền: {str(e)}")
+            raise FuturesError(order.exchange_id, f"Lỗi khi đợi lệnh futures được điền: {str(e)}")
     
-    def set_futures_leverage(self, exchange_id, symbol, leverage):
+    async def set_futures_leverage(self, exchange_id, symbol, leverage):
         """
         Thiết lập đòn bẩy cho một cặp giao dịch trên thị trường Futures.
         
@@ -381,7 +512,8 @@ class OrderService:
             exchange = self.exchange_service.get_exchange(exchange_id)
             
             if hasattr(exchange, 'set_leverage'):
-                result = exchange.set_leverage(leverage, symbol)
+                await self.exchange_service.request_scheduler.acquire(exchange_id, 'set_leverage', exchange)
+                result = await exchange.set_leverage(leverage, symbol)
                 log_info(f"Đã thiết lập đòn bẩy {leverage}x cho {symbol} trên {exchange_id}")
                 return result
             else:
@@ -390,7 +522,7 @@ class OrderService:
         except Exception as e:
             raise FuturesError(exchange_id, f"Không thể thiết lập đòn bẩy: {str(e)}")
     
-    def check_futures_position(self, exchange_id, symbol):
+    async def check_futures_position(self, exchange_id, symbol):
         """
         Kiểm tra vị thế Futures hiện tại.
         
@@ -412,7 +544,8 @@ class OrderService:
             exchange = self.exchange_service.get_exchange(exchange_id)
             
             if hasattr(exchange, 'fetch_positions'):
-                positions = exchange.fetch_positions([symbol])
+                await self.exchange_service.request_scheduler.acquire(exchange_id, 'fetch_positions', exchange)
+                positions = await exchange.fetch_positions([symbol])
                 
                 if positions and len(positions) > 0:
                     for position in positions:
@@ -428,7 +561,7 @@ class OrderService:
         except Exception as e:
             raise FuturesError(exchange_id, f"Không thể kiểm tra vị thế: {str(e)}")
             
-    def get_futures_balance(self, exchange_id, asset='USDT'):
+    async def get_futures_balance(self, exchange_id, asset='USDT'):
         """
         Lấy số dư trên tài khoản Futures.
         
@@ -446,7 +579,8 @@ class OrderService:
             exchange = self.exchange_service.get_exchange(exchange_id)
             
             if hasattr(exchange, 'fetch_balance'):
-                balance = exchange.fetch_balance()
+                await self.exchange_service.request_scheduler.acquire(exchange_id, 'fetch_balance', exchange)
+                balance = await exchange.fetch_balance()
                 
                 if asset in balance['free']:
                     log_info(f"Số dư Futures {asset} trên {exchange_id}: {balance['free'][asset]}")
@@ -0,0 +1,405 @@
+"""
+Theo dõi trạng thái lệnh qua websocket (watch_orders/watch_my_trades) thay cho việc hỏi REST liên tục.
+"""
+import asyncio
+
+import ccxt
+import ccxt.pro
+
+from utils.logger import log_info, log_warning, log_error
+from configs import NETWORK_ERROR_DELAY, ORDER_RECONCILE_INTERVAL, ORDER_POLL_MIN_INTERVAL, ORDER_HISTORY_SIZE
+
+# Trạng thái ccxt mà lệnh không còn thay đổi nữa
+TERMINAL_STATUSES = ('closed', 'canceled', 'cancelled', 'expired', 'rejected')
+
+
+class OrderTracker:
+    """
+    Bảng lệnh trong bộ nhớ được cập nhật từ luồng websocket của mỗi sàn.
+
+    Lệnh được tra cứu theo (sàn, order id) hoặc (sàn, client order id). Người gọi chờ
+    một lệnh đạt trạng thái cuối bằng wait_for; trong lúc chờ, trạng thái được đối chiếu
+    qua REST với tần suất thấp để không bỏ lỡ cập nhật khi websocket bị gián đoạn.
+    Với sàn không có luồng lệnh, việc đối chiếu bắt đầu nhanh và giãn dần (backoff).
+    Chỉ history_size lệnh đã kết thúc gần nhất được giữ lại trong bộ nhớ.
+    """
+
+    def __init__(self, exchange_service, reconcile_interval=ORDER_RECONCILE_INTERVAL, min_poll_interval=ORDER_POLL_MIN_INTERVAL,
+                 history_size=ORDER_HISTORY_SIZE):
+        """
+        Khởi tạo bộ theo dõi lệnh.
+
+        Args:
+            exchange_service (ExchangeService): Dịch vụ sàn giao dịch
+            reconcile_interval (float): Khoảng thời gian đối chiếu qua REST khi chờ (giây)
+            min_poll_interval (float): Khoảng đối chiếu ban đầu khi sàn không có luồng lệnh (giây)
+            history_size (int): Số lệnh đã kết thúc được giữ lại trong bộ nhớ
+        """
+        self.exchange_service = exchange_service
+        self.reconcile_interval = reconcile_interval
+        self.min_poll_interval = min(min_poll_interval, reconcile_interval)
+        self.history_size = history_size
+        self.orders = {}  # (sàn, order id) -> lệnh, theo thứ tự ghi nhận
+        self.client_order_ids = {}  # (sàn, client order id) -> order id
+        self.terminal_events = {}  # (sàn, order id) -> asyncio.Event báo lệnh đạt trạng thái cuối
+        self.applied_trades = {}  # (sàn, order id) -> ID các giao dịch đã cộng vào lệnh, tránh cộng trùng
+        self.waiting = {}  # (sàn, order id) -> số người đang chờ lệnh, không bị loại khỏi bộ nhớ
+        self.pending_trades = {}  # (sàn, order id) -> giao dịch khớp đến trước khi lệnh được ghi nhận
+        self.watchers = {}  # Sàn -> tác vụ theo dõi lệnh
+        self.streaming = set()  # Các sàn đang nhận cập nhật lệnh qua websocket
+        self.fill_listeners = []  # Hàm gọi lại (sàn, lệnh) khi khối lượng khớp của một lệnh tăng
+
+    @staticmethod
+    def is_terminal(order):
+        """
+        Kiểm tra lệnh đã đạt trạng thái cuối.
+
+        Args:
+            order (dict): Lệnh theo định dạng ccxt
+
+        Returns:
+            bool: True nếu lệnh đã khớp hết, bị hủy, hết hạn hoặc bị từ chối
+        """
+        return order is not None and order.get('status') in TERMINAL_STATUSES
+
+    async def ensure_watching(self, exchange_id):
+        """
+        Bắt đầu theo dõi lệnh trên một sàn (nếu chưa) trước khi đặt lệnh.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        if exchange_id in self.watchers and not self.watchers[exchange_id].done():
+            return
+
+        self.watchers[exchange_id] = asyncio.create_task(self._watch(exchange_id))
+        # Nhường cho tác vụ theo dõi đăng ký luồng trước khi lệnh được gửi
+        await asyncio.sleep(0)
+
+    def is_streaming(self, exchange_id):
+        """
+        Kiểm tra sàn có đang nhận cập nhật lệnh qua websocket.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            bool: True nếu luồng theo dõi lệnh của sàn đang chạy
+        """
+        return exchange_id in self.streaming
+
+    def track(self, exchange_id, order):
+        """
+        Ghi nhận một lệnh vừa được sàn xác nhận.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order (dict): Lệnh do sàn trả về khi đặt
+
+        Returns:
+            dict: Trạng thái hiện tại của lệnh trong bảng
+        """
+        current = self.update(exchange_id, order)
+        if current is None:
+            return None
+
+        # Giao dịch khớp qua watch_my_trades có thể đến trước phản hồi đặt lệnh
+        trades = self.pending_trades.pop((exchange_id, str(current['id'])), None)
+        if trades and not self.is_terminal(current):
+            applied = self.applied_trades.setdefault((exchange_id, str(current['id'])), set())
+            trades = [trade for trade in trades if trade.get('id') is None or trade['id'] not in applied]
+            applied.update(trade['id'] for trade in trades if trade.get('id') is not None)
+
+            # Phản hồi đặt lệnh có thể đã gồm các giao dịch này, chỉ nhận phần khớp nhiều hơn
+            filled = sum(trade.get('amount') or 0 for trade in trades)
+            if filled > (current.get('filled') or 0):
+                cost = sum(trade.get('cost') or 0 for trade in trades)
+                self.update(exchange_id, self._fill_update(current, filled, cost))
+        return current
+
+    def update(self, exchange_id, order):
+        """
+        Gộp một trạng thái mới của lệnh vào bảng.
+
+        Cập nhật websocket có thể đến trước phản hồi REST của lệnh, nên trạng thái cuối
+        không bị ghi đè bởi trạng thái cũ hơn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order (dict): Lệnh theo định dạng ccxt
+
+        Returns:
+            dict: Trạng thái hiện tại của lệnh, hoặc None nếu lệnh không có ID
+        """
+        if not order or order.get('id') is None:
+            return None
+
+        key = (exchange_id, str(order['id']))
+        current = self.orders.get(key)
+        if current is None:
+            current = self.orders[key] = {}
+            self._prune()
+        elif self.is_terminal(current) and not self.is_terminal(order):
+            return current
+
+        filled_before = current.get('filled') or 0
+        current.update({field: value for field, value in order.items() if value is not None})
+
+        if (current.get('filled') or 0) > filled_before:
+            for listener in self.fill_listeners:
+                listener(exchange_id, current)
+
+        if current.get('clientOrderId'):
+            self.client_order_ids[(exchange_id, current['clientOrderId'])] = key[1]
+
+        if self.is_terminal(current):
+            self._terminal_event(key).set()
+
+        return current
+
+    def _prune(self):
+        """
+        Loại các lệnh cũ nhất đã kết thúc và không còn ai chờ khi bảng vượt quá history_size.
+
+        Bảng được thu về một nửa history_size mỗi lần nên chi phí duyệt được chia đều cho các lệnh.
+        """
+        if len(self.orders) <= self.history_size:
+            return
+
+        excess = len(self.orders) - self.history_size // 2
+        stale = [key for key, order in self.orders.items() if self.is_terminal(order) and key not in self.waiting][:excess]
+        for key in stale:
+            self.forget(*key)
+
+    def forget(self, exchange_id, order_id):
+        """
+        Xóa một lệnh cùng các chỉ mục của nó khỏi bộ nhớ.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str): ID của lệnh
+        """
+        key = (exchange_id, str(order_id))
+        order = self.orders.pop(key, None)
+        if order and order.get('clientOrderId'):
+            self.client_order_ids.pop((exchange_id, order['clientOrderId']), None)
+        self.terminal_events.pop(key, None)
+        self.applied_trades.pop(key, None)
+
+    def add_fill_listener(self, listener):
+        """
+        Đăng ký hàm được gọi mỗi khi một lệnh của bot khớp thêm.
+
+        Args:
+            listener (callable): Hàm nhận (ID sàn, lệnh)
+        """
+        self.fill_listeners.append(listener)
+
+    def get(self, exchange_id, order_id=None, client_order_id=None):
+        """
+        Tra cứu một lệnh theo order id hoặc client order id.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str, optional): ID của lệnh trên sàn
+            client_order_id (str, optional): ID do bot đặt cho lệnh
+
+        Returns:
+            dict: Trạng thái hiện tại của lệnh, hoặc None nếu chưa ghi nhận
+        """
+        if order_id is None and client_order_id is not None:
+            order_id = self.client_order_ids.get((exchange_id, client_order_id))
+        if order_id is None:
+            return None
+        return self.orders.get((exchange_id, str(order_id)))
+
+    async def wait_for(self, exchange_id, order_id, symbol, timeout):
+        """
+        Chờ một lệnh đạt trạng thái cuối.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str): ID của lệnh
+            symbol (str): Ký hiệu của cặp giao dịch (dùng khi đối chiếu qua REST)
+            timeout (float): Thời gian chờ tối đa (giây)
+
+        Returns:
+            dict: Trạng thái mới nhất của lệnh (người gọi kiểm tra 'status'), hoặc None nếu không rõ
+        """
+        key = (exchange_id, str(order_id))
+        event = self._terminal_event(key)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        poll_interval = self.min_poll_interval
+        self.waiting[key] = self.waiting.get(key, 0) + 1
+
+        try:
+            while not event.is_set():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+
+                # Có websocket thì chỉ đối chiếu thưa, không có thì hỏi nhanh rồi giãn dần
+                interval = self.reconcile_interval if self.is_streaming(exchange_id) else poll_interval
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, interval))
+                except asyncio.TimeoutError:
+                    filled_before = (self.orders.get(key) or {}).get('filled')
+                    order = await self.reconcile(exchange_id, order_id, symbol)
+                    if order is not None and order.get('filled') != filled_before:
+                        poll_interval = self.min_poll_interval
+                    else:
+                        poll_interval = min(poll_interval * 2, self.reconcile_interval)
+
+            return self.orders.get(key)
+        finally:
+            self.waiting[key] -= 1
+            if not self.waiting[key]:
+                del self.waiting[key]
+
+    async def reconcile(self, exchange_id, order_id, symbol):
+        """
+        Đối chiếu trạng thái một lệnh qua REST.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            order_id (str): ID của lệnh
+            symbol (str): Ký hiệu của cặp giao dịch
+
+        Returns:
+            dict: Trạng thái hiện tại của lệnh trong bảng
+        """
+        try:
+            order = await self.exchange_service.fetch_order(exchange_id, order_id, symbol)
+            return self.update(exchange_id, order)
+        except Exception as e:
+            log_error(f"Lỗi khi đối chiếu lệnh {order_id} trên {exchange_id}: {str(e)}")
+            return self.get(exchange_id, order_id)
+
+    def _terminal_event(self, key):
+        """Lấy sự kiện trạng thái cuối của một lệnh."""
+        if key not in self.terminal_events:
+            self.terminal_events[key] = asyncio.Event()
+        return self.terminal_events[key]
+
+    def _apply_trade(self, exchange_id, trade):
+        """
+        Cộng một giao dịch khớp (watch_my_trades) vào lệnh tương ứng.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            trade (dict): Giao dịch theo định dạng ccxt
+        """
+        order = self.get(exchange_id, trade.get('order'))
+        if order is None:
+            # Lệnh chưa được ghi nhận: giữ lại tới khi track() được gọi
+            if trade.get('order') is not None:
+                self.pending_trades.setdefault((exchange_id, str(trade['order'])), []).append(trade)
+                if len(self.pending_trades) > self.history_size:
+                    # Giao dịch của lệnh không do bot đặt: bỏ lệnh cũ nhất
+                    del self.pending_trades[next(iter(self.pending_trades))]
+            return
+        if self.is_terminal(order):
+            return
+
+        if trade.get('id') is not None:
+            applied = self.applied_trades.setdefault((exchange_id, str(order['id'])), set())
+            if trade['id'] in applied:
+                return
+            applied.add(trade['id'])
+
+        filled = (order.get('filled') or 0) + (trade.get('amount') or 0)
+        cost = (order.get('cost') or 0) + (trade.get('cost') or 0)
+        self.update(exchange_id, self._fill_update(order, filled, cost))
+
+    @staticmethod
+    def _fill_update(order, filled, cost):
+        """
+        Tạo cập nhật lệnh từ tổng khối lượng và giá trị đã khớp.
+
+        Args:
+            order (dict): Lệnh hiện tại
+            filled (float): Tổng khối lượng đã khớp
+            cost (float): Tổng giá trị đã khớp
+
+        Returns:
+            dict: Cập nhật theo định dạng ccxt
+        """
+        update = {'id': order['id'], 'filled': filled, 'cost': cost, 'average': cost / filled if filled else None}
+        if order.get('amount') is not None:
+            update['remaining'] = max(order['amount'] - filled, 0)
+            if filled >= order['amount'] - 1e-12:
+                update['status'] = 'closed'
+        return update
+
+    async def _watch(self, exchange_id):
+        """
+        Vòng lặp nhận cập nhật lệnh của một sàn trên kết nối websocket dùng chung.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+        """
+        try:
+            handle = await self.exchange_service.acquire_pro_exchange(exchange_id)
+        except Exception as e:
+            log_error(f"Không thể theo dõi lệnh trên {exchange_id}, chỉ đối chiếu qua REST: {str(e)}")
+            return
+
+        async with handle:
+            has = getattr(handle.exchange, 'has', {})
+            if has.get('watchOrders'):
+                use_trades = False
+            elif has.get('watchMyTrades'):
+                use_trades = True
+            else:
+                log_warning(f"Sàn {exchange_id} không hỗ trợ theo dõi lệnh qua websocket, chỉ đối chiếu qua REST")
+                return
+
+            log_info(f"Bắt đầu theo dõi lệnh qua websocket trên sàn {exchange_id}")
+            self.streaming.add(exchange_id)
+            try:
+                await self._watch_loop(exchange_id, handle, use_trades)
+            finally:
+                self.streaming.discard(exchange_id)
+
+    async def _watch_loop(self, exchange_id, handle, use_trades):
+        """
+        Nhận cập nhật lệnh (hoặc giao dịch khớp) cho đến khi bị dừng.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            handle (ProExchangeHandle): Handle tới kết nối dùng chung
+            use_trades (bool): Dùng watch_my_trades thay cho watch_orders
+        """
+        while True:
+            try:
+                if use_trades:
+                    for trade in await handle.exchange.watch_my_trades():
+                        self._apply_trade(exchange_id, trade)
+                else:
+                    for order in await handle.exchange.watch_orders():
+                        self.update(exchange_id, order)
+                self.streaming.add(exchange_id)
+
+            except (ccxt.NotSupported, ccxt.ArgumentsRequired) as e:
+                log_warning(f"Sàn {exchange_id} không hỗ trợ theo dõi lệnh qua websocket, chỉ đối chiếu qua REST: {str(e)}")
+                return
+
+            except ccxt.pro.NetworkError as network_error:
+                # Đối chiếu qua REST nhanh hơn trong lúc luồng bị gián đoạn
+                self.streaming.discard(exchange_id)
+                log_warning(f"Lỗi kết nối khi theo dõi lệnh trên {exchange_id}: {str(network_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
+
+            except Exception as loop_error:
+                self.streaming.discard(exchange_id)
+                log_error(f"Lỗi khi theo dõi lệnh trên {exchange_id}: {str(loop_error)}")
+                await asyncio.sleep(NETWORK_ERROR_DELAY)
+
+    async def close(self):
+        """Dừng tất cả các luồng theo dõi lệnh."""
+        for task in self.watchers.values():
+            task.cancel()
+
+        await asyncio.gather(*self.watchers.values(), return_exceptions=True)
+        self.watchers.clear()
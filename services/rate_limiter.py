@@ -0,0 +1,245 @@
+"""
+Bộ điều phối request REST theo từng sàn: token bucket có trọng số theo endpoint và hàng đợi ưu tiên.
+"""
+import time
+import heapq
+import asyncio
+import itertools
+
+from utils.logger import log_info
+from utils.latency import latency_tracker, STAGE_RATE_WAIT
+from configs import EXCHANGE_RATE_LIMITS, EXCHANGE_RATE_HEADROOM, EXCHANGE_RATE_BURST
+
+# Mức ưu tiên của request, số nhỏ hơn được phục vụ trước
+PRIORITY_ORDER = 0  # Đặt lệnh và hủy lệnh
+PRIORITY_STATUS = 1  # Trạng thái của một lệnh cụ thể
+PRIORITY_BACKGROUND = 2  # Đối chiếu danh sách lệnh, số dư, ticker, markets, giữ ấm kết nối
+
+# Endpoint -> (trọng số, mức ưu tiên); trọng số tính theo đơn vị rateLimit của ccxt
+ENDPOINTS = {
+    'create_order': (1, PRIORITY_ORDER),
+    'cancel_order': (1, PRIORITY_ORDER),
+    'cancel_all_orders': (1, PRIORITY_ORDER),
+    'fetch_order': (1, PRIORITY_STATUS),
+    'fetch_open_orders': (3, PRIORITY_BACKGROUND),
+    'fetch_closed_orders': (5, PRIORITY_BACKGROUND),
+    'fetch_balance': (2, PRIORITY_BACKGROUND),
+    'fetch_positions': (2, PRIORITY_BACKGROUND),
+    'fetch_ticker': (1, PRIORITY_BACKGROUND),
+    'fetch_time': (1, PRIORITY_BACKGROUND),
+    'set_leverage': (1, PRIORITY_BACKGROUND),
+    'transfer': (1, PRIORITY_BACKGROUND),
+    'load_markets': (10, PRIORITY_BACKGROUND),
+}
+DEFAULT_ENDPOINT = (1, PRIORITY_BACKGROUND)
+DEFAULT_RATE_LIMIT_MS = 100  # rateLimit mặc định khi sàn không khai báo (mili giây mỗi đơn vị)
+
+
+class TokenBucket:
+    """
+    Token bucket với hàng đợi ưu tiên.
+
+    Token được nạp lại liên tục với tốc độ `rate` mỗi giây, tối đa `capacity`. Request chỉ
+    đi thẳng khi không có ai đang chờ; ngược lại request được xếp hàng theo (ưu tiên, thứ tự
+    đến) và được cấp token khi đủ, nên lệnh luôn vượt lên trước các request nền đang chờ.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Khởi tạo token bucket đầy.
+
+        Args:
+            rate (float): Số token được nạp lại mỗi giây
+            capacity (float): Số token tối đa (kích thước burst)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waiters = []  # Heap (ưu tiên, thứ tự, trọng số, future)
+        self._sequence = itertools.count()
+        self._timer = None
+        self.requests = 0
+        self.queued = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _refill(self):
+        """Nạp lại token theo thời gian đã trôi qua."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def depth(self):
+        """
+        Số request đang chờ token.
+
+        Returns:
+            int: Độ sâu hàng đợi
+        """
+        return sum(1 for waiter in self.waiters if not waiter[3].done())
+
+    async def acquire(self, weight=1, priority=PRIORITY_BACKGROUND):
+        """
+        Chờ tới khi đủ token cho một request.
+
+        Args:
+            weight (float): Số token request tiêu tốn
+            priority (int): Mức ưu tiên (PRIORITY_*)
+
+        Returns:
+            float: Thời gian đã chờ (giây)
+        """
+        weight = min(weight, self.capacity)
+        self.requests += 1
+        self._refill()
+
+        if not self.waiters and self.tokens >= weight:
+            self.tokens -= weight
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self._sequence), weight, future))
+        self.queued += 1
+        self.max_depth = max(self.max_depth, len(self.waiters))
+        start = time.perf_counter()
+        self._schedule()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Đã được cấp token nhưng bị hủy trước khi gửi: trả token cho request khác
+            if future.done() and not future.cancelled():
+                self.tokens = min(self.capacity, self.tokens + weight)
+            future.cancel()
+            self._schedule()
+            raise
+
+        waited = time.perf_counter() - start
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def _schedule(self):
+        """Cấp token cho các request đầu hàng đợi và hẹn giờ đánh thức khi thiếu token."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        self._refill()
+        while self.waiters:
+            _, _, weight, future = self.waiters[0]
+            if future.done():
+                heapq.heappop(self.waiters)
+                continue
+            if self.tokens < weight:
+                self._timer = asyncio.get_running_loop().call_later((weight - self.tokens) / self.rate, self._schedule)
+                return
+            heapq.heappop(self.waiters)
+            self.tokens -= weight
+            future.set_result(None)
+
+    def stats(self):
+        """
+        Thống kê của bucket.
+
+        Returns:
+            dict: Tốc độ, token còn lại, độ sâu hàng đợi và thời gian chờ
+        """
+        self._refill()
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'tokens': self.tokens,
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'requests': self.requests,
+            'queued': self.queued,
+            'avg_wait': self.total_wait / self.queued if self.queued else 0.0,
+            'max_wait': self.max_wait,
+        }
+
+
+class RequestScheduler:
+    """
+    Điều phối request REST của mọi bot trong tiến trình, một token bucket cho mỗi sàn.
+
+    Tốc độ mặc định lấy từ rateLimit của ccxt (mili giây cho mỗi đơn vị trọng số), nhân với
+    EXCHANGE_RATE_HEADROOM để chừa khoảng an toàn trước khi sàn trả về 429; có thể ghi đè
+    theo sàn bằng EXCHANGE_RATE_LIMITS.
+    """
+
+    def __init__(self, rate_limits=None, headroom=EXCHANGE_RATE_HEADROOM, burst=EXCHANGE_RATE_BURST):
+        """
+        Khởi tạo bộ điều phối.
+
+        Args:
+            rate_limits (dict, optional): Sàn -> số đơn vị trọng số mỗi giây (mặc định EXCHANGE_RATE_LIMITS)
+            headroom (float): Tỷ lệ của giới hạn sàn công bố được sử dụng
+            burst (float): Kích thước burst tính theo số giây của tốc độ
+        """
+        self.rate_limits = EXCHANGE_RATE_LIMITS if rate_limits is None else rate_limits
+        self.headroom = headroom
+        self.burst = burst
+        self.buckets = {}  # Sàn -> TokenBucket
+
+    def get_bucket(self, exchange_id, exchange=None):
+        """
+        Lấy (hoặc tạo) token bucket của một sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            exchange (object, optional): Đối tượng sàn ccxt để đọc rateLimit
+
+        Returns:
+            TokenBucket: Token bucket của sàn
+        """
+        bucket = self.buckets.get(exchange_id)
+        if bucket is None:
+            rate = self.rate_limits.get(exchange_id)
+            if rate is None:
+                rate_limit_ms = getattr(exchange, 'rateLimit', None) or DEFAULT_RATE_LIMIT_MS
+                rate = 1000 / rate_limit_ms * self.headroom
+            bucket = self.buckets[exchange_id] = TokenBucket(rate, max(1, rate * self.burst))
+        return bucket
+
+    async def acquire(self, exchange_id, endpoint, exchange=None):
+        """
+        Chờ lượt gửi một request REST tới sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            endpoint (str): Tên endpoint (khóa của ENDPOINTS)
+            exchange (object, optional): Đối tượng sàn ccxt để đọc rateLimit khi tạo bucket
+
+        Returns:
+            float: Thời gian đã chờ (giây)
+        """
+        weight, priority = ENDPOINTS.get(endpoint, DEFAULT_ENDPOINT)
+        waited = await self.get_bucket(exchange_id, exchange).acquire(weight, priority)
+        latency_tracker.record(STAGE_RATE_WAIT, exchange_id, waited)
+        return waited
+
+    def stats(self):
+        """
+        Thống kê theo sàn.
+
+        Returns:
+            dict: Sàn -> thống kê của token bucket
+        """
+        return {exchange_id: bucket.stats() for exchange_id, bucket in sorted(self.buckets.items())}
+
+    def report(self):
+        """Ghi log độ sâu hàng đợi và thời gian chờ của từng sàn."""
+        stats = self.stats()
+        if not stats:
+            return
+
+        lines = ["Giới hạn request REST: tốc độ / request / phải chờ / hàng đợi tối đa / chờ TB / chờ tối đa (ms)"]
+        for exchange_id, s in stats.items():
+            lines.append(
+                f"- {exchange_id:<14} {s['rate']:.1f}/s / {s['requests']} / {s['queued']} / {s['max_depth']} / "
+                f"{s['avg_wait'] * 1e3:.1f} / {s['max_wait'] * 1e3:.1f}"
+            )
+        log_info("\n".join(lines))
@@ -0,0 +1,194 @@
+"""
+Service phát lại sách lệnh đã ghi bởi TickRecorder theo thứ tự thời gian.
+"""
+import os
+import heapq
+import asyncio
+import time
+import numpy as np
+
+from utils.logger import log_info
+from services.tick_recorder import TICK_FILE_SUFFIX, load_ticks, symbol_to_filename, filename_to_symbol
+from configs import RECORDER_DIR
+
+
+class ReplayClock:
+    """
+    Đồng hồ mô phỏng thay cho module time khi phát lại.
+
+    Thời gian chỉ tiến khi ReplayService đưa ra một bản ghi mới; với speed > 0 đồng hồ
+    chờ thời gian thực tương ứng để phát lại với tốc độ gấp speed lần.
+    """
+
+    def __init__(self, start_ns, speed=0):
+        """
+        Khởi tạo đồng hồ mô phỏng.
+
+        Args:
+            start_ns (int): Thời điểm bắt đầu (ns)
+            speed (float): Hệ số tốc độ so với thời gian thực, 0 để chạy nhanh nhất có thể
+        """
+        self.now_ns = start_ns
+        self.speed = speed
+        self.sim_start_ns = start_ns
+        self.wall_start = time.perf_counter()
+
+    def time(self):
+        """
+        Thời điểm mô phỏng hiện tại.
+
+        Returns:
+            float: Số giây kể từ epoch
+        """
+        return self.now_ns / 1e9
+
+    async def advance(self, ts_ns):
+        """
+        Tiến đồng hồ tới thời điểm của bản ghi tiếp theo.
+
+        Args:
+            ts_ns (int): Thời điểm mới (ns)
+        """
+        if self.speed > 0:
+            wall_target = self.wall_start + (ts_ns - self.sim_start_ns) / 1e9 / self.speed
+            delay = wall_target - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        self.now_ns = max(self.now_ns, ts_ns)
+
+
+def record_to_orderbook(record, symbol):
+    """
+    Chuyển một bản ghi thành sách lệnh dạng ccxt (bỏ các mức giá trống).
+
+    Args:
+        record (np.void): Bản ghi từ tệp
+        symbol (str): Ký hiệu cặp giao dịch
+
+    Returns:
+        dict: Sách lệnh với bids, asks, timestamp, symbol
+    """
+    def levels(prices, sizes):
+        # NaN là mức giá trống (p == p loại NaN)
+        return [[p, q] for p, q in zip(prices.tolist(), sizes.tolist()) if p == p]
+
+    return {
+        'symbol': symbol,
+        'timestamp': int(record['ts_exchange']) or None,
+        'bids': levels(record['bid_px'], record['bid_qty']),
+        'asks': levels(record['ask_px'], record['ask_qty']),
+    }
+
+
+class ReplayService:
+    """
+    Đọc các tệp sách lệnh của nhiều sàn và trộn chúng theo thời điểm nhận (k-way merge).
+    """
+
+    def __init__(self, directory=RECORDER_DIR):
+        """
+        Khởi tạo dịch vụ phát lại.
+
+        Args:
+            directory (str): Thư mục gốc chứa các tệp đã ghi
+        """
+        self.directory = directory
+
+    def files_for(self, exchange_id, symbol):
+        """
+        Danh sách tệp của một sàn/cặp giao dịch theo thứ tự ngày.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu cặp giao dịch
+
+        Returns:
+            list: Đường dẫn các tệp
+        """
+        folder = os.path.join(self.directory, exchange_id, symbol_to_filename(symbol))
+        if not os.path.isdir(folder):
+            return []
+
+        return [
+            os.path.join(folder, name)
+            for name in sorted(os.listdir(folder))
+            if name.endswith(TICK_FILE_SUFFIX)
+        ]
+
+    def symbols(self, exchanges):
+        """
+        Các cặp giao dịch đã được ghi trên tất cả các sàn cho trước.
+
+        Args:
+            exchanges (list): Danh sách ID sàn giao dịch
+
+        Returns:
+            list: Ký hiệu các cặp giao dịch (sắp xếp theo tên)
+        """
+        common = None
+        for exchange_id in exchanges:
+            folder = os.path.join(self.directory, exchange_id)
+            names = set(os.listdir(folder)) if os.path.isdir(folder) else set()
+            common = names if common is None else common & names
+
+        return sorted(filename_to_symbol(name) for name in common or [])
+
+    def _exchange_ticks(self, exchange_id, symbol):
+        """Duyệt các bản ghi của một sàn theo thứ tự thời gian (nối các tệp theo ngày)."""
+        for path in self.files_for(exchange_id, symbol):
+            ticks = load_ticks(path)
+            for record in ticks:
+                yield int(record['ts_local']), exchange_id, record
+
+    def stream(self, exchanges, symbol):
+        """
+        Trộn bản ghi của tất cả các sàn theo thời điểm nhận cục bộ.
+
+        Args:
+            exchanges (list): Danh sách ID sàn giao dịch
+            symbol (str): Ký hiệu cặp giao dịch
+
+        Yields:
+            tuple: (ts_local (ns), exchange_id, sách lệnh dạng ccxt)
+        """
+        streams = [self._exchange_ticks(exchange_id, symbol) for exchange_id in exchanges]
+
+        for ts_local, exchange_id, record in heapq.merge(*streams, key=lambda tick: tick[0]):
+            yield ts_local, exchange_id, record_to_orderbook(record, symbol)
+
+    def opening_price(self, exchanges, symbol):
+        """
+        Giá trung bình (mid) của bản ghi đầu tiên có đủ hai phía trên mỗi sàn.
+
+        Args:
+            exchanges (list): Danh sách ID sàn giao dịch
+            symbol (str): Ký hiệu cặp giao dịch
+
+        Returns:
+            tuple: (giá trung bình, thời điểm bắt đầu (ns)), hoặc (None, None) nếu không có dữ liệu
+        """
+        mids = []
+        start_ns = None
+
+        for exchange_id in exchanges:
+            files = self.files_for(exchange_id, symbol)
+            ticks = load_ticks(files[0]) if files else []
+            if len(ticks) == 0:
+                continue
+            start_ns = int(ticks[0]['ts_local']) if start_ns is None else min(start_ns, int(ticks[0]['ts_local']))
+
+            # Phía trống được ghi là NaN: lấy bản ghi đầu tiên có đủ hai phía để số dư giả lập không bị NaN
+            for path in files:
+                ticks = load_ticks(path)
+                valid = np.flatnonzero(~np.isnan(ticks['bid_px'][:, 0]) & ~np.isnan(ticks['ask_px'][:, 0]))
+                if len(valid):
+                    first = ticks[valid[0]]
+                    mids.append((first['bid_px'][0] + first['ask_px'][0]) / 2)
+                    break
+
+        if not mids:
+            return None, None
+
+        log_info(f"Dữ liệu phát lại {symbol} bắt đầu từ {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(start_ns / 1e9))}")
+        return float(sum(mids) / len(mids)), start_ns
@@ -0,0 +1,251 @@
+"""
+Service ghi sách lệnh nhận được từ các sàn vào tệp nhị phân có độ rộng cố định.
+
+Mỗi bản ghi là một phần tử của mảng có cấu trúc NumPy, các tệp chỉ gồm các bản ghi nối
+tiếp nhau (không có header) nên có thể đọc lại trực tiếp bằng np.memmap.
+"""
+import os
+import time
+import asyncio
+from urllib.parse import quote, unquote
+import numpy as np
+
+from utils.logger import log_info, log_error
+from configs import RECORDER_DIR, RECORDER_LEVELS, RECORDER_CHUNK_SIZE
+
+TICK_FILE_SUFFIX = '.ticks'
+
+
+def tick_dtype(levels=RECORDER_LEVELS):
+    """
+    Kiểu dữ liệu của một bản ghi sách lệnh.
+
+    Args:
+        levels (int): Số mức giá được lưu cho mỗi phía
+
+    Returns:
+        np.dtype: Kiểu dữ liệu có cấu trúc (little-endian, độ rộng cố định)
+    """
+    return np.dtype([
+        ('ts_exchange', '<i8'),  # Thời điểm của sàn (ms), 0 nếu sàn không gửi
+        ('ts_local', '<i8'),  # Thời điểm nhận cục bộ (ns)
+        ('bid_px', '<f8', (levels,)),
+        ('bid_qty', '<f8', (levels,)),
+        ('ask_px', '<f8', (levels,)),
+        ('ask_qty', '<f8', (levels,)),
+    ])
+
+
+def symbol_to_filename(symbol):
+    """
+    Chuyển ký hiệu cặp giao dịch thành tên thư mục hợp lệ (BTC/USDT -> BTC%2FUSDT).
+
+    Mã hóa phần trăm giữ nguyên '-' và '_' nên có thể đổi ngược chính xác,
+    kể cả với ký hiệu hợp đồng như BTC/USDT:USDT-240628.
+
+    Args:
+        symbol (str): Ký hiệu cặp giao dịch
+
+    Returns:
+        str: Tên thư mục
+    """
+    return quote(symbol, safe='')
+
+
+def filename_to_symbol(name):
+    """
+    Chuyển tên thư mục về ký hiệu cặp giao dịch (BTC%2FUSDT -> BTC/USDT).
+
+    Args:
+        name (str): Tên thư mục
+
+    Returns:
+        str: Ký hiệu cặp giao dịch
+    """
+    return unquote(name)
+
+
+def tick_file_levels(path):
+    """
+    Đọc số mức giá từ tên tệp (ví dụ: 2024-01-31.L10.ticks -> 10).
+
+    Args:
+        path (str): Đường dẫn tệp
+
+    Returns:
+        int: Số mức giá mỗi phía
+    """
+    name = os.path.basename(path)
+    return int(name[:-len(TICK_FILE_SUFFIX)].rsplit('.L', 1)[1])
+
+
+def load_ticks(path):
+    """
+    Mở một tệp sách lệnh đã ghi dưới dạng memmap (chỉ đọc, không nạp vào RAM).
+
+    Args:
+        path (str): Đường dẫn tệp
+
+    Returns:
+        np.memmap: Mảng bản ghi, rỗng nếu tệp chưa có dữ liệu
+    """
+    dtype = tick_dtype(tick_file_levels(path))
+    if os.path.getsize(path) < dtype.itemsize:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+class _TickBuffer:
+    """Bộ đệm bản ghi của một cặp (sàn, cặp giao dịch), ghi ra tệp theo từng khối."""
+
+    def __init__(self, dtype, chunk_size):
+        self.records = np.zeros(chunk_size, dtype=dtype)
+        self.count = 0
+        self.day = None
+
+
+class TickRecorder:
+    """
+    Ghi sách lệnh (top N mức giá, thời điểm của sàn và thời điểm nhận) vào một tệp
+    cho mỗi sàn/cặp giao dịch/ngày (UTC).
+    """
+
+    def __init__(self, directory=RECORDER_DIR, levels=RECORDER_LEVELS, chunk_size=RECORDER_CHUNK_SIZE):
+        """
+        Khởi tạo bộ ghi.
+
+        Args:
+            directory (str): Thư mục gốc chứa các tệp
+            levels (int): Số mức giá được lưu cho mỗi phía
+            chunk_size (int): Số bản ghi trong bộ đệm trước khi ghi ra tệp
+        """
+        self.directory = directory
+        self.levels = levels
+        self.chunk_size = chunk_size
+        self.dtype = tick_dtype(levels)
+        self.buffers = {}  # (exchange_id, symbol) -> _TickBuffer
+        self.records_written = 0
+        self.write_task = None  # Lần ghi nền cuối cùng, các khối được ghi tuần tự theo thứ tự nhận
+
+    def path_for(self, exchange_id, symbol, day):
+        """
+        Đường dẫn tệp của một sàn/cặp giao dịch/ngày.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu cặp giao dịch
+            day (str): Ngày theo định dạng YYYY-MM-DD
+
+        Returns:
+            str: Đường dẫn tệp
+        """
+        return os.path.join(
+            self.directory, exchange_id, symbol_to_filename(symbol),
+            f"{day}.L{self.levels}{TICK_FILE_SUFFIX}"
+        )
+
+    def record(self, exchange_id, symbol, orderbook, ts_local=None):
+        """
+        Thêm một sách lệnh vào bộ đệm, ghi ra tệp khi bộ đệm đầy hoặc sang ngày mới.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu cặp giao dịch
+            orderbook (dict): Sách lệnh ccxt
+            ts_local (int, optional): Thời điểm nhận (ns), mặc định là thời điểm hiện tại
+        """
+        ts_local = ts_local if ts_local is not None else time.time_ns()
+        day = time.strftime('%Y-%m-%d', time.gmtime(ts_local / 1e9))
+
+        key = (exchange_id, symbol)
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = self.buffers[key] = _TickBuffer(self.dtype, self.chunk_size)
+
+        # Mỗi ngày một tệp: ghi phần còn lại của ngày cũ trước khi sang ngày mới
+        if buffer.day != day:
+            self._flush_buffer(exchange_id, symbol, buffer, background=True)
+            buffer.day = day
+
+        row = buffer.records[buffer.count]
+        row['ts_exchange'] = orderbook.get('timestamp') or 0
+        row['ts_local'] = ts_local
+        self._fill_side(row['bid_px'], row['bid_qty'], orderbook['bids'])
+        self._fill_side(row['ask_px'], row['ask_qty'], orderbook['asks'])
+        buffer.count += 1
+
+        if buffer.count == self.chunk_size:
+            self._flush_buffer(exchange_id, symbol, buffer, background=True)
+
+    def _fill_side(self, prices, sizes, levels):
+        """Sao chép top N mức giá của một phía, các mức thiếu được để NaN/0."""
+        count = min(len(levels), self.levels)
+        for i in range(count):
+            prices[i] = levels[i][0]
+            sizes[i] = levels[i][1]
+        prices[count:] = np.nan
+        sizes[count:] = 0
+
+    def _flush_buffer(self, exchange_id, symbol, buffer, background=False):
+        """
+        Nối các bản ghi trong bộ đệm vào cuối tệp của ngày tương ứng.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            symbol (str): Ký hiệu cặp giao dịch
+            buffer (_TickBuffer): Bộ đệm cần ghi
+            background (bool): Ghi trong thread khi có event loop để không chặn callback sách lệnh
+        """
+        if buffer.count == 0:
+            return
+
+        path = self.path_for(exchange_id, symbol, buffer.day)
+        data = buffer.records[:buffer.count].tobytes()
+        count = buffer.count
+        buffer.count = 0
+
+        try:
+            loop = asyncio.get_running_loop() if background else None
+        except RuntimeError:
+            loop = None
+
+        if loop is None:
+            self._write_chunk(exchange_id, symbol, path, data, count)
+        else:
+            self.write_task = loop.create_task(
+                self._write_after(self.write_task, exchange_id, symbol, path, data, count)
+            )
+
+    async def _write_after(self, previous, exchange_id, symbol, path, data, count):
+        """Ghi một khối trong thread sau khi khối trước đó đã được ghi."""
+        if previous is not None:
+            await previous
+        await asyncio.to_thread(self._write_chunk, exchange_id, symbol, path, data, count)
+
+    def _write_chunk(self, exchange_id, symbol, path, data, count):
+        """Nối một khối bản ghi vào cuối tệp."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as f:
+                f.write(data)
+            self.records_written += count
+        except OSError as e:
+            log_error(f"Không thể ghi sách lệnh {symbol} trên {exchange_id} vào {path}: {str(e)}")
+
+    def flush(self):
+        """Ghi toàn bộ bộ đệm ra tệp (không chờ các lần ghi nền, dùng drain() khi đang có event loop)."""
+        for (exchange_id, symbol), buffer in self.buffers.items():
+            self._flush_buffer(exchange_id, symbol, buffer)
+
+    async def drain(self):
+        """Chờ các lần ghi nền rồi ghi phần còn lại của bộ đệm trong thread."""
+        if self.write_task is not None:
+            await self.write_task
+            self.write_task = None
+        await asyncio.to_thread(self.flush)
+
+    def close(self):
+        """Ghi toàn bộ bộ đệm và giải phóng bộ nhớ."""
+        self.flush()
+        self.buffers.clear()
+        log_info(f"Đã ghi {self.records_written} sách lệnh vào {self.directory}")
@@ -0,0 +1,233 @@
+"""
+Đường ống thực thi giao dịch: ý định giao dịch được xếp hàng và chạy bởi nhóm tác vụ thực thi.
+"""
+import time
+import asyncio
+import itertools
+from collections import defaultdict
+
+from utils.logger import log_error
+from configs import TRADE_EXECUTOR_COUNT
+
+BUY_SIDE = 'buy'
+SELL_SIDE = 'sell'
+
+
+class TradeIntent:
+    """
+    Ảnh chụp một cơ hội giao dịch tại thời điểm quyết định.
+
+    Giá và khối lượng được cố định khi xếp hàng, vì trạng thái giá của bot tiếp tục
+    thay đổi trong lúc giao dịch chờ được thực thi.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, buy_exchange, sell_exchange, symbol, amount, buy_price, sell_price,
+                 buy_limit_price, sell_limit_price, profit_pct, profit_usd, reserved_usd, reserved_crypto):
+        """
+        Khởi tạo ý định giao dịch.
+
+        Args:
+            buy_exchange (str): Sàn mua
+            sell_exchange (str): Sàn bán
+            symbol (str): Ký hiệu của cặp giao dịch
+            amount (float): Số lượng crypto giao dịch
+            buy_price (float): Giá mua khớp trung bình (VWAP)
+            sell_price (float): Giá bán khớp trung bình (VWAP)
+            buy_limit_price (float): Giá giới hạn của lệnh mua
+            sell_limit_price (float): Giá giới hạn của lệnh bán
+            profit_pct (float): Lợi nhuận sau phí tính theo phần trăm
+            profit_usd (float): Lợi nhuận sau phí tính theo USD
+            reserved_usd (float): Số USDT giữ chỗ trên sàn mua
+            reserved_crypto (float): Số crypto giữ chỗ trên sàn bán
+        """
+        self.id = next(self._ids)
+        self.buy_exchange = buy_exchange
+        self.sell_exchange = sell_exchange
+        self.symbol = symbol
+        self.amount = amount
+        self.buy_price = buy_price
+        self.sell_price = sell_price
+        self.buy_limit_price = buy_limit_price
+        self.sell_limit_price = sell_limit_price
+        self.profit_pct = profit_pct
+        self.profit_usd = profit_usd
+        self.reserved_usd = reserved_usd
+        self.reserved_crypto = reserved_crypto
+        self.created_at = time.perf_counter()
+
+    def __repr__(self):
+        return (
+            f"TradeIntent(#{self.id} {self.amount} {self.symbol} "
+            f"{self.buy_exchange} {self.buy_price} -> {self.sell_price} {self.sell_exchange})"
+        )
+
+
+class InFlightLedger:
+    """
+    Sổ giữ chỗ số dư của các giao dịch đang thực hiện.
+
+    Mỗi ý định giữ USDT trên sàn mua và crypto trên sàn bán cho tới khi hoàn tất,
+    đồng thời chiếm phía mua/bán của sàn tương ứng để hai giao dịch không tranh nhau
+    cùng một phía sách lệnh.
+    """
+
+    def __init__(self):
+        """Khởi tạo sổ giữ chỗ rỗng."""
+        self.intents = {}  # ID ý định -> TradeIntent
+        self.reserved_usd = defaultdict(float)  # Sàn -> USDT đang giữ chỗ
+        self.reserved_crypto = defaultdict(float)  # Sàn -> crypto đang giữ chỗ
+        self.busy_sides = defaultdict(int)  # (sàn, phía) -> số giao dịch đang dùng
+
+    def __len__(self):
+        return len(self.intents)
+
+    def reserve(self, intent):
+        """
+        Giữ chỗ số dư và phía sách lệnh cho một ý định giao dịch.
+
+        Args:
+            intent (TradeIntent): Ý định giao dịch
+        """
+        self.intents[intent.id] = intent
+        self.reserved_usd[intent.buy_exchange] += intent.reserved_usd
+        self.reserved_crypto[intent.sell_exchange] += intent.reserved_crypto
+        self.busy_sides[(intent.buy_exchange, BUY_SIDE)] += 1
+        self.busy_sides[(intent.sell_exchange, SELL_SIDE)] += 1
+
+    def release(self, intent):
+        """
+        Trả lại phần giữ chỗ của một ý định đã hoàn tất.
+
+        Args:
+            intent (TradeIntent): Ý định giao dịch
+        """
+        if self.intents.pop(intent.id, None) is None:
+            return
+
+        self.reserved_usd[intent.buy_exchange] = max(0.0, self.reserved_usd[intent.buy_exchange] - intent.reserved_usd)
+        self.reserved_crypto[intent.sell_exchange] = max(0.0, self.reserved_crypto[intent.sell_exchange] - intent.reserved_crypto)
+        self.busy_sides[(intent.buy_exchange, BUY_SIDE)] -= 1
+        self.busy_sides[(intent.sell_exchange, SELL_SIDE)] -= 1
+
+    def usd_reserved(self, exchange_id):
+        """
+        Lấy số USDT đang giữ chỗ trên một sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            float: Số USDT đang giữ chỗ
+        """
+        return self.reserved_usd.get(exchange_id, 0.0)
+
+    def crypto_reserved(self, exchange_id):
+        """
+        Lấy số crypto đang giữ chỗ trên một sàn.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            float: Số crypto đang giữ chỗ
+        """
+        return self.reserved_crypto.get(exchange_id, 0.0)
+
+    def is_busy(self, exchange_id, side):
+        """
+        Kiểm tra một phía sách lệnh của sàn có đang được giao dịch khác sử dụng.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            side (str): 'buy' hoặc 'sell'
+
+        Returns:
+            bool: True nếu có giao dịch đang mua (hoặc bán) trên sàn
+        """
+        return self.busy_sides.get((exchange_id, side), 0) > 0
+
+    def conflicts(self, buy_exchange, sell_exchange):
+        """
+        Kiểm tra một cặp sàn có xung đột với các giao dịch đang thực hiện.
+
+        Args:
+            buy_exchange (str): Sàn mua
+            sell_exchange (str): Sàn bán
+
+        Returns:
+            bool: True nếu sàn mua đang có lệnh mua hoặc sàn bán đang có lệnh bán
+        """
+        return self.is_busy(buy_exchange, BUY_SIDE) or self.is_busy(sell_exchange, SELL_SIDE)
+
+
+class TradePipeline:
+    """
+    Hàng đợi ý định giao dịch được xử lý bởi một nhóm tác vụ thực thi.
+
+    submit trả về ngay sau khi giữ chỗ số dư, nên tác vụ đánh giá tiếp tục tìm cơ hội
+    trong lúc các giao dịch trước đang chờ khớp lệnh.
+    """
+
+    def __init__(self, executor, executor_count=TRADE_EXECUTOR_COUNT):
+        """
+        Khởi tạo đường ống giao dịch.
+
+        Args:
+            executor (callable): Coroutine function nhận TradeIntent và thực hiện giao dịch
+            executor_count (int): Số giao dịch được thực hiện đồng thời tối đa
+        """
+        self.executor = executor
+        self.executor_count = max(1, executor_count)
+        self.ledger = InFlightLedger()
+        self.queue = asyncio.Queue()
+        self.workers = []
+
+    def start(self):
+        """Khởi động các tác vụ thực thi."""
+        if self.workers:
+            return
+
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.executor_count)]
+
+    def has_capacity(self):
+        """
+        Kiểm tra còn tác vụ thực thi rảnh để nhận giao dịch mới.
+
+        Returns:
+            bool: True nếu số giao dịch đang thực hiện nhỏ hơn số tác vụ thực thi
+        """
+        return len(self.ledger) < self.executor_count
+
+    def submit(self, intent):
+        """
+        Giữ chỗ số dư và xếp hàng một ý định giao dịch.
+
+        Args:
+            intent (TradeIntent): Ý định giao dịch
+        """
+        self.ledger.reserve(intent)
+        self.queue.put_nowait(intent)
+
+    async def _worker(self):
+        """Tác vụ thực thi: lấy ý định từ hàng đợi và thực hiện cho tới khi bị hủy."""
+        while True:
+            intent = await self.queue.get()
+            try:
+                await self.executor(intent)
+            except Exception as e:
+                log_error(f"Lỗi khi thực hiện giao dịch #{intent.id}: {str(e)}")
+            finally:
+                self.ledger.release(intent)
+                self.queue.task_done()
+
+    async def close(self):
+        """Chờ các giao dịch đã xếp hàng hoàn tất rồi dừng các tác vụ thực thi."""
+        await self.queue.join()
+
+        for worker in self.workers:
+            worker.cancel()
+
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
@@ -0,0 +1,67 @@
+"""
+Shared fixtures for the unit tests.
+"""
+import pytest
+from services.exchange_service import ExchangeService
+from services.mock_exchange import MockExchangeHub
+from services.balance_service import BalanceService
+from services.order_manager import OrderManager
+from services.order_service import OrderService
+
+MOCK_SETTINGS = {
+    'update_rate': 0,
+    'rest_latency': 0,
+    'fill_probability': 1.0,
+    'start_prices': {'BTC/USDT': 100},
+    'initial_balances': {'USDT': 1000, 'BTC': 1},
+}
+
+
+@pytest.fixture
+def mock_settings(request):
+    """Mock exchange settings; override keys with indirect parametrization of this fixture."""
+    return {**MOCK_SETTINGS, **getattr(request, 'param', {})}
+
+
+@pytest.fixture
+def create_mock_hub(mock_settings):
+    """Factory for fresh mock exchange hubs; keyword arguments override single settings."""
+    def create(**settings):
+        return MockExchangeHub({**mock_settings, **settings})
+    return create
+
+
+@pytest.fixture
+def create_exchange_service(create_mock_hub):
+    """Factory for ExchangeService instances backed by a fresh mock exchange hub."""
+    def create(**settings):
+        exchange_service = ExchangeService(use_mock=True)
+        exchange_service.mock_hub = create_mock_hub(**settings)
+        return exchange_service
+    return create
+
+
+@pytest.fixture
+def create_order_manager(create_exchange_service):
+    """Factory for OrderManager instances backed by a fresh mock exchange hub."""
+    def create(**kwargs):
+        return OrderManager(create_exchange_service(), **kwargs)
+    return create
+
+
+@pytest.fixture
+def create_order_service(create_exchange_service):
+    """Factory returning an OrderService and the ExchangeService it trades through."""
+    def create(**kwargs):
+        exchange_service = create_exchange_service()
+        return OrderService(exchange_service, **kwargs), exchange_service
+    return create
+
+
+@pytest.fixture
+def create_balance_service(create_exchange_service):
+    """Factory returning a BalanceService and the ExchangeService it reads from."""
+    def create(**kwargs):
+        exchange_service = create_exchange_service()
+        return BalanceService(exchange_service, **kwargs), exchange_service
+    return create
@@ -0,0 +1,183 @@
+"""
+Unit tests for balance_service module.
+"""
+import time
+import asyncio
+import pytest
+from services.order_service import OrderService
+from utils.exceptions import InsufficientBalanceError
+
+
+def balance_requests(exchange_service, exchange_id):
+    """Number of REST requests sent to one venue."""
+    return exchange_service.request_scheduler.stats()[exchange_id]['requests']
+
+
+class TestBalanceSnapshot:
+    """Test the per-exchange balance snapshot of BalanceService."""
+
+    def test_one_request_serves_every_asset(self, create_balance_service):
+        """Test that USDT and the base asset of a venue are read from a single fetch_balance."""
+        async def read():
+            balance_service, exchange_service = create_balance_service()
+            usdt = await balance_service.get_balance('binance', 'USDT')
+            btc = await balance_service.get_balance('binance', 'BTC/USDT')
+            return usdt, btc, balance_requests(exchange_service, 'binance')
+
+        usdt, btc, requests = asyncio.run(read())
+        assert usdt == pytest.approx(1000)
+        assert btc == pytest.approx(1)
+        assert requests == 1
+
+    def test_concurrent_refreshes_share_one_request(self, create_balance_service):
+        """Test that concurrent reads of a stale venue wait on the same request."""
+        async def read():
+            balance_service, exchange_service = create_balance_service()
+            await asyncio.gather(*(balance_service.get_balance(exchange_id, asset)
+                                   for exchange_id in ('binance', 'okx') for asset in ('USDT', 'BTC')))
+            return balance_requests(exchange_service, 'binance'), balance_requests(exchange_service, 'okx')
+
+        assert asyncio.run(read()) == (1, 1)
+
+    def test_fill_invalidates_snapshot(self, create_balance_service):
+        """Test that a fill reported by the order tracker makes the next read fetch fresh balances."""
+        async def trade():
+            balance_service, exchange_service = create_balance_service()
+            order_service = OrderService(exchange_service)
+            order_service.order_tracker.add_fill_listener(balance_service.invalidate)
+
+            await balance_service.refresh_all(['binance', 'okx'])
+            assert balance_service.is_fresh('binance')
+
+            await order_service.order_manager.create_market_order('binance', 'BTC/USDT', 'sell', 0.5)
+            stale = balance_service.free('binance', 'BTC')
+            fresh = await balance_service.get_balance('binance', 'BTC')
+            return stale, fresh, balance_service.is_fresh('okx')
+
+        stale, fresh, okx_fresh = asyncio.run(trade())
+        assert stale == pytest.approx(1)
+        assert fresh == pytest.approx(0.5)
+        assert okx_fresh
+
+
+class TestBalanceStream:
+    """Test the background balance streams of BalanceService."""
+
+    def test_watch_balance_pushes_updates(self, create_balance_service):
+        """Test that balances pushed over watch_balance reach listeners without REST calls."""
+        async def stream():
+            balance_service, exchange_service = create_balance_service()
+            updates = []
+            balance_service.add_listener(lambda exchange_id, balance: updates.append((exchange_id, balance['free']['BTC'])))
+            await balance_service.start_streaming(['binance'])
+            await asyncio.sleep(0.05)
+
+            await exchange_service.create_market_sell_order('binance', 'BTC/USDT', 0.5)
+            await asyncio.sleep(0.05)
+            await balance_service.close()
+            await exchange_service.close()
+            return updates, balance_service.free('binance', 'BTC'), exchange_service.request_scheduler.stats()['binance']['requests']
+
+        updates, btc, requests = asyncio.run(stream())
+        assert updates[0] == ('binance', pytest.approx(1))
+        assert updates[-1] == ('binance', pytest.approx(0.5))
+        assert btc == pytest.approx(0.5)
+        # Chỉ có lệnh bán đi qua REST
+        assert requests == 1
+
+    def test_invalidate_while_streaming_refetches(self, create_balance_service):
+        """Test that an invalidated venue is fetched over REST even while its balance stream is running."""
+        async def stream():
+            balance_service, exchange_service = create_balance_service()
+            await balance_service.start_streaming(['binance'])
+            await asyncio.sleep(0.05)
+
+            await balance_service.get_balance('binance', 'BTC')
+            balance_service.invalidate('binance')
+            fresh = balance_service.is_fresh('binance')
+            await balance_service.get_balance('binance', 'BTC')
+            await balance_service.close()
+            await exchange_service.close()
+            return fresh, balance_requests(exchange_service, 'binance'), balance_service.is_fresh('binance')
+
+        fresh, requests, refreshed = asyncio.run(stream())
+        assert not fresh
+        # Chỉ lần đọc sau khi vô hiệu hóa đi qua REST
+        assert requests == 1
+        assert refreshed
+
+    def test_polling_without_watch_balance(self, create_balance_service):
+        """Test that venues without watch_balance are polled and re-polled early after a fill."""
+        async def poll():
+            balance_service, exchange_service = create_balance_service()
+            balance_service.poll_interval = 10
+            balance_service.min_poll_interval = 0.01
+            pro_exchange = await exchange_service.get_pro_exchange('okx')
+            pro_exchange.has['watchBalance'] = False
+
+            await balance_service.start_streaming(['okx'])
+            await asyncio.sleep(0.05)
+            await exchange_service.create_market_sell_order('okx', 'BTC/USDT', 0.25)
+            balance_service.invalidate('okx')
+            await asyncio.sleep(0.05)
+            await balance_service.close()
+            await exchange_service.close()
+            return balance_service.free('okx', 'BTC'), 'okx' in balance_service.streaming
+
+        btc, streaming = asyncio.run(poll())
+        assert btc == pytest.approx(0.75)
+        assert not streaming
+
+
+class TestBalanceChecks:
+    """Test the concurrent pre-trade balance checks."""
+
+    @pytest.mark.parametrize('mock_settings', [{'rest_latency': 0.2}], indirect=True)
+    def test_venues_are_checked_concurrently(self, create_balance_service):
+        """Test that checking three venues takes about one venue round-trip."""
+        async def check():
+            balance_service, _ = create_balance_service()
+
+            start = time.perf_counter()
+            report = await balance_service.check_balances(['binance', 'okx', 'kucoin'], 'USDT', 3000)
+            return report, time.perf_counter() - start
+
+        report, elapsed = asyncio.run(check())
+        assert report.ok
+        assert report.available('okx', 'USDT') == pytest.approx(1000)
+        assert elapsed < 0.5
+
+    def test_every_shortfall_is_reported(self, create_balance_service):
+        """Test that all short venues, failed venues and timeouts are collected in one report."""
+        async def check():
+            balance_service, exchange_service = create_balance_service()
+            slow = exchange_service.get_exchange('kucoin')
+
+            async def hang(params=None):
+                await asyncio.sleep(5)
+
+            slow.fetch_balance = hang
+            return await balance_service.check_requirements([
+                ('binance', 'USDT', 2000),
+                ('okx', 'BTC', 0.5),
+                ('okx', 'USDT', 5000),
+                ('kucoin', 'USDT', 10),
+                ('unknown', 'USDT', 10),
+            ], timeout=0.1)
+
+        report = asyncio.run(check())
+        assert not report.ok
+        assert [(s.exchange, s.asset) for s in report.shortfalls] == [
+            ('binance', 'USDT'), ('okx', 'USDT'), ('kucoin', 'USDT'), ('unknown', 'USDT'),
+        ]
+        assert report.shortfalls[0].missing == pytest.approx(1000)
+        assert report.shortfalls[2].error and report.shortfalls[3].error
+        assert report.elapsed < 1
+
+    def test_check_balances_raises_with_all_shortfalls(self, create_balance_service):
+        """Test that check_balances raises once with every short venue attached."""
+        balance_service, _ = create_balance_service()
+        with pytest.raises(InsufficientBalanceError) as error:
+            asyncio.run(balance_service.check_balances(['binance', 'okx'], 'USDT', 5000))
+
+        assert [shortfall.exchange for shortfall in error.value.shortfalls] == ['binance', 'okx']
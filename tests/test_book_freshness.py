@@ -0,0 +1,40 @@
+"""
+Unit tests for book_freshness module.
+"""
+import pytest
+from utils.book_freshness import BookFreshness
+
+
+class TestBookFreshness:
+    """Test BookFreshness class."""
+
+    def test_unknown_exchange_is_not_fresh(self):
+        """Test that a venue without updates is never selected."""
+        freshness = BookFreshness(max_age=5)
+        assert freshness.age('binance', 100) is None
+        assert not freshness.is_fresh('binance', 100)
+
+    def test_stale_after_max_age(self):
+        """Test that a venue becomes stale past max_age and fresh again on the next update."""
+        freshness = BookFreshness(max_age=5)
+        freshness.touch('binance', 100)
+
+        assert freshness.is_fresh('binance', 105)
+        assert not freshness.is_fresh('binance', 105.1)
+        assert 'binance' in freshness.stale
+
+        freshness.touch('binance', 106)
+        assert freshness.is_fresh('binance', 106)
+        assert 'binance' not in freshness.stale
+
+    def test_update_rates_and_exchange_lag(self):
+        """Test per-venue update counters and exchange timestamp lag."""
+        freshness = BookFreshness(max_age=5)
+        for i in range(11):
+            freshness.touch('okx', 100 + i * 0.1, exchange_timestamp=int((100 + i * 0.1) * 1000) - 20)
+        freshness.touch('kucoin', 100)
+
+        assert freshness.update_counts == {'okx': 11, 'kucoin': 1}
+        assert freshness.update_rates(101)['okx'] == pytest.approx(11)
+        assert freshness.exchange_lag('okx') == pytest.approx(0.02, abs=1e-3)
+        assert freshness.exchange_lag('kucoin') is None
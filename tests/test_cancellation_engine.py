@@ -0,0 +1,70 @@
+"""
+Unit tests for cancellation_engine module.
+"""
+import time
+import asyncio
+from services.cancellation_engine import CancellationEngine
+
+
+class TestCancellationEngine:
+    """Test CancellationEngine class."""
+
+    def test_cancels_concurrently_without_cancel_all(self, create_exchange_service):
+        """Test that venues without cancelAllOrders cancel every order in about one round-trip."""
+        async def unwind():
+            exchange_service = create_exchange_service(rest_latency=0.05)
+            for exchange_id in ('binance', 'okx'):
+                exchange_service.get_exchange(exchange_id).has['cancelAllOrders'] = False
+                for price in (50, 51, 52, 53):
+                    await exchange_service.create_limit_buy_order(exchange_id, 'BTC/USDT', 1, price)
+
+            start = time.perf_counter()
+            report = await exchange_service.cancellation_engine.cancel_all([('binance', 'BTC/USDT'), ('okx', 'BTC/USDT')])
+            elapsed = time.perf_counter() - start
+            open_orders = await exchange_service.fetch_open_orders('okx', 'BTC/USDT')
+            return report, elapsed, open_orders
+
+        report, elapsed, open_orders = asyncio.run(unwind())
+        assert report.ok
+        assert report.cancelled == 8
+        assert open_orders == []
+        # Lấy danh sách + hủy + xác nhận = 3 request nối tiếp thay vì 10 request mỗi sàn
+        assert elapsed < 0.3
+
+    def test_native_cancel_all_is_confirmed(self, create_exchange_service):
+        """Test that a venue-wide cancel is confirmed through the open order list."""
+        async def unwind():
+            exchange_service = create_exchange_service()
+            await exchange_service.create_limit_buy_order('binance', 'BTC/USDT', 1, 50)
+            await exchange_service.create_limit_buy_order('binance', 'BTC/USDT', 1, 49)
+            report = await exchange_service.cancel_all_orders('binance', 'BTC/USDT')
+            return report, exchange_service.request_scheduler.stats()['binance']['requests']
+
+        report, requests = asyncio.run(unwind())
+        assert report.ok
+        assert report.requests == 1
+        # Một request hủy cả hai lệnh
+        assert report.cancelled == 2
+        # Đặt hai lệnh + hủy tất cả + xác nhận
+        assert requests == 4
+
+    def test_orders_left_open_are_reported(self, create_exchange_service):
+        """Test that orders the venue refuses to cancel are retried and reported as remaining."""
+        async def unwind():
+            exchange_service = create_exchange_service()
+            exchange = exchange_service.get_exchange('binance')
+            exchange.has['cancelAllOrders'] = False
+            order = await exchange_service.create_limit_buy_order('binance', 'BTC/USDT', 1, 50)
+
+            async def refuse(order_id, symbol=None):
+                raise RuntimeError('rejected')
+
+            exchange.cancel_order = refuse
+            report = await CancellationEngine(exchange_service, attempts=2).cancel_all([('binance', 'BTC/USDT')])
+            return report, order['id']
+
+        report, order_id = asyncio.run(unwind())
+        assert not report.ok
+        assert report.remaining == {'binance': [order_id]}
+        assert report.requests == 2
+        assert report.cancelled == 0
@@ -0,0 +1,107 @@
+"""
+Unit tests for connection_registry module.
+"""
+import asyncio
+import pytest
+from services.connection_registry import ConnectionRegistry
+from utils.exceptions import ExchangeError
+
+
+class FakeClient:
+    """Minimal stand-in for a ccxt.pro client."""
+
+    def __init__(self, exchange_id, open_delay=0):
+        self.id = exchange_id
+        self.open_delay = open_delay
+        self.closed = False
+
+    async def load_markets(self):
+        await asyncio.sleep(self.open_delay)
+        return {}
+
+    async def close(self):
+        self.closed = True
+
+
+def create_registry(open_delay=0):
+    """Create a registry whose factory records every client it opens."""
+    opened = []
+
+    def factory(exchange_id):
+        client = FakeClient(exchange_id, open_delay)
+        opened.append(client)
+        return client
+
+    return ConnectionRegistry(factory), opened
+
+
+class TestConnectionRegistry:
+    """Test ConnectionRegistry class."""
+
+    def test_concurrent_get_or_create_opens_one_client(self):
+        """Test that concurrent first requests for a venue share a single client."""
+        async def open_many():
+            registry, opened = create_registry(open_delay=0.01)
+            clients = await asyncio.gather(*(registry.get_or_create('binance') for _ in range(5)))
+            return clients, opened
+
+        clients, opened = asyncio.run(open_many())
+        assert len(opened) == 1
+        assert all(client is opened[0] for client in clients)
+
+    def test_acquire_and_release_count_handles(self):
+        """Test that handles are reference counted and released once."""
+        async def use():
+            registry, _ = create_registry()
+            first = await registry.acquire('okx')
+            async with await registry.acquire('okx'):
+                assert registry.ref_counts['okx'] == 2
+            first.release()
+            first.release()
+            return registry
+
+        registry = asyncio.run(use())
+        assert registry.ref_counts['okx'] == 0
+        # Kết nối vẫn được giữ ấm cho phiên sau
+        assert 'okx' in registry.clients
+
+    def test_get_client_without_connection(self):
+        """Test that reading a venue that was never opened raises ExchangeError."""
+        registry, _ = create_registry()
+        with pytest.raises(ExchangeError):
+            registry.get_client('binance')
+
+    def test_reconnect_keeps_a_client_available(self):
+        """Test that holders still see a client while the replacement is being opened."""
+        async def reconnect():
+            registry, _ = create_registry(open_delay=0.05)
+            handle = await registry.acquire('binance')
+            old = handle.exchange
+
+            task = asyncio.create_task(handle.reconnect())
+            await asyncio.sleep(0.01)
+            during = handle.exchange
+            await task
+            return old, during, handle.exchange
+
+        old, during, after = asyncio.run(reconnect())
+        assert during is old
+        assert after is not old
+        assert old.closed and not after.closed
+
+    def test_stale_reconnects_are_ignored(self):
+        """Test that loops reporting the same broken client trigger a single reconnect."""
+        async def storm():
+            registry, opened = create_registry(open_delay=0.01)
+            handles = [await registry.acquire('binance') for _ in range(3)]
+            for handle in handles:
+                handle.exchange
+            clients = await asyncio.gather(*(handle.reconnect() for handle in handles))
+            # Handle đã thấy kết nối mới thì lần kết nối lại sau đó mới có hiệu lực
+            handles[0].exchange
+            await handles[0].reconnect()
+            return clients, opened
+
+        clients, opened = asyncio.run(storm())
+        assert len(opened) == 3
+        assert clients[0] is clients[1] is clients[2] is opened[1]
@@ -0,0 +1,69 @@
+"""
+Unit tests for depth_book module.
+"""
+import pytest
+from utils.depth_book import DepthLadder, DepthBook
+
+
+class TestDepthLadder:
+    """Test DepthLadder class."""
+
+    def test_vwap_within_first_level(self):
+        """Test that a small order fills at the best price."""
+        ladder = DepthLadder()
+        ladder.update([[100, 1], [101, 2]])
+        assert ladder.price_for(0.5) == (100, 100)
+
+    def test_vwap_across_levels(self):
+        """Test VWAP and limit price for an order walking several levels."""
+        ladder = DepthLadder()
+        ladder.update([[100, 1], [101, 2], [102, 5]])
+
+        vwap, limit_price = ladder.price_for(2)
+        assert vwap == pytest.approx((100 * 1 + 101 * 1) / 2)
+        assert limit_price == 101
+
+        vwap, limit_price = ladder.price_for(4)
+        assert vwap == pytest.approx((100 + 202 + 102) / 4)
+        assert limit_price == 102
+
+    def test_insufficient_depth(self):
+        """Test that an order larger than the book returns None."""
+        ladder = DepthLadder()
+        ladder.update([[100, 1], [101, 2]])
+        assert ladder.price_for(3.5) is None
+        assert DepthLadder().price_for(1) is None
+
+    def test_incremental_update(self):
+        """Test that only levels after the first change are rebuilt."""
+        ladder = DepthLadder()
+        assert ladder.update([[100, 1], [101, 2], [102, 3]]) == 0
+        assert ladder.update([[100, 1], [101, 2], [102, 3]]) == 3
+        assert ladder.update([[100, 1], [101, 4], [102, 3]]) == 1
+        assert ladder.cum_sizes == [1, 5, 8]
+        assert ladder.cum_notional == [100, 504, 810]
+
+    def test_book_shrinks(self):
+        """Test that removed levels are dropped from the cumulative arrays."""
+        ladder = DepthLadder()
+        ladder.update([[100, 1], [101, 2], [102, 3]])
+        ladder.update([[100, 1]])
+        assert ladder.prices == [100]
+        assert ladder.total_size() == 1
+
+    def test_max_levels(self):
+        """Test that levels beyond max_levels are ignored."""
+        ladder = DepthLadder(max_levels=2)
+        ladder.update([[100, 1], [101, 2], [102, 3]])
+        assert ladder.total_size() == 3
+
+
+class TestDepthBook:
+    """Test DepthBook class."""
+
+    def test_buy_and_sell_sides(self):
+        """Test that buys walk the asks and sells walk the bids."""
+        book = DepthBook()
+        book.update({'bids': [[99, 1], [98, 1]], 'asks': [[101, 1], [102, 1]]})
+        assert book.buy_price(2) == (pytest.approx(101.5), 102)
+        assert book.sell_price(2) == (pytest.approx(98.5), 98)
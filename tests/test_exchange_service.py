@@ -0,0 +1,49 @@
+"""
+Unit tests for exchange_service module.
+"""
+import asyncio
+import pytest
+
+
+@pytest.mark.parametrize('mock_settings', [{'rest_latency': 0.005}], indirect=True)
+class TestKeepAlive:
+    """Test connection warm-up and keep-alive."""
+
+    def test_warm_up_measures_rtt(self, create_exchange_service):
+        """Test that warm-up pings every venue and keeps pinging until close."""
+        async def run():
+            exchange_service = create_exchange_service()
+            calls = []
+            exchange = exchange_service.get_exchange('binance')
+            fetch_balance = exchange.fetch_balance
+
+            async def counting_fetch_balance(params=None):
+                calls.append(params)
+                return await fetch_balance(params)
+
+            exchange.fetch_balance = counting_fetch_balance
+
+            await exchange_service.start_keepalive(['binance', 'okx'], interval=0.01)
+            warm_rtt = exchange_service.get_rtt('okx')
+            await asyncio.sleep(0.1)
+            await exchange_service.close()
+            return exchange_service, warm_rtt, len(calls)
+
+        exchange_service, warm_rtt, calls = asyncio.run(run())
+        assert warm_rtt >= 0.005
+        assert exchange_service.get_rtt('binance') >= 0.005
+        assert exchange_service.get_rtt('kucoin') is None
+        assert calls >= 3
+        assert exchange_service.keepalive_tasks == {}
+
+    def test_failed_warm_up_does_not_raise(self, create_exchange_service):
+        """Test that an unreachable venue is logged and the others are still warmed."""
+        async def run():
+            exchange_service = create_exchange_service()
+            await exchange_service.start_keepalive(['binance', 'unknown'], interval=60)
+            await exchange_service.close()
+            return exchange_service
+
+        exchange_service = asyncio.run(run())
+        assert exchange_service.get_rtt('binance') is not None
+        assert exchange_service.get_rtt('unknown') is None
@@ -10,7 +10,11 @@ from utils.helpers import (
     calculate_average,
     extract_base_asset,
     read_file_content,
-    update_balance_file
+    update_balance_file,
+    floor_to_step,
+    ceil_to_step,
+    round_to_step,
+    common_step
 )
 
 
@@ -128,3 +132,35 @@ class TestFileOperations:
             assert new_balance == 95.0
         finally:
             os.unlink(temp_file)
+
+
+class TestStepRounding:
+    """Test floor_to_step, ceil_to_step and round_to_step functions."""
+
+    def test_floor_to_step(self):
+        """Test rounding down to the lot size without float noise."""
+        assert floor_to_step(0.3, 0.1) == 0.3
+        assert floor_to_step(1.23456789, 0.00001) == 1.23456
+        assert floor_to_step(123, 10) == 120
+
+    def test_ceil_to_step(self):
+        """Test rounding up to the tick size."""
+        assert ceil_to_step(100.01, 0.5) == 100.5
+        assert ceil_to_step(100.5, 0.5) == 100.5
+
+    def test_round_to_step(self):
+        """Test rounding to the nearest step."""
+        assert round_to_step(0.16, 0.1) == 0.2
+        assert round_to_step(0.14, 0.1) == 0.1
+
+    def test_no_step(self):
+        """Test that a missing step leaves the value unchanged."""
+        assert floor_to_step(1.23456789, None) == 1.23456789
+        assert ceil_to_step(1.23456789, 0) == 1.23456789
+
+    def test_common_step(self):
+        """Test the least common multiple of decimal steps."""
+        assert common_step(0.3, 0.2) == 0.6
+        assert common_step(0.001, 0.01) == 0.01
+        assert common_step(0.00001, None) == 0.00001
+        assert common_step(None, 0) is None
@@ -0,0 +1,79 @@
+"""
+Unit tests for latency module.
+"""
+import json
+import pytest
+from utils.latency import LatencyHistogram, LatencyTracker, STAGE_FEED, STAGE_QUEUE, STAGE_ORDER_ACK
+
+
+class TestLatencyHistogram:
+    """Test LatencyHistogram class."""
+
+    def test_bucket_bounds_are_contiguous(self):
+        """Test that every value maps to a bucket whose upper bound covers it."""
+        previous_upper = -1
+        for index in range(200):
+            upper = LatencyHistogram._bucket_upper_bound(index)
+            assert upper > previous_upper
+            assert LatencyHistogram._bucket_index(upper) == index
+            assert LatencyHistogram._bucket_index(previous_upper + 1) == index
+            previous_upper = upper
+
+    def test_percentiles_within_relative_error(self):
+        """Test p50/p99/p999 on a uniform 1..1000 ms distribution."""
+        histogram = LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+
+        assert histogram.count == 1000
+        assert histogram.percentile(50) == pytest.approx(0.5, rel=0.07)
+        assert histogram.percentile(99) == pytest.approx(0.99, rel=0.07)
+        assert histogram.percentile(99.9) == pytest.approx(0.999, rel=0.07)
+        assert histogram.percentile(100) == pytest.approx(1.0)
+
+    def test_negative_and_empty(self):
+        """Test that negative values count as zero and empty histograms report nothing."""
+        histogram = LatencyHistogram()
+        assert histogram.percentile(50) is None
+        assert histogram.summary() == {'count': 0}
+
+        histogram.record(-0.002)
+        assert histogram.summary()['max'] == 0
+
+
+class TestLatencyTracker:
+    """Test LatencyTracker class."""
+
+    def test_summary_per_stage_and_exchange(self):
+        """Test that samples are grouped by stage and exchange in pipeline order."""
+        tracker = LatencyTracker()
+        tracker.record(STAGE_ORDER_ACK, 'binance', 0.05)
+        tracker.record(STAGE_FEED, 'okx', 0.01)
+        tracker.record(STAGE_FEED, 'binance', 0.02)
+
+        summary = tracker.summary()
+        assert list(summary) == [STAGE_FEED, STAGE_ORDER_ACK]
+        assert list(summary[STAGE_FEED]) == ['binance', 'okx']
+        assert summary[STAGE_ORDER_ACK]['binance']['p50'] == pytest.approx(50, rel=0.07)
+
+    def test_disabled_tracker_records_nothing(self):
+        """Test that a disabled tracker ignores samples."""
+        tracker = LatencyTracker(enabled=False)
+        tracker.record(STAGE_QUEUE, 'binance', 0.001)
+        assert tracker.summary() == {}
+
+    def test_export_json(self, tmp_path):
+        """Test that the exported file contains the summary."""
+        tracker = LatencyTracker()
+        assert tracker.export(str(tmp_path)) is None
+
+        tracker.record(STAGE_QUEUE, 'kucoin', 0.001)
+        path = tracker.export(str(tmp_path), 'BTC/USDT')
+
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        assert data[STAGE_QUEUE]['kucoin']['count'] == 1
+        assert 'BTC-USDT' in path
+
+        tracker.reset()
+        assert tracker.summary() == {}
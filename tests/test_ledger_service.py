@@ -0,0 +1,149 @@
+"""
+Unit tests for ledger_service module.
+"""
+import asyncio
+import sqlite3
+import pytest
+import services.ledger_service as ledger_module
+from services.ledger_service import LedgerService, ACCOUNT
+from services.balance_service import BalanceService
+from services.exchange_service import ExchangeService
+from services.trade_pipeline import TradeIntent
+
+
+@pytest.fixture
+def ledger_path(tmp_path, monkeypatch):
+    """Point the legacy balance files into tmp_path and return a ledger path there."""
+    monkeypatch.setattr(ledger_module, 'BALANCE_FILE', str(tmp_path / 'balance.txt'))
+    monkeypatch.setattr(ledger_module, 'START_BALANCE_FILE', str(tmp_path / 'start_balance.txt'))
+    return str(tmp_path / 'ledger.db')
+
+
+class TestLedgerService:
+    """Test LedgerService class."""
+
+    def test_records_are_batched_and_queryable(self, ledger_path):
+        """Test that queued records land in few transactions and are read back through queries."""
+        async def record():
+            ledger = LedgerService(ledger_path)
+            await ledger.start()
+            session_id = await ledger.record_session_start('classic', 'BTC/USDT', 1000)
+            for i in range(50):
+                ledger.record_trade('BTC/USDT', 'binance', 'okx', 0.1, 100, 101 + i, 0.5, 5, 0.2, 0.0002)
+            ledger.record_balance(ACCOUNT, 'USDT', 1005)
+            ledger.record_snapshot('binance', {'free': {'BTC': 1, 'ETH': 0}, 'used': {'BTC': 0}, 'total': {'BTC': 1, 'ETH': 0}})
+
+            balance = await ledger.latest_balance()
+            btc = await ledger.latest_balance('binance', 'BTC')
+            start_balance = await ledger.start_balance()
+            trades = await ledger.session_trades()
+            batches = ledger.batches_written
+            await ledger.close()
+            return session_id, balance, btc, start_balance, trades, batches
+
+        session_id, balance, btc, start_balance, trades, batches = asyncio.run(record())
+        assert session_id == 1
+        assert balance == 1005
+        assert btc == 1
+        assert start_balance == 1000
+        assert [trade['sell_price'] for trade in trades] == [101 + i for i in range(50)]
+        assert trades[0]['fee_usd'] == pytest.approx(0.2)
+        # Các bản ghi đưa vào cùng lúc được ghi trong một transaction
+        assert batches == 1
+
+    def test_wal_mode_and_reopen(self, ledger_path):
+        """Test that the file uses WAL and sessions continue after the ledger is reopened."""
+        async def reopen():
+            ledger = LedgerService(ledger_path)
+            await ledger.start()
+            await ledger.record_session_start('classic', 'BTC/USDT', 1000)
+            await ledger.close()
+
+            ledger = LedgerService(ledger_path)
+            await ledger.start()
+            session_id = await ledger.record_session_start('classic', 'BTC/USDT', 1010)
+            start_balance = await ledger.start_balance(1)
+            await ledger.close()
+            return session_id, start_balance
+
+        assert asyncio.run(reopen()) == (2, 1000)
+        with sqlite3.connect(ledger_path) as db:
+            assert db.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+    def test_imports_balance_files_once(self, ledger_path, tmp_path):
+        """Test that balance.txt and start_balance.txt seed an empty ledger only once."""
+        (tmp_path / 'balance.txt').write_text('1234.5')
+        (tmp_path / 'start_balance.txt').write_text('1000')
+
+        async def open_twice():
+            results = []
+            for _ in range(2):
+                ledger = LedgerService(ledger_path)
+                await ledger.start()
+                results.append((ledger.session_id, await ledger.latest_balance(), await ledger.start_balance()))
+                await ledger.close()
+            return results
+
+        assert asyncio.run(open_twice()) == [(1, 1234.5, 1000), (1, 1234.5, 1000)]
+
+
+class TestBalanceServiceLedger:
+    """Test the ledger-backed session balance of BalanceService."""
+
+    def test_session_balance_and_trades(self, ledger_path):
+        """Test that a session start, a trade and the profit update are read back from the ledger."""
+        async def session():
+            balance_service = BalanceService(ExchangeService(use_mock=True), ledger=LedgerService(ledger_path))
+            await balance_service.start_session('fake-money', 'BTC/USDT', 1000)
+            intent = TradeIntent('binance', 'okx', 'BTC/USDT', 0.1, 100, 102, 100, 102, 1.5, 0.2, 10, 0.1)
+            balance_service.record_trade(intent, 0.02, 0.0002)
+            new_balance = balance_service.update_balance_with_profit(1.5)
+            stored = await balance_service.session_balance()
+            trades = await balance_service.ledger.session_trades()
+            await balance_service.close()
+            return new_balance, stored, trades
+
+        new_balance, stored, trades = asyncio.run(session())
+        assert new_balance == 1015
+        assert stored == 1015
+        assert len(trades) == 1
+        assert trades[0]['buy_exchange'] == 'binance' and trades[0]['success'] == 1
+
+    def test_failed_batch_is_rolled_back(self, ledger_path):
+        """Test that rows of a failed batch are discarded instead of committed with the next batch."""
+        async def fail():
+            ledger = LedgerService(ledger_path)
+            await ledger.start()
+            await ledger.record_session_start('classic', 'BTC/USDT', 1000)
+            ledger.record_balance(ACCOUNT, 'USDT', 999)
+            # amount NOT NULL: lệnh INSERT thứ hai của lô thất bại
+            ledger.record_trade('BTC/USDT', 'binance', 'okx', None, 100, 101, 0.5, 5, 0.2, 0.0002)
+            await ledger.flush()
+            ledger.record_balance('binance', 'BTC', 1)
+            balance = await ledger.latest_balance()
+            await ledger.close()
+            return balance
+
+        assert asyncio.run(fail()) == 1000
+
+    def test_processes_sharing_a_file_get_distinct_sessions(self, ledger_path):
+        """Test that two ledgers opened on the same file do not reuse session ids."""
+        async def share():
+            first, second = LedgerService(ledger_path), LedgerService(ledger_path)
+            await first.start()
+            await second.start()
+            ids = [
+                await first.record_session_start('classic', 'BTC/USDT', 1000),
+                await second.record_session_start('classic', 'ETH/USDT', 2000),
+            ]
+            second.record_trade('ETH/USDT', 'binance', 'okx', 1, 2000, 2010, 0.5, 10, 1, 0.001)
+            trades = await second.session_trades()
+            starts = [await first.start_balance(ids[0]), await first.start_balance(ids[1])]
+            await first.close()
+            await second.close()
+            return ids, trades, starts
+
+        ids, trades, starts = asyncio.run(share())
+        assert ids == [1, 2]
+        assert [trade['session_id'] for trade in trades] == [2]
+        assert starts == [1000, 2000]
@@ -0,0 +1,96 @@
+"""
+Unit tests for market_cache module.
+"""
+import os
+import json
+import time
+import asyncio
+import ccxt
+import pytest
+from services.market_cache import MarketCache, MarketRules
+
+BTC_MARKET = {
+    'symbol': 'BTC/USDT',
+    'precision': {'price': 0.01, 'amount': 0.00001},
+    'limits': {'price': {'min': 0.01}, 'amount': {'min': 0.00001}, 'cost': {'min': 5}},
+}
+
+
+class TestMarketRules:
+    """Test MarketRules class."""
+
+    def test_tick_size_market(self):
+        """Test that TICK_SIZE precision is used as the step directly."""
+        rules = MarketRules.from_market(BTC_MARKET, ccxt.TICK_SIZE)
+        assert rules.price_step == 0.01
+        assert rules.amount_step == 0.00001
+        assert rules.min_cost == 5
+
+    def test_decimal_places_market(self):
+        """Test that DECIMAL_PLACES precision is converted to a step."""
+        market = {'precision': {'price': 2, 'amount': 4}, 'limits': {}}
+        rules = MarketRules.from_market(market, ccxt.DECIMAL_PLACES)
+        assert rules.price_step == pytest.approx(0.01)
+        assert rules.amount_step == pytest.approx(0.0001)
+        assert rules.min_amount is None
+
+
+class TestMarketCache:
+    """Test MarketCache against the mock exchange."""
+
+    def test_rounding_and_minimums(self, create_exchange_service):
+        """Test lot-size and tick-size rounding and the min-notional check."""
+        exchange_service = create_exchange_service()
+        cache = MarketCache(exchange_service)
+        exchange_service.get_exchange('binance').markets['BTC/USDT'] = BTC_MARKET
+        asyncio.run(cache.ensure_loaded('binance'))
+
+        assert cache.amount_to_precision('binance', 'BTC/USDT', 0.123456789) == 0.12345
+        assert cache.price_to_precision('binance', 'BTC/USDT', 100.123, 'buy') == 100.13
+        assert cache.price_to_precision('binance', 'BTC/USDT', 100.127, 'sell') == 100.12
+        assert cache.meets_minimums('binance', 'BTC/USDT', 0.1, 100)
+        assert not cache.meets_minimums('binance', 'BTC/USDT', 0.01, 100)
+        # Sàn chưa tải markets: giữ nguyên giá trị
+        assert cache.amount_to_precision('okx', 'BTC/USDT', 0.123456789) == 0.123456789
+
+    def test_common_amount_uses_common_lot_size(self, create_exchange_service):
+        """Test that both legs get an amount that is a multiple of every venue's lot size."""
+        cache = MarketCache(create_exchange_service())
+        cache.rules[('binance', 'BTC/USDT')] = MarketRules(amount_step=0.3)
+        cache.rules[('okx', 'BTC/USDT')] = MarketRules(amount_step=0.2)
+
+        assert cache.common_amount(['binance', 'okx'], 'BTC/USDT', 1.0) == 0.6
+        assert cache.common_amount(['binance', 'okx'], 'BTC/USDT', 1.25) == 1.2
+        # Sàn chưa tải markets không giới hạn khối lượng
+        assert cache.common_amount(['binance', 'kucoin'], 'BTC/USDT', 1.0) == 0.9
+
+    def test_fresh_file_skips_download(self, tmp_path, create_exchange_service):
+        """Test that markets are persisted and loaded from a fresh file without load_markets."""
+        directory = str(tmp_path)
+        first = create_exchange_service()
+        asyncio.run(MarketCache(first, directory).load(['binance', 'okx']))
+        assert os.path.exists(os.path.join(directory, 'binance.json'))
+        assert os.path.exists(os.path.join(directory, 'okx.json'))
+
+        second = create_exchange_service()
+        exchange = second.get_exchange('binance')
+
+        async def no_download(reload=False):
+            raise AssertionError("load_markets không được gọi khi tệp còn hạn")
+
+        exchange.load_markets = no_download
+        cache = MarketCache(second, directory)
+        asyncio.run(cache.ensure_loaded('binance'))
+        assert cache.is_loaded('binance')
+        assert cache.get('binance', 'BTC/USDT') is not None
+
+    def test_expired_file_is_reloaded(self, tmp_path, create_exchange_service):
+        """Test that a file older than the TTL is replaced by a fresh download."""
+        path = tmp_path / 'binance.json'
+        path.write_text(json.dumps({'saved_at': time.time() - 100, 'markets': {'BTC/USDT': BTC_MARKET}}))
+
+        cache = MarketCache(create_exchange_service(), str(tmp_path), ttl=10)
+        asyncio.run(cache.ensure_loaded('binance'))
+
+        assert cache.get('binance', 'ETH/USDT') is not None
+        assert json.loads(path.read_text())['saved_at'] > time.time() - 10
@@ -0,0 +1,108 @@
+"""
+Unit tests for mock_exchange module.
+"""
+import asyncio
+import ccxt
+import pytest
+from services.mock_exchange import split_symbol
+
+
+class TestSplitSymbol:
+    """Test split_symbol function."""
+
+    def test_formats(self):
+        """Test spot, linear swap and short futures symbols."""
+        assert split_symbol("BTC/USDT") == ("BTC", "USDT")
+        assert split_symbol("BTC/USDT:USDT") == ("BTC", "USDT")
+        assert split_symbol("BTC:USDT") == ("BTC", "USDT")
+
+
+class TestMockExchange:
+    """Test the REST facade of the mock exchange."""
+
+    def test_market_order_updates_balances(self, create_mock_hub):
+        """Test that a market buy fills immediately and moves both balances."""
+        async def trade():
+            exchange = create_mock_hub().create_exchange("binance")
+            order = await exchange.create_market_buy_order("BTC/USDT", 0.5)
+            return order, await exchange.fetch_balance()
+
+        order, balance = asyncio.run(trade())
+        assert order['status'] == 'closed'
+        assert order['filled'] == 0.5
+        assert balance['free']['BTC'] == pytest.approx(1.5)
+        assert balance['free']['USDT'] < 1000 - 0.5 * 99
+
+    def test_resting_limit_order_and_cancel(self, create_mock_hub):
+        """Test that a passive limit order rests, reserves funds and can be cancelled."""
+        async def rest_and_cancel():
+            exchange = create_mock_hub().create_exchange("binance")
+            order = await exchange.create_limit_buy_order("BTC/USDT", 1, 50)
+
+            assert order['status'] == 'open'
+            assert [o['id'] for o in await exchange.fetch_open_orders("BTC/USDT")] == [order['id']]
+            assert (await exchange.fetch_balance())['used']['USDT'] > 0
+
+            await exchange.cancel_order(order['id'], "BTC/USDT")
+            assert await exchange.fetch_open_orders("BTC/USDT") == []
+            assert (await exchange.fetch_balance())['used']['USDT'] == pytest.approx(0)
+
+            with pytest.raises(ccxt.OrderNotFound):
+                await exchange.cancel_order(order['id'], "BTC/USDT")
+
+        asyncio.run(rest_and_cancel())
+
+    def test_marketable_limit_order_fills(self, create_mock_hub):
+        """Test that a limit order through the book fills and appears in closed orders."""
+        async def trade():
+            exchange = create_mock_hub().create_exchange("okx")
+            order = await exchange.create_limit_sell_order("BTC/USDT", 0.5, 90)
+            return order, await exchange.fetch_closed_orders("BTC/USDT")
+
+        order, closed = asyncio.run(trade())
+        assert order['status'] == 'closed'
+        assert closed[-1]['filled'] == 0.5
+
+    def test_insufficient_funds(self, create_mock_hub):
+        """Test that orders larger than the free balance are rejected."""
+        exchange = create_mock_hub().create_exchange("kucoin")
+        with pytest.raises(ccxt.InsufficientFunds):
+            asyncio.run(exchange.create_market_sell_order("BTC/USDT", 5))
+
+    def test_transfer_and_futures_position(self, create_mock_hub):
+        """Test a spot to futures transfer and a short position on the futures venue."""
+        async def transfer_and_short():
+            hub = create_mock_hub()
+            spot = hub.create_exchange("kucoin")
+            futures = hub.create_exchange("kucoinfutures")
+
+            await spot.transfer("USDT", 100, "spot", "future")
+            assert (await spot.fetch_balance())['free']['USDT'] == 900
+            assert (await futures.fetch_balance())['free']['USDT'] == 1100
+
+            await futures.create_market_sell_order("BTC:USDT", 3)
+            return (await futures.fetch_positions(["BTC:USDT"]))[0]
+
+        position = asyncio.run(transfer_and_short())
+        assert (position['side'], position['contracts']) == ("short", 3)
+
+
+class TestMockProExchange:
+    """Test the websocket facade of the mock exchange."""
+
+    def test_watch_order_book(self, create_mock_hub):
+        """Test that every watch returns a fresh, sorted order book."""
+        async def watch():
+            exchange = create_mock_hub().create_pro_exchange("binance")
+            await exchange.load_markets()
+            first = await exchange.watch_order_book("BTC/USDT")
+            second = await exchange.watch_order_book_for_symbols(["BTC/USDT"])
+            await exchange.close()
+            return exchange, first, second
+
+        exchange, first, second = asyncio.run(watch())
+        assert "BTC/USDT" in exchange.markets
+        assert first is not second
+        assert second['symbol'] == "BTC/USDT"
+        assert first['bids'][0][0] < first['asks'][0][0]
+        assert first['asks'][0][0] < first['asks'][1][0]
@@ -0,0 +1,92 @@
+"""
+Unit tests for order_manager module.
+"""
+import asyncio
+import pytest
+from services.order_manager import (
+    ManagedOrder, ORDER_OPEN, ORDER_PARTIALLY_FILLED, ORDER_FILLED, ORDER_CANCELED, ORDER_REJECTED
+)
+
+
+class TestManagedOrder:
+    """Test ManagedOrder state transitions."""
+
+    def test_partial_fill_then_cancel(self):
+        """Test that partial fills are kept through a cancel and stale updates are ignored."""
+        managed = ManagedOrder('binance', 'BTC/USDT', 'buy', 1.0, 100)
+        managed.apply({'id': '1', 'status': 'open', 'filled': 0.0})
+        assert managed.state == ORDER_OPEN
+        assert managed.order_id == '1'
+
+        managed.apply({'status': 'open', 'filled': 0.3, 'average': 99.5})
+        assert managed.state == ORDER_PARTIALLY_FILLED
+        assert managed.remaining == pytest.approx(0.7)
+
+        managed.apply({'status': 'canceled', 'filled': 0.3})
+        managed.apply({'status': 'open', 'filled': 0.1})
+        assert managed.state == ORDER_CANCELED
+        assert managed.filled == pytest.approx(0.3)
+        assert managed.average == 99.5
+        assert managed.closed_at is not None
+
+
+class TestOrderManager:
+    """Test OrderManager against the mock exchange."""
+
+    def test_create_lookup_and_cancel(self, create_order_manager):
+        """Test that orders are indexed by order id and client order id and cancelled from state."""
+        async def create_and_cancel():
+            manager = create_order_manager()
+            managed = await manager.create_limit_order('binance', 'BTC/USDT', 'buy', 1, 50)
+
+            assert manager.get('binance', managed.order_id) is managed
+            assert manager.get_by_client_id(managed.client_order_id) is managed
+            assert managed.state == ORDER_OPEN
+
+            await manager.cancel(managed)
+            return managed
+
+        managed = asyncio.run(create_and_cancel())
+        assert managed.state == ORDER_CANCELED
+        assert managed.filled == 0
+
+    def test_marketable_order_is_filled(self, create_order_manager):
+        """Test that an immediately filled order is terminal after acknowledgement."""
+        async def create():
+            manager = create_order_manager()
+            managed = await manager.create_limit_order('binance', 'BTC/USDT', 'buy', 0.5, 200)
+            await manager.cancel(managed)
+            return managed
+
+        managed = asyncio.run(create())
+        assert managed.state == ORDER_FILLED
+        assert managed.filled == pytest.approx(0.5)
+
+    def test_rejected_order(self, create_order_manager):
+        """Test that a rejected order is recorded with its error."""
+        async def create():
+            manager = create_order_manager()
+            with pytest.raises(Exception):
+                await manager.create_limit_order('binance', 'BTC/USDT', 'sell', 5, 150)
+            return manager
+
+        manager = asyncio.run(create())
+        [managed] = manager.client_orders.values()
+        assert managed.state == ORDER_REJECTED
+        assert managed.error
+        assert managed.order_id is None
+
+    def test_finished_orders_are_evicted(self, create_order_manager):
+        """Test that the order tables keep only recent finished orders and every open order."""
+        async def trade():
+            manager = create_order_manager()
+            manager.history_size = 4
+            resting = await manager.create_limit_order('binance', 'BTC/USDT', 'buy', 0.1, 50)
+            filled = [await manager.create_limit_order('binance', 'BTC/USDT', 'buy', 0.01, 200) for _ in range(10)]
+            return manager, resting, filled
+
+        manager, resting, filled = asyncio.run(trade())
+        assert len(manager.orders) <= 4 and len(manager.client_orders) <= 4
+        assert manager.get('binance', resting.order_id) is resting
+        assert manager.get_by_client_id(filled[-1].client_order_id) is filled[-1]
+        assert manager.get_by_client_id(filled[0].client_order_id) is None
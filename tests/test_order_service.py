@@ -0,0 +1,182 @@
+"""
+Unit tests for order_service module.
+"""
+import time
+import asyncio
+import pytest
+import services.order_service as order_service_module
+from services.order_service import OrderService
+from services.order_manager import ManagedOrder
+from utils.exceptions import OrderError
+from utils.latency import LatencyTracker, STAGE_LEG_SKEW, STAGE_LEG_ACK_SKEW, ALL_EXCHANGES
+
+
+class TestPlaceArbitrageOrders:
+    """Test concurrent dispatch of the two arbitrage legs."""
+
+    def test_rejected_sell_cancels_resting_buy(self, create_order_service):
+        """Test that a resting buy is cancelled when the sell leg is rejected."""
+        async def place():
+            order_service, exchange_service = create_order_service()
+            # 5 BTC vượt quá số dư 1 BTC trên okx nên lệnh bán bị từ chối
+            result = await order_service.place_arbitrage_orders('binance', 'okx', 'BTC/USDT', 5, 50, 150)
+            return result, await exchange_service.fetch_open_orders('binance', 'BTC/USDT')
+
+        result, open_orders = asyncio.run(place())
+        assert result is False
+        assert open_orders == []
+
+    def test_filled_buy_is_unwound(self, create_order_service):
+        """Test that a buy filled before the sell leg failed is sold back at market."""
+        async def place():
+            order_service, exchange_service = create_order_service()
+            result = await order_service.place_arbitrage_orders('binance', 'okx', 'BTC/USDT', 0.5, 200, 0)
+            return result, await exchange_service.get_balance('binance', 'BTC')
+
+        result, btc = asyncio.run(place())
+        assert result is False
+        assert btc == pytest.approx(1)
+
+    def test_timed_out_leg_is_cancelled_by_client_order_id(self, monkeypatch, create_order_service):
+        """Test that a leg acknowledged too late is cancelled alone, leaving other trades' orders resting."""
+        monkeypatch.setattr(order_service_module, 'ARBITRAGE_SUBMIT_TIMEOUT', 0.1)
+
+        async def place():
+            order_service, exchange_service = create_order_service()
+            # Chân lệnh đang chờ của một giao dịch khác trên cùng sàn và cặp
+            other = await order_service.order_manager.create_limit_order('okx', 'BTC/USDT', 'sell', 0.1, 150)
+            original = exchange_service.create_limit_sell_order
+
+            async def slow_ack(*args, **kwargs):
+                order = await original(*args, **kwargs)
+                await asyncio.sleep(5)
+                return order
+
+            exchange_service.create_limit_sell_order = slow_ack
+            result = await order_service.place_arbitrage_orders('binance', 'okx', 'BTC/USDT', 0.5, 50, 150)
+            okx_open = await exchange_service.fetch_open_orders('okx', 'BTC/USDT')
+            binance_open = await exchange_service.fetch_open_orders('binance', 'BTC/USDT')
+            return result, other, okx_open, binance_open
+
+        result, other, okx_open, binance_open = asyncio.run(place())
+        assert result is False
+        assert [order['id'] for order in okx_open] == [other.order_id]
+        assert binance_open == []
+
+    def test_both_timed_out_legs_are_cancelled_and_hedged(self, monkeypatch, create_order_service):
+        """Test that legs reaching the venues after the deadline are cancelled and hedged before the error."""
+        monkeypatch.setattr(order_service_module, 'ARBITRAGE_SUBMIT_TIMEOUT', 0.1)
+
+        async def place():
+            order_service, exchange_service = create_order_service()
+
+            def slow_ack(send):
+                async def send_and_stall(*args, **kwargs):
+                    order = await send(*args, **kwargs)
+                    await asyncio.sleep(5)
+                    return order
+                return send_and_stall
+
+            exchange_service.create_limit_buy_order = slow_ack(exchange_service.create_limit_buy_order)
+            exchange_service.create_limit_sell_order = slow_ack(exchange_service.create_limit_sell_order)
+            # Lệnh mua khớp ngay trên binance, lệnh bán nằm chờ trên okx
+            with pytest.raises(OrderError):
+                await order_service.place_arbitrage_orders('binance', 'okx', 'BTC/USDT', 0.5, 200, 150)
+            okx_open = await exchange_service.fetch_open_orders('okx', 'BTC/USDT')
+            return okx_open, await exchange_service.get_balance('binance', 'BTC')
+
+        okx_open, btc = asyncio.run(place())
+        assert okx_open == []
+        assert btc == pytest.approx(1)
+
+    def test_both_legs_rejected(self, create_order_service):
+        """Test that an OrderError is raised when no leg is accepted."""
+        order_service, _ = create_order_service()
+        with pytest.raises(OrderError):
+            asyncio.run(order_service.place_arbitrage_orders('binance', 'okx', 'BTC/USDT', 50, 50, 150))
+
+    def test_leg_skew_records_send_gap(self, monkeypatch, create_order_service):
+        """Test that the submit-time gap is recorded as leg skew and the ack gap separately."""
+        tracker = LatencyTracker()
+        monkeypatch.setattr(order_service_module, 'latency_tracker', tracker)
+        order_service, _ = create_order_service()
+        sell_order = ManagedOrder('okx', 'BTC/USDT', 'sell', 0.1, 100)
+        buy_order = ManagedOrder('binance', 'BTC/USDT', 'buy', 0.1, 100)
+        sell_order.created_at, buy_order.created_at = 10.0, 10.002
+        sell_order.acked_at, buy_order.acked_at = 10.05, 10.02
+
+        order_service._report_leg_skew(sell_order, buy_order)
+        assert tracker.histograms[(STAGE_LEG_SKEW, ALL_EXCHANGES)].summary()['max'] == pytest.approx(2, rel=0.01)
+        assert tracker.histograms[(STAGE_LEG_ACK_SKEW, ALL_EXCHANGES)].summary()['max'] == pytest.approx(30, rel=0.01)
+
+
+class TestPlaceInitialOrders:
+    """Test concurrent placement and fill monitoring of the initial buy orders."""
+
+    @pytest.mark.parametrize('mock_settings', [{'rest_latency': 0.2}], indirect=True)
+    def test_venues_are_placed_concurrently(self, create_order_service):
+        """Test that startup takes about one venue round-trip, not the sum over venues."""
+        async def place():
+            order_service, _ = create_order_service()
+
+            start = time.perf_counter()
+            result = await order_service.place_initial_orders(['binance', 'okx', 'kucoin'], 'BTC/USDT', 0.5, 200)
+            elapsed = time.perf_counter() - start
+            await order_service.close()
+            return result, elapsed
+
+        result, elapsed = asyncio.run(place())
+        assert result is True
+        assert elapsed < 0.5
+
+    def test_failed_venue_cancels_the_others(self, create_order_service):
+        """Test that orders already placed are cancelled when another venue rejects its order."""
+        async def place():
+            order_service, exchange_service = create_order_service()
+            with pytest.raises(OrderError):
+                await order_service.place_initial_orders(['binance', 'unknown'], 'BTC/USDT', 1, 50)
+            return await exchange_service.fetch_open_orders('binance', 'BTC/USDT')
+
+        assert asyncio.run(place()) == []
+
+
+class TestImmediateExecution:
+    """Test IOC/FOK execution of the arbitrage legs."""
+
+    def test_both_legs_fill_immediately(self, create_order_service):
+        """Test that marketable IOC legs fill in the order response and leave nothing resting."""
+        async def place():
+            order_service, exchange_service = create_order_service(execution_mode='ioc')
+            result = await order_service.place_arbitrage_orders('binance', 'okx', 'BTC/USDT', 0.5, 200, 10)
+            open_orders = await exchange_service.fetch_open_orders('binance', 'BTC/USDT')
+            return result, open_orders
+
+        result, open_orders = asyncio.run(place())
+        assert result is True
+        assert open_orders == []
+
+    def test_unfilled_leg_is_hedged_at_once(self, create_order_service):
+        """Test that an IOC buy that does not cross is cancelled and the filled sell is bought back."""
+        async def place():
+            order_service, exchange_service = create_order_service(execution_mode='ioc')
+
+            start = time.perf_counter()
+            result = await order_service.place_arbitrage_orders('binance', 'okx', 'BTC/USDT', 0.5, 50, 10)
+            elapsed = time.perf_counter() - start
+            open_orders = await exchange_service.fetch_open_orders('binance', 'BTC/USDT')
+            return result, elapsed, open_orders, await exchange_service.get_balance('okx', 'BTC')
+
+        result, elapsed, open_orders, btc = asyncio.run(place())
+        assert result is False
+        assert elapsed < 1
+        assert open_orders == []
+        assert btc == pytest.approx(1)
+
+    def test_fok_where_supported(self, create_exchange_service):
+        """Test that FOK mode uses FOK on venues declaring it and IOC mode always uses IOC."""
+        exchange_service = create_exchange_service()
+
+        assert OrderService(exchange_service, execution_mode='fok')._time_in_force('binance') == 'FOK'
+        assert OrderService(exchange_service, execution_mode='ioc')._time_in_force('binance') == 'IOC'
+        assert OrderService(exchange_service, execution_mode='gtc')._time_in_force('binance') is None
+        assert not exchange_service.supports_time_in_force('binance', 'GTD')
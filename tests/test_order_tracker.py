@@ -0,0 +1,127 @@
+"""
+Unit tests for order_tracker module.
+"""
+import asyncio
+from services.order_tracker import OrderTracker
+
+
+class TestOrderTracker:
+    """Test OrderTracker class."""
+
+    def test_websocket_update_resolves_wait(self, create_exchange_service):
+        """Test that a cancel pushed over watch_orders ends the wait without REST polling."""
+        async def cancel_while_waiting():
+            exchange_service = create_exchange_service()
+            tracker = OrderTracker(exchange_service, reconcile_interval=60)
+            await tracker.ensure_watching('binance')
+
+            order = await exchange_service.create_limit_buy_order('binance', 'BTC/USDT', 1, 50)
+            tracker.track('binance', order)
+
+            async def cancel_later():
+                await asyncio.sleep(0.05)
+                await exchange_service.cancel_order('binance', order['id'], 'BTC/USDT')
+
+            cancel_task = asyncio.create_task(cancel_later())
+
+            result = await asyncio.wait_for(tracker.wait_for('binance', order['id'], 'BTC/USDT', 30), 5)
+            await tracker.close()
+            return result
+
+        order = asyncio.run(cancel_while_waiting())
+        assert order['status'] == 'canceled'
+
+    def test_reconcile_without_websocket(self, create_exchange_service):
+        """Test that REST reconciliation picks up a state change the tracker did not see."""
+        async def reconcile():
+            exchange_service = create_exchange_service()
+            tracker = OrderTracker(exchange_service, reconcile_interval=0.01)
+
+            order = await exchange_service.create_limit_buy_order('binance', 'BTC/USDT', 1, 50)
+            tracker.track('binance', order)
+            await exchange_service.cancel_order('binance', order['id'], 'BTC/USDT')
+
+            assert tracker.get('binance', order['id'])['status'] == 'open'
+            return await tracker.wait_for('binance', order['id'], 'BTC/USDT', 1)
+
+        assert asyncio.run(reconcile())['status'] == 'canceled'
+
+    def test_lookup_by_client_order_id(self):
+        """Test lookup by client order id and that terminal states are not overwritten."""
+        tracker = OrderTracker(exchange_service=None)
+        tracker.track('okx', {'id': '7', 'clientOrderId': 'arb-1', 'status': 'open', 'filled': 0.0})
+        tracker.update('okx', {'id': '7', 'status': 'closed', 'filled': 1.0})
+        tracker.update('okx', {'id': '7', 'status': 'open', 'filled': 0.5})
+
+        order = tracker.get('okx', client_order_id='arb-1')
+        assert order['status'] == 'closed'
+        assert order['filled'] == 1.0
+        assert tracker.get('okx', client_order_id='missing') is None
+
+    def test_trades_accumulate_fills(self):
+        """Test that watch_my_trades updates fill the order and deduplicate by trade id."""
+        tracker = OrderTracker(exchange_service=None)
+        tracker.track('kucoin', {'id': '3', 'amount': 1.0, 'status': 'open'})
+
+        tracker._apply_trade('kucoin', {'id': 't1', 'order': '3', 'amount': 0.4, 'cost': 40})
+        tracker._apply_trade('kucoin', {'id': 't1', 'order': '3', 'amount': 0.4, 'cost': 40})
+        assert tracker.get('kucoin', '3')['filled'] == 0.4
+
+        tracker._apply_trade('kucoin', {'id': 't2', 'order': '3', 'amount': 0.6, 'cost': 66})
+        order = tracker.get('kucoin', '3')
+        assert order['status'] == 'closed'
+        assert order['average'] == 106 / 1.0
+
+    def test_polling_backs_off_without_websocket(self, create_exchange_service):
+        """Test that REST polling starts fast and doubles up to the reconcile interval."""
+        async def wait_resting_order():
+            exchange_service = create_exchange_service()
+            tracker = OrderTracker(exchange_service, reconcile_interval=0.08, min_poll_interval=0.01)
+            calls = []
+            reconcile = tracker.reconcile
+
+            async def counting_reconcile(*args):
+                calls.append(args)
+                return await reconcile(*args)
+
+            tracker.reconcile = counting_reconcile
+            order = await exchange_service.create_limit_buy_order('binance', 'BTC/USDT', 1, 50)
+            tracker.track('binance', order)
+            await tracker.wait_for('binance', order['id'], 'BTC/USDT', 0.3)
+            return len(calls)
+
+        # 0.01 + 0.02 + 0.04 + 0.08 + 0.08 + 0.08 giây thay vì 30 lần đối chiếu
+        assert 4 <= asyncio.run(wait_resting_order()) <= 8
+
+    def test_finished_orders_are_evicted(self):
+        """Test that only recent finished orders stay in memory while open orders are kept."""
+        tracker = OrderTracker(exchange_service=None, history_size=4)
+        tracker.track('okx', {'id': 'open', 'status': 'open'})
+        for i in range(10):
+            tracker.track('okx', {'id': str(i), 'clientOrderId': f"arb-{i}", 'status': 'closed', 'filled': 1.0})
+            tracker._terminal_event(('okx', str(i)))
+
+        assert len(tracker.orders) <= 4
+        assert tracker.get('okx', 'open') is not None
+        assert tracker.get('okx', '9') is not None
+        assert tracker.get('okx', client_order_id='arb-0') is None
+        assert len(tracker.client_order_ids) < 10
+        assert len(tracker.terminal_events) < 10
+
+    def test_trades_before_track_are_applied(self):
+        """Test that fills streamed before the order is tracked are applied once it is tracked."""
+        tracker = OrderTracker(exchange_service=None)
+        tracker._apply_trade('kucoin', {'id': 't1', 'order': '5', 'amount': 0.4, 'cost': 40})
+        tracker._apply_trade('kucoin', {'id': 't2', 'order': '5', 'amount': 0.6, 'cost': 60})
+
+        order = tracker.track('kucoin', {'id': '5', 'amount': 1.0, 'filled': 0.0, 'status': 'open'})
+        assert order['filled'] == 1.0
+        assert order['status'] == 'closed'
+        assert tracker.pending_trades == {}
+
+        # Phản hồi đã gồm giao dịch khớp sớm thì không cộng lại
+        tracker._apply_trade('kucoin', {'id': 't3', 'order': '6', 'amount': 0.4, 'cost': 40})
+        order = tracker.track('kucoin', {'id': '6', 'amount': 1.0, 'filled': 0.4, 'status': 'open'})
+        assert order['filled'] == 0.4
+        tracker._apply_trade('kucoin', {'id': 't3', 'order': '6', 'amount': 0.4, 'cost': 40})
+        assert tracker.get('kucoin', '6')['filled'] == 0.4
@@ -0,0 +1,45 @@
+"""
+Unit tests for orderbook_slots module.
+"""
+import asyncio
+from utils.orderbook_slots import LatestBookSlots
+
+
+class TestLatestBookSlots:
+    """Test LatestBookSlots class."""
+
+    def test_burst_is_coalesced(self):
+        """Test that a burst of updates produces a single batch with newest values."""
+        slots = LatestBookSlots()
+        slots.publish("binance", 1)
+        slots.publish("binance", 2)
+        slots.publish("kucoin", 10)
+        slots.publish("binance", 3)
+
+        updates = asyncio.run(slots.wait_for_updates(0.1))
+        assert updates == {"binance": 3, "kucoin": 10}
+        assert slots.take_updates() == {}
+
+    def test_timeout_returns_empty(self):
+        """Test that waiting without updates returns an empty batch."""
+        slots = LatestBookSlots()
+        assert asyncio.run(slots.wait_for_updates(0.01)) == {}
+
+    def test_wakes_on_publish(self):
+        """Test that a waiting evaluator wakes up as soon as a slot changes."""
+        async def scenario():
+            slots = LatestBookSlots()
+            waiter = asyncio.ensure_future(slots.wait_for_updates(1))
+            await asyncio.sleep(0)
+            slots.publish("okx", "book")
+            return await waiter
+
+        assert asyncio.run(scenario()) == {"okx": "book"}
+
+    def test_get_keeps_latest_value(self):
+        """Test that the latest value stays readable after being taken."""
+        slots = LatestBookSlots()
+        slots.publish("okx", "book")
+        slots.take_updates()
+        assert slots.get("okx") == "book"
+        assert slots.get("bybit") is None
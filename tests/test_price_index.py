@@ -0,0 +1,64 @@
+"""
+Unit tests for price_index module.
+"""
+from utils.price_index import BestPriceIndex
+
+
+class TestBestPriceIndex:
+    """Test BestPriceIndex class."""
+
+    def test_lowest_and_highest(self):
+        """Test that asks return the lowest price and bids the highest."""
+        asks = BestPriceIndex()
+        bids = BestPriceIndex(highest=True)
+        for exchange, price in [("binance", 101), ("kucoin", 99), ("okx", 100)]:
+            asks.update(exchange, price)
+            bids.update(exchange, price)
+
+        assert asks.best() == ("kucoin", 99)
+        assert bids.best() == ("binance", 101)
+
+    def test_updates_invalidate_old_entries(self):
+        """Test that an outdated price is never returned after an update."""
+        asks = BestPriceIndex()
+        asks.update("binance", 100)
+        asks.update("kucoin", 101)
+        asks.update("binance", 102)
+
+        assert asks.best() == ("kucoin", 101)
+        assert asks.top(3) == [("kucoin", 101), ("binance", 102)]
+
+    def test_remove(self):
+        """Test that removed exchanges are skipped."""
+        asks = BestPriceIndex()
+        asks.update("binance", 100)
+        asks.update("kucoin", 101)
+        asks.remove("binance")
+
+        assert asks.best() == ("kucoin", 101)
+        assert len(asks) == 1
+
+        asks.update("binance", 99)
+        assert asks.best() == ("binance", 99)
+
+    def test_eligibility(self):
+        """Test that ineligible exchanges are skipped but kept in the index."""
+        asks = BestPriceIndex()
+        asks.update("binance", 100)
+        asks.update("kucoin", 101)
+        asks.update("okx", 102)
+
+        assert asks.best(lambda ex: ex != "binance") == ("kucoin", 101)
+        assert asks.top(2, lambda ex: ex == "okx") == [("okx", 102)]
+        assert asks.best(lambda ex: False) is None
+        assert asks.best() == ("binance", 100)
+
+    def test_heap_stays_bounded(self):
+        """Test that repeated updates do not grow the heap without bound."""
+        bids = BestPriceIndex(highest=True)
+        for i in range(1000):
+            bids.update("binance", 100 + i % 7)
+            bids.update("kucoin", 100 + i % 5)
+
+        assert len(bids.heap) <= 4 * len(bids.prices) + 17
+        assert bids.best()[1] == max(bids.prices.values())
@@ -0,0 +1,99 @@
+"""
+Unit tests for rate_limiter module.
+"""
+import time
+import asyncio
+from services.rate_limiter import TokenBucket, RequestScheduler, PRIORITY_ORDER, PRIORITY_BACKGROUND
+
+
+class TestTokenBucket:
+    """Test TokenBucket class."""
+
+    def test_burst_then_throttle(self):
+        """Test that a full bucket serves a burst at once and then paces requests to the refill rate."""
+        async def drain():
+            bucket = TokenBucket(rate=50, capacity=5)
+            start = time.perf_counter()
+            for _ in range(5):
+                await bucket.acquire()
+            burst = time.perf_counter() - start
+            for _ in range(5):
+                await bucket.acquire()
+            return burst, time.perf_counter() - start, bucket.stats()
+
+        burst, total, stats = asyncio.run(drain())
+        assert burst < 0.02
+        # 5 request vượt burst cần 5 / 50 = 0.1 giây token
+        assert 0.08 <= total < 0.5
+        assert stats['requests'] == 10
+        assert stats['queued'] == 5
+
+    def test_weight_consumes_tokens(self):
+        """Test that a heavy request waits for as many tokens as its weight."""
+        async def heavy():
+            bucket = TokenBucket(rate=100, capacity=10)
+            await bucket.acquire(weight=10)
+            return await bucket.acquire(weight=5)
+
+        assert 0.03 <= asyncio.run(heavy()) < 0.3
+
+    def test_orders_jump_the_queue(self):
+        """Test that an order queued after background requests is served before them."""
+        async def contend():
+            bucket = TokenBucket(rate=100, capacity=1)
+            await bucket.acquire()
+            served = []
+
+            async def request(name, priority):
+                await bucket.acquire(priority=priority)
+                served.append(name)
+
+            tasks = [asyncio.create_task(request(f"poll-{i}", PRIORITY_BACKGROUND)) for i in range(3)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(request('order', PRIORITY_ORDER)))
+            await asyncio.gather(*tasks)
+            return served
+
+        assert asyncio.run(contend()) == ['order', 'poll-0', 'poll-1', 'poll-2']
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """Test that a cancelled request does not hold up the requests behind it."""
+        async def cancel():
+            bucket = TokenBucket(rate=20, capacity=1)
+            await bucket.acquire()
+            stuck = asyncio.create_task(bucket.acquire(priority=PRIORITY_ORDER))
+            waiting = asyncio.create_task(bucket.acquire())
+            await asyncio.sleep(0)
+            stuck.cancel()
+            await asyncio.wait_for(waiting, 1)
+            return bucket.depth()
+
+        assert asyncio.run(cancel()) == 0
+
+
+class TestRequestScheduler:
+    """Test RequestScheduler class."""
+
+    def test_rate_from_exchange_and_override(self):
+        """Test that the bucket rate follows ccxt rateLimit with headroom unless overridden."""
+        class Venue:
+            rateLimit = 50
+
+        scheduler = RequestScheduler(rate_limits={'okx': 5}, headroom=0.8, burst=1)
+        assert scheduler.get_bucket('binance', Venue()).rate == 16
+        assert scheduler.get_bucket('okx', Venue()).rate == 5
+
+    def test_exchange_service_requests_are_counted(self, create_exchange_service):
+        """Test that REST calls through ExchangeService pass the shared per-exchange scheduler."""
+        async def trade():
+            exchange_service = create_exchange_service()
+            order = await exchange_service.create_limit_buy_order('binance', 'BTC/USDT', 1, 50)
+            await exchange_service.fetch_order('binance', order['id'], 'BTC/USDT')
+            await exchange_service.cancel_order('binance', order['id'], 'BTC/USDT')
+            await exchange_service.get_balance('okx', 'USDT')
+            return exchange_service.request_scheduler.stats()
+
+        stats = asyncio.run(trade())
+        assert stats['binance']['requests'] == 3
+        assert stats['okx']['requests'] == 1
+        assert stats['binance']['depth'] == 0
@@ -0,0 +1,78 @@
+"""
+Unit tests for replay_service module.
+"""
+import asyncio
+from services.tick_recorder import TickRecorder
+from services.replay_service import ReplayService, ReplayClock
+
+
+def make_orderbook(price):
+    """Build a small ccxt-style order book around a price."""
+    return {'timestamp': 1, 'bids': [[price - 1, 1.0]], 'asks': [[price + 1, 2.0]]}
+
+
+def record_sample(directory):
+    """Record interleaved ticks for two exchanges."""
+    recorder = TickRecorder(directory, levels=2)
+    for ts in [10, 30, 50]:
+        recorder.record("binance", "BTC/USDT", make_orderbook(100 + ts), ts_local=ts)
+    for ts in [20, 40]:
+        recorder.record("kucoin", "BTC/USDT", make_orderbook(200 + ts), ts_local=ts)
+    recorder.record("kucoin", "ETH/USDT", make_orderbook(10), ts_local=5)
+    recorder.close()
+
+
+class TestReplayService:
+    """Test ReplayService class."""
+
+    def test_merge_in_timestamp_order(self, tmp_path):
+        """Test that ticks from all exchanges are merged by local timestamp."""
+        record_sample(str(tmp_path))
+        replay = ReplayService(str(tmp_path))
+
+        ticks = list(replay.stream(["binance", "kucoin"], "BTC/USDT"))
+        assert [ts for ts, _, _ in ticks] == [10, 20, 30, 40, 50]
+        assert [ex for _, ex, _ in ticks] == ["binance", "kucoin", "binance", "kucoin", "binance"]
+
+    def test_orderbook_conversion(self, tmp_path):
+        """Test that empty levels are dropped from replayed books."""
+        record_sample(str(tmp_path))
+        _, _, orderbook = next(ReplayService(str(tmp_path)).stream(["binance"], "BTC/USDT"))
+
+        assert orderbook['symbol'] == "BTC/USDT"
+        assert orderbook['bids'] == [[109, 1.0]]
+        assert orderbook['asks'] == [[111, 2.0]]
+
+    def test_symbols_and_opening_price(self, tmp_path):
+        """Test the recorded symbol list and the opening mid price."""
+        record_sample(str(tmp_path))
+        replay = ReplayService(str(tmp_path))
+
+        assert replay.symbols(["binance", "kucoin"]) == ["BTC/USDT"]
+        assert replay.symbols(["kucoin"]) == ["BTC/USDT", "ETH/USDT"]
+        assert replay.opening_price(["binance", "kucoin"], "BTC/USDT") == ((110 + 220) / 2, 10)
+        assert replay.opening_price(["okx"], "BTC/USDT") == (None, None)
+
+    def test_opening_price_skips_one_sided_ticks(self, tmp_path):
+        """Test that ticks with an empty side do not make the opening price NaN."""
+        recorder = TickRecorder(str(tmp_path), levels=2)
+        recorder.record("okx", "BTC/USDT", {'timestamp': 1, 'bids': [], 'asks': [[101, 1.0]]}, ts_local=5)
+        recorder.record("okx", "BTC/USDT", make_orderbook(100), ts_local=15)
+        recorder.close()
+
+        assert ReplayService(str(tmp_path)).opening_price(["okx"], "BTC/USDT") == (100, 5)
+
+
+class TestReplayClock:
+    """Test ReplayClock class."""
+
+    def test_advance(self):
+        """Test that the clock follows replayed timestamps and never goes back."""
+        clock = ReplayClock(1_000_000_000)
+        assert clock.time() == 1.0
+
+        asyncio.run(clock.advance(3_000_000_000))
+        assert clock.time() == 3.0
+
+        asyncio.run(clock.advance(2_000_000_000))
+        assert clock.time() == 3.0
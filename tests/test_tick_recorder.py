@@ -0,0 +1,91 @@
+"""
+Unit tests for tick_recorder module.
+"""
+import os
+import asyncio
+import numpy as np
+from services.tick_recorder import TickRecorder, load_ticks, tick_file_levels, symbol_to_filename, filename_to_symbol
+
+DAY_NS = 86400 * 10**9
+
+
+def make_orderbook(price, timestamp=1700000000000):
+    """Build a small ccxt-style order book around a price."""
+    return {
+        'timestamp': timestamp,
+        'bids': [[price - 1, 1.0], [price - 2, 2.0]],
+        'asks': [[price + 1, 1.5], [price + 2, 2.5], [price + 3, 3.5]],
+    }
+
+
+class TestTickRecorder:
+    """Test TickRecorder class."""
+
+    def test_round_trip_with_memmap(self, tmp_path):
+        """Test that recorded books are read back unchanged from the file."""
+        recorder = TickRecorder(str(tmp_path), levels=3, chunk_size=4)
+        for i in range(10):
+            recorder.record("binance", "BTC/USDT", make_orderbook(100 + i), ts_local=i)
+        recorder.close()
+
+        path = recorder.path_for("binance", "BTC/USDT", "1970-01-01")
+        assert tick_file_levels(path) == 3
+
+        ticks = load_ticks(path)
+        assert isinstance(ticks, np.memmap)
+        assert len(ticks) == 10
+        assert list(ticks['ts_local']) == list(range(10))
+        assert ticks['ts_exchange'][0] == 1700000000000
+        assert list(ticks['ask_px'][5]) == [106, 107, 108]
+        assert list(ticks['bid_qty'][5]) == [1.0, 2.0, 0.0]
+        assert np.isnan(ticks['bid_px'][5][2])
+
+    def test_chunked_writes(self, tmp_path):
+        """Test that nothing is written until a chunk is full or flushed."""
+        recorder = TickRecorder(str(tmp_path), levels=2, chunk_size=4)
+        path = recorder.path_for("okx", "ETH/USDT", "1970-01-01")
+
+        for i in range(3):
+            recorder.record("okx", "ETH/USDT", make_orderbook(50), ts_local=i)
+        assert not os.path.exists(path)
+
+        recorder.record("okx", "ETH/USDT", make_orderbook(50), ts_local=3)
+        assert len(load_ticks(path)) == 4
+
+        recorder.record("okx", "ETH/USDT", make_orderbook(50), ts_local=4)
+        recorder.flush()
+        assert len(load_ticks(path)) == 5
+
+    def test_chunks_are_written_off_the_event_loop(self, tmp_path):
+        """Test that full chunks are written in a thread, in order, and drained at the end."""
+        recorder = TickRecorder(str(tmp_path), levels=2, chunk_size=2)
+        path = recorder.path_for("okx", "ETH/USDT", "1970-01-01")
+
+        async def record():
+            for i in range(5):
+                recorder.record("okx", "ETH/USDT", make_orderbook(50), ts_local=i)
+            # Khối đầy chưa được ghi ngay trong callback
+            written = os.path.exists(path)
+            await recorder.drain()
+            return written
+
+        assert not asyncio.run(record())
+        assert list(load_ticks(path)['ts_local']) == [0, 1, 2, 3, 4]
+        assert recorder.records_written == 5
+
+    def test_one_file_per_day(self, tmp_path):
+        """Test that books received on different days go to different files."""
+        recorder = TickRecorder(str(tmp_path), levels=2)
+        recorder.record("kucoin", "BTC/USDT", make_orderbook(100), ts_local=0)
+        recorder.record("kucoin", "BTC/USDT", make_orderbook(101), ts_local=DAY_NS + 1)
+        recorder.close()
+
+        assert len(load_ticks(recorder.path_for("kucoin", "BTC/USDT", "1970-01-01"))) == 1
+        assert len(load_ticks(recorder.path_for("kucoin", "BTC/USDT", "1970-01-02"))) == 1
+
+    def test_symbol_filename_round_trip(self):
+        """Test that symbols containing '-' or '_' map back to the same symbol."""
+        for symbol in ("BTC/USDT", "BTC/USDT:USDT", "BTC/USDT:USDT-240628", "1000_SATS/USDT"):
+            name = symbol_to_filename(symbol)
+            assert '/' not in name and ':' not in name
+            assert filename_to_symbol(name) == symbol
@@ -0,0 +1,83 @@
+"""
+Unit tests for top_of_book module.
+"""
+import pytest
+from utils.top_of_book import TopOfBookTable
+
+NO_FEES = {
+    'binance': {'give': 0, 'receive': 0},
+    'kucoin': {'give': 0, 'receive': 0},
+    'okx': {'give': 0, 'receive': 0},
+}
+
+
+class TestTopOfBookTable:
+    """Test TopOfBookTable class."""
+
+    def test_needs_two_exchanges(self):
+        """Test that a spread needs prices from at least two exchanges."""
+        table = TopOfBookTable(NO_FEES)
+        table.update("BTC/USDT", "binance", 100, 101)
+        assert table.best_spread("BTC/USDT") is None
+        assert table.best_spread("ETH/USDT") is None
+
+    def test_best_spread_across_exchanges(self):
+        """Test that the cheapest ask and richest bid on different exchanges are chosen."""
+        table = TopOfBookTable(NO_FEES)
+        table.update("BTC/USDT", "binance", 100, 101)
+        table.update("BTC/USDT", "kucoin", 103, 104)
+        table.update("BTC/USDT", "okx", 99, 100.5)
+
+        spread = table.best_spread("BTC/USDT")
+        assert spread['buy_exchange'] == "okx"
+        assert spread['sell_exchange'] == "kucoin"
+        assert spread['net_spread_pct'] == pytest.approx((103 - 100.5) / 100.5 * 100)
+
+    def test_same_exchange_best_on_both_sides(self):
+        """Test that a venue holding both best prices is paired with the runner-up."""
+        table = TopOfBookTable(NO_FEES)
+        table.update("ETH/USDT", "binance", 110, 100)
+        table.update("ETH/USDT", "kucoin", 105, 106)
+        table.update("ETH/USDT", "okx", 101, 108)
+
+        spread = table.best_spread("ETH/USDT")
+        assert spread['buy_exchange'] != spread['sell_exchange']
+        assert (spread['buy_exchange'], spread['sell_exchange']) == ("binance", "kucoin")
+
+    def test_fees_reduce_net_spread(self):
+        """Test that fees are deducted from the net spread."""
+        fees = {'binance': {'give': 0.001, 'receive': 0.001}, 'kucoin': {'give': 0.001, 'receive': 0.001}}
+        table = TopOfBookTable(fees)
+        table.update("BTC/USDT", "binance", 99, 100)
+        table.update("BTC/USDT", "kucoin", 100.1, 101)
+
+        spread = table.best_spread("BTC/USDT")
+        assert spread['spread_pct'] > 0
+        assert spread['net_spread_pct'] < 0
+
+    def test_fees_decide_the_venues(self):
+        """Test that venues are chosen by their price after fees, not by the raw price."""
+        fees = {
+            'binance': {'give': 0.01, 'receive': 0.01},
+            'kucoin': {'give': 0.01, 'receive': 0.01},
+            'gate': {'give': 0.01, 'receive': 0.01},
+            'okx': {'give': 0.0, 'receive': 0.0},
+            'bybit': {'give': 0.0, 'receive': 0.0},
+        }
+        table = TopOfBookTable(fees)
+        table.update("BTC/USDT", "binance", 99, 100)
+        table.update("BTC/USDT", "kucoin", 103, 104)
+        table.update("BTC/USDT", "gate", 102.8, 105)
+        table.update("BTC/USDT", "okx", 98, 100.5)
+        table.update("BTC/USDT", "bybit", 102.5, 103)
+
+        spread = table.best_spread("BTC/USDT")
+        assert (spread['buy_exchange'], spread['sell_exchange']) == ("okx", "bybit")
+        assert spread['net_spread_pct'] == pytest.approx((102.5 - 100.5) / 100.5 * 100)
+
+    def test_update_from_empty_orderbook(self):
+        """Test that one-sided order books are ignored."""
+        table = TopOfBookTable(NO_FEES)
+        assert table.update_from_orderbook("BTC/USDT", "binance", {'bids': [], 'asks': [[1, 1]]}) is False
+        assert table.update_from_orderbook("BTC/USDT", "binance", {'bids': [[1, 1]], 'asks': [[2, 1]]}) is True
+        assert table.symbols() == ["BTC/USDT"]
@@ -0,0 +1,101 @@
+"""
+Unit tests for trade_pipeline module.
+"""
+import asyncio
+import pytest
+from services.trade_pipeline import TradeIntent, InFlightLedger, TradePipeline, BUY_SIDE, SELL_SIDE
+
+
+def create_intent(buy_exchange='binance', sell_exchange='okx', reserved_usd=100, reserved_crypto=1):
+    """Create a trade intent buying 1 BTC at 100 on buy_exchange and selling at 101 on sell_exchange."""
+    return TradeIntent(
+        buy_exchange, sell_exchange, 'BTC/USDT', 1, 100, 101, 100.5, 100.5, 0.5, 0.9,
+        reserved_usd=reserved_usd, reserved_crypto=reserved_crypto
+    )
+
+
+class TestInFlightLedger:
+    """Test InFlightLedger class."""
+
+    def test_reserve_and_release(self):
+        """Test that reservations accumulate per venue and are returned on release."""
+        ledger = InFlightLedger()
+        first = create_intent()
+        second = create_intent('binance', 'kucoin', reserved_usd=50, reserved_crypto=0.5)
+
+        ledger.reserve(first)
+        ledger.reserve(second)
+        assert len(ledger) == 2
+        assert ledger.usd_reserved('binance') == 150
+        assert ledger.crypto_reserved('okx') == 1
+        assert ledger.crypto_reserved('kucoin') == 0.5
+
+        ledger.release(first)
+        ledger.release(first)
+        assert len(ledger) == 1
+        assert ledger.usd_reserved('binance') == 50
+        assert ledger.crypto_reserved('okx') == 0
+        assert ledger.usd_reserved('bybit') == 0
+
+    def test_conflicts_on_same_book_side(self):
+        """Test that a venue side in use conflicts while the opposite side stays free."""
+        ledger = InFlightLedger()
+        intent = create_intent()
+        ledger.reserve(intent)
+
+        assert ledger.is_busy('binance', BUY_SIDE)
+        assert not ledger.is_busy('binance', SELL_SIDE)
+        assert ledger.conflicts('binance', 'kucoin')
+        assert ledger.conflicts('kucoin', 'okx')
+        assert not ledger.conflicts('okx', 'binance')
+
+        ledger.release(intent)
+        assert not ledger.conflicts('binance', 'okx')
+
+
+class TestTradePipeline:
+    """Test TradePipeline class."""
+
+    def test_trades_run_concurrently(self):
+        """Test that submit returns at once and queued trades run in parallel executors."""
+        async def run():
+            running = []
+            peak = []
+
+            async def executor(intent):
+                running.append(intent)
+                peak.append(len(running))
+                await asyncio.sleep(0.05)
+                running.remove(intent)
+
+            pipeline = TradePipeline(executor, executor_count=2)
+            pipeline.start()
+
+            pipeline.submit(create_intent())
+            pipeline.submit(create_intent('kucoin', 'bybit'))
+            assert not pipeline.has_capacity()
+            assert pipeline.ledger.usd_reserved('binance') == 100
+
+            await pipeline.close()
+            return pipeline, max(peak)
+
+        pipeline, peak = asyncio.run(run())
+        assert peak == 2
+        assert len(pipeline.ledger) == 0
+        assert pipeline.has_capacity()
+
+    def test_failed_trade_releases_reservation(self):
+        """Test that an executor error is logged and the reservation is still released."""
+        async def run():
+            async def executor(intent):
+                raise RuntimeError("sàn từ chối")
+
+            pipeline = TradePipeline(executor, executor_count=1)
+            pipeline.start()
+            pipeline.submit(create_intent())
+            await pipeline.close()
+            return pipeline
+
+        pipeline = asyncio.run(run())
+        assert pipeline.ledger.usd_reserved('binance') == pytest.approx(0)
+        assert not pipeline.ledger.conflicts('binance', 'okx')
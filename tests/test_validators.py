@@ -8,7 +8,8 @@ from utils.validators import (
     validate_positive_number,
     validate_positive_integer,
     validate_symbol,
-    validate_exchanges_unique
+    validate_exchanges_unique,
+    validate_exchange_count
 )
 
 
@@ -165,3 +166,18 @@ class TestValidateExchangesUnique:
         
         is_valid, error = validate_exchanges_unique(["BINANCE", "Binance", "binance"])
         assert is_valid is False
+
+
+class TestValidateExchangeCount:
+    """Test validate_exchange_count function."""
+    
+    def test_enough_exchanges(self):
+        """Test that two or more exchanges are accepted."""
+        assert validate_exchange_count(["binance", "kucoin"]) == (True, None)
+        assert validate_exchange_count(["binance", "kucoin", "okx", "bybit"])[0] is True
+    
+    def test_too_few_exchanges(self):
+        """Test that fewer than two exchanges are rejected."""
+        is_valid, error = validate_exchange_count(["binance"])
+        assert is_valid is False
+        assert "2" in error
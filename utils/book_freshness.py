@@ -0,0 +1,134 @@
+"""
+Theo dõi độ mới của sách lệnh trên từng sàn để loại các sàn có giá cũ khỏi việc chọn sàn.
+"""
+from typing import Dict, Optional
+
+from utils.logger import log_info, log_warning
+
+
+class BookFreshness:
+    """
+    Lưu thời điểm cập nhật gần nhất (cục bộ và của sàn) và số lần cập nhật của mỗi sàn.
+
+    Sàn không cập nhật sách lệnh trong quá max_age giây được coi là cũ cho đến khi
+    nhận được cập nhật tiếp theo. Thời gian được truyền vào từ đồng hồ của bot nên
+    hoạt động cả khi phát lại dữ liệu đã ghi.
+    """
+
+    def __init__(self, max_age: float):
+        """
+        Khởi tạo bộ theo dõi.
+
+        Args:
+            max_age (float): Thời gian tối đa (giây) từ lần cập nhật cuối trước khi sàn bị coi là cũ
+        """
+        self.max_age = max_age
+        self.local_times = {}  # Thời điểm nhận cập nhật gần nhất (giây)
+        self.exchange_times = {}  # Thời điểm của sàn trong cập nhật gần nhất (giây)
+        self.first_times = {}  # Thời điểm nhận cập nhật đầu tiên (giây)
+        self.update_counts = {}  # Số lần cập nhật của mỗi sàn
+        self.stale = set()  # Các sàn đang bị coi là cũ
+
+    def touch(self, exchange_id: str, now: float, exchange_timestamp: Optional[int] = None) -> None:
+        """
+        Ghi nhận một cập nhật sách lệnh.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            now (float): Thời điểm nhận (giây)
+            exchange_timestamp (int, optional): Thời điểm của sàn (ms) nếu sàn có gửi
+        """
+        self.local_times[exchange_id] = now
+        if exchange_timestamp:
+            self.exchange_times[exchange_id] = exchange_timestamp / 1000
+        if exchange_id not in self.first_times:
+            self.first_times[exchange_id] = now
+        self.update_counts[exchange_id] = self.update_counts.get(exchange_id, 0) + 1
+
+        if exchange_id in self.stale:
+            self.stale.discard(exchange_id)
+            log_info(f"Sách lệnh của {exchange_id} đã cập nhật trở lại")
+
+    def age(self, exchange_id: str, now: float) -> Optional[float]:
+        """
+        Thời gian kể từ lần cập nhật gần nhất.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            now (float): Thời điểm hiện tại (giây)
+
+        Returns:
+            float: Số giây, hoặc None nếu sàn chưa cập nhật lần nào
+        """
+        last = self.local_times.get(exchange_id)
+        return None if last is None else now - last
+
+    def is_fresh(self, exchange_id: str, now: float) -> bool:
+        """
+        Kiểm tra giá của một sàn còn đủ mới để giao dịch.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+            now (float): Thời điểm hiện tại (giây)
+
+        Returns:
+            bool: True nếu sàn đã cập nhật trong vòng max_age giây
+        """
+        last = self.local_times.get(exchange_id)
+        if last is not None and now - last <= self.max_age:
+            return True
+
+        if last is not None and exchange_id not in self.stale:
+            self.stale.add(exchange_id)
+            log_warning(f"Sách lệnh của {exchange_id} không cập nhật trong {now - last:.1f}s, tạm loại khỏi việc chọn sàn")
+        return False
+
+    def update_rates(self, now: float) -> Dict[str, float]:
+        """
+        Tần suất cập nhật trung bình của mỗi sàn kể từ cập nhật đầu tiên.
+
+        Args:
+            now (float): Thời điểm hiện tại (giây)
+
+        Returns:
+            dict: ID sàn -> số cập nhật mỗi giây
+        """
+        return {
+            exchange_id: count / max(now - self.first_times[exchange_id], 1e-9)
+            for exchange_id, count in self.update_counts.items()
+        }
+
+    def exchange_lag(self, exchange_id: str) -> Optional[float]:
+        """
+        Độ trễ giữa thời điểm của sàn và thời điểm nhận trong cập nhật gần nhất.
+
+        Args:
+            exchange_id (str): ID của sàn giao dịch
+
+        Returns:
+            float: Số giây (phụ thuộc độ lệch đồng hồ), hoặc None nếu sàn không gửi thời điểm
+        """
+        if exchange_id not in self.exchange_times:
+            return None
+        return self.local_times[exchange_id] - self.exchange_times[exchange_id]
+
+    def report(self, now: float) -> None:
+        """
+        Ghi log số lần cập nhật, tần suất và độ trễ của sàn cho mỗi sàn.
+
+        Args:
+            now (float): Thời điểm hiện tại (giây)
+        """
+        if not self.update_counts:
+            return
+
+        rates = self.update_rates(now)
+        lines = ["Cập nhật sách lệnh theo sàn:"]
+        for exchange_id, count in self.update_counts.items():
+            lag = self.exchange_lag(exchange_id)
+            lag_text = f", độ trễ của sàn {lag * 1000:.0f}ms" if lag is not None else ""
+            lines.append(
+                f"- {exchange_id}: {count} cập nhật ({rates[exchange_id]:.1f}/s), "
+                f"lần cuối {self.age(exchange_id, now):.1f}s trước{lag_text}"
+            )
+        log_info("\n".join(lines))
@@ -0,0 +1,169 @@
+"""
+Sổ độ sâu lũy kế để tính giá khớp trung bình (VWAP) cho một khối lượng giao dịch.
+"""
+from bisect import bisect_left
+from typing import List, Optional, Tuple
+
+
+class DepthLadder:
+    """
+    Một phía của sách lệnh (bids hoặc asks) với mảng khối lượng và giá trị lũy kế.
+
+    Khi sách lệnh thay đổi, chỉ các mức giá từ vị trí thay đổi đầu tiên trở đi được
+    tính lại. Truy vấn VWAP cho một khối lượng dùng tìm kiếm nhị phân trên mảng lũy kế.
+    """
+
+    def __init__(self, max_levels: int = 50):
+        """
+        Khởi tạo một phía sách lệnh rỗng.
+
+        Args:
+            max_levels (int): Số mức giá tối đa được giữ lại
+        """
+        self.max_levels = max_levels
+        self.prices: List[float] = []
+        self.sizes: List[float] = []
+        self.cum_sizes: List[float] = []  # Tổng khối lượng từ mức tốt nhất đến mức i
+        self.cum_notional: List[float] = []  # Tổng giá trị (giá * khối lượng) đến mức i
+
+    def update(self, levels: list) -> int:
+        """
+        Cập nhật từ danh sách mức giá của sách lệnh (mức tốt nhất đứng đầu).
+
+        Args:
+            levels (list): Danh sách [giá, khối lượng, ...] theo thứ tự tốt nhất trước
+
+        Returns:
+            int: Vị trí mức giá đầu tiên bị thay đổi (bằng số mức nếu không có thay đổi)
+        """
+        count = min(len(levels), self.max_levels)
+        common = min(count, len(self.prices))
+
+        # Tìm mức giá đầu tiên khác với lần cập nhật trước
+        first_changed = 0
+        while (
+            first_changed < common
+            and levels[first_changed][0] == self.prices[first_changed]
+            and levels[first_changed][1] == self.sizes[first_changed]
+        ):
+            first_changed += 1
+
+        if first_changed == count == len(self.prices):
+            return first_changed
+
+        # Giữ lại phần không đổi, tính lại phần lũy kế từ vị trí thay đổi
+        del self.prices[first_changed:]
+        del self.sizes[first_changed:]
+        del self.cum_sizes[first_changed:]
+        del self.cum_notional[first_changed:]
+
+        cum_size = self.cum_sizes[-1] if self.cum_sizes else 0.0
+        cum_notional = self.cum_notional[-1] if self.cum_notional else 0.0
+
+        for i in range(first_changed, count):
+            price, size = levels[i][0], levels[i][1]
+            cum_size += size
+            cum_notional += price * size
+            self.prices.append(price)
+            self.sizes.append(size)
+            self.cum_sizes.append(cum_size)
+            self.cum_notional.append(cum_notional)
+
+        return first_changed
+
+    def best_price(self) -> Optional[float]:
+        """
+        Giá tốt nhất của phía này.
+
+        Returns:
+            float: Giá tốt nhất, hoặc None nếu phía này rỗng
+        """
+        return self.prices[0] if self.prices else None
+
+    def total_size(self) -> float:
+        """
+        Tổng khối lượng trên các mức giá được giữ lại.
+
+        Returns:
+            float: Tổng khối lượng
+        """
+        return self.cum_sizes[-1] if self.cum_sizes else 0.0
+
+    def price_for(self, quantity: float) -> Optional[Tuple[float, float]]:
+        """
+        Tính giá khớp trung bình và giá giới hạn cần thiết để khớp một khối lượng.
+
+        Args:
+            quantity (float): Khối lượng cần khớp
+
+        Returns:
+            tuple: (giá trung bình VWAP, giá của mức xa nhất cần chạm tới),
+                hoặc None nếu độ sâu không đủ
+        """
+        if not self.prices:
+            return None
+
+        if quantity <= 0:
+            return self.prices[0], self.prices[0]
+
+        if quantity > self.cum_sizes[-1]:
+            return None
+
+        # Mức giá đầu tiên có khối lượng lũy kế đủ cho quantity
+        index = bisect_left(self.cum_sizes, quantity)
+
+        prev_size = self.cum_sizes[index - 1] if index > 0 else 0.0
+        prev_notional = self.cum_notional[index - 1] if index > 0 else 0.0
+        notional = prev_notional + (quantity - prev_size) * self.prices[index]
+
+        return notional / quantity, self.prices[index]
+
+
+class DepthBook:
+    """
+    Sổ độ sâu của một sàn cho một cặp giao dịch, gồm hai phía bids và asks.
+    """
+
+    def __init__(self, max_levels: int = 50):
+        """
+        Khởi tạo sổ độ sâu rỗng.
+
+        Args:
+            max_levels (int): Số mức giá tối đa được giữ lại cho mỗi phía
+        """
+        self.bids = DepthLadder(max_levels)
+        self.asks = DepthLadder(max_levels)
+
+    def update(self, orderbook: dict) -> None:
+        """
+        Cập nhật cả hai phía từ sách lệnh ccxt.
+
+        Args:
+            orderbook (dict): Dữ liệu sách lệnh
+        """
+        self.bids.update(orderbook["bids"])
+        self.asks.update(orderbook["asks"])
+
+    def buy_price(self, quantity: float) -> Optional[Tuple[float, float]]:
+        """
+        Giá để mua một khối lượng (khớp vào phía asks).
+
+        Args:
+            quantity (float): Khối lượng cần mua
+
+        Returns:
+            tuple: (VWAP, giá giới hạn) hoặc None nếu độ sâu không đủ
+        """
+        return self.asks.price_for(quantity)
+
+    def sell_price(self, quantity: float) -> Optional[Tuple[float, float]]:
+        """
+        Giá để bán một khối lượng (khớp vào phía bids).
+
+        Args:
+            quantity (float): Khối lượng cần bán
+
+        Returns:
+            tuple: (VWAP, giá giới hạn) hoặc None nếu độ sâu không đủ
+        """
+        return self.bids.price_for(quantity)
@@ -20,12 +20,15 @@ class ExchangeError(ArbitrageError):
 class InsufficientBalanceError(ArbitrageError):
     """Lỗi số dư không đủ để thực hiện giao dịch."""
     
-    def __init__(self, exchange, asset, required, available):
+    def __init__(self, exchange, asset, required, available, shortfalls=None):
         self.exchange = exchange
         self.asset = asset
         self.required = required
         self.available = available
+        self.shortfalls = shortfalls or []  # Tất cả các sàn thiếu số dư (BalanceShortfall)
         message = f"Số dư không đủ trên {exchange}. Cần {round(required, 3)} {asset}, hiện có {round(available, 3)} {asset}."
+        if len(self.shortfalls) > 1:
+            message += f" (cùng {len(self.shortfalls) - 1} sàn khác)"
         super().__init__(message)
 
 
@@ -1,7 +1,11 @@
 """
 Các hàm tiện ích dùng chung cho toàn bộ ứng dụng.
 """
+import math
 import time
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
 from typing import List, Optional, Union
 from datetime import datetime
 from colorama import Style
@@ -165,6 +169,83 @@ def extract_base_asset(symbol: str) -> str:
     return symbol
 
 
+@lru_cache(maxsize=1024)
+def _step_decimals(step: float) -> int:
+    """Số chữ số thập phân của bước giá/khối lượng, dùng để loại bỏ sai số dấu phẩy động."""
+    return max(0, -Decimal(repr(step)).normalize().as_tuple().exponent)
+
+
+def floor_to_step(value: float, step: Optional[float]) -> float:
+    """
+    Làm tròn xuống theo bước (tick size hoặc lot size) của sàn.
+    
+    Args:
+        value (float): Giá trị cần làm tròn
+        step (float, optional): Bước của sàn, None hoặc 0 để giữ nguyên
+        
+    Returns:
+        float: Bội số lớn nhất của step không vượt quá value
+    """
+    if not step:
+        return value
+    return round(math.floor(round(value / step, 9)) * step, _step_decimals(step))
+
+
+def ceil_to_step(value: float, step: Optional[float]) -> float:
+    """
+    Làm tròn lên theo bước (tick size hoặc lot size) của sàn.
+    
+    Args:
+        value (float): Giá trị cần làm tròn
+        step (float, optional): Bước của sàn, None hoặc 0 để giữ nguyên
+        
+    Returns:
+        float: Bội số nhỏ nhất của step không nhỏ hơn value
+    """
+    if not step:
+        return value
+    return round(math.ceil(round(value / step, 9)) * step, _step_decimals(step))
+
+
+def round_to_step(value: float, step: Optional[float]) -> float:
+    """
+    Làm tròn tới bội số gần nhất của bước (tick size hoặc lot size) của sàn.
+    
+    Args:
+        value (float): Giá trị cần làm tròn
+        step (float, optional): Bước của sàn, None hoặc 0 để giữ nguyên
+        
+    Returns:
+        float: Bội số gần nhất của step
+    """
+    if not step:
+        return value
+    return round(round(value / step) * step, _step_decimals(step))
+
+
+def common_step(*steps: Optional[float]) -> Optional[float]:
+    """
+    Tìm bước nhỏ nhất là bội số của mọi bước (bội chung nhỏ nhất, ví dụ 0.3 và 0.2 -> 0.6).
+    
+    Args:
+        *steps (float): Các bước của sàn, None hoặc 0 được bỏ qua
+        
+    Returns:
+        float: Bội chung nhỏ nhất của các bước, None nếu không có bước nào
+    """
+    result = None
+    for step in steps:
+        if not step:
+            continue
+        # Tính trên phân số để 0.1, 0.3... không bị sai số dấu phẩy động
+        step = Fraction(Decimal(repr(step)))
+        if result is None:
+            result = step
+        else:
+            result = Fraction(math.lcm(result.numerator, step.numerator), math.gcd(result.denominator, step.denominator))
+    return float(result) if result is not None else None
+
+
 def get_precision_min(orderbook: dict, exchange_id: str) -> float:
     """
     Xác định độ chính xác tối thiểu cho giá dựa trên sách lệnh.
@@ -0,0 +1,237 @@
+"""
+Đo độ trễ tick-to-trade theo từng giai đoạn và từng sàn bằng histogram bucket cố định.
+"""
+import os
+import json
+import time
+from typing import Dict, Optional
+
+from utils.logger import log_info, log_error
+from configs import ENABLE_LATENCY_TRACKING, LATENCY_REPORT_DIR
+
+# Các giai đoạn của pipeline, theo thứ tự xảy ra
+STAGE_FEED = 'feed'  # Thời điểm của sàn -> nhận qua websocket (phụ thuộc đồng hồ của sàn)
+STAGE_QUEUE = 'queue'  # Nhận qua websocket -> bắt đầu process_orderbook
+STAGE_PROCESS = 'process'  # Bắt đầu -> kết thúc process_orderbook
+STAGE_DECISION = 'decision'  # Nhận sách lệnh của sàn -> _should_execute_trade chấp nhận (khi phát lại: từ lúc bắt đầu đánh giá)
+STAGE_ORDER_ACK = 'order_ack'  # Gửi lệnh -> sàn xác nhận (create_limit_*_order)
+STAGE_LEG_SKEW = 'leg_skew'  # Chênh lệch thời điểm gửi hai chân của một giao dịch chênh lệch giá
+STAGE_LEG_ACK_SKEW = 'leg_ack_skew'  # Chênh lệch thời điểm sàn xác nhận hai chân của một giao dịch chênh lệch giá
+STAGE_FILL = 'fill'  # Sàn xác nhận lệnh -> OrderService phát hiện lệnh đã khớp
+STAGE_RTT = 'rtt'  # Thời gian khứ hồi của request giữ ấm kết nối REST (không nằm trên đường đặt lệnh)
+STAGE_RATE_WAIT = 'rate_wait'  # Thời gian request REST chờ token của bộ giới hạn request
+STAGES = (
+    STAGE_FEED, STAGE_QUEUE, STAGE_PROCESS, STAGE_DECISION, STAGE_ORDER_ACK, STAGE_LEG_SKEW, STAGE_LEG_ACK_SKEW,
+    STAGE_FILL, STAGE_RTT, STAGE_RATE_WAIT,
+)
+
+ALL_EXCHANGES = '*'  # Khóa cho các giai đoạn không gắn với một sàn cụ thể
+
+
+class LatencyHistogram:
+    """
+    Histogram độ trễ với bucket log-tuyến tính cố định (tương tự HdrHistogram).
+
+    Giá trị được lưu theo micro giây; mỗi lũy thừa của 2 được chia thành 16 bucket nên
+    sai số tương đối tối đa khoảng 6%. Ghi một giá trị là O(1) và không cấp phát bộ nhớ.
+    """
+
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+    MAX_VALUE_US = (1 << 36) - 1  # Khoảng 19 giờ
+
+    def __init__(self):
+        """Khởi tạo histogram rỗng."""
+        self.counts = [0] * (self._bucket_index(self.MAX_VALUE_US) + 1)
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    @classmethod
+    def _bucket_index(cls, value_us: int) -> int:
+        """Vị trí bucket của một giá trị (micro giây)."""
+        if value_us < cls.SUB_BUCKETS:
+            return value_us
+
+        shift = value_us.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return (shift + 1) * cls.SUB_BUCKETS + (value_us >> shift) - cls.SUB_BUCKETS
+
+    @classmethod
+    def _bucket_upper_bound(cls, index: int) -> int:
+        """Giá trị lớn nhất (micro giây) thuộc một bucket."""
+        if index < cls.SUB_BUCKETS:
+            return index
+
+        shift = index // cls.SUB_BUCKETS - 1
+        mantissa = index % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        """
+        Ghi một giá trị độ trễ.
+
+        Args:
+            seconds (float): Độ trễ (giây), giá trị âm được tính là 0
+        """
+        value_us = min(max(int(seconds * 1e6), 0), self.MAX_VALUE_US)
+
+        self.counts[self._bucket_index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Giá trị tại một phân vị.
+
+        Args:
+            pct (float): Phân vị (0-100), ví dụ 99.9
+
+        Returns:
+            float: Độ trễ (giây) theo cận trên của bucket, hoặc None nếu chưa có dữ liệu
+        """
+        if self.count == 0:
+            return None
+
+        target = max(1, -(-self.count * pct // 100))  # Làm tròn lên
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(self._bucket_upper_bound(index), self.max_us) / 1e6
+
+        return self.max_us / 1e6
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Thống kê của histogram (mili giây).
+
+        Returns:
+            dict: count, min, mean, p50, p99, p999, max
+        """
+        if self.count == 0:
+            return {'count': 0}
+
+        return {
+            'count': self.count,
+            'min': self.min_us / 1e3,
+            'mean': self.total_us / self.count / 1e3,
+            'p50': self.percentile(50) * 1e3,
+            'p99': self.percentile(99) * 1e3,
+            'p999': self.percentile(99.9) * 1e3,
+            'max': self.max_us / 1e3,
+        }
+
+
+class LatencyTracker:
+    """
+    Tập hợp histogram độ trễ theo (giai đoạn, sàn) của một phiên giao dịch.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Khởi tạo bộ đo độ trễ.
+
+        Args:
+            enabled (bool): Tắt để bỏ qua mọi lần ghi
+        """
+        self.enabled = enabled
+        self.histograms = {}  # (giai đoạn, sàn) -> LatencyHistogram
+
+    def record(self, stage: str, exchange_id: str, seconds: float) -> None:
+        """
+        Ghi độ trễ của một giai đoạn trên một sàn.
+
+        Args:
+            stage (str): Tên giai đoạn (một trong STAGES)
+            exchange_id (str): ID của sàn giao dịch, hoặc ALL_EXCHANGES
+            seconds (float): Độ trễ (giây)
+        """
+        if not self.enabled:
+            return
+
+        histogram = self.histograms.get((stage, exchange_id))
+        if histogram is None:
+            histogram = self.histograms[(stage, exchange_id)] = LatencyHistogram()
+        histogram.record(seconds)
+
+    def record_since(self, stage: str, exchange_id: str, start: float) -> None:
+        """
+        Ghi thời gian đã trôi qua kể từ một mốc time.perf_counter().
+
+        Args:
+            stage (str): Tên giai đoạn
+            exchange_id (str): ID của sàn giao dịch, hoặc ALL_EXCHANGES
+            start (float): Mốc bắt đầu từ time.perf_counter()
+        """
+        if self.enabled:
+            self.record(stage, exchange_id, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Thống kê độ trễ theo giai đoạn và sàn.
+
+        Returns:
+            dict: giai đoạn -> sàn -> thống kê (mili giây), theo thứ tự STAGES
+        """
+        result = {}
+        order = {stage: i for i, stage in enumerate(STAGES)}
+
+        for stage, exchange_id in sorted(self.histograms, key=lambda k: (order.get(k[0], len(order)), k[0], k[1])):
+            result.setdefault(stage, {})[exchange_id] = self.histograms[(stage, exchange_id)].summary()
+
+        return result
+
+    def report(self) -> None:
+        """Ghi log bảng p50/p99/p999 của từng giai đoạn và sàn."""
+        summary = self.summary()
+        if not summary:
+            return
+
+        lines = ["Độ trễ theo giai đoạn (ms): số mẫu / p50 / p99 / p999 / max"]
+        for stage, exchanges in summary.items():
+            for exchange_id, stats in exchanges.items():
+                lines.append(
+                    f"- {stage:<10} {exchange_id:<14} {stats['count']:>8} / {stats['p50']:.3f} / "
+                    f"{stats['p99']:.3f} / {stats['p999']:.3f} / {stats['max']:.3f}"
+                )
+        log_info("\n".join(lines))
+
+    def export(self, directory: str = LATENCY_REPORT_DIR, label: str = 'session') -> Optional[str]:
+        """
+        Ghi thống kê độ trễ ra tệp JSON.
+
+        Args:
+            directory (str): Thư mục chứa báo cáo
+            label (str): Nhãn đưa vào tên tệp (ví dụ: ký hiệu cặp giao dịch)
+
+        Returns:
+            str: Đường dẫn tệp, hoặc None nếu không có dữ liệu hoặc ghi lỗi
+        """
+        summary = self.summary()
+        if not summary:
+            return None
+
+        name = f"latency_{label.replace('/', '-').replace(':', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        path = os.path.join(directory, name)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+            log_info(f"Đã ghi báo cáo độ trễ vào {path}")
+            return path
+        except OSError as e:
+            log_error(f"Không thể ghi báo cáo độ trễ vào {path}: {str(e)}")
+            return None
+
+    def reset(self) -> None:
+        """Xóa toàn bộ dữ liệu để bắt đầu phiên mới."""
+        self.histograms.clear()
+
+
+# Bộ đo dùng chung cho bot và các dịch vụ trong tiến trình
+latency_tracker = LatencyTracker(ENABLE_LATENCY_TRACKING)
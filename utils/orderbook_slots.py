@@ -0,0 +1,76 @@
+"""
+Các ô lưu sách lệnh mới nhất của từng sàn, dùng để gộp (coalesce) các cập nhật
+trước khi đánh giá cơ hội giao dịch.
+"""
+import asyncio
+
+
+class LatestBookSlots:
+    """
+    Mỗi khóa (thường là ID sàn) giữ đúng một giá trị mới nhất.
+
+    Các vòng lặp websocket ghi đè giá trị của mình bằng `publish`, còn một tác vụ
+    đánh giá duy nhất gọi `wait_for_updates` để lấy tất cả các khóa đã thay đổi
+    kể từ lần đánh giá trước. Một loạt cập nhật liên tiếp chỉ gây ra một lần đánh giá.
+    """
+
+    def __init__(self):
+        """Khởi tạo các ô trống."""
+        self.values = {}  # Giá trị mới nhất của mỗi khóa
+        self.dirty = {}  # Các khóa đã thay đổi chưa được đánh giá (giữ thứ tự cập nhật)
+        self.event = asyncio.Event()
+
+    def publish(self, key, value):
+        """
+        Ghi giá trị mới nhất cho một khóa và đánh thức tác vụ đánh giá.
+
+        Args:
+            key (Hashable): Khóa của ô (ví dụ: ID sàn)
+            value (object): Giá trị mới nhất (ví dụ: sách lệnh)
+        """
+        self.values[key] = value
+        self.dirty[key] = True
+        self.event.set()
+
+    def get(self, key, default=None):
+        """
+        Lấy giá trị mới nhất của một khóa.
+
+        Args:
+            key (Hashable): Khóa của ô
+            default (object, optional): Giá trị mặc định nếu chưa có dữ liệu
+
+        Returns:
+            object: Giá trị mới nhất hoặc giá trị mặc định
+        """
+        return self.values.get(key, default)
+
+    def take_updates(self):
+        """
+        Lấy và xóa danh sách các khóa đã thay đổi mà không chờ.
+
+        Returns:
+            dict: Ánh xạ khóa -> giá trị mới nhất của các khóa đã thay đổi
+        """
+        updates = {key: self.values[key] for key in self.dirty}
+        self.dirty = {}
+        self.event.clear()
+        return updates
+
+    async def wait_for_updates(self, timeout=None):
+        """
+        Chờ cho đến khi có ít nhất một ô thay đổi.
+
+        Args:
+            timeout (float, optional): Thời gian chờ tối đa (giây)
+
+        Returns:
+            dict: Ánh xạ khóa -> giá trị mới nhất, rỗng nếu hết thời gian chờ
+        """
+        if not self.dirty:
+            try:
+                await asyncio.wait_for(self.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return {}
+
+        return self.take_updates()
@@ -0,0 +1,135 @@
+"""
+Chỉ mục giá tốt nhất theo sàn dùng heap với cơ chế vô hiệu hóa trễ (lazy invalidation).
+"""
+import heapq
+from typing import Callable, List, Optional, Tuple
+
+
+class BestPriceIndex:
+    """
+    Chỉ mục cho biết sàn có giá tốt nhất (thấp nhất hoặc cao nhất) trong O(log N).
+
+    Mỗi lần cập nhật đẩy một mục mới vào heap kèm số phiên bản; các mục cũ không bị
+    xóa ngay mà bị bỏ qua khi chúng nổi lên đỉnh heap.
+    """
+
+    def __init__(self, highest: bool = False):
+        """
+        Khởi tạo chỉ mục rỗng.
+
+        Args:
+            highest (bool): True để lấy giá cao nhất (bids), False để lấy giá thấp nhất (asks)
+        """
+        self.highest = highest
+        self.heap = []  # (khóa sắp xếp, phiên bản, sàn)
+        self.prices = {}  # Giá hiện tại của mỗi sàn
+        self.versions = {}  # Phiên bản hiện tại của mỗi sàn
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def _push(self, key: str, price: float) -> None:
+        """Đẩy một mục mới cho sàn vào heap."""
+        sort_key = -price if self.highest else price
+        heapq.heappush(self.heap, (sort_key, self.versions[key], key))
+
+    def update(self, key: str, price: float) -> None:
+        """
+        Cập nhật giá của một sàn.
+
+        Args:
+            key (str): ID của sàn giao dịch
+            price (float): Giá mới
+        """
+        if self.prices.get(key) == price:
+            return
+
+        self.versions[key] = self.versions.get(key, 0) + 1
+        self.prices[key] = price
+        self._push(key, price)
+
+        # Dọn heap khi số mục cũ quá nhiều so với số sàn
+        if len(self.heap) > 4 * len(self.prices) + 16:
+            self._rebuild()
+
+    def remove(self, key: str) -> None:
+        """
+        Loại một sàn khỏi chỉ mục (ví dụ: khi không đủ độ sâu).
+
+        Args:
+            key (str): ID của sàn giao dịch
+        """
+        if key in self.prices:
+            del self.prices[key]
+            self.versions[key] += 1
+
+    def get(self, key: str) -> Optional[float]:
+        """
+        Lấy giá hiện tại của một sàn.
+
+        Args:
+            key (str): ID của sàn giao dịch
+
+        Returns:
+            float: Giá hiện tại, hoặc None nếu sàn không có trong chỉ mục
+        """
+        return self.prices.get(key)
+
+    def _rebuild(self) -> None:
+        """Tạo lại heap chỉ với các mục còn hiệu lực."""
+        self.heap = [
+            (-price if self.highest else price, self.versions[key], key)
+            for key, price in self.prices.items()
+        ]
+        heapq.heapify(self.heap)
+
+    def _is_current(self, entry: tuple) -> bool:
+        """Kiểm tra một mục trong heap còn là giá hiện tại của sàn hay không."""
+        _, version, key = entry
+        return key in self.prices and self.versions.get(key) == version
+
+    def top(self, count: int = 1, eligible: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Lấy các sàn có giá tốt nhất thỏa điều kiện.
+
+        Các mục cũ gặp trên đường đi bị loại bỏ vĩnh viễn; các sàn không thỏa điều kiện
+        được đẩy lại vào heap sau khi tìm xong.
+
+        Args:
+            count (int): Số sàn cần lấy
+            eligible (callable, optional): Hàm nhận ID sàn, trả về True nếu sàn được phép chọn
+
+        Returns:
+            list: Danh sách (sàn, giá) theo thứ tự tốt nhất trước
+        """
+        result = []
+        popped = []
+
+        while self.heap and len(result) < count:
+            entry = heapq.heappop(self.heap)
+
+            if not self._is_current(entry):
+                continue
+
+            popped.append(entry)
+            key = entry[2]
+            if eligible is None or eligible(key):
+                result.append((key, self.prices[key]))
+
+        for entry in popped:
+            heapq.heappush(self.heap, entry)
+
+        return result
+
+    def best(self, eligible: Optional[Callable[[str], bool]] = None) -> Optional[Tuple[str, float]]:
+        """
+        Lấy sàn có giá tốt nhất thỏa điều kiện.
+
+        Args:
+            eligible (callable, optional): Hàm nhận ID sàn, trả về True nếu sàn được phép chọn
+
+        Returns:
+            tuple: (sàn, giá), hoặc None nếu không có sàn nào thỏa điều kiện
+        """
+        top = self.top(1, eligible)
+        return top[0] if top else None
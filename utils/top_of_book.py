@@ -0,0 +1,112 @@
+"""
+Bảng giá mua/bán tốt nhất theo từng cặp giao dịch và từng sàn.
+"""
+from typing import Dict, Optional
+
+
+class TopOfBookTable:
+    """
+    Lưu giá mua (bid) và giá bán (ask) tốt nhất của mỗi sàn cho nhiều cặp giao dịch
+    và tính chênh lệch giá giữa các sàn cho một cặp.
+    """
+
+    def __init__(self, fees: Optional[Dict[str, dict]] = None):
+        """
+        Khởi tạo bảng giá.
+
+        Args:
+            fees (dict, optional): Phí giao dịch của từng sàn (định dạng giống EXCHANGE_FEES)
+        """
+        self.fees = fees or {}
+        self.bids = {}  # symbol -> {exchange_id: giá mua tốt nhất}
+        self.asks = {}  # symbol -> {exchange_id: giá bán tốt nhất}
+
+    def update(self, symbol: str, exchange_id: str, bid: float, ask: float) -> None:
+        """
+        Cập nhật giá tốt nhất của một sàn cho một cặp giao dịch.
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            exchange_id (str): ID của sàn giao dịch
+            bid (float): Giá mua cao nhất
+            ask (float): Giá bán thấp nhất
+        """
+        self.bids.setdefault(symbol, {})[exchange_id] = bid
+        self.asks.setdefault(symbol, {})[exchange_id] = ask
+
+    def update_from_orderbook(self, symbol: str, exchange_id: str, orderbook: dict) -> bool:
+        """
+        Cập nhật giá tốt nhất từ sách lệnh.
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+            exchange_id (str): ID của sàn giao dịch
+            orderbook (dict): Dữ liệu sách lệnh
+
+        Returns:
+            bool: True nếu sách lệnh có đủ hai phía để cập nhật, ngược lại False
+        """
+        if not orderbook.get("bids") or not orderbook.get("asks"):
+            return False
+
+        self.update(symbol, exchange_id, orderbook["bids"][0][0], orderbook["asks"][0][0])
+        return True
+
+    def symbols(self):
+        """
+        Danh sách các cặp giao dịch đã có dữ liệu.
+
+        Returns:
+            list: Danh sách ký hiệu cặp giao dịch
+        """
+        return list(self.bids.keys())
+
+    def _net_spread_pct(self, buy_exchange: str, buy_price: float, sell_exchange: str, sell_price: float) -> float:
+        """Tính chênh lệch giá sau phí (phần trăm) khi mua ở một sàn và bán ở sàn khác."""
+        fee_buy = self.fees.get(buy_exchange, {}).get('give', 0.001)
+        fee_sell = self.fees.get(sell_exchange, {}).get('receive', 0.001)
+        return (sell_price * (1 - fee_sell) - buy_price * (1 + fee_buy)) / buy_price * 100
+
+    def best_spread(self, symbol: str) -> Optional[dict]:
+        """
+        Tìm cặp sàn (mua, bán) khác nhau có chênh lệch giá tốt nhất cho một cặp giao dịch.
+
+        Args:
+            symbol (str): Ký hiệu của cặp giao dịch
+
+        Returns:
+            dict: Thông tin chênh lệch giá tốt nhất, hoặc None nếu có ít hơn hai sàn
+        """
+        asks = self.asks.get(symbol, {})
+        bids = self.bids.get(symbol, {})
+
+        if len(asks) < 2 or len(bids) < 2:
+            return None
+
+        # Xếp hạng theo số tiền nhận được sau phí: phí khác nhau giữa các sàn có thể đảo thứ tự giá.
+        # Với mỗi sàn mua, sàn bán tốt nhất khác nó luôn nằm trong hai sàn nhận được nhiều nhất.
+        sorted_bids = sorted(
+            bids.items(),
+            key=lambda item: item[1] * (1 - self.fees.get(item[0], {}).get('receive', 0.001)),
+            reverse=True,
+        )[:2]
+
+        best = None
+        for buy_exchange, buy_price in asks.items():
+            for sell_exchange, sell_price in sorted_bids:
+                if buy_exchange == sell_exchange:
+                    continue
+
+                net_spread_pct = self._net_spread_pct(buy_exchange, buy_price, sell_exchange, sell_price)
+                if best is None or net_spread_pct > best['net_spread_pct']:
+                    best = {
+                        'symbol': symbol,
+                        'buy_exchange': buy_exchange,
+                        'buy_price': buy_price,
+                        'sell_exchange': sell_exchange,
+                        'sell_price': sell_price,
+                        'spread_pct': (sell_price - buy_price) / buy_price * 100,
+                        'net_spread_pct': net_spread_pct,
+                    }
+
+        return best
@@ -110,3 +110,19 @@ def validate_exchanges_unique(exchanges: List[str]) -> Tuple[bool, Optional[str]
     if len(normalized) != len(set(normalized)):
         return False, "Các sàn giao dịch phải khác nhau"
     return True, None
+
+
+def validate_exchange_count(exchanges: List[str], minimum: int = 2) -> Tuple[bool, Optional[str]]:
+    """
+    Kiểm tra số lượng sàn giao dịch đủ để thực hiện arbitrage.
+    
+    Args:
+        exchanges (list): Danh sách các sàn giao dịch
+        minimum (int): Số sàn tối thiểu
+        
+    Returns:
+        tuple: (is_valid: bool, error_message: str or None)
+    """
+    if len(exchanges) < minimum:
+        return False, f"Cần ít nhất {minimum} sàn giao dịch"
+    return True, None